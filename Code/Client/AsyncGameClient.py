@@ -0,0 +1,326 @@
+from __future__ import annotations
+
+import asyncio
+
+import MessageFraming
+import OperationStatus
+import RoomStatusTable
+import SocketProfile
+
+
+class AsyncGameClient:
+    """
+    The asyncio twin of GameClient.GameClient: the same steps of the protocol, the same parsed answers
+    (OperationStatus.StatusMessage), the heart beats are a task instead of a thread,
+    so thousands of clients run in one event loop, e.g. LoadGenerator.py
+
+    GameClient.GameClient的asyncio版本：协议的步骤和解析后的回答都相同（OperationStatus.StatusMessage），
+    心跳是任务而不是线程，所以一个事件循环里可以运行几千个客户端，例如LoadGenerator.py
+    """
+
+    def __init__(self, server_host: str, server_port: int,
+                 protocol_version: int = OperationStatus.PROTOCOL_VERSION_2,
+                 heart_beat_in_band: bool = False,
+                 socket_profile: str = SocketProfile.LATENCY_PROFILE,
+                 heart_beat_interval: float = 0.5):
+        """
+        :param server_host: the server's host name or IP address
+        :param server_port: the server's port it is listening on
+        :param protocol_version: the preferred protocol version, falls back to v1
+        :param heart_beat_in_band: ask to send the heart beats on the message connection,
+         falls back to a second heart beat connection
+        :param socket_profile: the options of the sockets to the server, one of SocketProfile.SOCKET_PROFILES
+        :param heart_beat_interval: seconds between two heart beats
+        """
+        self.server_host: str = server_host
+        self.server_port: int = server_port
+        self.protocol_version: int = protocol_version
+        self.heart_beat_in_band: bool = heart_beat_in_band
+        self.socket_profile: str = socket_profile
+        self.heart_beat_interval: float = heart_beat_interval
+
+        # Set later
+        self.reader: asyncio.StreamReader | None = None
+        self.writer: asyncio.StreamWriter | None = None
+        self.heart_beat_writer: asyncio.StreamWriter | None = None
+        self.heart_beat_task: asyncio.Task | None = None
+
+        self.username: str | None = None
+        self.password: str | None = None
+        # the username and the password of the login in progress
+        # 正在进行的登录的用户名和密码
+        self.login_username: str | None = None
+        self.login_password: str | None = None
+
+        # where the session is in the protocol, the same as GameClient.GameClient
+        # 会话在协议中的位置，与GameClient.GameClient相同
+        self.in_game_hall: bool = False
+        self.in_room: bool = False
+        self.game_started: bool = False
+
+        # the local room table, updated by /list, /list since, /watch and the pushes after /watch
+        # 本地房间表，由/list、/list since、/watch以及/watch之后的推送更新
+        self.room_status_table: RoomStatusTable.RoomStatusTable = RoomStatusTable.RoomStatusTable()
+
+    async def open_connection(self) -> tuple[asyncio.StreamReader, asyncio.StreamWriter]:
+        reader, writer = await asyncio.open_connection(self.server_host, self.server_port)
+        SocketProfile.apply_socket_profile(writer.get_extra_info("socket"), self.socket_profile)
+        return reader, writer
+
+    async def connect(self) -> None:
+        """
+        Connect to the server and negotiate the protocol with the login header
+        连接服务器，用登录头协商协议
+        :return: None
+        """
+        self.reader, self.writer = await self.open_connection()
+
+        # STEP Head.0.0.0 - Head.0.0.1
+        login_options: list[str] = []
+        if self.protocol_version == OperationStatus.PROTOCOL_VERSION_2:
+            login_options.append(OperationStatus.LOGIN_OPTION_V2)
+        if self.heart_beat_in_band:
+            login_options.append(OperationStatus.LOGIN_OPTION_IN_BAND_HEART_BEAT)
+        await self.send_message(OperationStatus.encode_login_options(OperationStatus.LOGIN_HEADER, login_options))
+
+        accepted_options: list[str] = OperationStatus.decode_login_options(OperationStatus.LOGIN_HEADER_RECEIVED,
+                                                                           await self.recv_message()) or []
+        if OperationStatus.LOGIN_OPTION_V2 not in accepted_options:
+            self.protocol_version = OperationStatus.PROTOCOL_VERSION_1
+        if OperationStatus.LOGIN_OPTION_IN_BAND_HEART_BEAT not in accepted_options:
+            self.heart_beat_in_band = False
+
+        if self.heart_beat_in_band:
+            # the server counts the heart beats from now on
+            # 服务器从现在开始计算心跳
+            await self.start_heart_beat()
+
+    async def start_heart_beat(self) -> None:
+        """
+        Start the heart beat task, on the message connection (in-band) or on a second connection
+        :return: None
+        """
+        if self.heart_beat_in_band:
+            self.heart_beat_task = asyncio.create_task(self.send_heart_beats_in_band())
+            return
+
+        heart_beat_reader, self.heart_beat_writer = await self.open_connection()
+        # the first frame names the player, the server pairs the connection with the login
+        # 第一帧说明玩家，服务器把连接和登录配对
+        self.heart_beat_writer.write(MessageFraming.encode_frame(f"Header:heart beat:{self.username}:client"))
+        self.heart_beat_task = asyncio.create_task(self.send_heart_beats(heart_beat_reader))
+
+    async def send_heart_beats_in_band(self) -> None:
+        # the server does not answer, the writes stop when the connection is closed
+        # 服务器不回复，连接关闭时停止写入
+        while not self.writer.is_closing():
+            self.writer.write(MessageFraming.HEART_BEAT_FRAME)
+            await asyncio.sleep(self.heart_beat_interval)
+
+    async def send_heart_beats(self, heart_beat_reader: asyncio.StreamReader) -> None:
+        # the answers are read apart, a slow answer does not delay the next heart beat past the server's timeout
+        # 单独读取回复，慢的回复不会把下一个心跳推迟到超过服务器的超时
+        answer_task: asyncio.Task = asyncio.create_task(self.read_heart_beat_answers(heart_beat_reader))
+        try:
+            while not self.heart_beat_writer.is_closing():
+                # send the heart beat package, the server answers each of them
+                # 发送心跳包，服务器逐个回复
+                self.heart_beat_writer.write(MessageFraming.encode_frame("Heart beat:atrium:send"))
+                await asyncio.sleep(self.heart_beat_interval)
+        finally:
+            answer_task.cancel()
+
+    @staticmethod
+    async def read_heart_beat_answers(heart_beat_reader: asyncio.StreamReader) -> None:
+        try:
+            while True:
+                await MessageFraming.read_message(heart_beat_reader)
+        except (OSError, RuntimeError):
+            # the connection is closed, the client has exited or the server is gone
+            # 连接已关闭，客户端已退出或者服务器已断开
+            pass
+
+    async def send_message(self, message: str) -> None:
+        self.writer.write(MessageFraming.encode_frame(message))
+        await self.writer.drain()
+
+    async def recv_message(self) -> str:
+        """
+        Receive exactly one message, the heart beat frames are dropped, the pushes go to the room table
+        :return: the message
+        """
+        while True:
+            frame_kind, message = await MessageFraming.read_frame(self.reader)
+            if frame_kind == MessageFraming.FRAME_KIND_MESSAGE:
+                return message
+            if frame_kind == MessageFraming.FRAME_KIND_PUSH:
+                self.room_status_table.apply(message)
+
+    async def receive(self) -> OperationStatus.StatusMessage:
+        return OperationStatus.StatusMessage.parse(await self.recv_message())
+
+    async def send_acknowledgement(self, message: str) -> None:
+        # only v1 acknowledges
+        if self.protocol_version == OperationStatus.PROTOCOL_VERSION_1:
+            await self.send_message(message)
+
+    async def login(self, username: str, password: str) -> OperationStatus.StatusMessage:
+        """
+        Log in, see GameClient.GameClient.login, the steps are also separate calls
+        :return: 1001 Authentication successful or 1002 Authentication failed
+        """
+        await self.read_username_prompt()
+        await self.send_username(username)
+        await self.send_password(password)
+        return await self.read_login_result()
+
+    async def read_username_prompt(self) -> str:
+        """
+        :return: the username prompt (STEP1.0.0.0)
+        """
+        if self.writer is None or self.in_game_hall or self.in_room:
+            raise OperationStatus.InvalidOperationError("Login needs a connected client which is not logged in")
+        return await self.recv_message()
+
+    async def send_username(self, username: str) -> str:
+        """
+        :return: the password prompt (STEP1.0.1.0)
+        """
+        # STEP1.0.0.1 - STEP1.0.1.0
+        self.login_username = username
+        await self.send_message("username:" + username)
+        return await self.recv_message()
+
+    async def send_password(self, password: str) -> str:
+        """
+        :return: the username and password shown back by the server (STEP1.0.2.0)
+        """
+        # STEP1.0.1.1 - STEP1.0.2.0
+        self.login_password = password
+        await self.send_message("password:" + password)
+        return await self.recv_message()
+
+    async def read_login_result(self) -> OperationStatus.StatusMessage:
+        """
+        :return: 1001 Authentication successful or 1002 Authentication failed
+        """
+        # STEP1.0.2.1
+        await self.send_acknowledgement("STEP1.0.2.1 Client Received")
+
+        # STEP1.0.3.0 - STEP1.0.3.1
+        login_result: OperationStatus.StatusMessage = await self.receive()
+        await self.send_acknowledgement("STEP1.0.3.1 Client Received")
+        if not login_result.is_status(OperationStatus.OperationStatus.authentication_successful):
+            return login_result
+
+        self.username = self.login_username
+        self.password = self.login_password
+        if not self.heart_beat_in_band:
+            await self.start_heart_beat()
+
+        # STEP1.1.0.0
+        await self.recv_message()
+        self.in_game_hall = True
+        return login_result
+
+    async def hall_command(self, command: str) -> OperationStatus.StatusMessage:
+        """
+        Send one command of the game hall, see GameClient.GameClient.hall_command
+        :return: the answer of the server (STEP1.1.1.0)
+        """
+        if not self.in_game_hall:
+            raise OperationStatus.InvalidOperationError("Hall commands are only sent in the game hall")
+
+        # STEP1.1.0.1 - STEP1.1.1.0
+        await self.send_message("hall_command:" + command)
+        response: OperationStatus.StatusMessage = await self.receive()
+        self.room_status_table.apply(response.message)
+
+        if response.is_status(OperationStatus.OperationStatus.wait):
+            # STEP 1.1.1.1
+            await self.send_acknowledgement("Client start wait")
+            self.in_game_hall = False
+            self.in_room = True
+        elif response.is_status(OperationStatus.OperationStatus.bye_bye):
+            # STEP1.1.1.1
+            await self.send_acknowledgement("STEP1.1.1.1 Client Received")
+            self.close()
+        else:
+            # STEP1.1.1.1 - STEP1.1.0.0
+            await self.send_acknowledgement("STEP1.1.1.1 Client Received")
+            await self.recv_message()
+        return response
+
+    async def list_rooms(self) -> OperationStatus.StatusMessage:
+        return await self.hall_command("/list")
+
+    async def enter(self, room_id: int) -> OperationStatus.StatusMessage:
+        return await self.hall_command(f"/enter {room_id}")
+
+    async def match(self) -> OperationStatus.StatusMessage:
+        return await self.hall_command("/match")
+
+    async def wait_game_start(self) -> OperationStatus.StatusMessage:
+        """
+        Wait in the room until the game starts, see GameClient.GameClient.wait_game_start
+        :return: 3012 Game started, or the win because another player quit (3024)
+        """
+        if not self.in_room:
+            raise OperationStatus.InvalidOperationError("Only a player in a room waits for the game")
+        if self.game_started:
+            raise OperationStatus.InvalidOperationError("The game has started already")
+
+        # STEP 1.2.0.0
+        game_start: OperationStatus.StatusMessage = await self.receive()
+        if game_start.is_status(OperationStatus.OperationStatus.win_the_game_since_opponent_quit):
+            # Error.quit.1
+            await self.back_to_game_hall()
+        else:
+            self.game_started = True
+        return game_start
+
+    async def guess(self, guess: bool) -> OperationStatus.StatusMessage:
+        """
+        Guess, wait for the result and go back to the game hall, see GameClient.GameClient.guess
+        :return: 3021 winner, 3022 lost, 3023 tie, or the win because another player quit (3024)
+        """
+        if not self.game_started:
+            game_start: OperationStatus.StatusMessage = await self.wait_game_start()
+            if not self.game_started:
+                return game_start
+
+        # STEP 1.2.0.1 - STEP 1.2.1.0 | Error.receive.1
+        await self.send_message(str(guess))
+        result: OperationStatus.StatusMessage = await self.receive()
+        await self.back_to_game_hall()
+        return result
+
+    async def back_to_game_hall(self) -> None:
+        # STEP1.2.2.0 - STEP1.1.0.0
+        await self.send_acknowledgement("STEP1.2.2.0 Client Received")
+        await self.recv_message()
+        self.in_room = False
+        self.game_started = False
+        self.in_game_hall = True
+
+    async def exit(self) -> OperationStatus.StatusMessage:
+        """
+        Leave the game hall and close the connections
+        :return: 4001 Bye bye
+        """
+        return await self.hall_command("/exit")
+
+    def close(self) -> None:
+        """
+        Close the connections and stop the heart beats
+        关闭连接并停止心跳
+        :return: None
+        """
+        self.in_game_hall = False
+        self.in_room = False
+        self.game_started = False
+        if self.heart_beat_task is not None:
+            self.heart_beat_task.cancel()
+        for writer in (self.writer, self.heart_beat_writer):
+            if writer is not None:
+                writer.close()
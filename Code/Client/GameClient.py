@@ -1,18 +1,41 @@
 import socket
-import threading
 import sys
 import OperationStatus
+import MessageFraming
 import re
 import HeartBeatThreadClient
+import RoomStatusTable
+import SocketProfile
 
 
 class GameClient:
-    def __init__(self, server_host: str, server_port: int):
+    """
+    The Game Client as a library, for the command line (GameClientCLI), bots and load tests
+    connect, login, list_rooms, enter, guess and exit each do one step of the protocol and return
+    the parsed answer of the server (OperationStatus.StatusMessage), nothing is read from input() or printed,
+    so many clients can run in one process
+
+    游戏客户端库，用于命令行（GameClientCLI）、机器人和负载测试
+    connect、login、list_rooms、enter、guess和exit各自完成协议的一步，返回解析后的服务器回答（OperationStatus.StatusMessage），
+    不读取input()也不打印，所以一个进程里可以运行很多客户端
+    """
+
+    def __init__(self, server_host: str, server_port: int,
+                 protocol_version: int = OperationStatus.PROTOCOL_VERSION_2,
+                 heart_beat_in_band: bool = False,
+                 socket_profile: str = SocketProfile.LATENCY_PROFILE,
+                 heart_beat_interval: float = 0.5):
         """
-        The Game Client for connecting to the server
+        The Game Client for connecting to the server, call connect() first
         Use TCP
         :param server_host: the server's host name or IP address
         :param server_port: the server's port it is listening on
+        :param protocol_version: the preferred protocol version,
+         falls back to v1 if the server does not support v2
+        :param heart_beat_in_band: ask to send the heart beats on the message socket,
+         falls back to a second heart beat connection if the server does not support it
+        :param socket_profile: the options of the sockets to the server, one of SocketProfile.SOCKET_PROFILES
+        :param heart_beat_interval: seconds between two heart beats
         """
         # Use TCP
 
@@ -22,318 +45,506 @@ class GameClient:
         self.server_port: int = server_port
 
         # Set later
+        self.server_socket: socket.socket | None = None
+        self.server_channel: MessageFraming.FramedSocket | None = None
         self.server_socket_heart_beat: socket.socket | None = None
 
         self.username: str | None = None
         self.password: str | None = None
-
-        # flag for quit game
-        # 退出游戏的标志
-        self.quit_game_room_other_exit: bool = False
-        # 猜测的标志
-        self.on_guessing: bool = False
-
-
-
+        # the username and the password of the login in progress, see send_username() and send_password()
+        # 正在进行的登录的用户名和密码，见send_username()和send_password()
+        self.login_username: str | None = None
+        self.login_password: str | None = None
+
+        # the preferred protocol version, it becomes the negotiated one after the login header
+        # 期望的协议版本，发送登录头后变为协商结果
+        self.protocol_version: int = protocol_version
+        # whether the heart beats are on the message socket, also negotiated after the login header
+        # 心跳是否在消息套接字上，同样在发送登录头后变为协商结果
+        self.heart_beat_in_band: bool = heart_beat_in_band
+        # the options set on the message socket and the heart beat socket
+        # 在消息套接字和心跳套接字上设置的选项
+        self.socket_profile: str = socket_profile
+        self.heart_beat_interval: float = heart_beat_interval
+
+        # where the session is in the protocol, the calls check it
+        # 会话在协议中的位置，各个调用会检查它
+        # logged in and the server is ready for a hall command (STEP1.1.0.0 received)
+        # 已登录，服务器准备好接收大厅命令（已收到STEP1.1.0.0）
+        self.in_game_hall: bool = False
+        # "3011 Wait" received, the game is played by wait_game_start() and guess()
+        # 已收到"3011 Wait"，游戏由wait_game_start()和guess()进行
+        self.in_room: bool = False
+        # the start of the game (3012) received, the guess is next
+        # 已收到游戏开始（3012），接下来是猜测
+        self.game_started: bool = False
+
+        # the local room table, updated by /list, /list since, /watch and the pushes after /watch
+        # 本地房间表，由/list、/list since、/watch以及/watch之后的推送更新
+        self.room_status_table: RoomStatusTable.RoomStatusTable = RoomStatusTable.RoomStatusTable()
+
+    def connect(self) -> None:
+        """
+        Connect to the server and negotiate the protocol with the login header
+        连接服务器，用登录头协商协议
+        :return: None
+        """
         # create the socket
         # AF_INET is the address family for IPv4
         # SOCK_STREAM is the socket type for TCP
         # 创建用户端的套接字，客户端连接口抽象层
         # AF_INET是IPv4的地址族
         # SOCK_STREAM是TCP的套接字类型
-        self.server_socket: socket.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        SocketProfile.apply_socket_profile(self.server_socket, self.socket_profile)
 
         # connect to the server
         # 连接到服务器，host:port
-        # try to connect to the server, Catch exceptions
-        # 尝试连接服务器，捕获异常
-        try:
-            self.server_socket.connect((self.server_host, self.server_port))
-        except Exception as e:
-            print(e)
+        self.server_socket.connect((self.server_host, self.server_port))
 
+        # every message of the protocol is sent and received as a frame through this channel
+        # 协议的所有消息都通过这个通道按帧收发
+        self.server_channel = MessageFraming.FramedSocket(self.server_socket)
+        self.server_channel.push_handler = self.room_status_table.apply
 
-        # 设置心跳的socket
-        self.server_socket_heart_beat: socket.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        # STEP Head.0.0.0
+        # 要告诉服务器，这是登录的socket
+        # tell the server, this is the login socket
+        login_options: list[str] = []
+        if self.protocol_version == OperationStatus.PROTOCOL_VERSION_2:
+            login_options.append(OperationStatus.LOGIN_OPTION_V2)
+        if self.heart_beat_in_band:
+            login_options.append(OperationStatus.LOGIN_OPTION_IN_BAND_HEART_BEAT)
+        self.server_channel.send_message(OperationStatus.encode_login_options(OperationStatus.LOGIN_HEADER,
+                                                                              login_options))
 
-        try:
+        # STEP Head.0.0.1
+        # Received the message from the server, that the server is ready for the command
+        # the server answers the options it accepts, we fall back for the others
+        # 服务器回复它接受的选项，其他选项退回旧方式
+        accepted_options: list[str] = OperationStatus.decode_login_options(OperationStatus.LOGIN_HEADER_RECEIVED,
+                                                                           self.server_channel.recv_message()) or []
+        if OperationStatus.LOGIN_OPTION_V2 not in accepted_options:
+            self.protocol_version = OperationStatus.PROTOCOL_VERSION_1
+        if OperationStatus.LOGIN_OPTION_IN_BAND_HEART_BEAT not in accepted_options:
+            self.heart_beat_in_band = False
+
+        if self.heart_beat_in_band:
+            # the server counts the heart beats from now on, even while the username is being typed
+            # 服务器从现在开始计算心跳，即使还在输入用户名
+            self.start_heart_beat()
+
+    def start_heart_beat(self) -> None:
+        """
+        Start the heart beat thread, on the message socket (in-band)
+        or on a second connection to the server
+        :return: None
+        """
+        if not self.heart_beat_in_band:
+            # 设置心跳的socket
+            self.server_socket_heart_beat = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            SocketProfile.apply_socket_profile(self.server_socket_heart_beat, self.socket_profile)
             self.server_socket_heart_beat.connect((self.server_host, self.server_port))
-        except Exception as e:
-            print(e)
 
-        # start the client
-        # 开始客户端
-        self.start()
+        # set the heart beat
+        heart_beat_thread: HeartBeatThreadClient.HeartBeatThreadClient = HeartBeatThreadClient.HeartBeatThreadClient(
+            self.server_socket_heart_beat,
+            self,
+            self.username,
+            heart_beat_interval=self.heart_beat_interval,
+            in_band=self.heart_beat_in_band
+        )
+
+        # start the thread
+        # 开始线程
+        heart_beat_thread.start()
+
+    def send_acknowledgement(self, message: str) -> None:
+        """
+        Tell the server the message is received, only v1 needs it
+        告诉服务器消息已收到，只有v1需要
+        :param message: the acknowledgement
+        :return: None
+        """
+        if self.protocol_version == OperationStatus.PROTOCOL_VERSION_1:
+            self.server_channel.send_message(message)
+
+    def receive(self) -> OperationStatus.StatusMessage:
+        return OperationStatus.StatusMessage.parse(self.server_channel.recv_message())
+
+    def login(self, username: str, password: str) -> OperationStatus.StatusMessage:
+        """
+        Log in, on success the heart beat is established and the game hall is entered,
+        on failure login() can be called again
+        The steps are also separate calls, read_username_prompt(), send_username(), send_password()
+        and read_login_result(), for a caller showing the prompts of the server, e.g. GameClientCLI
+        登录，成功后建立心跳并进入游戏大厅，失败后可以再次调用login()
+        这些步骤也可以分别调用，供显示服务器提示的调用者使用，例如GameClientCLI
+        :param username: the username, may be empty
+        :param password: the password, may be empty
+        :return: 1001 Authentication successful or 1002 Authentication failed
+        """
+        self.read_username_prompt()
+        self.send_username(username)
+        self.send_password(password)
+        return self.read_login_result()
+
+    def read_username_prompt(self) -> str:
+        """
+        Start a login, receive the username prompt of the server
+        开始登录，接收服务器的用户名提示
+        :return: the username prompt (STEP1.0.0.0)
+        """
+        if self.server_channel is None or self.in_game_hall or self.in_room:
+            raise OperationStatus.InvalidOperationError("Login needs a connected client which is not logged in")
+
+        # STEP1.0.0.0
+        # username prompt
+        # 用户名提示
+        return self.server_channel.recv_message()
+
+    def send_username(self, username: str) -> str:
+        """
+        Send the username, receive the password prompt of the server
+        发送用户名，接收服务器的密码提示
+        :param username: the username, may be empty
+        :return: the password prompt (STEP1.0.1.0)
+        """
+        # STEP1.0.0.1
+        # Add a head of sending, to allow empty username
+        # 添加发送的头，允许空用户名
+        self.login_username = username
+        self.server_channel.send_message("username:" + username)
+
+        # STEP1.0.1.0
+        # password prompt
+        # 密码提示
+        return self.server_channel.recv_message()
+
+    def send_password(self, password: str) -> str:
+        """
+        Send the password, receive the username and password shown back by the server
+        发送密码，接收服务器回显的用户名和密码
+        :param password: the password, may be empty
+        :return: the username and password shown back, to let the user confirm (STEP1.0.2.0)
+        """
+        # STEP1.0.1.1
+        # Add a head of sending, to allow empty password
+        # 添加发送的头，允许空密码
+        self.login_password = password
+        self.server_channel.send_message("password:" + password)
+
+        # STEP1.0.2.0
+        # show username and password, to let user confirm
+        # 显示用户名和密码，方便用户确认
+        return self.server_channel.recv_message()
+
+    def read_login_result(self) -> OperationStatus.StatusMessage:
+        """
+        Receive the result of the login, on success the heart beat is established and the game hall is entered
+        接收登录结果，成功后建立心跳并进入游戏大厅
+        :return: 1001 Authentication successful or 1002 Authentication failed
+        """
+        # STEP1.0.2.1
+        # tell the server the username and password shown back are received
+        # 告诉服务器已收到回显的用户名和密码
+        self.send_acknowledgement("STEP1.0.2.1 Client Received")
+
+        # STEP1.0.3.0 - STEP1.0.3.1
+        # The result of the login verification
+        # 登录验证的结果
+        login_result: OperationStatus.StatusMessage = self.receive()
+        self.send_acknowledgement("STEP1.0.3.1 Client Received")
+        if not login_result.is_status(OperationStatus.OperationStatus.authentication_successful):
+            return login_result
+
+        # 储存用户名和密码
+        # save the username and the password
+        self.username = self.login_username
+        self.password = self.login_password
+
+        # 这个时候要建立心跳链接，定时发送信息，因为如果断开连接，服务器并不知道
+        # set the heart beat now, the in-band one is already running since the login header
+        # 设置心跳，带内心跳从登录头之后就已经在运行
+        if not self.heart_beat_in_band:
+            self.start_heart_beat()
+
+        # STEP1.1.0.0
+        # the server is ready for the command, after the heart beat is established
+        # 心跳建立之后，服务器准备好接收命令
+        self.server_channel.recv_message()
+        self.in_game_hall = True
+        return login_result
+
+    def hall_command(self, command: str) -> OperationStatus.StatusMessage:
+        """
+        Send one command of the game hall, e.g. /list, /match, /watch, /list since 0
+        发送一条游戏大厅命令
+        :param command: the command
+        :return: the answer of the server (STEP1.1.1.0); after "3011 Wait" the game is played
+         by wait_game_start() and guess(), after "4001 Bye bye" the client is closed
+        """
+        if not self.in_game_hall:
+            raise OperationStatus.InvalidOperationError("Hall commands are only sent in the game hall")
+
+        # STEP1.1.0.1
+        # add head "hall_command:" to the command, to prevent an empty command
+        # 添加头"hall_command:"到命令，防止空命令
+        self.server_channel.send_message("hall_command:" + command)
+
+        # STEP1.1.1.0
+        # get the server's response, exception or success, for any commands
+        # 获得服务器返回的消息，异常还是成功
+        response: OperationStatus.StatusMessage = self.receive()
+        self.room_status_table.apply(response.message)
+
+        if response.is_status(OperationStatus.OperationStatus.wait):
+            # STEP 1.1.1.1
+            # tell the server, I received the message, start to wait
+            self.send_acknowledgement("Client start wait")
+            self.in_game_hall = False
+            self.in_room = True
+
+        elif response.is_status(OperationStatus.OperationStatus.bye_bye):
+            # STEP1.1.1.1
+            # tell the server, I received the message
+            self.send_acknowledgement("STEP1.1.1.1 Client Received")
+            self.close()
+
+        else:
+            # STEP1.1.1.1 - STEP1.1.0.0
+            # for any other message, tell the server I received it, then the server is ready again
+            # 其他消息，告诉服务器已收到，然后服务器再次准备好
+            self.send_acknowledgement("STEP1.1.1.1 Client Received")
+            self.server_channel.recv_message()
+
+        return response
+
+    def list_rooms(self) -> OperationStatus.StatusMessage:
+        """
+        :return: 3001 number_of_all_rooms number_of_players_in_room_1 ..., also in room_status_table
+        """
+        return self.hall_command("/list")
+
+    def enter(self, room_id: int) -> OperationStatus.StatusMessage:
+        """
+        :param room_id: the room, from 0
+        :return: 3011 Wait, 3013 The room is full, or 4002 Unrecognized message
+        """
+        return self.hall_command(f"/enter {room_id}")
 
+    def match(self) -> OperationStatus.StatusMessage:
+        """
+        Enter the fullest room with a free seat
+        :return: 3011 Wait, or 3013 The room is full if every room is full
+        """
+        return self.hall_command("/match")
+
+    def wait_game_start(self) -> OperationStatus.StatusMessage:
+        """
+        Wait in the room until the game starts, guess() waits for it too if it is not called
+        在房间里等待游戏开始，如果没有调用它，guess()也会等待
+        :return: 3012 Game started, or the win because another player quit (3024), then back in the game hall
+        """
+        if not self.in_room:
+            raise OperationStatus.InvalidOperationError("Only a player in a room waits for the game")
+        if self.game_started:
+            raise OperationStatus.InvalidOperationError("The game has started already")
+
+        # STEP 1.2.0.0
+        # wait for receiving the message from the server
+        # that the game is started / or the game is finished because someone is out of connection
+        # 等待接收服务器的消息，游戏开始/或者游戏结束因为有人断开连接
+        game_start: OperationStatus.StatusMessage = self.receive()
+        if game_start.is_status(OperationStatus.OperationStatus.win_the_game_since_opponent_quit):
+            # Error.quit.1
+            self.back_to_game_hall()
+        else:
+            self.game_started = True
+        return game_start
+
+    def guess(self, guess: bool) -> OperationStatus.StatusMessage:
+        """
+        Guess, wait for the result and go back to the game hall
+        猜测，等待结果并回到游戏大厅
+        :param guess: true or false
+        :return: 3021 winner, 3022 lost, 3023 tie, or the win because another player quit (3024)
+        """
+        if not self.game_started:
+            game_start: OperationStatus.StatusMessage = self.wait_game_start()
+            if not self.game_started:
+                # another player quit before the game started
+                # 另一个玩家在游戏开始前退出
+                return game_start
+
+        # STEP 1.2.0.1
+        # send to the server, capitalized
+        # 首字母大写，发送到服务器
+        self.server_channel.send_message(str(guess))
+
+        # STEP 1.2.1.0 | Error.receive.1
+        # receive the message from the server, RESULT
+        # 接收服务器的消息，结果
+        result: OperationStatus.StatusMessage = self.receive()
+        self.back_to_game_hall()
+        return result
+
+    def back_to_game_hall(self) -> None:
+        # STEP1.2.2.0 - STEP1.1.0.0
+        # tell the server, I received the RESULT, then the server is ready for the command
+        # 告诉服务器收到了结果，然后服务器准备好接收命令
+        self.send_acknowledgement("STEP1.2.2.0 Client Received")
+        self.server_channel.recv_message()
+        self.in_room = False
+        self.game_started = False
+        self.in_game_hall = True
+
+    def exit(self) -> OperationStatus.StatusMessage:
+        """
+        Leave the game hall and close the connections
+        :return: 4001 Bye bye
+        """
+        return self.hall_command("/exit")
+
+    def close(self) -> None:
+        """
+        Close the connections, the heart beat thread ends with them
+        关闭连接，心跳线程随之结束
+        :return: None
+        """
+        self.in_game_hall = False
+        self.in_room = False
+        self.game_started = False
+        for client_socket in (self.server_socket, self.server_socket_heart_beat):
+            if client_socket is not None:
+                client_socket.close()
+
+
+class GameClientCLI:
+    """
+    The interactive command line, on top of GameClient
+    Reads the username, the password and the commands from input(), prints the answers of the server
+
+    交互式命令行，建立在GameClient之上
+    从input()读取用户名、密码和命令，打印服务器的回答
+    """
+
+    def __init__(self, game_client: GameClient):
+        self.game_client: GameClient = game_client
 
     def start(self):
+        try:
+            self.game_client.connect()
+        except Exception as e:
+            print(e)
+            # 0 means normal exit, 1 means exceptional exit
+            sys.exit(0)
         self.login()
         self.game_hall_loop()
 
     def login(self) -> None:
         """
-        The login process
+        The login process, until the login is successful
         :return: None
         """
-        # STEP Head.0.0.0
-        # 要告诉服务器，这是登录的socket
-        # tell the server, this is the login socket
-        self.server_socket.send("Header:login".encode())
-
-        # STEP Head.0.0.1
-        # Received the message from the server, that the server is ready for the command
-        self.server_socket.recv(1024).decode()
-
-
         # Get input for sending
         while True:
             try:
-                # username prompt
-                # 用户名提示
-                # STEP1.0.0.0
-                received_message: str = self.server_socket.recv(1024).decode()
-                print(received_message, end="")
-
-                # input the username
-                # 输入用户名
-                username: str = input()
-                # Add a head of sending, to allow empty username
-                # 添加发送的头，允许空用户名
-                username = "username:" + username
-                # send the username
-                # 发送用户名
-                # STEP1.0.0.1
-                self.server_socket.send(username.encode())
-
-
-                # STEP1.0.1.0
-                # password prompt
-                # 密码提示
-                received_message: str = self.server_socket.recv(1024).decode()
-                print(received_message, end="")
-
-                # input the password
-                # 输入密码
-                password: str = input()
-                # Add a head of sending, to allow empty password
-                # 添加发送的头，允许空密码
-                password = "password:" + password
-                # send the password
-                # STEP1.0.1.1
-                # 发送密码
-                self.server_socket.send(password.encode())
-
+                # STEP1.0.0.0 - STEP1.0.0.1
+                # the username prompt of the server, then input the username
+                # 服务器的用户名提示，然后输入用户名
+                print(self.game_client.read_username_prompt(), end="")
+                password_prompt: str = self.game_client.send_username(input())
+
+                # STEP1.0.1.0 - STEP1.0.1.1
+                # the password prompt of the server, then input the password
+                # 服务器的密码提示，然后输入密码
+                print(password_prompt, end="")
+                login_echo: str = self.game_client.send_password(input())
 
                 # STEP1.0.2.0
-                # show username and password, to let user comfirm
+                # show username and password, to let user confirm
                 # 显示用户名和密码，方便用户确认
-                received_message: str = self.server_socket.recv(1024).decode()
-                print(received_message, end="")
-
-                # STEP1.0.2.1
-                # send msg to the server, I received the message
-                self.server_socket.send("STEP1.0.2.1 Client Received".encode())
-                # print("STEP1.0.2.1", "Client Received")
-
-                # STEP1.0.3.0
-                # The result of the login verification
-                # 登录验证的结果
-                received_message: str = self.server_socket.recv(1024).decode()
-                # print("STEP1.0.3.0", received_message)
-
-                # STEP1.0.3.1
-                # send msg to the server, I received the message
-                self.server_socket.send("STEP1.0.3.1 Client Received".encode())
+                print(login_echo, end="")
 
                 # if the username and password are correct, break the loop
                 # 如果用户名和密码正确，退出循环
-                if received_message == OperationStatus.OperationStatus.authentication_successful:
-                    # 储存用户名
-                    # save the username
-                    self.username: str = username
-                    # 储存密码
-                    # save the password
-                    self.password: str = password
-
+                if self.game_client.read_login_result().is_status(
+                        OperationStatus.OperationStatus.authentication_successful):
                     print("Login successful")
                     break
 
             except KeyboardInterrupt:
                 print('\n')
                 print("Terminated abnormally!!")
-                self.server_socket.close()
+                self.game_client.close()
                 # 0 means normal exit, 1 means exceptional exit
                 sys.exit(0)
 
             except Exception as e:
                 print(e)
-                self.server_socket.close()
+                self.game_client.close()
                 # 0 means normal exit, 1 means exceptional exit
                 sys.exit(0)
 
     def game_hall_loop(self):
-        command: str
-        # 这个时候要建立心跳链接，定时发送信息，因为如果断开连接，服务器并不知道
-        # 新线程
-        # 设置心跳
-        # print("start setting heart beat")
-
-        # set the heart beat
-        heart_beat_thread: HeartBeatThreadClient.HeartBeatThreadClient = HeartBeatThreadClient.HeartBeatThreadClient(
-            self.server_socket_heart_beat,
-            self,
-            self.username
-        )
-
-        # start the thread
-        # 开始线程
-        heart_beat_thread.start()
-        # print("finish setting, start heart beat")
-
         while True:
-            # STEP1.1.0.0
-            # Receive the message from the server,
-            # that the server is ready for the command
-            header = self.server_socket.recv(1024).decode()
-
-            # print(header)
-
             # STEP1.1.0.1
-            command = input()
-            # prevent for empty command
-            # 防止空命令
-            # add head "hall_command:" to the command
-            # 添加头"hall_command:"到命令
-            head: str = "hall_command:"
-            command = head + command
-
-            # send the command to the server
-            # 发送命令到服务器
-            self.server_socket.send(command.encode())
-
-            # print(command)
+            command: str = input()
+            # /rooms is answered from the local room table, the server is not asked
+            # /rooms由本地房间表回答，不询问服务器
+            while command == "/rooms":
+                print(self.game_client.room_status_table)
+                command = input()
 
             # STEP1.1.1.0
-            # get the server's response, exception or success
-            # 获得服务器返回的消息，异常还是成功, for any commands
-            received_message: str = self.server_socket.recv(1024).decode()
-            print(received_message)
-
-
-            # if success, break the loop
-            # 如果成功
-            if received_message == OperationStatus.OperationStatus.wait:
-
-                # STEP 1.1.1.1
-                # send msg to the server, I received the message, start to wait
-                self.server_socket.send("Client start wait".encode())
-
-                # STEP 1.1.2.0
-                # wait for receiving the message from the server
-                # Server received
-                # 等待服务器通知，游戏开始
-                # 创建游戏线程，并等待游戏线程结束
+            # get the server's response, exception or success, for any commands
+            # 获得服务器返回的消息，异常还是成功
+            response: OperationStatus.StatusMessage = self.game_client.hall_command(command)
+            print(response.message)
+
+            # if success, wait for the game
+            # 如果成功，等待游戏
+            if response.is_status(OperationStatus.OperationStatus.wait):
                 self.game_loop()
                 # after the game, back to the game hall
 
             # if exit, exit the game
             # 如果退出，退出游戏
-            elif received_message == OperationStatus.OperationStatus.bye_bye:
-                # STEP1.1.1.1
-                # tell the server, I received the message
-                self.server_socket.send("STEP1.1.1.1 Client Received".encode())
-
-                self.server_socket.close()
+            elif response.is_status(OperationStatus.OperationStatus.bye_bye):
                 sys.exit(0)
 
-            else:
-                # STEP1.1.1.1
-                # for any other message
-                # tell the server, I received the message
-                self.server_socket.send("STEP1.1.1.1 Client Received".encode())
-
-
-
     def game_loop(self):
-
         # STEP 1.2.0.0
-        # wait for receiving the message from the server
-        # that the game is started / or the game is finished because someone is out of connection
-        # 等待接收服务器的消息，游戏开始/或者游戏结束因为有人断开连接
+        # 等待服务器通知，游戏开始，或者有人断开连接时游戏结束
         # 3012 OR Win
-        received_message: str = self.server_socket.recv(1024).decode()
-        print(received_message)
-
-        if received_message == OperationStatus.OperationStatus.win_the_game_since_opponent_quit:
-            # Error.quit.1
-            self.server_socket.send("STEP1.2.2.0 Client Received".encode())
+        game_start: OperationStatus.StatusMessage = self.game_client.wait_game_start()
+        print(game_start.message)
+        if not self.game_client.game_started:
             return
 
         while True:
             # STEP 1.2.0.1
             # input command of guess true or false
             # 输入猜测的命令
-            # 设置开始猜测，这样如果收到退出游戏的消息
-            self.on_guessing = True
             command: str = input()
-            # 设置结束猜测
-            self.on_guessing = False
-
-            # flag 不为False，说明有人退出游戏
-            # if the flag is not False, it means someone quit the game
-            # if self.quit_game_room_other_exit:
-                # STEP
-                # 接受服务器的你赢了消息，游戏结束
-                # received_message: str = self.server_socket.recv(1024).decode()
-                # 但是由于前面心跳线程已经打印了退出游戏的消息，所以这里不用打印
-                # but the heart beat thread has already print the message of quit game
-                # so here we don't need to print
-                # print(received_message)
-                # break
 
             # only true/false will send to the server
             # 只有true/false会发送到服务器，true/false不区分大小写
             if matched_user_command := re.fullmatch(r'/guess (?P<guess>[Tt][Rr][Uu][Ee]|[Ff][Aa][Ll][Ss][Ee])', command):
-                # get the guess
-                # 获得猜测
-                guess: str = matched_user_command.group("guess")
-
-                # capitalize the first letter
-                # 首字母大写
-                guess = guess.capitalize()
-
-                # STEP 1.2.0.1
-                # send to the server
-                # 发送到服务器
-                self.server_socket.send(guess.encode())
-
-                # STEP 1.2.1.0 | Error.receive.1
-                # receive the message from the server, RESULT
-                # 接收服务器的消息
-                received_message: str = self.server_socket.recv(1024).decode()
-                # the received message should be the result of the game
-                print(received_message)
-
-                if received_message == OperationStatus.OperationStatus.win_the_game_since_opponent_quit:
-                    # Error.quit.1
-                    self.server_socket.send("STEP1.2.2.0 Client Received".encode())
-                    break
-
-                else:
-                    # print("STEP1.2.2.0 START")
-                    # STEP1.2.2.0 (NEED FIX)
-                    # tell the server, I received the RESULT
-                    self.server_socket.send("STEP1.2.2.0 Client Received".encode())
-                    # print("STEP1.2.2.0 END")
-
-                    break
+                # STEP 1.2.0.1 - STEP 1.2.1.0
+                # the result of the game, or the win because someone quit
+                # 游戏结果，或者因为有人退出而获胜
+                result: OperationStatus.StatusMessage = self.game_client.guess(
+                    matched_user_command.group("guess").lower() == "true")
+                print(result.message)
+                break
 
             else:
                 print(OperationStatus.OperationStatus.unrecognized_message)
 
         # back to game hall
         # 回到游戏大厅
-        # self.game_hall_loop()
 
 
 if __name__ == '__main__':
@@ -348,4 +559,4 @@ if __name__ == '__main__':
     game_client: GameClient = GameClient(server_host, server_port)
     '''
     game_client: GameClient = GameClient("localhost", 15210)
-
+    GameClientCLI(game_client).start()
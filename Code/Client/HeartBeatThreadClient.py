@@ -1,44 +1,80 @@
+from __future__ import annotations
+
 import socket
 import threading
 import time
 import OperationStatus
+import MessageFraming
 import GameClient
 
 
 class HeartBeatThreadClient(threading.Thread):
 
-    def __init__(self, server_socket: socket.socket,
+    def __init__(self, server_socket: socket.socket | None,
                  player_client: GameClient.GameClient,
-                 player_name: str,
-                 heart_beat_interval: int = 0.5):
-        super().__init__()
-        # the server socket
-        self.server_socket: socket.socket = server_socket
+                 player_name: str | None,
+                 heart_beat_interval: float = 0.5,
+                 in_band: bool = False):
+        # a daemon, many clients may run in one process, it ends when the client closes its sockets
+        # 守护线程，一个进程里可能运行很多客户端，客户端关闭套接字时它就结束
+        super().__init__(daemon=True)
+        # the server socket, None for in-band
+        self.server_socket: socket.socket | None = server_socket
+        # in-band: heart beat frames on the message channel of the client, shared with the main thread
+        # 带内：心跳帧在客户端的消息通道上发送，与主线程共用
+        self.in_band: bool = in_band
+        if in_band:
+            self.server_channel: MessageFraming.FramedSocket = player_client.server_channel
+        else:
+            self.server_channel: MessageFraming.FramedSocket = MessageFraming.FramedSocket(server_socket)
         # the heart beat interval
-        self.heart_beat_interval: int = heart_beat_interval
-        # the player info
-        # 格式是 username:{real_username}
-        self.player_name: str = player_name
+        self.heart_beat_interval: float = heart_beat_interval
+        # the username, None for in-band, the heart beats start before the login
+        # 用户名，带内心跳为None，心跳在登录之前开始
+        self.player_name: str | None = player_name
 
         self.player_client: GameClient.GameClient = player_client
 
     def run(self):
+        if self.in_band:
+            self.run_in_band()
+            return
+
         # 定期发送心跳包
         # send heart beat package periodically
         # 先发送玩家信息，用于校验
         # send the player information first, for the verification
         # 发送的格式为：Header:player info:username
-        player_info_header: str = "Header:heart beat:{}:client".format(self.player_name.split(":")[1])
-        self.server_socket.send(player_info_header.encode())
-        print("finish sending 1st heart beat package")
-
-        while True:
-            # send the heart beat package
-            # 发送心跳包
-            # 发送的格式为：Header:heart beat:username
-            self.server_socket.send("Heart beat:atrium:send".encode())
-            # Receive the message from the server, check both alive
-            received_heart_beat: str = self.server_socket.recv(1024).decode()
-
-            # print("finish sending heart beat package NN")
-            time.sleep(self.heart_beat_interval)
+        player_info_header: str = "Header:heart beat:{}:client".format(self.player_name)
+        try:
+            self.server_channel.send_message(player_info_header)
+
+            while True:
+                # send the heart beat package
+                # 发送心跳包
+                # 发送的格式为：Header:heart beat:username
+                self.server_channel.send_message("Heart beat:atrium:send")
+                # Receive the message from the server, check both alive
+                received_heart_beat: str = self.server_channel.recv_message()
+                # handle the pushes waiting on the message socket, e.g. while the user is typing
+                # 处理消息套接字上等待的推送，例如用户正在输入时
+                self.player_client.server_channel.poll_heart_beats()
+
+                # print("finish sending heart beat package NN")
+                time.sleep(self.heart_beat_interval)
+        except (OSError, ValueError):
+            # a socket is closed, the client has exited or the server is gone
+            # 套接字已关闭，客户端已退出或者服务器已断开
+            return
+
+    def run_in_band(self):
+        # 定期在消息通道上发送心跳帧，服务器不回复，发送失败说明连接已断开
+        # send heart beat frames on the message channel periodically,
+        # the server does not answer, a failed send means the connection is lost
+        try:
+            while True:
+                self.server_channel.send_heart_beat()
+                self.server_channel.poll_heart_beats()
+                time.sleep(self.heart_beat_interval)
+        except (OSError, ValueError):
+            pass
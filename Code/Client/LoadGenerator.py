@@ -0,0 +1,368 @@
+from __future__ import annotations
+
+import argparse
+import asyncio
+import dataclasses
+import json
+import random
+import statistics
+import sys
+import time
+
+import AsyncGameClient
+import OperationStatus
+
+# Load generator: thousands of bot players in one process, one event loop, each bot an AsyncGameClient
+# 负载生成器：一个进程、一个事件循环里运行几千个机器人玩家，每个机器人是一个AsyncGameClient
+# python3 LoadGenerator.py --write-accounts ../Server/LoadUsers.txt --players 2000
+# python3 GameServer.py thread LoadUsers.txt                       (in the Server folder)
+# python3 LoadGenerator.py --players 2000 --login-rate 200 --duration 30 --server-pid <pid of the server>
+
+# the steps timed, in the order of a session; game_start is the wait in the room for the other players
+# 测量的步骤，按会话中的顺序；game_start是在房间里等待其他玩家的时间
+LOAD_STEPS: tuple[str, ...] = ("connect", "login", "list", "enter", "match", "game_start", "guess", "exit")
+# /enter picks one of this many fullest free rooms of the local table
+# /enter从本地房间表最满的这么多个空闲房间中挑一个
+ENTER_CHOICES: int = 4
+
+
+@dataclasses.dataclass
+class LoadProfile:
+    """
+    What the bots do, every bot the same with its own random numbers
+    机器人做什么，每个机器人都一样，只是随机数不同
+    """
+    # the bots, one account each
+    players: int = 100
+    # bots logging in per second, the ramp up
+    login_rate: float = 50
+    # seconds each bot plays after its login, then it exits
+    duration: float = 30
+    # /list per second of a bot in the game hall, 0 for none
+    list_rate: float = 0.5
+    # the share of the games joined by /enter of a room from the local table, the others by /match
+    enter_ratio: float = 0.5
+    # the share of the guesses which are true
+    true_ratio: float = 0.5
+    # the mean seconds a bot thinks before each command and each guess, exponentially distributed
+    think_time: float = 0.2
+    # seconds a bot waits in a room for the other players before it gives up and leaves
+    game_start_timeout: float = 10
+    heart_beat_in_band: bool = True
+    protocol_version: int = OperationStatus.PROTOCOL_VERSION_2
+    seed: int = 3234
+
+
+class StepStats:
+    """
+    The latencies and the errors of one step
+    一个步骤的延迟和错误
+    """
+
+    def __init__(self) -> None:
+        self.latencies: list[float] = []
+        self.error_number: int = 0
+
+    def summary(self, elapsed: float) -> dict[str, float | int | None]:
+        latencies: list[float] = sorted(self.latencies)
+        attempt_number: int = len(latencies) + self.error_number
+        return {
+            "count": len(latencies),
+            "per_second": round(len(latencies) / elapsed, 1),
+            "errors": self.error_number,
+            "error_rate": round(self.error_number / attempt_number, 4) if attempt_number else 0,
+            "mean_ms": round(statistics.mean(latencies) * 1000, 3) if latencies else None,
+            "p50_ms": round(latencies[len(latencies) // 2] * 1000, 3) if latencies else None,
+            "p99_ms": round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000, 3)
+            if latencies else None,
+            "max_ms": round(latencies[-1] * 1000, 3) if latencies else None,
+        }
+
+
+def read_process_status(pid: int) -> dict[str, int]:
+    """
+    The threads and the resident memory (KB) of a process, from /proc, Linux only
+    :param pid: the process id
+    :return: {"threads": ..., "rss_kb": ...}
+    """
+    process_status: dict[str, int] = {}
+    with open(f"/proc/{pid}/status") as status_file:
+        for line in status_file:
+            if line.startswith("VmRSS:"):
+                process_status["rss_kb"] = int(line.split()[1])
+            elif line.startswith("Threads:"):
+                process_status["threads"] = int(line.split()[1])
+    return process_status
+
+
+def bot_accounts(player_number: int) -> list[tuple[str, str]]:
+    """
+    :param player_number: the number of bots
+    :return: the accounts of the bots, bot{i}:password{i}
+    """
+    return [(f"bot{i}", f"password{i}") for i in range(player_number)]
+
+
+def read_accounts(path: str) -> list[tuple[str, str]]:
+    """
+    :param path: a UserInfo.txt file, account:password on each line
+    :return: the accounts
+    """
+    with open(path) as accounts_file:
+        return [tuple(line.strip().split(":", 1)) for line in accounts_file if line.strip()]
+
+
+class LoadGenerator:
+    """
+    Runs the bots of a LoadProfile against a server and summarises what they saw
+
+    Every bot logs in at its turn of the ramp, then until its duration is over: thinks, polls /list when it is due,
+    joins a game by /enter (one of the fullest free rooms of its local table) or by /match, waits for the other players,
+    thinks and guesses; then it exits. Every step is timed, an unexpected answer or a broken connection
+    is an error of the step and ends the bot. A bot that waits longer than game_start_timeout for the other
+    players leaves, this is not an error, e.g. nobody else is joining at the end of the run.
+    With the pid of the server process its threads and resident memory are sampled.
+
+    对服务器运行LoadProfile的机器人，并汇总它们看到的结果
+    每个机器人在爬坡中轮到它时登录，然后直到它的时长结束：思考，到时间就轮询/list，
+    通过/enter（本地房间表里最满的几个空闲房间之一）或/match加入游戏，等待其他玩家，思考并猜测；然后退出。
+    每一步都计时，意外的回答或断开的连接是这一步的错误，并结束这个机器人。
+    在房间里等待超过game_start_timeout的机器人离开，这不是错误，例如运行结束时没有别人加入。
+    给出服务器进程的pid时，采样它的线程数和常驻内存
+    """
+
+    def __init__(self, server_host: str, server_port: int, accounts: list[tuple[str, str]],
+                 load_profile: LoadProfile, server_pid: int | None = None,
+                 sample_interval: float = 0.5) -> None:
+        """
+        :param accounts: at least load_profile.players accounts of the server, one per bot
+        :param server_pid: the server process, on this machine, None to skip the server samples
+        """
+        if len(accounts) < load_profile.players:
+            raise ValueError(f"{load_profile.players} bots need as many accounts, there are {len(accounts)}")
+        self.server_host: str = server_host
+        self.server_port: int = server_port
+        self.accounts: list[tuple[str, str]] = accounts
+        self.load_profile: LoadProfile = load_profile
+        self.server_pid: int | None = server_pid
+        self.sample_interval: float = sample_interval
+
+        self.step_stats: dict[str, StepStats] = {step: StepStats() for step in LOAD_STEPS}
+        self.outcome_numbers: dict[str, int] = {"win": 0, "lose": 0, "tie": 0, "opponent_quit": 0,
+                                                "room_full": 0, "room_gone": 0, "abandoned_waits": 0}
+        self.first_errors: list[str] = []
+        self.failed_bot_number: int = 0
+        self.live_bot_number: int = 0
+        self.peak_live_bot_number: int = 0
+        self.server_samples: list[dict[str, int]] = []
+
+    async def timed(self, step: str, awaitable):
+        """
+        Await one step of a bot, its latency is recorded, its exception is an error of the step
+        """
+        start_time: float = time.perf_counter()
+        try:
+            result = await awaitable
+        except Exception as e:
+            self.record_error(step, repr(e))
+            raise
+        self.step_stats[step].latencies.append(time.perf_counter() - start_time)
+        return result
+
+    def record_error(self, step: str, error: str) -> None:
+        self.step_stats[step].error_number += 1
+        if len(self.first_errors) < 10:
+            self.first_errors.append(f"{step}: {error}")
+
+    def expect(self, step: str, answer: OperationStatus.StatusMessage, *expected_codes: int) -> None:
+        if answer.code not in expected_codes:
+            # the latency was recorded, the step is an error after all
+            # 延迟已经记录了，这一步仍然是错误
+            self.step_stats[step].latencies.pop()
+            self.record_error(step, f"unexpected answer {answer.message!r}")
+            raise OperationStatus.InvalidOperationError(answer.message)
+
+    async def think(self, bot_random: random.Random) -> None:
+        if self.load_profile.think_time > 0:
+            await asyncio.sleep(bot_random.expovariate(1 / self.load_profile.think_time))
+
+    async def run_bot(self, bot_id: int) -> None:
+        load_profile: LoadProfile = self.load_profile
+        # the same numbers every run, whatever the other bots do
+        # 无论其他机器人怎么做，每次运行的随机数都相同
+        bot_random: random.Random = random.Random(f"{load_profile.seed}:{bot_id}")
+        await asyncio.sleep(bot_id / load_profile.login_rate)
+
+        client: AsyncGameClient.AsyncGameClient = AsyncGameClient.AsyncGameClient(
+            self.server_host, self.server_port, load_profile.protocol_version, load_profile.heart_beat_in_band)
+        self.live_bot_number += 1
+        self.peak_live_bot_number = max(self.peak_live_bot_number, self.live_bot_number)
+        try:
+            await self.timed("connect", client.connect())
+            username, password = self.accounts[bot_id]
+            self.expect("login", await self.timed("login", client.login(username, password)), 1001)
+
+            stop_time: float = time.monotonic() + load_profile.duration
+            next_list_time: float = time.monotonic()
+            while time.monotonic() < stop_time:
+                await self.think(bot_random)
+                if load_profile.list_rate > 0 and time.monotonic() >= next_list_time:
+                    self.expect("list", await self.timed("list", client.list_rooms()), 3001)
+                    next_list_time = time.monotonic() + 1 / load_profile.list_rate
+
+                if bot_random.random() < load_profile.enter_ratio:
+                    # one of the fullest free rooms of the local table, not always the first,
+                    # otherwise every bot with the same table enters the same room
+                    # 本地房间表中最满的几个空闲房间之一，否则房间表相同的机器人都进入同一个房间
+                    free_room_ids: list[int] = client.room_status_table.free_room_ids()[:ENTER_CHOICES] or [0]
+                    answer: OperationStatus.StatusMessage = await self.timed(
+                        "enter", client.enter(bot_random.choice(free_room_ids)))
+                    # 4002 is a room retired after the table was taken
+                    # 4002是房间表之后被回收的房间
+                    self.expect("enter", answer, 3011, 3013, 4002)
+                else:
+                    answer: OperationStatus.StatusMessage = await self.timed("match", client.match())
+                    self.expect("match", answer, 3011, 3013)
+                if answer.code == 3013:
+                    self.outcome_numbers["room_full"] += 1
+                    continue
+                if answer.code == 4002:
+                    self.outcome_numbers["room_gone"] += 1
+                    continue
+
+                try:
+                    game_start: OperationStatus.StatusMessage = await asyncio.wait_for(
+                        self.timed("game_start", client.wait_game_start()), load_profile.game_start_timeout)
+                except asyncio.TimeoutError:
+                    # the room cannot be left in the protocol, the connection is closed instead
+                    # 协议里不能离开房间，改为关闭连接
+                    self.outcome_numbers["abandoned_waits"] += 1
+                    return
+                if client.game_started:
+                    await self.think(bot_random)
+                    result: OperationStatus.StatusMessage = await self.timed(
+                        "guess", client.guess(bot_random.random() < load_profile.true_ratio))
+                    self.expect("guess", result, 3021, 3022, 3023, 3024)
+                else:
+                    result = game_start
+                self.outcome_numbers[{3021: "win", 3022: "lose", 3023: "tie", 3024: "opponent_quit"}[result.code]] += 1
+
+            self.expect("exit", await self.timed("exit", client.exit()), 4001)
+        except Exception:
+            self.failed_bot_number += 1
+        finally:
+            client.close()
+            self.live_bot_number -= 1
+
+    async def sample_server(self) -> None:
+        while True:
+            try:
+                self.server_samples.append(read_process_status(self.server_pid))
+            except OSError:
+                return
+            await asyncio.sleep(self.sample_interval)
+
+    async def run(self) -> dict:
+        """
+        Run every bot to its end
+        :return: the summary, see summary()
+        """
+        sample_task: asyncio.Task | None = None
+        if self.server_pid is not None:
+            sample_task = asyncio.create_task(self.sample_server())
+        start_time: float = time.perf_counter()
+        await asyncio.gather(*(self.run_bot(bot_id) for bot_id in range(self.load_profile.players)))
+        elapsed: float = time.perf_counter() - start_time
+        if sample_task is not None:
+            # the server has seen the last exits
+            # 服务器已经看到最后的退出
+            await asyncio.sleep(self.sample_interval)
+            sample_task.cancel()
+        return self.summary(elapsed)
+
+    def summary(self, elapsed: float) -> dict:
+        """
+        :param elapsed: seconds of the run
+        :return: a JSON object: the profile, the throughput, the latency and the errors of every step,
+         the outcomes of the games, and the growth of the server threads and memory
+        """
+        steps: dict[str, dict] = {step: step_stats.summary(elapsed) for step, step_stats in self.step_stats.items()}
+        step_number: int = sum(len(step_stats.latencies) for step_stats in self.step_stats.values())
+        error_number: int = sum(step_stats.error_number for step_stats in self.step_stats.values())
+        server: dict[str, int] | None = None
+        if self.server_samples:
+            server = {
+                "threads_start": self.server_samples[0]["threads"],
+                "threads_peak": max(sample["threads"] for sample in self.server_samples),
+                "threads_end": self.server_samples[-1]["threads"],
+                "rss_kb_start": self.server_samples[0]["rss_kb"],
+                "rss_kb_peak": max(sample["rss_kb"] for sample in self.server_samples),
+                "rss_kb_end": self.server_samples[-1]["rss_kb"],
+            }
+            server["threads_growth"] = server["threads_peak"] - server["threads_start"]
+            server["rss_kb_growth"] = server["rss_kb_peak"] - server["rss_kb_start"]
+        return {
+            "load": "bots",
+            "server": f"{self.server_host}:{self.server_port}",
+            "profile": dataclasses.asdict(self.load_profile),
+            "elapsed_seconds": round(elapsed, 2),
+            "peak_live_bots": self.peak_live_bot_number,
+            "failed_bots": self.failed_bot_number,
+            "steps_per_second": round(step_number / elapsed, 1),
+            "games_per_second": round(steps["guess"]["count"] / elapsed, 1),
+            "error_rate": round(error_number / (step_number + error_number), 4) if step_number + error_number else 0,
+            "steps": steps,
+            "outcomes": self.outcome_numbers,
+            "first_errors": self.first_errors,
+            "server_process": server,
+        }
+
+
+if __name__ == '__main__':
+    argument_parser: argparse.ArgumentParser = argparse.ArgumentParser(
+        description="Bot players against the game server, prints a JSON summary")
+    argument_parser.add_argument("--host", default="localhost")
+    argument_parser.add_argument("--port", type=int, default=15210)
+    argument_parser.add_argument("--accounts", default=None,
+                                 help="a UserInfo.txt with an account per bot, bot{i}:password{i} if not given")
+    argument_parser.add_argument("--write-accounts", default=None, metavar="PATH",
+                                 help="write the accounts bot{i}:password{i} of --players bots for the server, exit")
+    argument_parser.add_argument("--server-pid", type=int, default=None,
+                                 help="sample the threads and memory of the server process, same machine")
+    argument_parser.add_argument("--output", default=None, help="also write the summary into this file")
+    argument_parser.add_argument("--players", type=int, default=LoadProfile.players)
+    argument_parser.add_argument("--login-rate", type=float, default=LoadProfile.login_rate)
+    argument_parser.add_argument("--duration", type=float, default=LoadProfile.duration)
+    argument_parser.add_argument("--list-rate", type=float, default=LoadProfile.list_rate)
+    argument_parser.add_argument("--enter-ratio", type=float, default=LoadProfile.enter_ratio)
+    argument_parser.add_argument("--true-ratio", type=float, default=LoadProfile.true_ratio)
+    argument_parser.add_argument("--think-time", type=float, default=LoadProfile.think_time)
+    argument_parser.add_argument("--game-start-timeout", type=float, default=LoadProfile.game_start_timeout)
+    argument_parser.add_argument("--socket-heart-beat", action="store_true",
+                                 help="heart beats on a second connection instead of the message connection")
+    argument_parser.add_argument("--protocol-version", type=int, default=LoadProfile.protocol_version,
+                                 choices=[OperationStatus.PROTOCOL_VERSION_1, OperationStatus.PROTOCOL_VERSION_2])
+    argument_parser.add_argument("--seed", type=int, default=LoadProfile.seed)
+    arguments: argparse.Namespace = argument_parser.parse_args()
+
+    if arguments.write_accounts is not None:
+        with open(arguments.write_accounts, "w") as accounts_file:
+            accounts_file.writelines(f"{username}:{password}\n" for username, password
+                                     in bot_accounts(arguments.players))
+        sys.exit(0)
+
+    load_generator: LoadGenerator = LoadGenerator(
+        arguments.host, arguments.port,
+        read_accounts(arguments.accounts) if arguments.accounts is not None else bot_accounts(arguments.players),
+        LoadProfile(players=arguments.players, login_rate=arguments.login_rate, duration=arguments.duration,
+                    list_rate=arguments.list_rate, enter_ratio=arguments.enter_ratio,
+                    true_ratio=arguments.true_ratio, think_time=arguments.think_time,
+                    game_start_timeout=arguments.game_start_timeout,
+                    heart_beat_in_band=not arguments.socket_heart_beat,
+                    protocol_version=arguments.protocol_version, seed=arguments.seed),
+        arguments.server_pid)
+    load_summary: dict = asyncio.run(load_generator.run())
+    print(json.dumps(load_summary))
+    if arguments.output is not None:
+        with open(arguments.output, "w") as output_file:
+            json.dump(load_summary, output_file, indent=2)
@@ -0,0 +1,518 @@
+import asyncio
+import collections
+import select
+import socket
+import struct
+import threading
+import time
+from typing import Callable
+
+# Message framing, shared by the server and the client (the same file is in both folders)
+# 消息分帧，服务器和客户端共用（两个文件夹里是同一个文件）
+#
+# TCP is a byte stream, one send() is not one recv(), messages may be split or coalesced.
+# Every message is sent as one frame:
+#     4 bytes unsigned big-endian payload length | 1 byte frame kind | UTF-8 payload
+# TCP是字节流，一次send不等于一次recv，消息可能被拆分或合并，所以每条消息都作为一帧发送
+#
+# The frame kind keeps in-band heart beats and pushes apart from hall and game messages,
+# recv_message never returns a heart beat frame or a push frame
+# 帧类型把带内心跳、推送和大厅、游戏消息分开，recv_message不会返回心跳帧和推送帧
+#
+# A client asks for the framing by sending its first message as a frame. The clients from before the framing send
+# raw bytes, one message per send, and take one recv as one message; the server tells them apart by the first bytes
+# (UNFRAMED_HEADER_PREFIX) and serves them unframed, see FramedSocket.detect_unframed and read_first_message
+# 客户端通过把第一条消息作为帧发送来要求分帧。分帧之前的客户端发送原始字节，每次send一条消息，并把一次recv当作一条消息；
+# 服务器根据开头的字节（UNFRAMED_HEADER_PREFIX）区分它们，不分帧地服务它们，见FramedSocket.detect_unframed和read_first_message
+
+# the frame header, the length of the payload and the frame kind
+# 帧头，负载的长度和帧类型
+FRAME_HEADER: struct.Struct = struct.Struct("!IB")
+
+# frame kinds
+# 帧类型
+FRAME_KIND_MESSAGE: int = 0
+FRAME_KIND_HEART_BEAT: int = 1
+# sent by the server without a request, e.g. room status changes for /watch, never acknowledged
+# 服务器在没有请求时发送，例如/watch的房间状态变化，不需要确认
+FRAME_KIND_PUSH: int = 2
+
+# refuse frames larger than this, a broken or hostile peer should not make us allocate gigabytes
+# 拒绝超过此大小的帧
+MAX_FRAME_SIZE: int = 1 << 20
+
+# bytes asked from the kernel for each recv_into
+DEFAULT_RECEIVE_SIZE: int = 4096
+
+
+# the first bytes of an unframed client, its first message is "Header:login" or "Header:heart beat:...".
+# Read as a frame header, "Head" is a payload of 1214603620 bytes, far over MAX_FRAME_SIZE, so no frame starts with them
+# 不分帧的客户端开头的字节，它的第一条消息是"Header:login"或"Header:heart beat:..."。
+# 作为帧头读取时，"Head"表示1214603620字节的负载，远超MAX_FRAME_SIZE，所以没有帧以它们开头
+UNFRAMED_HEADER_PREFIX: bytes = b"Header:"
+# an unframed client reads one message per recv: a message sent before the client answered the previous one waits
+# this many seconds after it, so the client has read the previous one and does not take the two as one
+# 不分帧的客户端每次recv读取一条消息：在客户端回答上一条消息之前发送的消息在它之后等待这么多秒，
+# 这样客户端已经读取了上一条，不会把两条当作一条
+UNFRAMED_SEND_GAP: float = 0.1
+
+
+class FrameTooLargeError(ConnectionError):
+    pass
+
+
+def encode_frame(message: str, frame_kind: int = FRAME_KIND_MESSAGE) -> bytes:
+    """
+    Encode one message as a frame
+    :param message: the message
+    :param frame_kind: FRAME_KIND_MESSAGE, FRAME_KIND_HEART_BEAT or FRAME_KIND_PUSH
+    :return: the frame bytes, header + payload
+    """
+    payload: bytes = message.encode()
+    if len(payload) > MAX_FRAME_SIZE:
+        raise FrameTooLargeError(f"The message is {len(payload)} bytes, the limit is {MAX_FRAME_SIZE}")
+    return FRAME_HEADER.pack(len(payload), frame_kind) + payload
+
+
+# the heart beat frame never changes, encode it once
+# 心跳帧不会变，只编码一次
+HEART_BEAT_FRAME: bytes = encode_frame("", FRAME_KIND_HEART_BEAT)
+
+
+def unframe(frames: bytes) -> bytes:
+    """
+    What an unframed client is sent for some frames: the payloads of the message frames, one after the other.
+    It knows neither heart beat nor push frames, they are dropped
+    :param frames: returned by encode_frame, or several of them joined
+    :return: the raw bytes, empty if there is no message frame
+    """
+    payloads: list[bytes] = []
+    offset: int = 0
+    while offset < len(frames):
+        payload_length, frame_kind = FRAME_HEADER.unpack_from(frames, offset)
+        offset += FRAME_HEADER.size
+        if frame_kind == FRAME_KIND_MESSAGE:
+            payloads.append(frames[offset:offset + payload_length])
+        offset += payload_length
+    return b"".join(payloads)
+
+
+class FrameDecoder:
+    """
+    Incremental frame decoder with a reusable receive buffer
+    Feed it whatever bytes arrive, take out the complete frames, partial frames stay in the buffer
+
+    增量帧解码器，接收缓冲区可以重复使用
+    收到的字节直接喂进来，取出完整的帧，不完整的帧留在缓冲区里
+    """
+
+    def __init__(self) -> None:
+        self.buffer: bytearray = bytearray()
+        # the start of the unconsumed bytes, the consumed bytes are dropped lazily
+        # 未处理字节的起点，已处理的字节延迟删除
+        self.read_offset: int = 0
+
+    def feed(self, data: bytes | memoryview) -> None:
+        """
+        Append received bytes to the buffer
+        :param data: the received bytes
+        :return: None
+        """
+        # drop the consumed bytes only when they are the larger part, so each byte is moved at most once or twice
+        # 只有已处理部分较大时才压缩缓冲区
+        if self.read_offset and self.read_offset * 2 >= len(self.buffer):
+            del self.buffer[:self.read_offset]
+            self.read_offset = 0
+        self.buffer += data
+
+    def next_frame(self) -> tuple[int, str] | None:
+        """
+        Take out the next complete frame
+        :return: (frame kind, message), or None if no complete frame is buffered yet
+        """
+        available: int = len(self.buffer) - self.read_offset
+        if available < FRAME_HEADER.size:
+            return None
+
+        payload_length, frame_kind = FRAME_HEADER.unpack_from(self.buffer, self.read_offset)
+        if payload_length > MAX_FRAME_SIZE:
+            raise FrameTooLargeError(f"The frame is {payload_length} bytes, the limit is {MAX_FRAME_SIZE}")
+        if available < FRAME_HEADER.size + payload_length:
+            return None
+
+        payload_start: int = self.read_offset + FRAME_HEADER.size
+        self.read_offset = payload_start + payload_length
+        return frame_kind, self.buffer[payload_start:self.read_offset].decode()
+
+
+class UnframedDecoder:
+    """
+    The decoder of an unframed client, the same interface as FrameDecoder: whatever one recv returned is one message.
+    Such a client sends one message and waits for the answer (protocol v1), so its messages do not coalesce
+
+    不分帧客户端的解码器，接口与FrameDecoder相同：一次recv返回的数据就是一条消息。
+    这种客户端发送一条消息后等待回答（v1协议），所以它的消息不会合并
+    """
+
+    def __init__(self, first_bytes: bytes | bytearray = b"") -> None:
+        """
+        :param first_bytes: the bytes received before the client was found unframed, its first message
+        """
+        self.chunks: collections.deque[bytes] = collections.deque()
+        if first_bytes:
+            self.chunks.append(bytes(first_bytes))
+
+    def feed(self, data: bytes | memoryview) -> None:
+        """
+        One recv of the client
+        :param data: the received bytes, copied, the receive chunk is reused
+        :return: None
+        """
+        self.chunks.append(bytes(data))
+
+    def next_frame(self) -> tuple[int, str] | None:
+        """
+        :return: (FRAME_KIND_MESSAGE, the message of the next recv), or None if nothing is buffered
+        """
+        if not self.chunks:
+            return None
+        return FRAME_KIND_MESSAGE, self.chunks.popleft().decode()
+
+
+class FramedSocket:
+    """
+    A blocking socket sending and receiving whole messages
+    All send/recv of the protocol go through this class
+    Heart beat frames are dropped on receive, they only refresh last_receive_time
+    Push frames are handed to push_handler on receive, dropped if there is none
+    Sending is thread safe, so a heart beat thread can share the socket
+    An unframed client (detect_unframed) is sent the raw messages and every recv is one message
+
+    收发完整消息的阻塞套接字，协议所有的收发都通过这个类
+    接收时丢弃心跳帧，只更新last_receive_time；推送帧交给push_handler，没有则丢弃
+    发送是线程安全的，心跳线程可以共用套接字
+    不分帧的客户端（detect_unframed）收到原始消息，每次recv是一条消息
+    """
+
+    def __init__(self, framed_socket: socket.socket, receive_size: int = DEFAULT_RECEIVE_SIZE) -> None:
+        self.socket: socket.socket = framed_socket
+        self.decoder: FrameDecoder | UnframedDecoder = FrameDecoder()
+        # the client does not frame its messages, see detect_unframed
+        # 客户端不对消息分帧，见detect_unframed
+        self.unframed: bool = False
+        # when the last message was sent to an unframed client which has not answered it yet, None after an answer
+        # 最后一条消息发给还没有回答的不分帧客户端的时间，回答之后为None
+        self.unanswered_send_time: float | None = None
+
+        # reusable chunk for recv_into, no new bytes object for each recv
+        # 可重复使用的接收块，每次recv不创建新的bytes对象
+        self.receive_chunk: bytearray = bytearray(receive_size)
+        self.receive_view: memoryview = memoryview(self.receive_chunk)
+
+        # messages taken out by poll_heart_beats, recv_message returns them first
+        # poll_heart_beats取出的消息，recv_message优先返回
+        self.pending_messages: collections.deque[str] = collections.deque()
+
+        # the last time any byte arrived, heart beats included
+        # 最后一次收到任何字节的时间，包括心跳
+        self.last_receive_time: float = time.monotonic()
+
+        # one frame is sent by one sendall under the lock, frames of two threads never interleave
+        # 一帧在锁内用一次sendall发送，两个线程的帧不会交错
+        self.send_lock: threading.Lock = threading.Lock()
+        # only one thread receives at a time
+        # 同一时间只有一个线程接收
+        self.receive_lock: threading.Lock = threading.Lock()
+        # asks whether data has arrived without blocking, poll has no limit on the file descriptor unlike select
+        # 不阻塞地询问数据是否已到达，poll不像select那样限制文件描述符的大小
+        self.readable_poll: select.poll | None = None
+
+        # called with the message of every push frame, by the thread receiving it
+        # 由接收到推送帧的线程调用，参数是推送帧的消息
+        self.push_handler: Callable[[str], None] | None = None
+        # sends the frames instead of sendall when set, e.g. the bounded outbound queue of the server
+        # 设置后代替sendall发送帧，例如服务器的有界出站队列
+        self.outbound: Callable[[bytes], None] | None = None
+        # the frames held back by hold_frames, None when the frames are sent at once
+        # hold_frames留下的帧，帧立刻发送时为None
+        self.held_frames: list[bytes] | None = None
+
+    def send_message(self, message: str) -> None:
+        """
+        Send one message as one frame, sendall handles partial sends
+        :param message: the message
+        :return: None
+        """
+        self.send_frame(encode_frame(message))
+
+    def send_frame(self, frame: bytes) -> None:
+        """
+        Send a frame encoded beforehand, e.g. a cached response
+        :param frame: returned by encode_frame
+        :return: None
+        """
+        frame = self.wire_bytes(frame)
+        if not frame:
+            return
+        if self.unframed:
+            self.wait_unframed_send_gap()
+        with self.send_lock:
+            if self.held_frames is not None:
+                self.held_frames.append(frame)
+            else:
+                self.write_frame_locked(frame)
+
+    def wait_unframed_send_gap(self) -> None:
+        """
+        Keep UNFRAMED_SEND_GAP after a message the unframed client has not answered yet
+        在不分帧的客户端还没有回答的消息之后等待UNFRAMED_SEND_GAP
+        :return: None
+        """
+        if self.unanswered_send_time is not None:
+            gap_left: float = self.unanswered_send_time + UNFRAMED_SEND_GAP - time.monotonic()
+            if gap_left > 0:
+                time.sleep(gap_left)
+        self.unanswered_send_time = time.monotonic()
+
+    def wire_bytes(self, frame: bytes) -> bytes:
+        """
+        What goes on the wire for a frame: the frame, or its payload for an unframed client
+        :param frame: returned by encode_frame
+        :return: the bytes to send, empty if an unframed client gets nothing, e.g. a push
+        """
+        return unframe(frame) if self.unframed else frame
+
+    def write_frame_locked(self, frame: bytes) -> None:
+        if self.outbound is not None:
+            self.outbound(frame)
+        else:
+            self.socket.sendall(frame)
+
+    def hold_frames(self) -> None:
+        """
+        Hold the frames sent from now on, the next receive (or flush) sends them in one call,
+        so the frames of one reply leave together instead of one small segment each
+        保留从现在开始发送的帧，下一次接收（或flush）一次性发送，这样同一个回复的帧一起发出，而不是每帧一个小的报文段
+        :return: None
+        """
+        if self.unframed:
+            # joined messages would be one message to the client
+            # 合并的消息对客户端来说是一条消息
+            return
+        with self.send_lock:
+            if self.held_frames is None:
+                self.held_frames = []
+
+    def flush(self) -> None:
+        """
+        Send the held frames in one call and stop holding, call it before the socket is read by someone else
+        一次性发送保留的帧并停止保留，在套接字交给其他读取者之前调用
+        :return: None
+        """
+        with self.send_lock:
+            held_frames, self.held_frames = self.held_frames, None
+            if held_frames:
+                self.write_frame_locked(b"".join(held_frames))
+
+    def send_heart_beat(self) -> None:
+        """
+        Send one in-band heart beat frame
+        :return: None
+        """
+        with self.send_lock:
+            self.socket.sendall(HEART_BEAT_FRAME)
+
+    def detect_unframed(self) -> bool:
+        """
+        Tell an unframed client by its first bytes, blocking until enough of them have arrived,
+        before the first recv_message. From then on the client is sent raw messages and every recv is one message
+        根据开头的字节识别不分帧的客户端，阻塞到收到足够的字节为止，在第一次recv_message之前调用。
+        之后发给客户端的是原始消息，每次recv是一条消息
+        :return: whether the client is unframed
+        """
+        with self.receive_lock:
+            # a frame starts with a 0 byte, one byte is enough to tell most clients
+            # 帧以0字节开头，大多数客户端一个字节就能区分
+            while len(self.decoder.buffer) < len(UNFRAMED_HEADER_PREFIX) and \
+                    UNFRAMED_HEADER_PREFIX.startswith(self.decoder.buffer):
+                self.receive_into_decoder()
+            if self.decoder.buffer.startswith(UNFRAMED_HEADER_PREFIX):
+                self.decoder = UnframedDecoder(self.decoder.buffer)
+                self.unframed = True
+        return self.unframed
+
+    def receive_into_decoder(self) -> None:
+        """
+        One recv into the decoder, blocking (or until the socket timeout)
+        :return: None
+        """
+        received_size: int = self.socket.recv_into(self.receive_chunk)
+        if received_size == 0:
+            raise ConnectionError("Connection closed by the peer")
+        self.last_receive_time = time.monotonic()
+        self.unanswered_send_time = None
+        self.decoder.feed(self.receive_view[:received_size])
+
+    def recv_message(self) -> str:
+        """
+        Receive exactly one message, blocking until the whole frame has arrived
+        :return: the message
+        """
+        # the peer answers only after it has the whole reply
+        # 对方收到完整的回复后才会回答
+        if self.held_frames is not None:
+            self.flush()
+
+        with self.receive_lock:
+            if self.pending_messages:
+                return self.pending_messages.popleft()
+
+            while True:
+                while (frame := self.decoder.next_frame()) is None:
+                    self.receive_into_decoder()
+                frame_kind, message = frame
+                if frame_kind == FRAME_KIND_MESSAGE:
+                    return message
+                self.handle_frame(frame_kind, message)
+
+    def take_message_locked(self) -> str | None:
+        """
+        Take the next message if it has arrived, reading only what the socket already has, never blocking
+        The caller holds receive_lock, e.g. while waiting on the sockets of several players with a selector
+
+        如果下一条消息已经到达就取出，只读取套接字已有的数据，从不阻塞
+        调用者持有receive_lock，例如用选择器同时等待多个玩家的套接字时
+        :return: the message, or None if it has not fully arrived yet
+        """
+        if self.pending_messages:
+            return self.pending_messages.popleft()
+
+        while True:
+            while (frame := self.decoder.next_frame()) is not None:
+                frame_kind, message = frame
+                if frame_kind == FRAME_KIND_MESSAGE:
+                    return message
+                self.handle_frame(frame_kind, message)
+            if not self.readable_now():
+                return None
+            self.receive_into_decoder()
+
+    def readable_now(self) -> bool:
+        if not hasattr(select, "poll"):
+            return bool(select.select([self.socket], [], [], 0)[0])
+        if self.readable_poll is None:
+            self.readable_poll = select.poll()
+            self.readable_poll.register(self.socket, select.POLLIN)
+        return bool(self.readable_poll.poll(0))
+
+    def handle_frame(self, frame_kind: int, message: str) -> None:
+        """
+        A frame which is not a message, a heart beat is dropped, a push goes to push_handler
+        :param frame_kind: the frame kind
+        :param message: the message of the frame
+        :return: None
+        """
+        if frame_kind == FRAME_KIND_PUSH and self.push_handler is not None:
+            self.push_handler(message)
+
+    def poll_heart_beats(self) -> None:
+        """
+        Read whatever has arrived without blocking, for a socket nobody is receiving from,
+        so its heart beats and pushes are still seen. Messages are kept for recv_message.
+        Does nothing if another thread is receiving.
+
+        不阻塞地读取已到达的数据，用于当前没有线程接收的套接字，这样心跳和推送依然能被看到
+        消息留给recv_message，如果有其他线程正在接收，则什么都不做
+        """
+        if not self.receive_lock.acquire(blocking=False):
+            return
+        try:
+            while self.readable_now():
+                self.receive_into_decoder()
+                while (frame := self.decoder.next_frame()) is not None:
+                    frame_kind, message = frame
+                    if frame_kind == FRAME_KIND_MESSAGE:
+                        self.pending_messages.append(message)
+                    else:
+                        self.handle_frame(frame_kind, message)
+        finally:
+            self.receive_lock.release()
+
+    def fileno(self) -> int:
+        return self.socket.fileno()
+
+    def close(self) -> None:
+        self.socket.close()
+
+
+async def read_frame(reader: asyncio.StreamReader) -> tuple[int, str]:
+    """
+    Receive exactly one frame from an asyncio stream
+    :param reader: the stream reader
+    :return: (frame kind, message)
+    """
+    try:
+        header: bytes = await reader.readexactly(FRAME_HEADER.size)
+        payload_length, frame_kind = FRAME_HEADER.unpack(header)
+        if payload_length > MAX_FRAME_SIZE:
+            raise FrameTooLargeError(f"The frame is {payload_length} bytes, the limit is {MAX_FRAME_SIZE}")
+        return frame_kind, (await reader.readexactly(payload_length)).decode()
+    except asyncio.IncompleteReadError as e:
+        raise ConnectionError("Connection closed by the peer") from e
+
+
+async def read_first_message(reader: asyncio.StreamReader) -> tuple[str, bool]:
+    """
+    Receive the first message of a connection, a frame or the first send of an unframed client,
+    told apart by the first bytes, the asyncio version of FramedSocket.detect_unframed
+    :param reader: the stream reader
+    :return: (the message, whether the client is unframed)
+    """
+    try:
+        first_bytes: bytes = await reader.readexactly(1)
+        if not UNFRAMED_HEADER_PREFIX.startswith(first_bytes):
+            # the first byte of a frame header, read the rest of the frame
+            # 帧头的第一个字节，读取帧的其余部分
+            payload_length, frame_kind = FRAME_HEADER.unpack(
+                first_bytes + await reader.readexactly(FRAME_HEADER.size - 1))
+            if payload_length > MAX_FRAME_SIZE:
+                raise FrameTooLargeError(f"The frame is {payload_length} bytes, the limit is {MAX_FRAME_SIZE}")
+            return (await reader.readexactly(payload_length)).decode(), False
+    except asyncio.IncompleteReadError as e:
+        raise ConnectionError("Connection closed by the peer") from e
+
+    # whatever the unframed client sent at once is its first message
+    # 不分帧的客户端一次发送的数据就是它的第一条消息
+    first_bytes += await reader.read(DEFAULT_RECEIVE_SIZE)
+    while len(first_bytes) < len(UNFRAMED_HEADER_PREFIX) and UNFRAMED_HEADER_PREFIX.startswith(first_bytes):
+        received_bytes: bytes = await reader.read(DEFAULT_RECEIVE_SIZE)
+        if not received_bytes:
+            raise ConnectionError("Connection closed by the peer")
+        first_bytes += received_bytes
+    if not first_bytes.startswith(UNFRAMED_HEADER_PREFIX):
+        raise ConnectionError("The first bytes are neither a frame nor an unframed header")
+    return first_bytes.decode(), True
+
+
+async def read_unframed_message(reader: asyncio.StreamReader) -> str:
+    """
+    Receive one message of an unframed client from an asyncio stream, whatever one read returns
+    :param reader: the stream reader
+    :return: the message
+    """
+    received_bytes: bytes = await reader.read(DEFAULT_RECEIVE_SIZE)
+    if not received_bytes:
+        raise ConnectionError("Connection closed by the peer")
+    return received_bytes.decode()
+
+
+async def read_message(reader: asyncio.StreamReader) -> str:
+    """
+    Receive exactly one message from an asyncio stream, heart beat frames are dropped
+    :param reader: the stream reader
+    :return: the message
+    """
+    while True:
+        frame_kind, message = await read_frame(reader)
+        if frame_kind != FRAME_KIND_HEART_BEAT:
+            return message
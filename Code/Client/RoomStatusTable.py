@@ -0,0 +1,75 @@
+import threading
+
+import OperationStatus
+
+
+class RoomStatusTable:
+    """
+    The local copy of the room status, kept up to date by the answers of /list and the pushes of /watch
+    Thread safe, the pushes may be handled by the heart beat thread while the main thread reads the table
+
+    房间状态的本地副本，由/list的回答和/watch的推送保持最新
+    线程安全，推送可能由心跳线程处理，同时主线程在读取房间表
+    """
+
+    def __init__(self) -> None:
+        # room id -> number of players
+        # 房间号 -> 玩家数
+        self.room_players: list[int] = []
+        # the version of the last 3003 applied, -1 before the first one
+        # 最后应用的3003的版本，第一次之前为-1
+        self.version: int = -1
+        self.lock: threading.Lock = threading.Lock()
+
+    def apply(self, message: str) -> bool:
+        """
+        Apply a room status message, other messages are ignored
+        3001 number_of_all_rooms players_in_room_1 ...: the whole table
+        3003 version number_of_all_rooms room_id:players ...: the changed rooms, skipped if not newer than the table
+        :param message: a message from the server
+        :return: whether the table changed
+        """
+        fields: list[str] = message.split()
+        if not fields:
+            return False
+
+        with self.lock:
+            if fields[0] == OperationStatus.OperationStatus.list_rooms_status:
+                self.room_players = [int(player_number) for player_number in fields[2:]]
+                return True
+
+            if fields[0] == OperationStatus.OperationStatus.list_rooms_changes:
+                version: int = int(fields[1])
+                if version <= self.version:
+                    # an older batch, e.g. pushed before the answer of /watch was taken
+                    # 更旧的批次
+                    return False
+                self.version = version
+
+                # rooms from number_of_all_rooms on are gone, new rooms have 0 players until told otherwise
+                # 房间号不小于number_of_all_rooms的房间已不存在，新房间在被告知之前有0个玩家
+                room_number: int = int(fields[2])
+                del self.room_players[room_number:]
+                self.room_players.extend([0] * (room_number - len(self.room_players)))
+                for room_change in fields[3:]:
+                    room_id, player_number = room_change.split(":")
+                    self.room_players[int(room_id)] = int(player_number)
+                return True
+
+        return False
+
+    def free_room_ids(self, max_player_number: int = 2) -> list[int]:
+        """
+        :param max_player_number: the number of players of a full room
+        :return: the rooms with a free seat, the fullest first, so a waiting player is joined
+        """
+        with self.lock:
+            free_rooms: list[tuple[int, int]] = [(player_number, room_id)
+                                                 for room_id, player_number in enumerate(self.room_players)
+                                                 if player_number < max_player_number]
+        return [room_id for _, room_id in sorted(free_rooms, key=lambda free_room: (-free_room[0], free_room[1]))]
+
+    def __str__(self) -> str:
+        with self.lock:
+            return " ".join([OperationStatus.OperationStatus.list_rooms_status, str(len(self.room_players)),
+                             *map(str, self.room_players)])
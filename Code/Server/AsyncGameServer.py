@@ -0,0 +1,1191 @@
+from __future__ import annotations
+
+import asyncio
+import collections
+import re
+import socket
+import threading
+import time
+
+import UserInfoFile
+import GameServer
+import OperationStatus
+import MessageFraming
+import GameHall
+import GameRoom
+import OutboundQueue
+import Player
+import RoomStatusBroadcaster
+import SessionTracker
+import SocketProfile
+
+# Default Encoding is UTF-8
+
+
+class AsyncGameServer:
+
+    def __init__(self, listening_port: int, user_info_file_path: str,
+                 heart_beat_timeout: float = GameServer.HEART_BEAT_TIMEOUT,
+                 heart_beat_rendezvous_timeout: float = GameServer.HEART_BEAT_RENDEZVOUS_TIMEOUT,
+                 game_room_number: int = GameServer.GAME_ROOM_NUMBER,
+                 max_game_room_number: int = GameServer.MAX_GAME_ROOM_NUMBER,
+                 room_size: int = GameServer.ROOM_SIZE,
+                 room_status_push_interval: float = GameServer.ROOM_STATUS_PUSH_INTERVAL,
+                 guess_timeout: float = GameServer.GUESS_TIMEOUT,
+                 outbound_high_watermark: int = GameServer.OUTBOUND_HIGH_WATERMARK,
+                 outbound_low_watermark: int = GameServer.OUTBOUND_LOW_WATERMARK,
+                 outbound_queue_limit: int = GameServer.OUTBOUND_QUEUE_LIMIT,
+                 write_timeout: float = GameServer.WRITE_TIMEOUT,
+                 socket_profile: str = GameServer.SOCKET_PROFILE,
+                 session_sweep_interval: float = GameServer.SESSION_SWEEP_INTERVAL):
+        """
+        The Game Server, asyncio engine
+        Every connection is a coroutine in one event loop, instead of one thread per connection.
+        It speaks exactly the same protocol as GameServer.GameServer.
+
+        所有连接都是同一个事件循环里的协程，而不是每个连接一个线程，协议与多线程版本完全相同
+
+        :param listening_port:
+        :param user_info_file_path: path to a UserInfo.txt file,
+         which contains usernames and passwords for all users (clients) that may participate in the application.
+        :param heart_beat_timeout: a player is lost if nothing arrives for this many seconds
+        :param heart_beat_rendezvous_timeout: how long a login waits for the heart beat connection
+        :param game_room_number: the minimum number of rooms, more are created on demand
+        :param max_game_room_number: the maximum number of rooms
+        :param room_size: the players of a room, 2 or more
+        :param room_status_push_interval: seconds between two batches of room status changes pushed to /watch
+        :param guess_timeout: seconds a player has to guess (and a v1 player to acknowledge the result)
+        :param outbound_high_watermark: bytes buffered for a client above which it is backed up
+        :param outbound_low_watermark: bytes buffered at or below which a backed up client is not any more
+        :param outbound_queue_limit: bytes buffered for a client above which it is evicted
+        :param write_timeout: seconds the buffered bytes of a client may not move before it is evicted
+        :param socket_profile: the options of the accepted sockets, one of SocketProfile.SOCKET_PROFILES
+        :param session_sweep_interval: seconds between two sweeps reclaiming the leaked sessions and players
+        """
+        if not 0 <= outbound_low_watermark <= outbound_high_watermark <= outbound_queue_limit:
+            raise ValueError(f"Expected 0 <= low watermark ({outbound_low_watermark}) "
+                             f"<= high watermark ({outbound_high_watermark}) <= queue limit ({outbound_queue_limit})")
+        if socket_profile not in SocketProfile.SOCKET_PROFILES:
+            raise ValueError(f"Unknown socket profile {socket_profile}, "
+                             f"should be one of {tuple(SocketProfile.SOCKET_PROFILES)}")
+        self.listening_port: int = listening_port
+        self.account_password_file: str = user_info_file_path
+
+        # create the UserInfoFile object
+        self.user_info_file: UserInfoFile = UserInfoFile.UserInfoFile(self.account_password_file)
+
+        # the same Game Hall as the thread engine, shared by all sessions
+        # 与多线程版本相同的游戏大厅，所有会话共享
+        self.game_hall: GameHall.GameHall = GameHall.GameHall(self, game_room_number, max_game_room_number,
+                                                              room_size)
+
+        # username -> the login sessions waiting for their heart beat connections, oldest first
+        # 用户名 -> 等待心跳连接的登录会话，最早的在前
+        self.heart_beat_waiters: dict[str, collections.deque[AsyncGameSession]] = {}
+        self.heart_beat_rendezvous_timeout: float = heart_beat_rendezvous_timeout
+
+        # the event loop already waits on all heart beat connections at once, only the timeout is configurable
+        # 事件循环本身就同时等待所有心跳连接，只有超时时间可以配置
+        self.heart_beat_timeout: float = heart_beat_timeout
+        # the deadlines of the games are timers of the event loop, no task or thread of their own
+        # 游戏的截止时间是事件循环的定时器，不需要单独的任务或线程
+        self.guess_timeout: float = guess_timeout
+
+        # keep references of the running games, or the tasks may be garbage collected
+        # 保存正在进行的游戏，否则任务可能被垃圾回收
+        self.running_games: set[asyncio.Task] = set()
+
+        # pushes the room status changes to the players who sent /watch, from a task of the event loop
+        # 把房间状态变化推送给发送了/watch的玩家，由事件循环里的一个任务推送
+        self.room_status_broadcaster: RoomStatusBroadcaster.RoomStatusBroadcaster = \
+            RoomStatusBroadcaster.RoomStatusBroadcaster(self.game_hall, room_status_push_interval)
+
+        # the write buffer of every transport is the outbound queue of its client, with the same bounds
+        # as the thread engine; writing never waits for a slow client, draining waits at most write_timeout
+        # 每个传输的写缓冲区就是客户端的出站队列，边界与多线程版本相同；写入从不等待慢客户端，排空最多等待write_timeout
+        self.outbound_high_watermark: int = outbound_high_watermark
+        self.outbound_low_watermark: int = outbound_low_watermark
+        self.outbound_queue_limit: int = outbound_queue_limit
+        self.write_timeout: float = write_timeout
+        self.outbound_counters: OutboundQueue.OutboundStats = OutboundQueue.OutboundStats()
+        # every open connection, checked for stalled write buffers
+        # 所有打开的连接，检查停滞的写缓冲区
+        self.sessions: set[AsyncGameSession] = set()
+        # the loop running serve(), connections made in this process are handed to it, see attach_connection
+        # 运行serve()的事件循环，本进程中创建的连接交给它，见attach_connection
+        self.event_loop: asyncio.AbstractEventLoop | None = None
+        # set on every accepted socket after the transport has set its own options
+        # 在传输设置完自己的选项之后设置在每个接受的套接字上
+        self.socket_profile: str = socket_profile
+        # the same accounting of the sessions as the thread engine, swept by a task of the event loop
+        # 与多线程版本相同的会话统计，由事件循环里的一个任务清扫
+        self.session_tracker: SessionTracker.SessionTracker = \
+            SessionTracker.SessionTracker(self.game_hall, session_sweep_interval, self.reclaim_session,
+                                          self.disconnect_player)
+
+    def start(self):
+        """
+        Start the server, block until the event loop is stopped
+        :return: None
+        """
+        asyncio.run(self.serve())
+
+    async def serve(self):
+        self.event_loop = asyncio.get_running_loop()
+        # listen() backlog is the same as the thread engine
+        # 与多线程版本相同的最大连接数
+        server: asyncio.AbstractServer = await asyncio.start_server(self.handle_connection,
+                                                                    "",
+                                                                    self.listening_port,
+                                                                    backlog=100)
+        push_task: asyncio.Task = asyncio.create_task(self.push_room_status())
+        outbound_task: asyncio.Task = asyncio.create_task(self.check_outbound())
+        sweep_task: asyncio.Task = asyncio.create_task(self.sweep_sessions())
+        async with server:
+            await server.serve_forever()
+        push_task.cancel()
+        outbound_task.cancel()
+        sweep_task.cancel()
+
+    async def push_room_status(self) -> None:
+        """
+        Push a batch of room status changes every push interval
+        每个推送间隔推送一批房间状态变化
+        """
+        while True:
+            await asyncio.sleep(self.room_status_broadcaster.push_interval)
+            if self.room_status_broadcaster.watchers:
+                self.room_status_broadcaster.push_changes()
+
+    async def check_outbound(self) -> None:
+        """
+        Evict the clients whose buffered bytes did not move for write_timeout,
+        a stalled client is evicted at most a quarter of write_timeout late
+        驱逐缓冲的字节write_timeout内没有移动的客户端，停滞的客户端最多晚write_timeout的四分之一被驱逐
+        """
+        while True:
+            await asyncio.sleep(self.write_timeout / 4)
+            now: float = time.monotonic()
+            for session in list(self.sessions):
+                session.check_outbound(now)
+
+    async def sweep_sessions(self) -> None:
+        """
+        Sweep the session tracker every sweep interval, the same as SessionTracker.SessionSweepThread
+        每个清扫间隔清扫一次会话跟踪器，与SessionTracker.SessionSweepThread相同
+        """
+        while True:
+            await asyncio.sleep(self.session_tracker.sweep_interval)
+            try:
+                self.session_tracker.sweep()
+            except Exception as e:
+                print("Session Sweep Error", repr(e))
+
+    def session_stats(self) -> dict[str, int]:
+        """
+        The sessions, connections and players alive and the leaks reclaimed, the same as GameServer.session_stats
+        存活的会话、连接和玩家以及回收的泄漏，与GameServer.session_stats相同
+        :return: see SessionTracker.SessionTracker.stats, and the threads of the process
+        """
+        session_stats: dict[str, int] = self.session_tracker.stats()
+        session_stats["threads"] = threading.active_count()
+        return session_stats
+
+    def reclaim_session(self, record: SessionTracker.SessionRecord) -> None:
+        """
+        Called by the session tracker for a leaked session, wake up its coroutine and release its player
+        会话跟踪器对泄漏的会话调用，唤醒它的协程并释放它的玩家
+        :param record: the record of the session
+        :return: None
+        """
+        session: AsyncGameSession = record.session
+        # a paused session resumes and sees the connection closed
+        # 暂停的会话恢复后看到连接已关闭
+        session.thread_lock.set()
+        session.writer.transport.abort()
+        if record.player is not None:
+            self.disconnect_player(record.player)
+
+    def outbound_stats(self) -> dict[str, int]:
+        """
+        The depth of the write buffers and the eviction counts, for monitoring, the same as GameServer.outbound_stats
+        写缓冲区的深度和驱逐次数，用于监控，与GameServer.outbound_stats相同
+        :return: see OutboundQueue.OutboundStats.snapshot
+        """
+        queued_sizes: list[int] = [queued_size for session in self.sessions
+                                   if (queued_size := session.writer.transport.get_write_buffer_size()) > 0]
+        return self.outbound_counters.snapshot(queued_sizes, self.outbound_high_watermark)
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """
+        Each TCP connect = a coroutine
+        每个TCP连接 = 一个协程
+        """
+        SocketProfile.apply_socket_profile(writer.get_extra_info("socket"), self.socket_profile)
+        await self.serve_connection(reader, writer)
+
+    def attach_connection(self, client_accept: tuple) -> None:
+        """
+        Serve a connected socket made in this process, e.g. one end of socket.socketpair() (InProcessHarness.py),
+        any thread, the server must be started, the same as GameServer.attach_connection
+        服务一个在本进程中创建的已连接套接字，例如socket.socketpair()的一端（InProcessHarness.py），任何线程都可以调用，
+        服务器必须已经启动，与GameServer.attach_connection相同
+        :param client_accept: (socket, address) like socket.accept()
+        :return: None
+        """
+        asyncio.run_coroutine_threadsafe(self.serve_attached_connection(client_accept[0]), self.event_loop)
+
+    async def serve_attached_connection(self, client_socket: socket.socket) -> None:
+        reader, writer = await asyncio.open_connection(sock=client_socket)
+        await self.serve_connection(reader, writer)
+
+    async def serve_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        session: AsyncGameSession = AsyncGameSession(reader, writer, self)
+        self.sessions.add(session)
+        self.session_tracker.set_holder(session.session_record, asyncio.current_task())
+        try:
+            await session.run()
+        finally:
+            self.sessions.discard(session)
+            # a logged in session leaves the game hall when it ends, however it ends
+            # 登录的会话结束时离开游戏大厅，无论如何结束
+            if session.session_record.player is not None:
+                self.disconnect_player(session.session_record.player)
+            self.session_tracker.close(session.session_record)
+
+    def expect_heart_beat(self, session: AsyncGameSession) -> None:
+        """
+        The session waits for the heart beat connection of its player
+        :param session: the login session, its player is logged in
+        :return: None
+        """
+        self.heart_beat_waiters.setdefault(session.player.player_name, collections.deque()).append(session)
+
+    def heart_beat_arrived(self, username: str) -> AsyncGameSession | None:
+        """
+        A heart beat connection of the username arrives, take the oldest waiting session
+        :param username: the username in the heart beat header
+        :return: the session, None if nobody is waiting for this username
+        """
+        username_waiters: collections.deque[AsyncGameSession] | None = self.heart_beat_waiters.get(username)
+        if not username_waiters:
+            return None
+        session: AsyncGameSession = username_waiters.popleft()
+        if not username_waiters:
+            del self.heart_beat_waiters[username]
+        return session
+
+    def cancel_heart_beat(self, session: AsyncGameSession) -> None:
+        """
+        The session stops waiting, e.g. timeout
+        :param session: the login session
+        :return: None
+        """
+        username_waiters: collections.deque[AsyncGameSession] | None = \
+            self.heart_beat_waiters.get(session.player.player_name)
+        if username_waiters is not None and session in username_waiters:
+            username_waiters.remove(session)
+            if not username_waiters:
+                del self.heart_beat_waiters[session.player.player_name]
+
+    def start_game(self, game_room: GameRoom.GameRoom) -> None:
+        """
+        Start a game of the room as a task
+        :param game_room: the full room
+        :return: None
+        """
+        game_task: asyncio.Task = asyncio.create_task(AsyncGame(self, game_room).run())
+        self.running_games.add(game_task)
+        game_task.add_done_callback(self.running_games.discard)
+
+    def disconnect_player(self, player: Player.Player) -> None:
+        """
+        The player is lost, remove the player from the room and the game hall, close the connection
+        玩家断线，将玩家从房间和游戏大厅移除，关闭连接
+        :param player: the player
+        :return: None
+        """
+        game_room: GameRoom.GameRoom | None = player.game_room
+        if game_room is not None:
+            game: AsyncGame | None = game_room.game
+            # the running game does not wait for the lost player any more, the others are told they won at once,
+            # unless the player had left the room already, the same as GameServer.disconnect_player
+            # 正在进行的游戏不再等待断线的玩家，其他玩家立刻被告知获胜，除非玩家已经离开了房间，与GameServer.disconnect_player相同
+            if game_room.remove_player(player) and game is not None:
+                game.cancel()
+        self.game_hall.remove_player(player)
+        self.room_status_broadcaster.unwatch(player)
+        session: AsyncGameSession = player.player_thread
+        session.writer.close()
+        # a session paused in the room resumes and ends, the game does not resume a player it lost
+        # 在房间里暂停的会话恢复后结束，游戏不会恢复它失去的玩家
+        session.thread_lock.set()
+        self.session_tracker.close(session.session_record)
+
+    @staticmethod
+    def print_message(*args):
+        """
+        Print the message
+        :param message: the message
+        :return: None
+        """
+        print(args)
+
+    @staticmethod
+    def player_connection_error(player: Player, exception: Exception):
+        print("Player Connection Error", player.player_name, exception)
+
+
+class AsyncGameSession:
+    """
+    The coroutine version of GameServer.GameServerThreadEachPlayer
+    One session for each accepted connection, login or heart beat
+
+    GameServerThreadEachPlayer的协程版本，每个连接一个会话
+    """
+
+    def __init__(self, reader: asyncio.StreamReader,
+                 writer: asyncio.StreamWriter,
+                 game_server: AsyncGameServer) -> None:
+
+        self.player: Player.Player | None = None
+        self.reader: asyncio.StreamReader = reader
+        self.writer: asyncio.StreamWriter = writer
+        self.client_address: tuple = writer.get_extra_info("peername")
+        # drain waits from the high watermark until the low watermark
+        # drain从高水位开始等待，直到低水位
+        self.writer.transport.set_write_buffer_limits(game_server.outbound_high_watermark,
+                                                      game_server.outbound_low_watermark)
+        # bytes ever written into the buffer, minus the bytes still in it, is what the kernel took
+        # 曾经写入缓冲区的字节数减去仍在缓冲区里的字节数，就是内核接收的字节数
+        self.written_bytes: int = 0
+        self.sent_bytes: int = 0
+        # the last time bytes left the buffer, or it was empty
+        # 最后一次有字节离开缓冲区，或者缓冲区为空的时间
+        self.last_progress_time: float = time.monotonic()
+        # None while the connection is open, see OutboundQueue
+        # 连接打开时为None，见OutboundQueue
+        self.closed_reason: str | None = None
+        # the frames held back by hold_frames, None when the frames are written at once, see MessageFraming
+        # hold_frames留下的帧，帧立刻写入时为None，见MessageFraming
+        self.held_frames: list[bytes] | None = None
+
+        # Game Server, For all shared resources, including the game hall
+        self.game_server: AsyncGameServer = game_server
+
+        # UserInfoFile
+        self.user_info_file: UserInfoFile = game_server.user_info_file
+
+        # Protocol version of the client, negotiated by the login header
+        # 客户端的协议版本，由登录头协商
+        self.protocol_version: int = OperationStatus.PROTOCOL_VERSION_1
+        # Heart beats are frames on this connection, negotiated by the login header
+        # 心跳是这个连接上的帧，由登录头协商
+        self.heart_beat_in_band: bool = False
+        # the client does not frame its messages, told by its first bytes, see MessageFraming.read_first_message
+        # 客户端不对消息分帧，根据开头的字节判断，见MessageFraming.read_first_message
+        self.unframed: bool = False
+        # when the last message was written to the unframed client before it answered, see MessageFraming.FramedSocket
+        # 在不分帧的客户端回答之前最后一条消息写入的时间，见MessageFraming.FramedSocket
+        self.unanswered_send_time: float | None = None
+        # in-band: every frame is read by read_in_band_frames, the messages are queued here,
+        # None means the connection is lost
+        # 带内心跳时所有帧由read_in_band_frames读取，消息放入这个队列，None表示连接已断开
+        self.message_queue: asyncio.Queue[str | None] = asyncio.Queue()
+        self.frame_reader: asyncio.Task | None = None
+        # set when the heart beat connection of the player arrives, two-connection heart beats only
+        # 玩家的心跳连接到达时被设置，只用于双连接心跳
+        self.heart_beat_established: asyncio.Event = asyncio.Event()
+        # a receive the game started but did not wait for, e.g. an opponent quit meanwhile,
+        # the next recv_message takes its message, so no frame is lost half read
+        # 游戏开始但没有等到的接收，例如同时对手退出了，下一次recv_message取它的消息，这样不会丢失读了一半的帧
+        self.receive_task: asyncio.Task | None = None
+
+        # Session pause flag, the same meaning as the thread_lock of the thread engine
+        # set: the session is running in the hall; clear: waiting for the game to finish
+        self.thread_lock: asyncio.Event = asyncio.Event()
+        self.thread_lock.set()
+
+        # what the session holds, closed when the session ends or the player is disconnected
+        # 会话持有的资源，会话结束或玩家断开时关闭
+        self.session_record: SessionTracker.SessionRecord = game_server.session_tracker.open(self,
+                                                                                            writer.transport)
+
+    async def recv_message(self) -> str:
+        # the client answers only after it has the whole reply
+        # 客户端收到完整的回复后才会回答
+        if self.held_frames is not None:
+            self.flush_frames()
+
+        if self.receive_task is not None:
+            receive_task, self.receive_task = self.receive_task, None
+            return await receive_task
+
+        if self.unframed:
+            message: str = await MessageFraming.read_unframed_message(self.reader)
+            self.unanswered_send_time = None
+            return message
+        if not self.heart_beat_in_band:
+            return await MessageFraming.read_message(self.reader)
+
+        message: str | None = await self.message_queue.get()
+        if message is None:
+            # keep the mark for the next reader
+            # 为下一个读取者保留标记
+            self.message_queue.put_nowait(None)
+            raise ConnectionError("Heart beat lost")
+        return message
+
+    async def recv_hall_command(self) -> str:
+        """
+        Receive the next hall command, the late messages of a forfeited game are dropped before it
+        :return: the hall command, "hall_command:command"
+        """
+        while True:
+            message: str = await self.recv_message()
+            if self.player.late_message_number > 0 and not message.startswith("hall_command:"):
+                self.player.late_message_number -= 1
+                continue
+            return message
+
+    async def read_in_band_frames(self) -> None:
+        """
+        Read every frame of an in-band heart beat connection,
+        nothing for heart_beat_timeout seconds means the player is lost
+
+        读取带内心跳连接的所有帧，heart_beat_timeout秒内没有收到任何数据则玩家断线
+        """
+        try:
+            while True:
+                frame_kind, message = await asyncio.wait_for(MessageFraming.read_frame(self.reader),
+                                                             self.game_server.heart_beat_timeout)
+                if frame_kind != MessageFraming.FRAME_KIND_HEART_BEAT:
+                    self.message_queue.put_nowait(message)
+        except Exception as e:
+            print("Heart Beat Connection Error", repr(e))
+
+            self.message_queue.put_nowait(None)
+            if self.player is not None:
+                self.game_server.disconnect_player(self.player)
+            # a session waiting in the room wakes up and ends
+            # 在房间里等待的会话被唤醒后结束
+            self.resume_thread_to_game()
+
+    async def receive_acknowledgement(self) -> str | None:
+        """
+        Receive the "Client Received" acknowledgement, only v1 clients send it
+        :return: the acknowledgement, None for v2
+        """
+        if self.protocol_version == OperationStatus.PROTOCOL_VERSION_1:
+            return await self.recv_message()
+        return None
+
+    async def send_message(self, message: str):
+        await self.send_frame(MessageFraming.encode_frame(message))
+
+    async def send_frame(self, frame: bytes) -> None:
+        """
+        Send a frame encoded beforehand, e.g. the cached /list answer
+        """
+        try:
+            if self.unframed and self.unanswered_send_time is not None:
+                # the same gap as MessageFraming.FramedSocket.wait_unframed_send_gap, only this session waits
+                # 与MessageFraming.FramedSocket.wait_unframed_send_gap相同的间隔，只有这个会话等待
+                await asyncio.sleep(self.unanswered_send_time + MessageFraming.UNFRAMED_SEND_GAP - time.monotonic())
+            self.write_frame(frame)
+            await self.drain()
+        except Exception as e:
+            print("Message Send Error", e)
+
+    def write_frame(self, frame: bytes) -> None:
+        """
+        Put the frame into the write buffer, never waiting, the client is evicted if the buffer is over the limit
+        把帧放入写缓冲区，从不等待，缓冲区超过上限时驱逐客户端
+        :param frame: returned by MessageFraming.encode_frame
+        :return: None
+        """
+        if self.closed_reason is not None:
+            raise OutboundQueue.ClientEvictedError(f"The connection is closed, {self.closed_reason}")
+        if self.unframed:
+            # the raw messages, an unframed client gets no push, see MessageFraming.unframe
+            # 原始消息，不分帧的客户端不接收推送，见MessageFraming.unframe
+            frame = MessageFraming.unframe(frame)
+            if not frame:
+                return
+            self.unanswered_send_time = time.monotonic()
+        if self.held_frames is not None:
+            self.held_frames.append(frame)
+            return
+        self.writer.write(frame)
+        self.written_bytes += len(frame)
+
+        queued_bytes: int = self.writer.transport.get_write_buffer_size()
+        self.game_server.outbound_counters.note_queued_bytes(queued_bytes)
+        if queued_bytes > self.game_server.outbound_queue_limit:
+            self.evict(OutboundQueue.EVICTED_FOR_OVERFLOW)
+            raise OutboundQueue.ClientEvictedError(
+                f"The outbound queue is over {self.game_server.outbound_queue_limit} bytes")
+
+    def hold_frames(self) -> None:
+        """
+        Hold the frames written from now on, the next receive (or flush_frames) writes them in one call
+        保留从现在开始写入的帧，下一次接收（或flush_frames）一次性写入
+        :return: None
+        """
+        # joined messages would be one message to an unframed client
+        # 合并的消息对不分帧的客户端来说是一条消息
+        if self.held_frames is None and not self.unframed:
+            self.held_frames = []
+
+    def flush_frames(self) -> None:
+        """
+        Write the held frames in one call and stop holding
+        一次性写入保留的帧并停止保留
+        :return: None
+        """
+        held_frames, self.held_frames = self.held_frames, None
+        if held_frames:
+            self.write_frame(b"".join(held_frames))
+
+    def backed_up(self) -> bool:
+        return self.writer.transport.get_write_buffer_size() > self.game_server.outbound_high_watermark
+
+    async def drain(self) -> None:
+        """
+        Wait until the write buffer is down to the low watermark, at most write_timeout, then the client is evicted.
+        Below the high watermark it returns at once, only raising the error of a broken connection.
+        等待写缓冲区降到低水位，最多等待write_timeout，之后驱逐客户端。低于高水位时立刻返回，只抛出连接断开的错误
+        """
+        if not self.backed_up():
+            await self.writer.drain()
+            return
+        try:
+            await asyncio.wait_for(self.writer.drain(), self.game_server.write_timeout)
+        except asyncio.TimeoutError:
+            self.evict(OutboundQueue.EVICTED_FOR_STALL)
+            raise OutboundQueue.ClientEvictedError(f"Nothing was written for {self.game_server.write_timeout} seconds")
+
+    def check_outbound(self, now: float) -> None:
+        """
+        Evict the client if its buffered bytes did not move for write_timeout
+        :param now: time.monotonic()
+        :return: None
+        """
+        queued_bytes: int = self.writer.transport.get_write_buffer_size()
+        sent_bytes: int = self.written_bytes - queued_bytes
+        if queued_bytes == 0 or sent_bytes > self.sent_bytes:
+            self.sent_bytes = sent_bytes
+            self.last_progress_time = now
+        elif now - self.last_progress_time > self.game_server.write_timeout:
+            self.evict(OutboundQueue.EVICTED_FOR_STALL)
+
+    def evict(self, reason: str) -> None:
+        """
+        Drop the buffered bytes and close the connection, disconnect the player
+        丢弃缓冲的字节并关闭连接，断开玩家
+        :param reason: OutboundQueue.EVICTED_FOR_OVERFLOW or OutboundQueue.EVICTED_FOR_STALL
+        :return: None
+        """
+        if self.closed_reason is not None:
+            return
+        self.closed_reason = reason
+        self.game_server.outbound_counters.count_eviction(reason)
+        print("Slow Client Evicted", reason, self.player.player_name if self.player is not None else None)
+        # the reads of the session see the connection closed
+        # 会话的读取会看到连接已关闭
+        self.writer.transport.abort()
+        if self.player is not None:
+            self.game_server.disconnect_player(self.player)
+
+    async def run(self) -> None:
+        # STEP Head.0.0.0
+        # 接受头文件，区分是登录还是心跳包
+        # receive the header, to distinguish whether it is login or heart beat package
+        # a client sending frames asked for the framing, a client from before the framing sends raw bytes
+        # 发送帧的客户端要求了分帧，分帧之前的客户端发送原始字节
+        try:
+            header, self.unframed = await MessageFraming.read_first_message(self.reader)
+        except ConnectionError:
+            self.writer.close()
+            return
+
+        login_options: list[str] | None = OperationStatus.decode_login_options(OperationStatus.LOGIN_HEADER, header)
+        accepted_options: list[str] = []
+        if login_options is not None:
+            # every reply is written in one call, when the client is asked for something
+            # 每个回复在向客户端请求时一次性写入
+            self.hold_frames()
+            if OperationStatus.LOGIN_OPTION_V2 in login_options:
+                # the client speaks v2, no acknowledgement
+                # 客户端使用v2协议，不需要确认
+                self.protocol_version = OperationStatus.PROTOCOL_VERSION_2
+                accepted_options.append(OperationStatus.LOGIN_OPTION_V2)
+            # in-band heart beats are told apart by the frame kind, an unframed client has none
+            # 带内心跳靠帧类型区分，不分帧的客户端没有帧类型
+            if OperationStatus.LOGIN_OPTION_IN_BAND_HEART_BEAT in login_options and not self.unframed:
+                self.heart_beat_in_band = True
+                self.frame_reader = asyncio.create_task(self.read_in_band_frames())
+                accepted_options.append(OperationStatus.LOGIN_OPTION_IN_BAND_HEART_BEAT)
+
+        # STEP Head.0.0.1
+        await self.send_message(OperationStatus.encode_login_options(OperationStatus.LOGIN_HEADER_RECEIVED,
+                                                                     accepted_options))
+
+        if login_options is not None:
+            # ——————————————————————————User Login—————————————————————————— #
+            if not await self.login():
+                self.writer.close()
+                return
+
+            try:
+                # ——————————————————————————Game Hall—————————————————————————— #
+                await self.game_hall()
+            except ConnectionError as e:
+                self.game_server.print_message("Connection Error: " + repr(e) + " player_name: " + self.player.player_name)
+
+            except OperationStatus.PlayerNormalQuit as e:
+                self.game_server.print_message(
+                    "Player Normal Quit: " + repr(e) + " player_name: " + self.player.player_name)
+
+                # close the socket
+                self.writer.close()
+
+            except Exception as e:
+                self.game_server.print_message("Unknown Error: " + repr(e) + " player_name: " + self.player.player_name)
+
+        # an unframed client sends its first heart beat right after the header, the two may arrive as one
+        # 不分帧的客户端在头之后立即发送第一个心跳，两者可能一起到达
+        elif header_matched := re.match(r"Header:heart beat:(?P<username>\w+):client", header):
+            # ——————————————————————————Heart Beat—————————————————————————— #
+            await self.heart_beat(header_matched.group("username"))
+
+    async def heart_beat(self, username: str) -> None:
+        # STEP Head.0.0.1
+        # 接受心跳包，回显
+        # receive the heart beat package, and echo it
+        # wake up the login session waiting for the heart beat
+        # 唤醒等待心跳的登录会话
+        login_session: AsyncGameSession | None = self.game_server.heart_beat_arrived(username)
+        if login_session is None:
+            # nobody logged in with this username, or the login already gave up
+            # 没有这个用户名的登录，或者登录已经放弃等待
+            print("Heart Beat without Login", username)
+            self.writer.close()
+            return
+        self.player = login_session.player
+        # the connection belongs to the session of the player from now on
+        # 从现在开始连接属于玩家的会话
+        self.game_server.session_tracker.hand_over(self.session_record, login_session.session_record)
+        self.game_server.game_hall.set_heart_beat_socket(self.player, self.writer.get_extra_info("socket"))
+        login_session.heart_beat_established.set()
+
+        try:
+            while True:
+                # the same timeout as the thread engine
+                # 与多线程版本相同的超时时间
+                await asyncio.wait_for(self.recv_message(), self.game_server.heart_beat_timeout)
+                # tell the client, the message is received
+                self.write_frame(MessageFraming.encode_frame("Heart beat:ventricle:response"))
+                await self.drain()
+
+        except Exception as e:
+            print("Heart Beat Connection Error", repr(e), username)
+
+            if self.player is None:
+                return
+
+            # in the room or in the game hall, the same as the thread engine
+            # 无论在房间还是游戏大厅，与多线程版本相同
+            self.game_server.disconnect_player(self.player)
+            self.writer.close()
+
+    def resume_thread_to_game(self) -> None:
+        """
+        Resume the session, the game is finished, back to the game hall
+        :return: None
+        """
+        self.thread_lock.set()
+
+    async def stop_thread(self) -> None:
+        """
+        Pause the session until the game is finished,
+        only this coroutine waits, the event loop keeps serving others
+        :return: None
+        """
+        print(self.player.player_name, "Session Paused")
+        await self.thread_lock.wait()
+        print(self.player.player_name, "Session Recovered")
+
+    async def login(self) -> bool:
+        """
+        Login until success
+        :return: Whether the player logged in and the heart beat is established
+        """
+        login_result: bool = False
+        while login_result is not True:
+            try:
+                # STEP1.0.0.0 - 1.0.2.1
+                login_result = await self.login_process()
+                # STEP1.0.3.0 - 1.0.3.1
+                await self.login_result_response(login_result)
+
+            except Exception as e:
+                print("Login: Unknown Error:", repr(e))
+                if self.player is not None:
+                    # the player was added to the hall, clean up
+                    # 玩家已经加入大厅，清理
+                    self.game_server.cancel_heart_beat(self)
+                    self.game_server.disconnect_player(self.player)
+                return False
+
+        if self.heart_beat_in_band:
+            # the heart beats are on this connection, nothing to wait for
+            # 心跳在这个连接上，不需要等待
+            return True
+
+        # the client opens the heart beat connection after it has the login result
+        # 客户端收到登录结果后才建立心跳连接
+        self.flush_frames()
+        # 进入大厅前要建立心跳链接，等待事件，不占用CPU
+        # wait for the heart beat to be established, without spinning
+        print("Waiting for Heart Beat to be Established")
+        try:
+            await asyncio.wait_for(self.heart_beat_established.wait(), self.game_server.heart_beat_rendezvous_timeout)
+        except asyncio.TimeoutError:
+            # the heart beat connection never arrived, clean up the player
+            # 心跳连接没有到达，清理玩家
+            print("Heart Beat Not Established", self.player.player_name)
+            self.game_server.cancel_heart_beat(self)
+            self.game_server.disconnect_player(self.player)
+            return False
+        print("Heart Beat Established")
+        return True
+
+    async def login_process(self) -> bool:
+        """
+        Login, ask for the username and password, and check the username and password
+        登录，请求用户名和密码，并检查用户名和密码
+
+        :return: Whether the login is successful
+        """
+        # STEP1.0.0.0
+        await self.send_message("Please input your user name:")
+        # STEP1.0.0.1
+        # del the head, the format is username:username
+        username: str = (await self.recv_message())[9:]
+
+        # STEP1.0.1.0
+        await self.send_message("Please input your password:")
+        # STEP1.0.1.1
+        # del the head, the format is password:password
+        password: str = (await self.recv_message())[9:]
+        self.hold_frames()
+
+        # STEP1.0.2.0
+        # 格式 /login player_name password
+        await self.send_message(f"/login {username} {password}\n")
+        # STEP1.0.2.1
+        # here, the received_message should be "Received" (v1) or None (v2)
+        await self.receive_acknowledgement()
+
+        if self.user_info_file.check_account_password(username, password):
+            # 心跳频道之后建立
+            self.player = Player.Player(username,
+                                        password,
+                                        self.writer.get_extra_info("socket"),
+                                        self,
+                                        player_status=1,
+                                        protocol_version=self.protocol_version)
+
+            # add the player to the game hall
+            # 将玩家添加到游戏大厅
+            self.game_server.game_hall.add_player(self.player)
+            self.game_server.session_tracker.set_player(self.session_record, self.player)
+
+            # wait for the heart beat connection from now on, the client opens it after the login result
+            # 从现在开始等待心跳连接，客户端在收到登录结果后才建立它
+            if not self.heart_beat_in_band:
+                self.game_server.expect_heart_beat(self)
+            return True
+        else:
+            return False
+
+    async def login_result_response(self, login_result: bool) -> None:
+        """
+        Send the login result to the client
+        将登录结果发送给客户端
+
+        :param login_result: Whether the login is successful
+        :return: None
+        """
+        # STEP1.0.3.0
+        if login_result:
+            await self.send_message(OperationStatus.OperationStatus.authentication_successful)
+        else:
+            await self.send_message(OperationStatus.OperationStatus.authentication_failed)
+        # STEP1.0.3.1
+        await self.receive_acknowledgement()
+
+    async def game_hall(self):
+        while True:
+            # STEP1.1.0.0
+            await self.send_message("STEP1.1.0.0 Server Ready")
+
+            # STEP1.1.0.1
+            # del the head, the format is hall_command:command
+            user_command: str = (await self.recv_hall_command())[13:]
+            # the answer and the next prompt leave together
+            # 回答和下一个提示一起发出
+            self.hold_frames()
+
+            if user_command == "/list":
+                # STEP1.1.1.0
+                await self.send_frame(self.game_server.game_hall.list_room_frame())
+                # STEP1.1.1.1
+                await self.receive_acknowledgement()
+
+            elif matched_command := re.fullmatch(r"/list (?P<first_room_id>\d+) (?P<room_number>\d+)", user_command):
+                # STEP1.1.1.0
+                await self.send_message(self.game_server.game_hall.list_room_page(
+                    int(matched_command.group("first_room_id")), int(matched_command.group("room_number"))))
+                # STEP1.1.1.1
+                await self.receive_acknowledgement()
+
+            elif matched_command := re.fullmatch(r"/list since (?P<version>\d+)", user_command):
+                # STEP1.1.1.0
+                await self.send_message(
+                    self.game_server.game_hall.list_room_changes(int(matched_command.group("version"))))
+                # STEP1.1.1.1
+                await self.receive_acknowledgement()
+
+            elif user_command == "/watch":
+                version, room_status = self.game_server.game_hall.room_changes_since(-1)
+                # STEP1.1.1.0
+                await self.send_message(room_status)
+                # STEP1.1.1.1
+                await self.receive_acknowledgement()
+                # write_frame only buffers, the event loop sends the push frames
+                # write_frame只写入缓冲区，由事件循环发送推送帧
+                self.game_server.room_status_broadcaster.watch(self.player, self.write_frame, version, self.backed_up)
+
+            elif user_command == "/unwatch":
+                self.game_server.room_status_broadcaster.unwatch(self.player)
+                # STEP1.1.1.0
+                await self.send_message(OperationStatus.OperationStatus.watch_stopped)
+                # STEP1.1.1.1
+                await self.receive_acknowledgement()
+
+            elif matched_command := re.fullmatch(r"/enter (?P<target_room_number>\d+)", user_command):
+                room_number_enter: int = int(matched_command.group("target_room_number"))
+
+                try:
+                    self.game_server.game_hall.enter_room(self.player, room_number_enter)
+
+                except OperationStatus.InvalidOperationError:
+                    # STEP1.1.1.0
+                    await self.send_message(OperationStatus.OperationStatus.unrecognized_message)
+                    # STEP1.1.1.1
+                    await self.receive_acknowledgement()
+                except OperationStatus.RoomFullError:
+                    # STEP1.1.1.0
+                    await self.send_message(OperationStatus.OperationStatus.room_full)
+                    # STEP1.1.1.1
+                    await self.receive_acknowledgement()
+                except Exception as e:
+                    # STEP1.1.1.0
+                    await self.send_message(repr(e))
+                    # STEP1.1.1.1
+                    await self.receive_acknowledgement()
+                else:
+                    await self.wait_in_room()
+
+            elif user_command == "/match":
+                try:
+                    self.game_server.game_hall.match_room(self.player)
+
+                except OperationStatus.RoomFullError:
+                    # STEP1.1.1.0
+                    await self.send_message(OperationStatus.OperationStatus.room_full)
+                    # STEP1.1.1.1
+                    await self.receive_acknowledgement()
+                else:
+                    await self.wait_in_room()
+
+            elif user_command == "/exit":
+                # STEP1.1.1.0
+                await self.send_message(OperationStatus.OperationStatus.bye_bye)
+                self.flush_frames()
+
+                raise OperationStatus.PlayerNormalQuit("Player Normal Quit")
+
+            else:
+                # STEP1.1.1.0
+                await self.send_message(OperationStatus.OperationStatus.unrecognized_message)
+                # STEP1.1.1.1
+                await self.receive_acknowledgement()
+
+    async def wait_in_room(self) -> None:
+        """
+        The player is in a room, tell the client to wait, then wait for the game to finish
+        玩家已经在房间里，告诉客户端等待，然后等待游戏结束
+        """
+        # STEP1.1.1.0
+        await self.send_message(OperationStatus.OperationStatus.wait)
+        self.player.player_status = Player.Player.WAITING_IN_ROOM
+
+        # STEP 1.1.1.1
+        start_wait_msg: str | None = await self.receive_acknowledgement()
+        print(self.player.player_name, start_wait_msg)
+
+        await self.start_game()
+
+    async def start_game(self):
+        game_room: GameRoom.GameRoom = self.player.game_room
+
+        # None raise the exception
+        if game_room is None:
+            raise OperationStatus.InvalidOperationError("The player is not in any room")
+
+        # The session is waiting from now on. A v1 player may still be sending "Client start wait"
+        # after the room is full, so the game starts only when every player of the room is waiting,
+        # or the game and the session would read the same stream. The room decides atomically.
+        # 从现在开始会话处于等待状态。房间满时v1玩家可能还没发送确认，
+        # 所以只有房间里所有玩家都在等待时才开始游戏，否则游戏和会话会读同一个流，由房间原子地决定
+        self.thread_lock.clear()
+        # the wait answer goes before the game starts
+        # 等待的回答在游戏开始之前发出
+        self.flush_frames()
+        if game_room.player_ready(self.player):
+            self.game_server.start_game(game_room)
+
+        # pause the session, wait for the game to finish
+        # 暂停会话，等待游戏结束
+        await self.stop_thread()
+
+
+class AsyncGame:
+    """
+    The coroutine version of GameRoom.GameRoom.Game
+    协程版本的GameRoom.Game
+    """
+
+    def __init__(self, game_server: AsyncGameServer, room: GameRoom.GameRoom):
+        self.game_server: AsyncGameServer = game_server
+        self.room: GameRoom.GameRoom = room
+        self.player_list: list[Player.Player] = self.room.player_list
+        # set when a player of the game is lost, wakes up the receive at once
+        # 游戏的玩家断线时被设置，立刻唤醒接收
+        self.player_lost: asyncio.Event = asyncio.Event()
+        self.room.game = self
+
+    def cancel(self) -> None:
+        """
+        A player of the game is lost, e.g. by the heart beat, the game stops waiting for messages at once,
+        tells the other players they won and frees the room
+        游戏的一个玩家断线，例如心跳丢失，游戏立刻停止等待消息，告诉其他玩家他们赢了并释放房间
+        :return: None
+        """
+        self.player_lost.set()
+
+    async def run(self):
+        await self.start_game()
+
+    @staticmethod
+    async def send_message_to_player_safe(player: Player.Player, message: str) -> bool:
+        """
+        Try send the message to a single player
+        :return: True if error
+        """
+        return await AsyncGame.send_frame_to_player_safe(player, MessageFraming.encode_frame(message))
+
+    @staticmethod
+    async def send_frame_to_player_safe(player: Player.Player, frame: bytes) -> bool:
+        """
+        Try send a frame encoded beforehand to a single player, the frame may be shared by the players
+        :return: True if error
+        """
+        session: AsyncGameSession = player.player_thread
+        try:
+            # never waits for a slow player, the other players of the room go on, a stalled player is evicted
+            # 从不等待慢玩家，房间里的其他玩家继续，停滞的玩家被驱逐
+            session.write_frame(frame)
+            if not session.backed_up():
+                await session.writer.drain()
+        except Exception as e:
+            print("Unknown Error:", player.player_name, repr(e))
+            return True
+        else:
+            return False
+
+    async def send_message_to_all(self, message: str) -> bool:
+        # encoded once for the whole room
+        # 整个房间只编码一次
+        frame: bytes = MessageFraming.encode_frame(message)
+        whether_error: bool = False
+        for player in self.player_list.copy():
+            if await self.send_frame_to_player_safe(player, frame):
+                # out of the room and the game hall, nobody else would release the player
+                # 离开房间和游戏大厅，没有其他人会释放这个玩家
+                self.game_server.disconnect_player(player)
+                whether_error = True
+
+        if whether_error:
+            await self.opponent_quit()
+            raise OperationStatus.PlayerNotFoundError("Some player is disconnected")
+        return True
+
+    @staticmethod
+    async def receive_acknowledgement(player: Player.Player) -> str | None:
+        """
+        The same as GameRoom.GameRoom.Game.receive_acknowledgement,
+        a player with late messages acknowledges after them, it is dropped in the game hall too
+        """
+        if player.protocol_version == OperationStatus.PROTOCOL_VERSION_1 and player.late_message_number > 0:
+            player.late_message_number += 1
+            return None
+        return await player.player_thread.receive_acknowledgement()
+
+    async def receive_message_from_all(self, received_messages: list[str | None], acknowledgement: bool = False,
+                                       deadline: float | None = None) -> bool:
+        """
+        Receive one message from every player at once, in any order
+        A slow player does not hold up the others, a lost player ends the wait at once
+        A player silent until the deadline gets None, its message is late and dropped in the game hall
+        :param received_messages: the messages are appended to it, in the order of the player list
+        :param acknowledgement: the messages are acknowledgements, v2 players are skipped
+        :param deadline: the event loop time after which the silent players are given up, None to wait forever
+        """
+        whether_error: bool = False
+        # STEP NORMAL_RECEIVE1.2.0.1
+        receive_tasks: dict[asyncio.Task, Player.Player] = {}
+        for player in self.player_list.copy():
+            if acknowledgement and player.protocol_version != OperationStatus.PROTOCOL_VERSION_1:
+                continue
+            if acknowledgement and player.late_message_number > 0:
+                # the acknowledgement comes after the late messages
+                # 确认在迟到的消息之后到达
+                player.late_message_number += 1
+                continue
+            receive_tasks[asyncio.ensure_future(player.player_thread.recv_message())] = player
+        player_messages: dict[Player.Player, str] = {}
+
+        loop: asyncio.AbstractEventLoop = asyncio.get_running_loop()
+        pending_tasks: set[asyncio.Task] = set(receive_tasks)
+        # a lost player ends the wait even if its message arrived already
+        # 即使断线玩家的消息已经到达，它也会结束等待
+        player_lost_wait: asyncio.Task = asyncio.ensure_future(self.player_lost.wait())
+        while pending_tasks and not whether_error:
+            wait_time: float | None = None if deadline is None else deadline - loop.time()
+            if wait_time is not None and wait_time <= 0:
+                break
+            done_tasks, _ = await asyncio.wait(pending_tasks | {player_lost_wait}, timeout=wait_time,
+                                               return_when=asyncio.FIRST_COMPLETED)
+            if player_lost_wait in done_tasks:
+                done_tasks.discard(player_lost_wait)
+                whether_error = True
+            pending_tasks -= done_tasks
+            for receive_task in done_tasks:
+                player: Player.Player = receive_tasks[receive_task]
+                try:
+                    player_messages[player] = receive_task.result()
+                except Exception as e:
+                    self.game_server.print_message("Receive message Error:", player, e)
+                    self.game_server.disconnect_player(player)
+                    whether_error = True
+
+        player_lost_wait.cancel()
+
+        # the players still sending keep their receive, the session takes the message next time,
+        # it is late and dropped in the game hall
+        # 仍在发送的玩家保留他们的接收，会话下次取这条消息，它迟到了，在游戏大厅里丢弃
+        for receive_task in pending_tasks:
+            player: Player.Player = receive_tasks[receive_task]
+            player.player_thread.receive_task = receive_task
+            player.late_message_number += 1
+
+        # in the order of the players
+        # 按玩家顺序
+        received_messages.extend(player_messages.get(player) for player in receive_tasks.values())
+
+        # 玩家数量小于指定数量，意味着有玩家退出了游戏
+        # less players than required means someone quit
+        if len(self.player_list) < self.room.MAX_PLAYER_NUMBER:
+            whether_error = True
+
+        # Error.receive.1
+        if whether_error:
+            await self.opponent_quit()
+            raise OperationStatus.PlayerNotFoundError("Some player is disconnected")
+        return True
+
+    async def opponent_quit(self) -> None:
+        """
+        Tell the remaining players they won, then finish the game
+        告诉剩下的玩家他们赢了，然后结束游戏
+        """
+        for player in self.player_list.copy():
+            if player.protocol_version != OperationStatus.PROTOCOL_VERSION_1:
+                player.player_thread.hold_frames()
+            await self.send_message_to_player_safe(player,
+                                                   OperationStatus.OperationStatus.win_the_game_since_opponent_quit)
+
+        # Error.quit.1
+        for player in self.player_list.copy():
+            try:
+                await self.receive_acknowledgement(player)
+            except Exception as e:
+                self.game_server.print_message("Receive message Error:", player, e)
+
+        self.finish_game()
+
+    def finish_game(self) -> None:
+        # clear the room first, a resumed player may enter the same room again at once
+        # 先清空房间，被恢复的玩家可能立刻再次进入同一个房间
+        for player in self.room.clear_room():
+            player.player_status = Player.Player.IN_THE_GAME_HALL
+            player.player_thread.resume_thread_to_game()
+
+    async def start_game(self):
+        # STEP 1.2.0.0
+        try:
+            await self.send_message_to_all(OperationStatus.OperationStatus.game_started)
+        except Exception as e:
+            self.game_server.print_message(e)
+            return
+
+        # generate a random boolean
+        # 生成一个随机布尔值
+        random_bool: bool = GameRoom.GameRoom.Game.generate_random_bool()
+
+        # STEP 1.2.0.1
+        # None for a player who did not guess in time
+        # 没有按时猜测的玩家为None
+        player_guess_str: list[str | None] = []
+        try:
+            await self.receive_message_from_all(
+                player_guess_str, deadline=asyncio.get_running_loop().time() + self.game_server.guess_timeout)
+        except Exception as e:
+            self.game_server.print_message(e)
+            return
+
+        # STEP 1.2.1.0 RESULT
+        # the same resolution and the same encoded frames as the thread engine
+        # 与多线程版本相同的判定和编码好的帧
+        results: dict[str | None, str] = GameRoom.GameRoom.Game.resolve_results(player_guess_str, random_bool)
+        for player, guess in zip(self.player_list.copy(), player_guess_str):
+            if player.protocol_version != OperationStatus.PROTOCOL_VERSION_1:
+                # nothing is answered before the next hall prompt, the resumed session writes both together
+                # 下一个大厅提示之前没有回答，恢复的会话把两者一起写入
+                player.player_thread.hold_frames()
+            await self.send_frame_to_player_safe(player, GameRoom.GameRoom.Game.RESULT_FRAMES[results[guess]])
+
+        # STEP 1.2.2.0
+        # v1 players acknowledge the result, v2 players do not
+        try:
+            await self.receive_message_from_all(
+                [], acknowledgement=True, deadline=asyncio.get_running_loop().time() + self.game_server.guess_timeout)
+        except Exception as e:
+            self.game_server.print_message(e)
+            return
+
+        self.finish_game()
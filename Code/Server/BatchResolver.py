@@ -0,0 +1,163 @@
+from __future__ import annotations
+
+import functools
+import random
+import threading
+import time
+
+import GameRoom
+import GameRunner
+import OperationStatus
+
+# NumPy is optional, without it the batch is resolved in Python with one random draw for all games
+# NumPy是可选的，没有它时批次在Python里判定，所有游戏只抽一次随机数
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+NUMPY_AVAILABLE: bool = numpy is not None
+
+# the guesses as numbers in the arrays, any other guess is resolved by GameRoom.Game.resolve_results
+# 数组里用数字表示的猜测，其他猜测由GameRoom.Game.resolve_results判定
+GUESS_CODES: dict[str | None, int] = {"False": 0, "True": 1, None: 2}
+RESULTS: tuple[str, ...] = (OperationStatus.OperationStatus.lose_the_game,
+                            OperationStatus.OperationStatus.win_the_game,
+                            OperationStatus.OperationStatus.result_is_tie)
+LOSE: int = 0
+WIN: int = 1
+TIE: int = 2
+
+
+def resolve_batch(games_guesses: list[list[str | None]],
+                  use_numpy: bool = NUMPY_AVAILABLE) -> list[dict[str | None, str]]:
+    """
+    Resolve the results of many games at once, with the rules of GameRoom.Game.resolve_results
+    使用GameRoom.Game.resolve_results的规则，一次判定许多局游戏的结果
+    :param games_guesses: the guesses of the players of every game
+    :param use_numpy: pack the guesses into arrays and resolve all games with array operations
+    :return: for every game, guess -> result message
+    """
+    if not games_guesses:
+        return []
+    if use_numpy:
+        return resolve_batch_numpy(games_guesses)
+
+    # one draw for the random bools of all games, one binary digit each
+    # 所有游戏的随机布尔值只抽一次，每局一个二进制位
+    game_number: int = len(games_guesses)
+    random_digits: str = format(random.getrandbits(game_number), f"0{game_number}b")
+
+    # the results depend only on the different guesses and the random bool, few combinations for many games,
+    # the games with the same combination share one read-only result
+    # 结果只取决于不同的猜测和随机布尔值，许多局游戏只有很少的组合，组合相同的游戏共用一个只读的结果
+    known_results: dict[tuple[frozenset[str | None], str], dict[str | None, str]] = {}
+    games_results: list[dict[str | None, str]] = []
+    for player_guesses, random_digit in zip(games_guesses, random_digits):
+        key: tuple[frozenset[str | None], str] = (frozenset(player_guesses), random_digit)
+        results: dict[str | None, str] | None = known_results.get(key)
+        if results is None:
+            results = known_results[key] = GameRoom.GameRoom.Game.resolve_results(player_guesses, random_digit == "1")
+        games_results.append(results)
+    return games_results
+
+
+def resolve_batch_numpy(games_guesses: list[list[str | None]]) -> list[dict[str | None, str]]:
+    game_number: int = len(games_guesses)
+    room_sizes = numpy.fromiter(map(len, games_guesses), dtype=numpy.int64, count=game_number)
+    game_starts = numpy.zeros(game_number, dtype=numpy.int64)
+    numpy.cumsum(room_sizes[:-1], out=game_starts[1:])
+
+    # every guess of every game in one array, an unknown guess is -1
+    # 所有游戏的所有猜测放在一个数组里，未知的猜测为-1
+    guess_codes = numpy.fromiter((GUESS_CODES.get(guess, -1) for player_guesses in games_guesses
+                                  for guess in player_guesses), dtype=numpy.int8, count=int(room_sizes.sum()))
+    true_numbers = numpy.add.reduceat((guess_codes == 1).astype(numpy.int64), game_starts)
+    false_numbers = numpy.add.reduceat((guess_codes == 0).astype(numpy.int64), game_starts)
+    none_numbers = numpy.add.reduceat((guess_codes == 2).astype(numpy.int64), game_starts)
+    unknown_numbers = room_sizes - true_numbers - false_numbers - none_numbers
+
+    # all random bools in one call
+    # 一次调用抽取所有随机布尔值
+    random_bools = numpy.random.default_rng().integers(0, 2, size=game_number, dtype=numpy.int8).astype(bool)
+
+    forfeit = none_numbers > 0
+    tie = ~forfeit & ((true_numbers == room_sizes) | (false_numbers == room_sizes))
+    true_results = numpy.where(forfeit, WIN, numpy.where(tie, TIE, numpy.where(random_bools, WIN, LOSE)))
+    false_results = numpy.where(forfeit, WIN, numpy.where(tie, TIE, numpy.where(random_bools, LOSE, WIN)))
+
+    games_results: list[dict[str | None, str]] = []
+    for i, player_guesses in enumerate(games_guesses):
+        if unknown_numbers[i]:
+            games_results.append(GameRoom.GameRoom.Game.resolve_results(player_guesses, bool(random_bools[i])))
+            continue
+        games_results.append({"True": RESULTS[true_results[i]], "False": RESULTS[false_results[i]],
+                              None: RESULTS[LOSE]})
+    return games_results
+
+
+class BatchResolver(threading.Thread):
+    """
+    Resolves the games that have all their guesses together, once per tick, thread engine
+
+    A game whose guesses are in waits for the tick instead of resolving itself.
+    The first ready game opens a tick, tick seconds later every game ready by then is resolved in one batch,
+    the results are sent by the workers of the game runner. An idle server does not tick.
+
+    一起判定所有猜测都已到达的游戏，每个周期一次，多线程引擎使用
+    猜测到齐的游戏等待周期，而不是自己判定。第一局就绪的游戏开启一个周期，tick秒后把那时就绪的所有游戏放在一个批次里判定，
+    结果由游戏运行器的工作线程发送。空闲的服务器不计时
+    """
+
+    def __init__(self, tick: float, game_runner: GameRunner.GameRunner, use_numpy: bool = NUMPY_AVAILABLE) -> None:
+        """
+        :param tick: seconds from the first ready game to the resolution of the batch
+        :param game_runner: runs the next steps of the resolved games
+        :param use_numpy: resolve with NumPy arrays, only if NumPy is installed
+        """
+        super().__init__(name="BatchResolver", daemon=True)
+        if use_numpy and not NUMPY_AVAILABLE:
+            raise ValueError("NumPy is not installed")
+        self.tick: float = tick
+        self.game_runner: GameRunner.GameRunner = game_runner
+        self.use_numpy: bool = use_numpy
+
+        # (game, guesses of the players) waiting for the tick
+        # 等待周期的（游戏，玩家的猜测）
+        self.ready_games: list[tuple[GameRoom.GameRoom.Game, list[str | None]]] = []
+        self.lock: threading.Lock = threading.Lock()
+        self.tick_opened: threading.Event = threading.Event()
+
+    def add(self, game: GameRoom.GameRoom.Game, player_guesses: list[str | None]) -> None:
+        """
+        Resolve the game at the next tick, then game.send_results runs on a worker
+        :param game: the game, all guesses are in
+        :param player_guesses: the guesses in the order of game.waiting_players
+        :return: None
+        """
+        with self.lock:
+            self.ready_games.append((game, player_guesses))
+            if len(self.ready_games) == 1:
+                self.tick_opened.set()
+
+    def run(self) -> None:
+        while True:
+            self.tick_opened.wait()
+            time.sleep(self.tick)
+            with self.lock:
+                ready_games, self.ready_games = self.ready_games, []
+                self.tick_opened.clear()
+
+            try:
+                games_results: list[dict[str | None, str]] = resolve_batch(
+                    [player_guesses for _, player_guesses in ready_games], self.use_numpy)
+            except Exception as e:
+                # never leave the games waiting, resolve them one by one
+                # 不能让游戏一直等待，逐个判定
+                print("Batch Resolve Error", repr(e))
+                games_results = [GameRoom.GameRoom.Game.resolve_results(player_guesses,
+                                                                        GameRoom.GameRoom.Game.generate_random_bool())
+                                 for _, player_guesses in ready_games]
+
+            for (game, player_guesses), results in zip(ready_games, games_results):
+                self.game_runner.submit(functools.partial(game.send_results, player_guesses, results))
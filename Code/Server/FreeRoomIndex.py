@@ -0,0 +1,121 @@
+from __future__ import annotations
+
+import heapq
+import threading
+
+import GameRoom
+import OperationStatus
+import Player
+
+
+class FreeRoomIndex:
+    """
+    The rooms a player can enter, ordered by occupancy, for /match
+
+    A heap of (-number of players, room id, version): the top is the fullest room that still has a seat,
+    so a waiting player is paired before an empty room is opened. Rooms report every change,
+    each change pushes a new entry with a new version; older entries of the room are skipped when
+    they reach the top (lazy deletion). Each join is O(log n).
+
+    可以进入的房间，按人数排序，用于/match
+    堆里是（-玩家数，房间号，版本），堆顶是还有空位的最满的房间，所以先给等待的玩家配对，再开新的空房间
+    房间的每次变化都压入一个新版本的条目，旧条目到达堆顶时被跳过（延迟删除），每次加入是O(log n)
+    """
+
+    def __init__(self, game_room_list: list[GameRoom.GameRoom]) -> None:
+        # never held while a room is entered, the room reports the change back to the index
+        # 进入房间时不持有，房间会把变化报告回索引
+        self.lock: threading.Lock = threading.Lock()
+        self.heap: list[tuple[int, int, int]] = []
+        self.rooms: dict[int, GameRoom.GameRoom] = {}
+        # room id -> the version of its newest entry, only that entry is valid
+        # 房间号 -> 最新条目的版本，只有这个条目有效
+        self.versions: dict[int, int] = {}
+
+        for game_room in game_room_list:
+            self.add_room(game_room)
+
+    def add_room(self, game_room: GameRoom.GameRoom) -> None:
+        """
+        Index the room, its changes are reported to room_changed from now on
+        :param game_room: the room
+        :return: None
+        """
+        with self.lock:
+            self.rooms[game_room.room_id] = game_room
+            self.push_locked(game_room)
+
+    def remove_room(self, game_room: GameRoom.GameRoom) -> None:
+        """
+        Stop indexing the room, e.g. it is retired, its entries are skipped from now on
+        :param game_room: the room
+        :return: None
+        """
+        with self.lock:
+            if self.rooms.get(game_room.room_id) is not game_room:
+                return
+            del self.rooms[game_room.room_id]
+            self.versions[game_room.room_id] += 1
+
+    def room_changed(self, game_room: GameRoom.GameRoom) -> None:
+        """
+        Called by the room after a player entered or left, or the room was cleared
+        :param game_room: the room
+        :return: None
+        """
+        with self.lock:
+            if self.rooms.get(game_room.room_id) is game_room:
+                self.push_locked(game_room)
+
+    def push_locked(self, game_room: GameRoom.GameRoom) -> None:
+        version: int = self.versions.get(game_room.room_id, 0) + 1
+        self.versions[game_room.room_id] = version
+
+        if not game_room.game_started and not game_room.check_full():
+            heapq.heappush(self.heap, (-len(game_room.player_list), game_room.room_id, version))
+
+        # too many skipped entries, rebuild from the valid ones
+        # 过期条目太多，用有效条目重建
+        if len(self.heap) > 4 * len(self.rooms) + 64:
+            self.heap = [entry for entry in self.heap if self.is_valid_locked(entry)]
+            heapq.heapify(self.heap)
+
+    def is_valid_locked(self, entry: tuple[int, int, int]) -> bool:
+        _, room_id, version = entry
+        return room_id in self.rooms and version == self.versions[room_id]
+
+    def match(self, player: Player.Player) -> GameRoom.GameRoom:
+        """
+        Put the player into the fullest room that still has a seat
+        The room is entered outside the lock of the index, the room reports the change back to room_changed
+        :param player: the player
+        :return: the room the player is in now
+        :raise RoomFullError: every room is full
+        """
+        while True:
+            with self.lock:
+                while self.heap and not self.is_valid_locked(self.heap[0]):
+                    # an older entry of the room, or the room is removed
+                    heapq.heappop(self.heap)
+                if not self.heap:
+                    raise OperationStatus.RoomFullError("All rooms are full")
+                entry: tuple[int, int, int] = self.heap[0]
+                game_room: GameRoom.GameRoom = self.rooms[entry[1]]
+
+            try:
+                game_room.add_player(player)
+            except OperationStatus.RoomFullError:
+                # filled by another player or retired meanwhile, skip the entry unless the room reported since
+                # 同时被其他玩家填满或被回收，除非房间已经报告了新的变化，否则跳过这个条目
+                with self.lock:
+                    if self.is_valid_locked(entry):
+                        self.versions[entry[1]] += 1
+                continue
+            return game_room
+
+    def free_room_number(self) -> int:
+        """
+        :return: the number of rooms with a free seat
+        """
+        with self.lock:
+            return sum(1 for entry in self.heap if self.is_valid_locked(entry))
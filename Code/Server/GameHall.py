@@ -1,46 +1,272 @@
+from __future__ import annotations
+
+import collections
+import heapq
+import threading
+
+import FreeRoomIndex
 import GameRoom
+import MessageFraming
 import Player
 import OperationStatus
 import GameServer
+import PlayerRegistry
 import socket
 
 
 class GameHall:
+    # the rooms kept even when nobody plays
+    # 没有人玩时也保留的房间数
     DEFAULT_GAME_ROOM_NUMBER = 10
+    # no room is created beyond this number
+    # 房间数不会超过这个数
+    DEFAULT_MAX_GAME_ROOM_NUMBER = 10000
+    # the players of a full room, a game starts when they are all waiting
+    # 满员房间的玩家数，所有人都在等待时游戏开始
+    DEFAULT_ROOM_SIZE = 2
+    # the changes of the room status remembered for "/list since version"
+    # 为"/list since version"记住的房间状态变化数
+    ROOM_STATUS_CHANGE_LOG_SIZE = 4096
 
     def __init__(self,
                  game_server: GameServer.GameServer,
-                 game_room_number: int = DEFAULT_GAME_ROOM_NUMBER) -> None:
-        self.game_room_number: int = game_room_number
+                 game_room_number: int = DEFAULT_GAME_ROOM_NUMBER,
+                 max_game_room_number: int = DEFAULT_MAX_GAME_ROOM_NUMBER,
+                 room_size: int = DEFAULT_ROOM_SIZE) -> None:
+        """
+        The game hall, rooms are created on demand and recycled when they become empty
+
+        While there are fewer than max_game_room_number rooms, one empty room is always kept,
+        so a new room is created when the last empty room is entered.
+        An empty room is retired when another empty room is left and there are more than game_room_number rooms,
+        the room object is kept in a free-list and reused for the next new room.
+
+        游戏大厅，房间按需创建，空了就回收
+        房间数少于max_game_room_number时总保留一个空房间，所以最后一个空房间被进入时创建新房间
+        还有其他空房间并且房间数多于game_room_number时，空房间被回收，房间对象放进空闲列表，下次创建房间时复用
+
+        :param game_server: the game server
+        :param game_room_number: the minimum number of rooms
+        :param max_game_room_number: the maximum number of rooms
+        :param room_size: the players of a full room, at least 2
+        """
+        if not 1 <= game_room_number <= max_game_room_number:
+            raise ValueError(f"Invalid room limits, min {game_room_number} max {max_game_room_number}")
+        if room_size < 2:
+            raise ValueError(f"A room should have at least 2 players, not {room_size}")
+
+        self.game_server: GameServer.GameServer = game_server
+        self.min_game_room_number: int = game_room_number
+        self.max_game_room_number: int = max_game_room_number
+        self.room_size: int = room_size
 
-        # create the game room list
-        # 创建游戏房间列表
-        self.game_room_list: [GameRoom.GameRoom] = []
         # the room starts the game
         self.active_room_list: [GameRoom.GameRoom] = []
 
-        # Player List
-        # 玩家列表
-        self.player_list: [Player.Player] = []
+        # Players, indexed by username and by socket
+        # 玩家，按用户名和套接字建立索引
+        self.player_registry: PlayerRegistry.PlayerRegistry = PlayerRegistry.PlayerRegistry()
 
-        for i in range(self.game_room_number):
-            self.game_room_list.append(GameRoom.GameRoom(game_server, i))
+        # the rooms with a free seat ordered by occupancy, for /match
+        # 有空位的房间按人数排序，用于/match
+        self.free_room_index: FreeRoomIndex.FreeRoomIndex = FreeRoomIndex.FreeRoomIndex([])
 
-    def add_player(self, player: Player.Player) -> bool:
+        # every field below is guarded by the pool lock, the lock is taken before the lock of a room
+        # 下面的字段都由房间池锁保护，先加房间池锁再加房间锁
+        self.room_pool_lock: threading.Lock = threading.Lock()
+        # room id -> the room in use
+        # 房间号 -> 使用中的房间
+        self.game_rooms: dict[int, GameRoom.GameRoom] = {}
+        # the number of players of each room id shown by /list, as text so /list only joins them,
+        # updated on every change, "0" for an unused id
+        # /list显示的每个房间号的玩家数，保存为文本，/list只需要拼接，每次变化时更新，未使用的房间号为"0"
+        self.room_occupancy: list[str] = []
+        # unused room ids below len(room_occupancy), the smallest is used first so /list stays short
+        # the set is the truth, the heap may hold ids already used again (lazy deletion)
+        # len(room_occupancy)以下未使用的房间号，先用最小的，让/list保持简短；以集合为准，堆里可能有已再次使用的房间号
+        self.free_room_ids: set[int] = set()
+        self.free_room_id_heap: list[int] = []
+        # ids of the rooms in use with nobody in them
+        # 使用中且没有人的房间号
+        self.empty_room_ids: set[int] = set()
+        # retired room objects, reused by create_room_locked
+        # 已回收的房间对象，由create_room_locked复用
+        self.spare_rooms: list[GameRoom.GameRoom] = []
+
+        # increased whenever /list would answer something else
+        # /list的回答每次变化时增加
+        self.room_status_version: int = 0
+        # (version, room id) of each change of the number of players, for "/list since version"
+        # 每次玩家数变化的（版本，房间号），用于"/list since version"
+        self.room_status_changes: collections.deque[tuple[int, int]] = collections.deque()
+        # the changes after this version are all in room_status_changes
+        # 这个版本之后的变化都在room_status_changes里
+        self.room_status_oldest_version: int = 0
+        # the /list answer and its frame, rebuilt only when the version changes
+        # /list的回答和它的帧，只在版本变化时重建
+        self.room_status_cache_version: int = -1
+        self.room_status_text: str = ""
+        self.room_status_frame: bytes = b""
+
+        with self.room_pool_lock:
+            for _ in range(self.min_game_room_number):
+                self.create_room_locked()
+
+    @property
+    def game_room_number(self) -> int:
+        """
+        The number of room ids shown by /list, unused ids among them are created when entered
+        /list显示的房间号数量，其中未使用的房间号在进入时创建
+        """
+        return len(self.room_occupancy)
+
+    @property
+    def game_room_list(self) -> list[GameRoom.GameRoom]:
+        """
+        A snapshot of the rooms in use, ordered by room id
+        使用中房间的快照，按房间号排序
+        """
+        with self.room_pool_lock:
+            return [self.game_rooms[room_id] for room_id in sorted(self.game_rooms)]
+
+    def create_room_locked(self, room_id: int | None = None) -> GameRoom.GameRoom:
+        """
+        Create a room, reuse a retired room object if there is one, call with the pool lock held
+        :param room_id: an unused room id below game_room_number, None for the smallest unused id
+        :return: the room
+        :raise RoomFullError: the maximum number of rooms is reached
+        """
+        if len(self.game_rooms) >= self.max_game_room_number:
+            raise OperationStatus.RoomFullError("All rooms are full")
+
+        if room_id is None:
+            room_id = self.smallest_free_room_id_locked()
+        self.free_room_ids.discard(room_id)
+        self.set_room_status_locked(room_id, "0")
+
+        if self.spare_rooms:
+            game_room: GameRoom.GameRoom = self.spare_rooms.pop()
+            game_room.reuse(room_id)
+        else:
+            game_room: GameRoom.GameRoom = GameRoom.GameRoom(self.game_server, room_id, self.room_size)
+        game_room.occupancy_listener = self.room_changed
 
-        if player in self.player_list:
+        self.game_rooms[room_id] = game_room
+        self.empty_room_ids.add(room_id)
+        self.free_room_index.add_room(game_room)
+        return game_room
+
+    def smallest_free_room_id_locked(self) -> int:
+        """
+        :return: the smallest unused room id, game_room_number if every shown id is used
+        """
+        while self.free_room_id_heap and self.free_room_id_heap[0] not in self.free_room_ids:
+            heapq.heappop(self.free_room_id_heap)
+        if self.free_room_id_heap:
+            return self.free_room_id_heap[0]
+        return len(self.room_occupancy)
+
+    def retire_room_locked(self, game_room: GameRoom.GameRoom) -> bool:
+        """
+        Put an empty room into the free-list, call with the pool lock held
+        :param game_room: the room
+        :return: False if somebody entered it meanwhile
+        """
+        if not game_room.retire():
             return False
+
+        room_id: int = game_room.room_id
+        game_room.occupancy_listener = None
+        self.free_room_index.remove_room(game_room)
+        del self.game_rooms[room_id]
+        self.empty_room_ids.discard(room_id)
+        self.spare_rooms.append(game_room)
+
+        self.set_room_status_locked(room_id, "0")
+        self.free_room_ids.add(room_id)
+        heapq.heappush(self.free_room_id_heap, room_id)
+        # unused ids at the end are not shown by /list any more
+        # 末尾未使用的房间号不再由/list显示
+        while self.room_occupancy and len(self.room_occupancy) - 1 in self.free_room_ids:
+            self.free_room_ids.remove(len(self.room_occupancy) - 1)
+            self.room_occupancy.pop()
+            self.room_status_version += 1
+        return True
+
+    def set_room_status_locked(self, room_id: int, player_number_text: str) -> None:
+        """
+        Update the number of players shown by /list for the room id, record the change
+        :param room_id: a room id below game_room_number, or game_room_number to show one more room
+        :param player_number_text: the number of players as text
+        :return: None
+        """
+        if room_id == len(self.room_occupancy):
+            self.room_occupancy.append(player_number_text)
+        elif self.room_occupancy[room_id] == player_number_text:
+            return
         else:
-            self.player_list.append(player)
-            return True
+            self.room_occupancy[room_id] = player_number_text
+
+        self.room_status_version += 1
+        if len(self.room_status_changes) == self.ROOM_STATUS_CHANGE_LOG_SIZE:
+            self.room_status_oldest_version = self.room_status_changes.popleft()[0]
+        self.room_status_changes.append((self.room_status_version, room_id))
+
+    def room_changed(self, game_room: GameRoom.GameRoom) -> None:
+        """
+        Called by the room after a player entered or left, or the room was cleared, outside the room lock
+        Updates /list and the free room index, creates or retires rooms
+        :param game_room: the room
+        :return: None
+        """
+        with self.room_pool_lock:
+            if self.game_rooms.get(game_room.room_id) is not game_room:
+                # retired meanwhile
+                return
+
+            self.free_room_index.room_changed(game_room)
+            player_number: int = len(game_room.player_list)
+            self.set_room_status_locked(game_room.room_id, str(player_number))
+            if player_number == 0 and not game_room.game_started:
+                self.empty_room_ids.add(game_room.room_id)
+            else:
+                self.empty_room_ids.discard(game_room.room_id)
+
+            if not self.empty_room_ids and len(self.game_rooms) < self.max_game_room_number:
+                # the last empty room is taken, open a new one
+                # 最后一个空房间被占用，开一个新房间
+                self.create_room_locked()
+                return
+
+            # one empty room is enough, retire the others, the highest ids first
+            # 一个空房间就够了，回收其他空房间，先回收房间号大的
+            while len(self.empty_room_ids) > 1 and len(self.game_rooms) > self.min_game_room_number:
+                if not self.retire_room_locked(self.game_rooms[max(self.empty_room_ids)]):
+                    break
+
+            # move the highest empty room to the smallest unused id, so /list gets shorter when players leave
+            # 把房间号最大的空房间移到最小的未使用房间号，玩家离开时/list变短
+            if self.empty_room_ids:
+                highest_empty_room_id: int = max(self.empty_room_ids)
+                if self.smallest_free_room_id_locked() < highest_empty_room_id and \
+                        self.retire_room_locked(self.game_rooms[highest_empty_room_id]):
+                    self.create_room_locked()
+
+    @property
+    def player_list(self) -> list[Player.Player]:
+        """
+        A snapshot of all players in the game hall, safe to iterate while players come and go
+        游戏大厅所有玩家的快照，遍历时玩家可以进出
+        """
+        return self.player_registry.snapshot()
+
+    def add_player(self, player: Player.Player) -> bool:
+
+        return self.player_registry.add(player)
 
     def remove_player(self, player: Player.Player) -> bool:
 
-        if player in self.player_list:
-            self.player_list.remove(player)
-            return True
-        else:
-            return False
+        return self.player_registry.remove(player)
 
     def enter_room(self, player: Player.Player, room_id: int) -> True:
         """
@@ -52,42 +278,149 @@ class GameHall:
         :param room_id: the room id
         :return:
         """
-        # room id should be in the room list, not out of range
-        # notice that the room id is start from 0, so the max room id is game_room_number - 1
-        if room_id >= self.game_room_number:
-            raise OperationStatus.InvalidOperationError("The room id is out of range")
-
         # player should in the player list
-        if player in self.player_list:
-            # find the room
+        if player not in self.player_registry:
+            raise OperationStatus.PlayerNotFoundError("The player is not in the player list")
+
+        while True:
+            with self.room_pool_lock:
+                # room id should be one of the ids shown by /list, not out of range
+                # notice that the room id is start from 0, so the max room id is game_room_number - 1
+                if room_id >= len(self.room_occupancy):
+                    raise OperationStatus.InvalidOperationError("The room id is out of range")
+
+                # find the room, an unused id gets a new room
+                # 找到房间，未使用的房间号创建新房间
+                game_room: GameRoom.GameRoom | None = self.game_rooms.get(room_id)
+                if game_room is None:
+                    game_room = self.create_room_locked(room_id)
+
             # get into the room
             # if success it will return True
-            self.game_room_list[room_id].add_player(player)
-            return True
-        else:
+            try:
+                game_room.add_player(player)
+                return True
+            except OperationStatus.RoomFullError:
+                if not game_room.retired:
+                    raise
+                # retired between the lookup and the entry, look up the id again
+                # 在查找和进入之间被回收，重新查找这个房间号
+
+    def match_room(self, player: Player.Player) -> GameRoom.GameRoom:
+        """
+        Put the player into the room where a game starts soonest,
+        the fullest room that still has a seat
+
+        把玩家放进最快开始游戏的房间，即还有空位的最满的房间
+
+        :param player: the player Object
+        :return: the room
+        :raise RoomFullError: every room is full and no more room can be created
+        """
+        if player not in self.player_registry:
             raise OperationStatus.PlayerNotFoundError("The player is not in the player list")
 
+        while True:
+            try:
+                return self.free_room_index.match(player)
+            except OperationStatus.RoomFullError:
+                # the empty room was taken just now, its new room may not be created yet
+                # 空房间刚被占用，新房间可能还没创建
+                with self.room_pool_lock:
+                    if self.empty_room_ids:
+                        continue
+                    self.create_room_locked()
+
     def list_room_and_status(self) -> str:
         """
         return a string showing the room status
         the format is
         3001 number_of_all_rooms number_of_players_in_room_1 ... number_of_players_in_room_n
         """
-        # create list
-        # [3001, number of all rooms, number of players in room 1, ... number of players in room n]
-        # head, total information
-        output_list: list[int | str] = [OperationStatus.OperationStatus.list_rooms_status,
-                                        self.game_room_number]
-        # room status list
-        room_status_list: list[int] = [len(each_room.player_list) for each_room in self.game_room_list]
+        with self.room_pool_lock:
+            self.update_room_status_cache_locked()
+            return self.room_status_text
+
+    def list_room_frame(self) -> bytes:
+        """
+        The answer of /list encoded as a frame, shared by every player until a room changes
+        编码成帧的/list回答，房间变化之前所有玩家共用
+        :return: the frame
+        """
+        with self.room_pool_lock:
+            self.update_room_status_cache_locked()
+            return self.room_status_frame
+
+    def update_room_status_cache_locked(self) -> None:
+        if self.room_status_cache_version == self.room_status_version:
+            return
 
-        # final combined list
-        output_list.extend(room_status_list)
+        # [3001, number of all rooms, number of players in room 1, ... number of players in room n]
+        # the numbers of players are kept up to date by room_changed, no room is visited here
+        # 玩家数由room_changed随时更新，这里不访问任何房间
+        room_status_list: list[str] = [OperationStatus.OperationStatus.list_rooms_status,
+                                       str(len(self.room_occupancy))]
+        room_status_list.extend(self.room_occupancy)
 
         # convert to string
-        output_str: str = " ".join([str(each) for each in output_list])
+        self.room_status_text = " ".join(room_status_list)
+        self.room_status_frame = MessageFraming.encode_frame(self.room_status_text)
+        self.room_status_cache_version = self.room_status_version
+
+    def list_room_page(self, first_room_id: int, room_number: int) -> str:
+        """
+        A page of the room status, for halls too large to list at once
+        the format is
+        3002 number_of_all_rooms first_room_id number_of_players_in_room_first ...
+
+        :param first_room_id: the first room id of the page
+        :param room_number: the number of rooms of the page at most
+        :return: the page
+        """
+        with self.room_pool_lock:
+            room_status_list: list[str] = [OperationStatus.OperationStatus.list_rooms_page,
+                                           str(len(self.room_occupancy)), str(first_room_id)]
+            room_status_list.extend(self.room_occupancy[first_room_id:first_room_id + room_number])
+        return " ".join(room_status_list)
+
+    def list_room_changes(self, since_version: int) -> str:
+        """
+        The rooms whose number of players changed after the version, a polling client keeps its own table
+        If the version is too old or unknown every room is sent, so the answer always brings the table up to date
+        the format is
+        3003 version number_of_all_rooms room_id:number_of_players ...
+        the rooms from number_of_all_rooms on are gone, rooms not in the table yet have 0 players
 
-        return output_str
+        变化后的房间，轮询的客户端自己维护房间表；版本太旧或未知时发送所有房间，所以回答总能让房间表更新到最新
+        房间号不小于number_of_all_rooms的房间已不存在，表里还没有的房间有0个玩家
+
+        :param since_version: the version of the last answer, 0 for the first time
+        :return: the changes
+        """
+        return self.room_changes_since(since_version)[1]
+
+    def room_changes_since(self, since_version: int) -> tuple[int, str]:
+        """
+        :param since_version: the version of the last answer, -1 for every room
+        :return: (the version of the answer, the answer of list_room_changes)
+        """
+        with self.room_pool_lock:
+            room_number: int = len(self.room_occupancy)
+            if self.room_status_oldest_version <= since_version <= self.room_status_version:
+                changed_room_ids: set[int] = set()
+                for version, room_id in reversed(self.room_status_changes):
+                    if version <= since_version:
+                        break
+                    if room_id < room_number:
+                        changed_room_ids.add(room_id)
+                room_ids: list[int] | range = sorted(changed_room_ids)
+            else:
+                room_ids = range(room_number)
+
+            room_status_list: list[str] = [OperationStatus.OperationStatus.list_rooms_changes,
+                                           str(self.room_status_version), str(room_number)]
+            room_status_list.extend(f"{room_id}:{self.room_occupancy[room_id]}" for room_id in room_ids)
+            return self.room_status_version, " ".join(room_status_list)
 
     # 对应心跳包
     # 按照名字找到玩家，然后把心跳包的socket赋值给玩家的socket
@@ -95,19 +428,28 @@ class GameHall:
                                                          player_name: str,
                                                          heart_beating_socket: socket.socket) -> bool:
 
-        player: Player.Player
-        for player in self.player_list:
-            if player.player_name == player_name:
-                player.player_heart_beat_socket_channel = heart_beating_socket
-                return True
+        player: Player.Player | None = self.player_registry.get_by_username(player_name)
+        if player is None:
+            return False
+
+        self.set_heart_beat_socket(player, heart_beating_socket)
+        return True
 
-        return False
+    def set_heart_beat_socket(self, player: Player.Player, heart_beating_socket: socket.socket) -> None:
+        """
+        Pair the heart beat socket with the player, the player can be found by it afterwards
+        把心跳套接字和玩家配对，之后可以按它找到玩家
+        :param player: the player
+        :param heart_beating_socket: the heart beat socket
+        :return: None
+        """
+        player.player_heart_beat_socket_channel = heart_beating_socket
+        self.player_registry.index_socket(heart_beating_socket, player)
 
     # 查看有没有对应的玩家
     def get_player_by_username(self, user_name: str) -> Player.Player | None:
-        player: Player.Player
-        for player in self.player_list:
-            if player.player_name == user_name:
-                return player
+        return self.player_registry.get_by_username(user_name)
 
-        return None
+    # 按套接字（消息或心跳）找到玩家
+    def get_player_by_socket(self, player_socket: socket.socket) -> Player.Player | None:
+        return self.player_registry.get_by_socket(player_socket)
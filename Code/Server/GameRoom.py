@@ -1,10 +1,15 @@
+from __future__ import annotations
+
 import threading
+from typing import Callable
 
 import Player
 import OperationStatus
+import MessageFraming
 import GameServer
 import random
 import re
+import time
 
 
 class GameRoom:
@@ -22,6 +27,32 @@ class GameRoom:
         # each room 2 players, just record the player name
         self.player_list: list[Player.Player] = []
 
+        # Every change of the room happens under this lock, hall threads and game threads may enter,
+        # leave or clear the room at the same time
+        # 房间的每次修改都在这个锁内进行，大厅线程和游戏线程可能同时进入、离开或清空房间
+        self.room_lock: threading.Lock = threading.Lock()
+        # the players who are waiting for the game, they will not read their sockets any more
+        # 正在等待游戏的玩家，他们不会再读自己的套接字
+        self.ready_player_list: list[Player.Player] = []
+        # a game is running in the room, nobody can enter until the room is cleared
+        # 房间里正在进行游戏，清空房间之前没有人能进入
+        self.game_started: bool = False
+        # the running game, told at once when one of its players is lost, None until the game is created
+        # and after the room is cleared; the asyncio engine keeps its AsyncGame here, both have cancel()
+        # 正在进行的游戏，有玩家断线时立刻通知它，游戏创建之前和房间清空之后为None；asyncio引擎在这里保存AsyncGame，两者都有cancel()
+        self.game: GameRoom.Game | None = None
+        # taken out of the game hall, kept in the free-list of the hall for reuse
+        # 已从游戏大厅移除，保存在大厅的空闲列表里等待复用
+        self.retired: bool = False
+
+        # called after every change of the players, outside the room lock, e.g. the free room index of the hall
+        # 每次玩家变化后在房间锁外调用，例如大厅的空闲房间索引
+        self.occupancy_listener: Callable[[GameRoom], None] | None = None
+
+    def notify_occupancy_changed(self) -> None:
+        if self.occupancy_listener is not None:
+            self.occupancy_listener(self)
+
     def check_full(self) -> bool:
         """
         Check whether the room is full
@@ -43,13 +74,43 @@ class GameRoom:
         :param player: the player
         :return: None
         """
-        if self.check_full():
-            # the room is full
-            raise OperationStatus.RoomFullError("The room is full")
-        else:
-            self.player_list.append(player)
-            player.game_room = self
-            return True
+        with self.room_lock:
+            if self.check_full() or self.game_started or self.retired:
+                # the room is full, or a game is running and someone left it, or the room is retired
+                # 房间已满，或者游戏正在进行而有人离开了，或者房间已被回收
+                raise OperationStatus.RoomFullError("The room is full")
+            elif player in self.player_list:
+                raise OperationStatus.InvalidOperationError("The player is already in the room")
+            else:
+                self.player_list.append(player)
+                player.game_room = self
+
+        self.notify_occupancy_changed()
+        return True
+
+    def player_ready(self, player: Player.Player) -> bool:
+        """
+        The player has entered and is waiting for the game, atomically decide whether the game starts now
+        The game starts when the room is full and every player in it is waiting,
+        exactly one caller gets True and must start the game
+
+        玩家已进入房间并等待游戏，原子地决定游戏是否现在开始
+        房间满且所有玩家都在等待时游戏开始，只有一个调用者得到True并负责开始游戏
+
+        :param player: the player, already added by add_player
+        :return: whether the caller should start the game
+        """
+        with self.room_lock:
+            if player not in self.player_list:
+                # removed meanwhile, e.g. the heart beat is lost
+                return False
+            if player not in self.ready_player_list:
+                self.ready_player_list.append(player)
+
+            if not self.game_started and self.check_full() and len(self.ready_player_list) == len(self.player_list):
+                self.game_started = True
+                return True
+            return False
 
     def remove_player(self, player: Player.Player) -> bool:
         """
@@ -57,18 +118,54 @@ class GameRoom:
         :param player: the player
         :return: None
         """
-        if player in self.player_list:
-            self.player_list.remove(player)
+        with self.room_lock:
+            if player in self.ready_player_list:
+                self.ready_player_list.remove(player)
+            if player in self.player_list:
+                self.player_list.remove(player)
+            else:
+                return False
+
+        self.notify_occupancy_changed()
+        return True
+
+    def clear_room(self) -> list[Player.Player]:
+        """
+        Clear the room, the room can be entered again
+        :return: the players who were in the room
+        """
+        with self.room_lock:
+            player_list: list[Player.Player] = self.player_list.copy()
+            self.player_list.clear()
+            self.ready_player_list.clear()
+            self.game_started = False
+            self.game = None
+
+        self.notify_occupancy_changed()
+        return player_list
+
+    def retire(self) -> bool:
+        """
+        Take the room out of use if it is empty, nobody can enter it afterwards
+        如果房间是空的就停止使用，之后没有人能进入
+        :return: whether the room is retired
+        """
+        with self.room_lock:
+            if self.player_list or self.game_started:
+                return False
+            self.retired = True
             return True
-        else:
-            return False
 
-    def clear_room(self):
+    def reuse(self, room_id: int) -> None:
         """
-        Clear the room
+        Put a retired room back into use under a new room id
+        以新的房间号重新使用已回收的房间
+        :param room_id: the new room id
         :return: None
         """
-        self.player_list.clear()
+        with self.room_lock:
+            self.room_id = room_id
+            self.retired = False
 
     def whether_full(self) -> bool:
         """
@@ -80,148 +177,182 @@ class GameRoom:
         else:
             return False
 
-    class Game(threading.Thread):
+    class Game:
+        """
+        One game of the room as a state machine, the steps run on the workers of GameRunner.GameRunner
+        A step never waits for a player, the runner collects the messages and queues the next step
+
+        房间里的一局游戏，作为状态机，步骤在GameRunner的工作线程上运行
+        步骤从不等待玩家，由运行器收集消息并把下一步排队
+
+        game states/游戏状态
+        0. Started, the game started message is not sent yet
+        1. Collecting guesses
+        2. Resolving, the result is sent
+        3. Collecting acknowledgements, v1 players acknowledge the result, or the opponent quit message
+        4. Done, the room is cleared
+        """
+        STARTED: int = 0
+        COLLECTING_GUESSES: int = 1
+        RESOLVING: int = 2
+        COLLECTING_ACKNOWLEDGEMENTS: int = 3
+        DONE: int = 4
+
+        # the results are the same for every game, their frames are encoded once and shared by all players
+        # 每局游戏的结果都一样，它们的帧只编码一次，所有玩家共用
+        RESULT_FRAMES: dict[str, bytes] = {
+            result: MessageFraming.encode_frame(result)
+            for result in (OperationStatus.OperationStatus.win_the_game, OperationStatus.OperationStatus.lose_the_game,
+                           OperationStatus.OperationStatus.result_is_tie)}
 
         def __init__(self, game_server: GameServer.GameServer, room):
-            super().__init__()
             self.game_server: GameServer.GameServer = game_server
             self.room: GameRoom = room
             self.player_list = self.room.player_list
+            self.state: int = GameRoom.Game.STARTED
+
+            # the players whose message is awaited in the collecting state, and the messages arrived so far,
+            # taken by the runner thread, read by the next step
+            # 收集状态下等待消息的玩家，以及已经到达的消息，由运行器线程取出，下一步读取
+            self.waiting_players: list[Player.Player] = []
+            self.player_messages: dict[Player.Player, str] = {}
+            # the deadline of the collecting state, time.monotonic()
+            # 收集状态的截止时间
+            self.deadline: float = 0
+            # some player is lost, set by the runner thread
+            # 有玩家断线，由运行器线程设置
+            self.whether_error: bool = False
+            # the players whose socket the runner reads, only used by the runner thread
+            # 运行器读取套接字的玩家，只由运行器线程使用
+            self.registered_players: list[Player.Player] = []
+            self.room.game = self
+
+        def cancel(self) -> None:
+            """
+            A player of the game is lost, e.g. by the heart beat, any thread.
+            The runner wakes the game up at once, it tells the other players they won and frees the room
+            游戏的一个玩家断线，例如心跳丢失，任何线程都可以调用。运行器立刻唤醒游戏，游戏告诉其他玩家他们赢了并释放房间
+            :return: None
+            """
+            self.game_server.game_runner.cancel_game(self)
 
-        def run(self):
-            self.start_game()
-
-        def send_message_to_all(self, message: str):
+        def advance(self) -> None:
+            """
+            Run the next step of the game, on a worker of the game runner
+            在游戏运行器的工作线程上运行游戏的下一步
+            :return: None
+            """
+            if self.state == GameRoom.Game.STARTED:
+                self.start_game()
+            elif self.state == GameRoom.Game.COLLECTING_GUESSES:
+                self.resolve_game()
+            elif self.state == GameRoom.Game.COLLECTING_ACKNOWLEDGEMENTS:
+                self.finish_game()
+
+        def send_message_to_all(self, message: str) -> bool:
+            """
+            Send the message to every player, it is encoded once for the whole room
+            :param message: the message
+            :return: True if some player is disconnected
+            """
+            frame: bytes = MessageFraming.encode_frame(message)
             whether_error: bool = False
-            for player in self.player_list:
-                whether_error: bool = self.send_message_to_player_safe(player, message)
-
-            # if any error, means some player is disconnected
-            # send msg to other player, you win
-            # clear the room
-            if whether_error:
-                temp_list = self.player_list.copy()
-
-                for player in temp_list:
-                    self.send_message_to_player_safe(player,
-                                                     OperationStatus.OperationStatus.win_the_game_since_opponent_quit)
-
-                    # receive the message from the player, the player receive the message
-                    # 接收玩家的消息，玩家接收消息
-                    player.player_socket.recv(1024).decode()
-
-                # set all player's status to hall
-                # 设置所有玩家的状态为大厅
-                for player in self.player_list:
-                    # finish pause the thread of Hall
-                    # 完成暂停大厅的线程
-                    print(player.player_name, "resume")
-                    player.player_thread.resume_thread_to_game()
-
-                    player.status = Player.Player.IN_THE_GAME_HALL
-
-                # 一定要先释放玩家线程锁，再清空房间，否则玩家列表为空，无法释放锁
-                # must release the player thread lock first, then clear the room
-                # otherwise the player list is empty, can not release the lock
-                # finally, clear the room
-                # 最后，清空房间
-                self.room.clear_room()
-
-                raise OperationStatus.PlayerNotFoundError("Some player is disconnected")
-            # if no error, means all player is connected, CONTINUE
-            else:
-                return True
+            for player in self.player_list.copy():
+                if self.send_frame_to_player_safe(player, frame):
+                    whether_error = True
+            return whether_error
 
-        def receive_message_from_all(self, received_messages: list[str]) -> bool:
-            whether_error: bool = False
-            # STEP NORMAL_RECEIVE1.2.0.1
+        def collect_messages(self, acknowledgement: bool = False) -> None:
+            """
+            Let the runner wait for one message from every player, in any order, at most guess_timeout seconds
+            A player with late messages of the game acknowledges after them, it is dropped in the game hall too
+            让运行器等待每个玩家的一条消息，顺序任意，最多guess_timeout秒
+            有迟到消息的玩家在迟到消息之后才确认，确认也在游戏大厅里丢弃
+            :param acknowledgement: the messages are acknowledgements, v2 players are skipped
+            :return: None
+            """
+            self.waiting_players = []
+            self.player_messages = {}
             for player in self.player_list:
-                try:
-                    received_message: str = player.player_socket.recv(1024).decode()
-                except Exception as e:
-                    whether_error: bool = True
-                    self.game_server.print_message("Receive message Error:", player, e)
-                    break
-                else:
-                    # add to the list
-                    received_messages.append(received_message)
-
-            # 同时如果玩家数量小于指定数量，意味着有玩家退出了游戏，心跳线程已经自动清除了玩家
-            # 这个时候也是错误。因为玩家退出游戏，游戏应该结束。
-            if len(self.player_list) < self.room.MAX_PLAYER_NUMBER:
-                whether_error: bool = True
-
-            # if any error, means some player is disconnected
-            # send msg to other player, you win
-            # clear the room
-            # Error.receive.1
-            if whether_error:
-                print(self.player_list)
-                temp_list = self.player_list.copy()
-                for player in temp_list:
-                    print(player.player_name)
-                    self.send_message_to_player_safe(player,
-                                                     OperationStatus.OperationStatus.win_the_game_since_opponent_quit)
-                    print("finish sending win the game message", player.player_name)
-
-
-                # receive the message from the player, the player receive the message
-                # 接收玩家的消息，其他玩家确认有人离开了
-                for player in self.player_list:
-                    # Error.quit.1
-                    msg: str = player.player_socket.recv(1024).decode()
-                    print("finish receiving message", player.player_name, msg)
-
-
-                # set all player's status to hall
-                # 设置所有玩家的状态为大厅
-                for player in self.player_list:
-                    # finish pause the thread of Hall
-                    # 完成暂停大厅的线程
-                    print(player.player_name, "resume")
-                    player.player_thread.resume_thread_to_game()
-
-                    player.status = Player.Player.IN_THE_GAME_HALL
-
-                # clear the room
-                # since the game is over
-                self.room.clear_room()
-
-                raise OperationStatus.PlayerNotFoundError("Some player is disconnected")
-            # if no error, means all player is connected, CONTINUE
-            else:
-                return True
+                if acknowledgement and player.protocol_version != OperationStatus.PROTOCOL_VERSION_1:
+                    continue
+                if acknowledgement and player.late_message_number > 0:
+                    # the acknowledgement comes after the late messages
+                    # 确认在迟到的消息之后到达
+                    player.late_message_number += 1
+                    continue
+                self.waiting_players.append(player)
+
+            if not self.waiting_players:
+                # nothing to wait for
+                # 没有需要等待的消息
+                self.advance()
+                return
+            self.game_server.game_runner.collect_messages(self, time.monotonic() + self.game_server.guess_timeout)
+
+        def take_pending_messages(self) -> None:
+            """
+            Take the messages the runner has read for the waiting players, runner thread
+            取出运行器为等待中的玩家读到的消息，在运行器线程调用
+            """
+            for player in self.waiting_players:
+                if player not in self.player_messages and player.player_channel.pending_messages:
+                    self.player_messages[player] = player.player_channel.pending_messages.popleft()
+
+        def collection_finished(self) -> bool:
+            """
+            :return: whether every waiting player answered, or some player is lost, runner thread
+            """
+            # 如果玩家数量小于指定数量，意味着有玩家退出了游戏，心跳线程已经自动清除了玩家
+            # less players than required means someone quit, the heart beat already removed the player
+            return self.whether_error or len(self.player_list) < self.room.MAX_PLAYER_NUMBER or \
+                len(self.player_messages) == len(self.waiting_players)
+
+        def mark_late_players(self) -> None:
+            """
+            The waiting players who did not answer send their message later, it is dropped in the game hall
+            没有回答的等待玩家稍后才发送消息，在游戏大厅里丢弃
+            """
+            for player in self.waiting_players:
+                if player not in self.player_messages:
+                    player.late_message_number += 1
 
-        # a decorator to check send msg to all player in the room
-        # any error will be raised
-        # the player will be removed from the room
-        # other player will receive a message of win
         def send_message_to_player_safe(self, player: Player.Player, message: str) -> bool:
 
             """
-            Try send the message to a single player, and receive the response
-            If failed, remove the player from the room, AND return False
-            If success, return True
+            Try send the message to a single player
+            If failed, remove the player from the room, AND return True
+            If success, return False
             :param player:
             :param message:
             :return:
             """
+            return self.send_frame_to_player_safe(player, MessageFraming.encode_frame(message))
 
+        def send_frame_to_player_safe(self, player: Player.Player, frame: bytes) -> bool:
+            """
+            The same as send_message_to_player_safe, the frame is encoded beforehand and may be shared by the players
+            :param player:
+            :param frame: returned by MessageFraming.encode_frame
+            :return: True if failed
+            """
             try:
                 # send the message 0
                 # get the player's socket
-                player.player_socket.send(message.encode())
+                player.player_channel.send_frame(frame)
 
             except ConnectionError as e:
                 self.game_server.print_message("Connection Error:", player.player_name, repr(e))
 
-                self.room.remove_player(player)
+                # out of the room and the game hall, nobody else would release the player
+                # 离开房间和游戏大厅，没有其他人会释放这个玩家
+                self.game_server.disconnect_player(player)
                 return True
 
             except Exception as e:
                 self.game_server.print_message("Unknown Error:", player.player_name, repr(e))
 
-                self.room.remove_player(player)
+                self.game_server.disconnect_player(player)
                 return True
 
             else:
@@ -235,95 +366,129 @@ class GameRoom:
             """
             return bool(random.getrandbits(1))
 
-        def start_game(self):
-            # try:
+        @staticmethod
+        def resolve_results(player_guesses: list[str | None], random_bool: bool) -> dict[str | None, str]:
+            """
+            The result of every guess of a game, for rooms of any size, all guesses are read in one pass
+            A player who did not guess (None) forfeits and the players who guessed win,
+            if everybody guessed the same it is a tie,
+            otherwise the players who guessed the random bool win and the others lose.
+
+            一局游戏每种猜测的结果，适用于任意人数的房间，只遍历一次所有猜测
+            没有猜测（None）的玩家判负，猜测了的玩家获胜；所有人猜测相同则平局；否则猜中随机布尔值的玩家获胜，其他玩家输
+            :param player_guesses: the guesses of the players, e.g. "True", "False", None
+            :param random_bool: the random bool of the game
+            :return: guess -> result message, the players with the same guess get the same result
+            """
+            guesses: set[str | None] = set(player_guesses)
+
+            if None in guesses:
+                return {guess: OperationStatus.OperationStatus.lose_the_game if guess is None
+                        else OperationStatus.OperationStatus.win_the_game for guess in guesses}
+
+            # if equal, the result is tie
+            # 如果相等，结果是平局
+            if len(guesses) == 1:
+                return {guess: OperationStatus.OperationStatus.result_is_tie for guess in guesses}
+
+            # the ones who guess the same as the random bool are the winners
+            # 猜测和随机布尔值相同的是赢家
+            random_guess: str = str(random_bool)
+            return {guess: OperationStatus.OperationStatus.win_the_game if guess == random_guess
+                    else OperationStatus.OperationStatus.lose_the_game for guess in guesses}
+
+        def start_game(self) -> None:
             # STEP 1.2.0.0
             self.game_server.print_message("Sending game started message......")
-            try:
-                self.send_message_to_all(OperationStatus.OperationStatus.game_started)
-                print("STEP 1.2.0.0")
-            except Exception as e:
-                self.game_server.print_message(e)
+            if self.send_message_to_all(OperationStatus.OperationStatus.game_started):
                 print("STEP 1.2.0.0, ERROR")
+                self.opponent_quit()
                 return
 
-            # generate a random boolean
-            # 生成一个随机布尔值
-            random_bool: bool = self.generate_random_bool()
-
-            # temp variable to store the player's guess
-            # 临时变量存储玩家的猜测
-            player_guess_str: list[str] = []
-
             # STEP 1.2.0.1
             # receive the message from the player, the player's guess
             # 接收玩家的消息，猜测
             # 过滤非法命令在用户端进行
             # filter the illegal command is at the client side
-            try:
-                self.receive_message_from_all(player_guess_str)
-                print("STEP 1.2.0.1")
-            except Exception as e:
-                self.game_server.print_message(e)
+            self.state = GameRoom.Game.COLLECTING_GUESSES
+            self.collect_messages()
+
+        def resolve_game(self) -> None:
+            self.state = GameRoom.Game.RESOLVING
+            self.mark_late_players()
+
+            # Error.receive.1
+            if self.whether_error or len(self.player_list) < self.room.MAX_PLAYER_NUMBER:
                 print("STEP 1.2.0.1, ERROR")
+                self.opponent_quit()
                 return
 
-
+            # the guesses in the order of the players, None for a player who did not guess in time
+            # 按玩家顺序的猜测，没有按时猜测的玩家为None
+            player_guess_str: list[str | None] = [self.player_messages.get(player) for player in self.waiting_players]
             self.game_server.print_message(player_guess_str)
 
-            # STEP 1.2.1.0 RESULT
-            # if equal, the result is tie
-            # 如果相等，结果是平局
-            if player_guess_str[0] == player_guess_str[1]:
-                try:
-                    self.send_message_to_all(OperationStatus.OperationStatus.result_is_tie)
-                except Exception as e:
-                    # 自带处理异常
-                    self.game_server.print_message(e)
-                    return
-
-            # if not equal, the result is not tie
-            # 如果不相等，结果不是平局
-            else:
-                # the one who guess the same as the random bool is the winner
-                # 猜测和随机布尔值相同的是赢家
-                if player_guess_str[0] == str(random_bool):
-                    winner: Player.Player = self.player_list[0]
-                    loser: Player.Player = self.player_list[1]
-                else:
-                    winner: Player.Player = self.player_list[1]
-                    loser: Player.Player = self.player_list[0]
-
-                # send the message to the winner and loser
-                # 发送消息给赢家和输家
-                self.send_message_to_player_safe(winner, OperationStatus.OperationStatus.win_the_game)
-                self.send_message_to_player_safe(loser, OperationStatus.OperationStatus.lose_the_game)
-
-            # STEP 1.2.2.0 (NEED FIX)
-            receive_result: list[str] = []
-            try:
-                self.receive_message_from_all(player_guess_str)
-            except Exception as e:
-                self.game_server.print_message(e)
+            if self.game_server.batch_resolver is not None:
+                # resolved together with the other ready games at the next tick
+                # 在下一个周期与其他就绪的游戏一起判定
+                self.game_server.batch_resolver.add(self, player_guess_str)
                 return
 
-            print(receive_result)
+            # generate a random boolean
+            # 生成一个随机布尔值
+            random_bool: bool = self.generate_random_bool()
+            self.send_results(player_guess_str, self.resolve_results(player_guess_str, random_bool))
 
-            # set all player's status to hall
-            # 设置所有玩家的状态为大厅
-            for player in self.player_list:
-                # finish pause the thread of Hall
-                # 完成暂停大厅的线程
+        def send_results(self, player_guess_str: list[str | None], results: dict[str | None, str]) -> None:
+            """
+            Send the results, then collect the acknowledgements
+            发送结果，然后收集确认
+            :param player_guess_str: the guesses in the order of waiting_players
+            :param results: guess -> result message, returned by resolve_results
+            :return: None
+            """
+            # STEP 1.2.1.0 RESULT
+            # at most 3 different results, their frames are encoded beforehand
+            # 最多3种不同的结果，它们的帧预先编码好
+            for player, guess in zip(self.waiting_players, player_guess_str):
+                if player.protocol_version != OperationStatus.PROTOCOL_VERSION_1:
+                    # nothing is answered before the next hall prompt, the resumed session sends both together
+                    # 下一个大厅提示之前没有回答，恢复的会话把两者一起发送
+                    player.player_channel.hold_frames()
+                self.send_frame_to_player_safe(player, self.RESULT_FRAMES[results[guess]])
+
+            # STEP 1.2.2.0
+            # v1 players acknowledge the result, v2 players do not
+            # v1玩家确认结果，v2玩家不需要
+            self.state = GameRoom.Game.COLLECTING_ACKNOWLEDGEMENTS
+            self.collect_messages(acknowledgement=True)
+
+        def opponent_quit(self) -> None:
+            """
+            Some player is disconnected, tell the other players they won, then wait for their acknowledgements
+            有玩家断线，告诉其他玩家他们赢了，然后等待他们的确认
+            """
+            for player in self.player_list.copy():
+                if player.protocol_version != OperationStatus.PROTOCOL_VERSION_1:
+                    player.player_channel.hold_frames()
+                self.send_message_to_player_safe(player,
+                                                 OperationStatus.OperationStatus.win_the_game_since_opponent_quit)
+
+            # Error.quit.1
+            self.state = GameRoom.Game.COLLECTING_ACKNOWLEDGEMENTS
+            self.collect_messages(acknowledgement=True)
+
+        def finish_game(self) -> None:
+            self.mark_late_players()
+            self.state = GameRoom.Game.DONE
+            self.game_server.game_runner.end_game(self)
+
+            # clear the room first, a resumed player may enter the same room again at once
+            # then resume the players who were in it
+            # 先清空房间，被恢复的玩家可能立刻再次进入同一个房间，然后恢复原来在房间里的玩家
+            for player in self.room.clear_room():
+                player.player_status = Player.Player.IN_THE_GAME_HALL
+
+                # continue the session of the player in the Hall
+                # 在大厅里继续玩家的会话
                 player.player_thread.resume_thread_to_game()
-
-                player.status = Player.Player.IN_THE_GAME_HALL
-
-            # 一定要先释放玩家线程锁，再清空房间，否则玩家列表为空，无法释放锁
-            # must release the player thread lock first, then clear the room
-            # otherwise the player list is empty, can not release the lock
-            # finally, clear the room
-            # 最后，清空房间
-            self.room.clear_room()
-
-            # except Exception as e:
-            #    self.game_server.print_message(e)
@@ -0,0 +1,353 @@
+from __future__ import annotations
+
+import heapq
+import itertools
+import queue
+import selectors
+import socket
+import threading
+import time
+from typing import Callable
+
+import GameRoom
+import Player
+
+
+class GameRunner(threading.Thread):
+    """
+    Runs the games of the thread engine as state machines, instead of one new thread per game
+
+    The steps of the games (send the start, resolve the guesses, finish) run on a bounded pool of worker threads.
+    A game waiting for its players holds no worker: this thread reads the sockets of the players of every
+    running game with one selector, heart beats included, and keeps the deadlines in a heap ordered by time.
+    When every awaited message has arrived, a player is lost or the deadline is due,
+    the next step of the game is queued for the workers.
+    The players waiting in the rooms for an opponent are watched the same way, so their sessions hold no thread:
+    a closed socket or in-band heart beats silent for heart_beat_timeout seconds make the player lost.
+
+    以状态机运行多线程引擎的游戏，而不是每局游戏新建一个线程
+    游戏的步骤（发送开始、判定猜测、结束）在有上限的工作线程池里运行。
+    等待玩家的游戏不占用工作线程：这个线程用一个选择器读取所有进行中游戏的玩家的套接字（包括心跳），
+    截止时间按时间顺序保存在堆里。所有等待的消息到达、有玩家断线或截止时间到了，就把游戏的下一步交给工作线程
+    在房间里等待对手的玩家也以同样方式监视，所以他们的会话不占用线程：
+    套接字关闭或带内心跳超过heart_beat_timeout秒没有到达，玩家即断线
+    """
+
+    def __init__(self, worker_number: int, check_interval: float, heart_beat_timeout: float,
+                 player_lost: Callable[[Player.Player], None]) -> None:
+        """
+        :param worker_number: the number of worker threads running the steps of the games
+        :param check_interval: how often the collecting games check whether a player was removed from the room,
+         and the in-band heart beats are checked
+        :param heart_beat_timeout: a player with in-band heart beats is lost if nothing arrives for this many seconds
+        :param player_lost: called on this thread with a lost player, e.g. GameServer.disconnect_player
+        """
+        super().__init__(name="GameRunner", daemon=True)
+        if worker_number < 1:
+            raise ValueError(f"The number of game workers should be at least 1, not {worker_number}")
+        self.worker_number: int = worker_number
+        self.check_interval: float = check_interval
+        self.heart_beat_timeout: float = heart_beat_timeout
+        self.player_lost: Callable[[Player.Player], None] = player_lost
+
+        # the steps waiting for a worker
+        # 等待工作线程的步骤
+        self.step_queue: queue.SimpleQueue[Callable[[], None]] = queue.SimpleQueue()
+        self.workers: list[threading.Thread] = [
+            threading.Thread(target=self.run_worker, name=f"GameWorker-{i}", daemon=True)
+            for i in range(worker_number)]
+
+        self.selector: selectors.BaseSelector = selectors.DefaultSelector()
+        # the games collecting messages
+        # 正在收集消息的游戏
+        self.collecting_games: set[GameRoom.GameRoom.Game] = set()
+        # (deadline, sequence, game), an entry is skipped if the game is no longer collecting with this deadline
+        # （截止时间，序号，游戏），如果游戏不再以这个截止时间收集消息，条目被跳过
+        self.deadline_heap: list[tuple[float, int, GameRoom.GameRoom.Game]] = []
+        self.sequence: itertools.count = itertools.count()
+        self.next_check_time: float = time.monotonic()
+
+        # work handed over by other threads, done by this thread, the selector is only touched here
+        # 其他线程交来的工作，由这个线程完成，选择器只在这里使用
+        self.reactor_calls: list[Callable[[], None]] = []
+        self.reactor_calls_lock: threading.Lock = threading.Lock()
+
+        # writing to wakeup_sender interrupts select
+        # 向wakeup_sender写数据可以打断select
+        self.wakeup_receiver, self.wakeup_sender = socket.socketpair()
+        self.wakeup_receiver.setblocking(False)
+        self.wakeup_sender.setblocking(False)
+        self.selector.register(self.wakeup_receiver, selectors.EVENT_READ, None)
+
+    def start(self) -> None:
+        super().start()
+        for worker in self.workers:
+            worker.start()
+
+    # —————————————————————————— called by any thread —————————————————————————— #
+
+    def watch_waiting_player(self, player: Player.Player) -> None:
+        """
+        Read the socket of a player waiting in a room, until its game starts or it is lost
+        读取在房间里等待的玩家的套接字，直到它的游戏开始或者断线
+        :param player: the player, no other thread reads its socket from now on
+        :return: None
+        """
+        self.call_in_reactor(lambda: self.register_player(None, player))
+
+    def forget_player(self, player: Player.Player) -> None:
+        """
+        Stop reading the socket of a disconnected player
+        停止读取已断开玩家的套接字
+        """
+        self.call_in_reactor(lambda: self.drop_player(player))
+
+    def start_game(self, game: GameRoom.GameRoom.Game) -> None:
+        """
+        Read the sockets of the players of the game from now on, and queue its first step
+        从现在开始读取游戏玩家的套接字，并把第一步排队
+        :param game: the game, in the started state
+        :return: None
+        """
+        players: list[Player.Player] = game.player_list.copy()
+        self.call_in_reactor(lambda: self.register_players(game, players))
+        self.submit(game.advance)
+
+    def collect_messages(self, game: GameRoom.GameRoom.Game, deadline: float) -> None:
+        """
+        Wait for the messages of game.waiting_players, then queue game.advance
+        等待game.waiting_players的消息，然后把game.advance排队
+        :param game: the game
+        :param deadline: time.monotonic() after which the silent players are given up
+        :return: None
+        """
+        self.call_in_reactor(lambda: self.start_collecting(game, deadline))
+
+    def end_game(self, game: GameRoom.GameRoom.Game) -> None:
+        """
+        Stop reading the sockets of the players of the game
+        停止读取游戏玩家的套接字
+        """
+        self.call_in_reactor(lambda: self.unregister_players(game))
+
+    def cancel_game(self, game: GameRoom.GameRoom.Game) -> None:
+        """
+        A player of the game is lost, stop waiting for the messages of the game and queue its next step at once,
+        the next collection of the game ends at once too
+        游戏的一个玩家断线，停止等待游戏的消息并立刻把下一步排队，游戏的下一次收集也会立刻结束
+        :param game: the game
+        :return: None
+        """
+        self.call_in_reactor(lambda: self.lose_game(game))
+
+    def submit(self, step: Callable[[], None]) -> None:
+        self.step_queue.put(step)
+
+    def call_in_reactor(self, reactor_call: Callable[[], None]) -> None:
+        with self.reactor_calls_lock:
+            self.reactor_calls.append(reactor_call)
+        self.wake_up()
+
+    def wake_up(self) -> None:
+        try:
+            self.wakeup_sender.send(b"\0")
+        except BlockingIOError:
+            # already woken up
+            pass
+
+    # —————————————————————————— worker threads —————————————————————————— #
+
+    def run_worker(self) -> None:
+        while True:
+            step: Callable[[], None] = self.step_queue.get()
+            try:
+                step()
+            except Exception as e:
+                print("Game Step Error", repr(e))
+
+    # —————————————————————————— the runner thread —————————————————————————— #
+
+    def run(self) -> None:
+        while True:
+            self.run_reactor_calls()
+
+            # sleep until the earliest deadline or the next check, or until a socket is ready
+            # 睡到最早的截止时间或下一次检查，或者有套接字就绪
+            timeout: float | None = None
+            # more than the wakeup socket registered, some players are watched
+            # 注册的不只是唤醒套接字，有玩家正被监视
+            if self.collecting_games or len(self.selector.get_map()) > 1:
+                timeout = max(0.0, self.next_check_time - time.monotonic())
+            if self.deadline_heap:
+                deadline_timeout: float = max(0.0, self.deadline_heap[0][0] - time.monotonic())
+                timeout = deadline_timeout if timeout is None else min(timeout, deadline_timeout)
+
+            for key, _ in self.selector.select(timeout):
+                if key.data is None:
+                    self.drain_wakeup()
+                    continue
+                game, player = key.data
+                self.receive_from_player(game, player)
+
+            now: float = time.monotonic()
+            if now >= self.next_check_time:
+                self.next_check_time = now + self.check_interval
+                self.check_collecting_games()
+                self.check_heart_beats(now)
+            self.expire_deadlines(now)
+
+    def run_reactor_calls(self) -> None:
+        with self.reactor_calls_lock:
+            reactor_calls, self.reactor_calls = self.reactor_calls, []
+        for reactor_call in reactor_calls:
+            reactor_call()
+
+    def drain_wakeup(self) -> None:
+        try:
+            while self.wakeup_receiver.recv(4096):
+                pass
+        except BlockingIOError:
+            pass
+
+    def register_players(self, game: GameRoom.GameRoom.Game, players: list[Player.Player]) -> None:
+        for player in players:
+            if not self.register_player(game, player):
+                game.whether_error = True
+                continue
+            game.registered_players.append(player)
+
+    def register_player(self, game: GameRoom.GameRoom.Game | None, player: Player.Player) -> bool:
+        """
+        :param game: the game of the player, None while the player waits in the room
+        :param player: the player
+        :return: False if the socket is closed already
+        """
+        player_socket: socket.socket = player.player_channel.socket
+        try:
+            try:
+                key: selectors.SelectorKey = self.selector.get_key(player_socket)
+            except KeyError:
+                self.selector.register(player_socket, selectors.EVENT_READ, (game, player))
+            else:
+                if key.fileobj is player_socket:
+                    # watched while waiting in the room, the game takes over
+                    # 在房间里等待时已被监视，由游戏接管
+                    self.selector.modify(player_socket, selectors.EVENT_READ, (game, player))
+                else:
+                    # the descriptor of a closed socket is reused, drop the stale registration
+                    # 已关闭套接字的描述符被复用，删除过期的注册
+                    self.selector.unregister(key.fileobj)
+                    self.selector.register(player_socket, selectors.EVENT_READ, (game, player))
+        except (ValueError, OSError):
+            # closed before it was registered
+            # 注册之前已经关闭
+            return False
+        return True
+
+    def unregister_players(self, game: GameRoom.GameRoom.Game) -> None:
+        self.collecting_games.discard(game)
+        for player in game.registered_players:
+            self.unregister_player(game, player)
+        game.registered_players = []
+
+    def unregister_player(self, game: GameRoom.GameRoom.Game, player: Player.Player) -> None:
+        try:
+            key: selectors.SelectorKey = self.selector.get_key(player.player_channel.socket)
+            if key.data == (game, player):
+                self.selector.unregister(key.fileobj)
+        except (KeyError, ValueError):
+            # closed, the descriptor is gone already
+            pass
+
+    def drop_player(self, player: Player.Player) -> None:
+        try:
+            key: selectors.SelectorKey = self.selector.get_key(player.player_channel.socket)
+            if key.data is not None and key.data[1] is player:
+                self.selector.unregister(key.fileobj)
+        except (KeyError, ValueError):
+            pass
+
+    def start_collecting(self, game: GameRoom.GameRoom.Game, deadline: float) -> None:
+        self.collecting_games.add(game)
+        game.deadline = deadline
+        heapq.heappush(self.deadline_heap, (deadline, next(self.sequence), game))
+        # the messages may have arrived already
+        # 消息可能已经到达
+        self.check_game(game)
+
+    def receive_from_player(self, game: GameRoom.GameRoom.Game | None, player: Player.Player) -> None:
+        """
+        Read whatever the player sent, the heart beats are seen, the messages wait for the game
+        读取玩家发来的所有数据，心跳被看到，消息留给游戏
+        """
+        try:
+            player.player_channel.poll_heart_beats()
+        except Exception as e:
+            # the connection is lost, the socket is readable for ever, stop watching it
+            # 连接已断开，套接字会一直可读，停止监视
+            print("Game Receive Error", player.player_name, repr(e))
+            self.lose_player(game, player)
+            return
+        if game in self.collecting_games:
+            self.check_game(game)
+
+    def check_game(self, game: GameRoom.GameRoom.Game) -> None:
+        game.take_pending_messages()
+        if game.collection_finished():
+            self.finish_collecting(game)
+
+    def check_collecting_games(self) -> None:
+        """
+        A player lost by the heart beat cancels its game at once (GameRoom.Game.cancel), its socket may be closed
+        without any event; this check only catches a player removed from the room in some other way
+        心跳丢失的玩家立刻取消它的游戏（GameRoom.Game.cancel），它的套接字可能在没有任何事件的情况下被关闭；
+        这个检查只处理以其他方式被移出房间的玩家
+        """
+        for game in list(self.collecting_games):
+            self.check_game(game)
+
+    def check_heart_beats(self, now: float) -> None:
+        """
+        Nobody else reads the sockets of the watched players, so nobody else sees their in-band heart beats stop
+        没有其他线程读取被监视玩家的套接字，所以也没有其他线程能发现他们的带内心跳停止
+        """
+        for key in list(self.selector.get_map().values()):
+            if key.data is None:
+                continue
+            game, player = key.data
+            if player.player_thread.heart_beat_in_band and \
+                    now - player.player_channel.last_receive_time > self.heart_beat_timeout:
+                print("Heart Beat Lost", player.player_name)
+                self.lose_player(game, player)
+
+    def lose_player(self, game: GameRoom.GameRoom.Game | None, player: Player.Player) -> None:
+        self.drop_player(player)
+        if game is not None:
+            game.whether_error = True
+        # removes the player from the room and cancels the game
+        # 把玩家移出房间并取消游戏
+        self.player_lost(player)
+        if game in self.collecting_games:
+            self.check_game(game)
+
+    def lose_game(self, game: GameRoom.GameRoom.Game) -> None:
+        game.whether_error = True
+        if game in self.collecting_games:
+            self.check_game(game)
+
+    def expire_deadlines(self, now: float) -> None:
+        while self.deadline_heap and self.deadline_heap[0][0] <= now:
+            deadline, _, game = heapq.heappop(self.deadline_heap)
+            if game in self.collecting_games and game.deadline == deadline:
+                self.finish_collecting(game)
+
+    def finish_collecting(self, game: GameRoom.GameRoom.Game) -> None:
+        self.collecting_games.discard(game)
+        self.submit(game.advance)
+        # a skipped entry keeps its finished game (and the players) until the deadline, up to guess_timeout seconds,
+        # rebuild the heap when they are the most of it
+        # 被跳过的条目会让结束的游戏（和玩家）留到截止时间，最多guess_timeout秒，它们占多数时重建堆
+        if len(self.deadline_heap) > 2 * len(self.collecting_games) + 64:
+            self.deadline_heap = [entry for entry in self.deadline_heap
+                                  if entry[2] in self.collecting_games and entry[2].deadline == entry[0]]
+            heapq.heapify(self.deadline_heap)
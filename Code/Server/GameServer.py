@@ -1,3 +1,5 @@
+from __future__ import annotations
+
 import UserInfoFile
 import threading
 import socket
@@ -6,25 +8,121 @@ import re
 import random
 
 import OperationStatus
+import MessageFraming
 import GameHall
 import Player
 import GameRoom
+import BatchResolver
+import GameRunner
+import HallThreadPool
+import HeartBeatRendezvous
+import HeartBeatSupervisor
+import OutboundQueue
+import RoomStatusBroadcaster
+import SessionTracker
+import SocketProfile
 
 # Default Encoding is UTF-8
 
-# Condition Variable for whether heart beat is established
-# 心跳是否建立的条件变量
-HEART_BEAT_CONDITION_VARIABLE: threading.Condition = threading.Condition()
+# Server engines, chosen at startup
+# 服务器引擎，启动时选择
+# thread: one thread per connection
+# asyncio: all connections are coroutines in one event loop
+THREAD_ENGINE: str = "thread"
+ASYNCIO_ENGINE: str = "asyncio"
+SERVER_ENGINES: tuple[str, ...] = (THREAD_ENGINE, ASYNCIO_ENGINE)
+
+# A player is lost if nothing arrives for this many seconds, the client sends a heart beat every 0.5 second
+# 超过这个秒数没有收到任何数据则认为玩家断线，客户端每0.5秒发送一次心跳
+HEART_BEAT_TIMEOUT: float = 1
+# how often the game runner checks the in-band heart beats of the players in the rooms
+# 游戏运行器检查房间里玩家带内心跳的间隔
+HEART_BEAT_CHECK_INTERVAL: float = 0.5
+# how long a login waits for the heart beat connection of the player, after that the player is removed
+# 登录等待玩家心跳连接的时间，超时后玩家被移除
+HEART_BEAT_RENDEZVOUS_TIMEOUT: float = 10
+# the rooms kept even when nobody plays, and the most rooms the game hall creates on demand
+# 没有人玩时也保留的房间数，以及游戏大厅按需创建的最多房间数
+GAME_ROOM_NUMBER: int = 10
+MAX_GAME_ROOM_NUMBER: int = 10000
+# the players of a room, a game starts when the room is full and they are all waiting
+# 房间的玩家数，房间满员并且所有人都在等待时游戏开始
+ROOM_SIZE: int = 2
+# the room status changes are pushed to the players watching them (/watch) in one batch every this many seconds
+# 房间状态变化每隔这么多秒合并成一批推送给关注的玩家（/watch）
+ROOM_STATUS_PUSH_INTERVAL: float = 0.2
+# a player who has not guessed this many seconds after the game started forfeits, the others win
+# 游戏开始这么多秒后还没有猜测的玩家判负，其他玩家获胜
+GUESS_TIMEOUT: float = 60
+# the worker threads running the steps of all games, thread engine
+# 运行所有游戏步骤的工作线程数，多线程引擎使用
+GAME_WORKER_NUMBER: int = 4
+# the games with all their guesses are resolved together once per this many seconds, 0 to resolve each game at once
+# 所有猜测都已到达的游戏每隔这么多秒一起判定，0表示每局游戏立刻判定
+RESOLUTION_TICK: float = 0
+# a hall thread left without a session waits this many seconds for the session of a finished game, then ends
+# 没有会话的大厅线程等待已结束游戏的会话这么多秒，然后结束
+HALL_THREAD_IDLE_TIMEOUT: float = 5
+# the bytes queued for a client which does not read fast enough: above the high watermark the client is backed up,
+# the room status pushes skip it until its queue drains to the low watermark; above the limit it is evicted
+# 为读得不够快的客户端排队的字节数：超过高水位时客户端处于积压状态，房间状态推送跳过它，直到队列降到低水位；超过上限时被驱逐
+OUTBOUND_HIGH_WATERMARK: int = 64 * 1024
+OUTBOUND_LOW_WATERMARK: int = 16 * 1024
+OUTBOUND_QUEUE_LIMIT: int = 2 * MessageFraming.MAX_FRAME_SIZE
+# a client whose queued bytes could not be written for this many seconds is evicted
+# 排队的字节这么多秒都写不出去的客户端被驱逐
+WRITE_TIMEOUT: float = 10
+# the options set on every accepted socket, see SocketProfile.SOCKET_PROFILES
+# 在每个接受的套接字上设置的选项，见SocketProfile.SOCKET_PROFILES
+SOCKET_PROFILE: str = SocketProfile.LATENCY_PROFILE
+
+# seconds between two sweeps of the session tracker, a leaked session is reclaimed within two of them
+# 会话跟踪器两次清扫之间的秒数，泄漏的会话在两次清扫之内被回收
+SESSION_SWEEP_INTERVAL: float = 5
 
 
 class GameServer:
 
-    def __init__(self, listening_port: int, user_info_file_path: str):
+    def __init__(self, listening_port: int, user_info_file_path: str,
+                 heart_beat_timeout: float = HEART_BEAT_TIMEOUT,
+                 heart_beat_check_interval: float = HEART_BEAT_CHECK_INTERVAL,
+                 heart_beat_rendezvous_timeout: float = HEART_BEAT_RENDEZVOUS_TIMEOUT,
+                 game_room_number: int = GAME_ROOM_NUMBER,
+                 max_game_room_number: int = MAX_GAME_ROOM_NUMBER,
+                 room_size: int = ROOM_SIZE,
+                 room_status_push_interval: float = ROOM_STATUS_PUSH_INTERVAL,
+                 guess_timeout: float = GUESS_TIMEOUT,
+                 game_worker_number: int = GAME_WORKER_NUMBER,
+                 hall_thread_idle_timeout: float = HALL_THREAD_IDLE_TIMEOUT,
+                 resolution_tick: float = RESOLUTION_TICK,
+                 outbound_high_watermark: int = OUTBOUND_HIGH_WATERMARK,
+                 outbound_low_watermark: int = OUTBOUND_LOW_WATERMARK,
+                 outbound_queue_limit: int = OUTBOUND_QUEUE_LIMIT,
+                 write_timeout: float = WRITE_TIMEOUT,
+                 socket_profile: str = SOCKET_PROFILE,
+                 session_sweep_interval: float = SESSION_SWEEP_INTERVAL):
         """
         The Game Server
         :param listening_port:
         :param user_info_file_path: path to a UserInfo.txt file,
          which contains usernames and passwords for all users (clients) that may participate in the application.
+        :param heart_beat_timeout: a player is lost if nothing arrives for this many seconds
+        :param heart_beat_check_interval: how often the in-band heart beats of the players in the rooms are checked
+        :param heart_beat_rendezvous_timeout: how long a login waits for the heart beat connection
+        :param game_room_number: the minimum number of rooms, more are created on demand
+        :param max_game_room_number: the maximum number of rooms
+        :param room_size: the players of a room, 2 or more
+        :param room_status_push_interval: seconds between two batches of room status changes pushed to /watch
+        :param guess_timeout: seconds a player has to guess (and a v1 player to acknowledge the result)
+        :param game_worker_number: the worker threads running the steps of all games
+        :param hall_thread_idle_timeout: seconds an idle hall thread waits for a session before it ends
+        :param resolution_tick: resolve the ready games in batches once per this many seconds, 0 for no batches
+        :param outbound_high_watermark: bytes queued for a client above which it is backed up
+        :param outbound_low_watermark: bytes queued at or below which a backed up client is not any more
+        :param outbound_queue_limit: bytes queued for a client above which it is evicted
+        :param write_timeout: seconds the queued bytes of a client may not move before it is evicted
+        :param socket_profile: the options of the accepted sockets, one of SocketProfile.SOCKET_PROFILES
+        :param session_sweep_interval: seconds between two sweeps reclaiming the leaked sessions and players
         """
 
         # listening_port is the port the server will listen on
@@ -40,7 +138,74 @@ class GameServer:
         # or there will be multiple game halls,
         # the user should be in the same game hall
         # 创建游戏大厅，不要在线程里创建，不然会出现多个游戏大厅，用户应该在同一个游戏大厅
-        self.game_hall: GameHall.GameHall = GameHall.GameHall(self)
+        self.game_hall: GameHall.GameHall = GameHall.GameHall(self, game_room_number, max_game_room_number,
+                                                              room_size)
+
+        self.heart_beat_timeout: float = heart_beat_timeout
+        self.heart_beat_check_interval: float = heart_beat_check_interval
+        self.heart_beat_rendezvous_timeout: float = heart_beat_rendezvous_timeout
+        # every game waits at most this long for the guesses, the deadlines are kept by the game runner
+        # 每局游戏最多等待这么久，截止时间由游戏运行器保存
+        self.guess_timeout: float = guess_timeout
+        if socket_profile not in SocketProfile.SOCKET_PROFILES:
+            raise ValueError(f"Unknown socket profile {socket_profile}, "
+                             f"should be one of {tuple(SocketProfile.SOCKET_PROFILES)}")
+        self.socket_profile: str = socket_profile
+
+        # runs every game as a state machine on a bounded pool of workers, no thread per game,
+        # and watches the players waiting in the rooms, no thread per waiting player
+        # 在有上限的工作线程池上以状态机运行所有游戏，不是每局游戏一个线程，
+        # 并监视在房间里等待的玩家，不是每个等待的玩家一个线程
+        self.game_runner: GameRunner.GameRunner = GameRunner.GameRunner(game_worker_number,
+                                                                        self.heart_beat_check_interval,
+                                                                        self.heart_beat_timeout,
+                                                                        self.disconnect_player)
+        self.game_runner.start()
+
+        # writes what the clients did not take at once, no thread sending to a client ever waits for it,
+        # and evicts the clients which stay backed up
+        # 写出客户端没有立刻接收的数据，发送给客户端的线程从不等待它，并驱逐一直积压的客户端
+        self.outbound_writer: OutboundQueue.OutboundWriter = OutboundQueue.OutboundWriter(outbound_high_watermark,
+                                                                                          outbound_low_watermark,
+                                                                                          outbound_queue_limit,
+                                                                                          write_timeout,
+                                                                                          self.evict_client)
+        self.outbound_writer.start()
+
+        # resolves the ready games in batches, None when every game resolves itself
+        # 批量判定就绪的游戏，每局游戏自己判定时为None
+        self.batch_resolver: BatchResolver.BatchResolver | None = None
+        if resolution_tick > 0:
+            self.batch_resolver = BatchResolver.BatchResolver(resolution_tick, self.game_runner)
+            self.batch_resolver.start()
+
+        # the sessions continue in the game hall on these threads after their games
+        # 会话在游戏结束后在这些线程上继续游戏大厅
+        self.hall_thread_pool: HallThreadPool.HallThreadPool = HallThreadPool.HallThreadPool(hall_thread_idle_timeout)
+
+        # login sessions waiting for their heart beat connections
+        # 等待心跳连接的登录会话
+        self.heart_beat_rendezvous: HeartBeatRendezvous.HeartBeatRendezvous = \
+            HeartBeatRendezvous.HeartBeatRendezvous()
+
+        # one thread watches all heart beat connections, the connection threads end after the pairing
+        # 一个线程监视所有心跳连接，连接线程在配对后结束
+        self.heart_beat_supervisor: HeartBeatSupervisor.HeartBeatSupervisor = \
+            HeartBeatSupervisor.HeartBeatSupervisor(self.heart_beat_timeout, self.heart_beat_lost)
+        self.heart_beat_supervisor.start()
+
+        # pushes the room status changes to the players who sent /watch
+        # 把房间状态变化推送给发送了/watch的玩家
+        self.room_status_broadcaster: RoomStatusBroadcaster.RoomStatusBroadcaster = \
+            RoomStatusBroadcaster.RoomStatusBroadcaster(self.game_hall, room_status_push_interval)
+        RoomStatusBroadcaster.RoomStatusPushThread(self.room_status_broadcaster).start()
+
+        # accounts for the thread, the sockets and the player of every session, reclaims what nobody releases
+        # 统计每个会话的线程、套接字和玩家，回收没有人释放的资源
+        self.session_tracker: SessionTracker.SessionTracker = \
+            SessionTracker.SessionTracker(self.game_hall, session_sweep_interval, self.reclaim_session,
+                                          self.disconnect_player)
+        SessionTracker.SessionSweepThread(self.session_tracker).start()
 
         # record all threads of the game server, one thread means one client
 
@@ -72,14 +237,130 @@ class GameServer:
             # accept() returns a tuple of (server_socket, client_address)
             # accept() 返回一个元组（客户端套接字，客户端地址）
             client_accept: tuple = server_socket.accept()
+            SocketProfile.apply_socket_profile(client_accept[0], self.socket_profile)
+            self.attach_connection(client_accept)
+
+    def attach_connection(self, client_accept: tuple) -> None:
+        """
+        Serve a connected socket, accepted by start() or made in this process,
+        e.g. one end of socket.socketpair() (InProcessHarness.py), any thread
+        服务一个已连接的套接字，由start()接受或在本进程中创建，例如socket.socketpair()的一端（InProcessHarness.py），任何线程都可以调用
+        :param client_accept: (socket, address) like socket.accept()
+        :return: None
+        """
+        # create a thread to handle the connection, it does not affect the main thread
+        # 分完线程不影响主线程，主线程继续循环接受连接，分线程处理连接
+        game_server_thread: GameServerThreadEachPlayer = GameServerThreadEachPlayer(client_accept,
+                                                                                    self)
+        # start the thread
+        # 开始线程
+        game_server_thread.start()
+
+    def disconnect_player(self, player: Player.Player) -> None:
+        """
+        The player is lost, remove the player from the room and the game hall, close the sockets
+        玩家断线，将玩家从房间和游戏大厅移除，关闭socket
+        :param player: the player
+        :return: None
+        """
+        # check whether the player is in the room
+        # 判断玩家是否在房间里
+        game_room: GameRoom.GameRoom | None = player.game_room
+        if game_room is not None:
+            game: GameRoom.GameRoom.Game | None = game_room.game
+            # the running game does not wait for the lost player any more, the others are told they won at once,
+            # unless the player had left the room already: its last room may hold the game of other players now
+            # 正在进行的游戏不再等待断线的玩家，其他玩家立刻被告知获胜，
+            # 除非玩家已经离开了房间：它最后的房间现在可能是其他玩家的游戏
+            if game_room.remove_player(player) and game is not None:
+                game.cancel()
+
+        # remove the player from the game hall
+        # 将玩家从游戏大厅移除
+        self.game_hall.remove_player(player)
+        self.room_status_broadcaster.unwatch(player)
+        self.game_runner.forget_player(player)
+
+        # remove the socket, shut down first to wake up the thread reading it, if any
+        # 移除socket，先关闭连接以唤醒正在读取它的线程（如果有）
+        self.shut_down_socket(player.player_socket)
+        player.player_socket.close()
+        if player.player_heart_beat_socket_channel is not None:
+            player.player_heart_beat_socket_channel.close()
+        # the session of the player ends here, whichever thread holds it
+        # 玩家的会话到此结束，无论哪个线程持有它
+        self.session_tracker.close(player.player_thread.session_record)
+
+    def reclaim_session(self, record: SessionTracker.SessionRecord) -> None:
+        """
+        Called by the session tracker for a leaked session, wake up its thread and release its player
+        会话跟踪器对泄漏的会话调用，唤醒它的线程并释放它的玩家
+        :param record: the record of the session
+        :return: None
+        """
+        for connection in record.connections:
+            self.shut_down_socket(connection)
+        if record.player is not None:
+            self.disconnect_player(record.player)
+
+    @staticmethod
+    def shut_down_socket(connection_socket: socket.socket) -> None:
+        """
+        Shut down both directions, a thread blocked in recv returns, unlike close
+        关闭两个方向，与close不同，阻塞在recv的线程会返回
+        """
+        try:
+            connection_socket.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            # closed or never connected
+            pass
+
+    def session_stats(self) -> dict[str, int]:
+        """
+        The sessions, connections and players alive and the leaks reclaimed, for monitoring
+        存活的会话、连接和玩家以及回收的泄漏，用于监控
+        :return: see SessionTracker.SessionTracker.stats, and the threads of the process
+        """
+        session_stats: dict[str, int] = self.session_tracker.stats()
+        session_stats["threads"] = threading.active_count()
+        return session_stats
+
+    def evict_client(self, outbound_queue: OutboundQueue.OutboundQueue) -> None:
+        """
+        Called by the outbound writer when a client is evicted, its queue is closed already
+        出站写入线程驱逐客户端时调用，它的队列已经关闭
+        :param outbound_queue: the queue of the client
+        :return: None
+        """
+        print("Slow Client Evicted", outbound_queue.closed_reason,
+              outbound_queue.player.player_name if outbound_queue.player is not None else None)
+        # wake up the thread reading the socket, if any, it sees the connection closed
+        # 唤醒正在读取套接字的线程（如果有），它会看到连接已关闭
+        try:
+            outbound_queue.socket.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        if outbound_queue.player is not None:
+            self.disconnect_player(outbound_queue.player)
 
-            # create a thread to handle the connection, it does not affect the main thread
-            # 分完线程不影响主线程，主线程继续循环接受连接，分线程处理连接
-            game_server_thread: GameServerThreadEachPlayer = GameServerThreadEachPlayer(client_accept,
-                                                                                        self)
-            # start the thread
-            # 开始线程
-            game_server_thread.start()
+    def outbound_stats(self) -> dict[str, int]:
+        """
+        The depth of the outbound queues and the eviction counts, for monitoring
+        出站队列的深度和驱逐次数，用于监控
+        :return: see OutboundQueue.OutboundStats.snapshot
+        """
+        return self.outbound_writer.stats()
+
+    def heart_beat_lost(self, player: Player.Player) -> None:
+        """
+        Called by the heart beat supervisor when the heart beat of the player is lost
+        心跳监视器发现玩家心跳丢失时调用
+        :param player: the player
+        :return: None
+        """
+        # in the room or in the game hall, a silent client would keep its hall thread blocked forever
+        # 无论在房间还是游戏大厅，不发消息的客户端会让它的大厅线程永远阻塞
+        self.disconnect_player(player)
 
     @staticmethod
     def print_message(*args):
@@ -121,6 +402,9 @@ class GameServerThreadEachPlayer(threading.Thread):
         self.client_socket: socket.socket = client_accept[0]
         # User Client Address
         self.client_address: tuple = client_accept[1]
+        # every message of the protocol is sent and received as a frame through this channel
+        # 协议的所有消息都通过这个通道按帧收发
+        self.client_channel: MessageFraming.FramedSocket = MessageFraming.FramedSocket(self.client_socket)
 
         # Game Server, For all shared resources, including the game hall
         self.game_server: GameServer = game_server
@@ -128,11 +412,22 @@ class GameServerThreadEachPlayer(threading.Thread):
         # UserInfoFile
         self.user_info_file: UserInfoFile = game_server.user_info_file
 
-        # Thread pause flag
-        self.thread_lock: threading.Event = threading.Event()
-        # Thread pause flag is False, the thread is running
-        # Thread pause flag is True, the thread is paused
-        self.thread_lock.set()
+        # Protocol version of the client, negotiated by the login header
+        # 客户端的协议版本，由登录头协商
+        self.protocol_version: int = OperationStatus.PROTOCOL_VERSION_1
+        # Heart beats are frames on this socket, no heart beat connection, negotiated by the login header
+        # 心跳是这个套接字上的帧，没有心跳连接，由登录头协商
+        self.heart_beat_in_band: bool = False
+        # the rendezvous with the heart beat connection, two-connection heart beats only
+        # 与心跳连接的会合，只用于双连接心跳
+        self.heart_beat_waiter: HeartBeatRendezvous.HeartBeatWaiter | None = None
+        # the bounded outbound queue of a login connection, None for a heart beat connection
+        # 登录连接的有界出站队列，心跳连接为None
+        self.outbound_queue: OutboundQueue.OutboundQueue | None = None
+        # what the session holds, closed when the session ends or the player is disconnected
+        # 会话持有的资源，会话结束或玩家断开时关闭
+        self.session_record: SessionTracker.SessionRecord = game_server.session_tracker.open(self,
+                                                                                            self.client_socket)
 
     def start(self) -> None:
         """
@@ -149,45 +444,88 @@ class GameServerThreadEachPlayer(threading.Thread):
         # super().start()
         # start only execute 1 time each thread, and after it finish executing, a new thread will be created
         # so do not use start
+        self.game_server.session_tracker.set_holder(self.session_record, self)
+        try:
+            self.serve_connection()
+        except Exception as e:
+            print("Connection Error", repr(e), self.client_address)
+        finally:
+            # nobody continues a session without a player: not logged in, or a heart beat connection handed over
+            # 没有玩家的会话没有人继续：没有登录，或者是已经交出的心跳连接
+            if self.session_record.player is None:
+                self.game_server.session_tracker.close(self.session_record)
+
+    def serve_connection(self) -> None:
+        """
+        Tell a login from a heart beat connection and serve it
+        区分登录和心跳连接并服务它
+        :return: None
+        """
         # —————————————————————————— 区分信息 —————————————————————————— #
+        # a client sending frames asked for the framing, a client from before the framing sends raw bytes
+        # 发送帧的客户端要求了分帧，分帧之前的客户端发送原始字节
+        self.client_channel.detect_unframed()
+
         # STEP Head.0.0.0
         # 接受头文件，区分是登录还是心跳包
         # receive the header, to distinguish whether it is login or heart beat package
-        header: str = self.client_socket.recv(1024).decode()
+        header: str = self.client_channel.recv_message()
         print(header)
+
+        login_options: list[str] | None = OperationStatus.decode_login_options(OperationStatus.LOGIN_HEADER, header)
+        accepted_options: list[str] = []
+        if login_options is not None:
+            # everything sent to a login connection goes through its bounded outbound queue,
+            # the heart beat connections are answered by the heart beat supervisor
+            # 发给登录连接的所有数据都经过它的有界出站队列，心跳连接由心跳监视器回复
+            self.outbound_queue = self.game_server.outbound_writer.create_queue(self.client_socket)
+            self.client_channel.outbound = self.outbound_queue.send
+            # every reply is sent in one call, when the client is asked for something
+            # 每个回复在向客户端请求时一次性发送
+            self.client_channel.hold_frames()
+
+            if OperationStatus.LOGIN_OPTION_V2 in login_options:
+                # the client speaks v2, no acknowledgement
+                # 客户端使用v2协议，不需要确认
+                self.protocol_version = OperationStatus.PROTOCOL_VERSION_2
+                accepted_options.append(OperationStatus.LOGIN_OPTION_V2)
+            # in-band heart beats are told apart by the frame kind, an unframed client has none
+            # 带内心跳靠帧类型区分，不分帧的客户端没有帧类型
+            if OperationStatus.LOGIN_OPTION_IN_BAND_HEART_BEAT in login_options and not self.client_channel.unframed:
+                # the heart beats come on this socket from now on, so it may wait at most the heart beat timeout
+                # 从现在开始心跳从这个套接字到达，所以最多等待心跳超时时间
+                self.heart_beat_in_band = True
+                self.client_socket.settimeout(self.game_server.heart_beat_timeout)
+                accepted_options.append(OperationStatus.LOGIN_OPTION_IN_BAND_HEART_BEAT)
+
         # STEP Head.0.0.1
         # Send Recv
-        self.client_socket.send("Received".encode())
+        self.send_message(OperationStatus.encode_login_options(OperationStatus.LOGIN_HEADER_RECEIVED,
+                                                               accepted_options))
 
-        if header == "Header:login":
+        if login_options is not None:
             # if it is login
             # 如果是登录
             # ——————————————————————————User Login—————————————————————————— #
             # User Login
             # until login successfully or press Ctrl+C
             # 直到登录成功或按Ctrl+C
-            self.login()
+            if not self.login():
+                self.game_server.session_tracker.close(self.session_record)
+                return
             # ——————————————————————————User Login—————————————————————————— #
 
-            try:
-                # ——————————————————————————Game Hall—————————————————————————— #
-                self.game_hall()
-                # ——————————————————————————Game Hall—————————————————————————— #
-            except ConnectionError as e:
-                self.game_server.print_message("Connection Error: " + repr(e) + " player_name: " + self.player.player_name)
+            # ——————————————————————————Game Hall—————————————————————————— #
+            self.run_game_hall()
+            # ——————————————————————————Game Hall—————————————————————————— #
 
-            except OperationStatus.PlayerNormalQuit as e:
-                self.game_server.print_message(
-                    "Player Normal Quit: " + repr(e) + " player_name: " + self.player.player_name)
-
-                # 还是要结束socket
-                # close the socket
-                self.player.player_socket.close()
-
-            except Exception as e:
-                self.game_server.print_message("Unknown Error: " + repr(e) + " player_name: " + self.player.player_name)
+            # the session left the game hall, this thread may continue the session of another player
+            # 会话离开了游戏大厅，这个线程可以继续另一个玩家的会话
+            self.game_server.hall_thread_pool.serve()
 
-        elif header_matched := re.fullmatch(r"Header:heart beat:(?P<username>\w+):client", header):
+        # an unframed client sends its first heart beat right after the header, the two may arrive as one
+        # 不分帧的客户端在头之后立即发送第一个心跳，两者可能一起到达
+        elif header_matched := re.match(r"Header:heart beat:(?P<username>\w+):client", header):
             # if it is heart beat package
             # 如果是心跳包
             # ——————————————————————————Heart Beat—————————————————————————— #
@@ -197,92 +535,123 @@ class GameServerThreadEachPlayer(threading.Thread):
             # receive the heart beat package, and echo it
             username: str = header_matched.group("username")
             print(f"Heart Beat from", username, "start")
-            # 调用GameHall的方法，将心跳包的socket传入
-            # call the method of GameHall, pass the heart beat socket
-            print("Heart skt is:", self.client_socket is None)
-            print(self.game_server.game_hall.correspond_heart_beating_socket_to_player_socket(username,
-                                                                                              self.client_socket))
-            self.player = self.game_server.game_hall.get_player_by_username(username)
-            print(self.player.player_name)
-            print(self.game_server.game_hall.get_player_by_username(username).player_heart_beat_socket_channel is None)
-            # 心跳包建立后，广播恢复线程，但是要先获取锁
-            # After the heart beat is established, broadcast to resume the thread, but need to get the lock first
-            # HEART_BEAT_CONDITION_VARIABLE.acquire(blocking=False)
-
+            # wake up the login session waiting for this heart beat connection
+            # 唤醒等待这个心跳连接的登录会话
+            heart_beat_waiter: HeartBeatRendezvous.HeartBeatWaiter | None = \
+                self.game_server.heart_beat_rendezvous.arrive(username, self.client_channel)
+            if heart_beat_waiter is None:
+                # nobody logged in with this username, or the login already gave up
+                # 没有这个用户名的登录，或者登录已经放弃等待
+                print("Heart Beat without Login", username)
+                self.game_server.session_tracker.close(self.session_record)
+                return
+            self.player = heart_beat_waiter.player
+            # the connection belongs to the session of the player from now on
+            # 从现在开始连接属于玩家的会话
+            self.game_server.session_tracker.hand_over(self.session_record,
+                                                       self.player.player_thread.session_record)
             print("Corresponding Heart Beat Socket to Player Socket Finished")
 
-            # 广播恢复线程
-            # broadcast to resume the thread
-            # HEART_BEAT_CONDITION_VARIABLE.notify_all()
-
-            # 设置超时时间为1秒
-            # set the timeout to 1 second
-            self.client_socket.settimeout(1)
-            try:
-                while True:
-                    self.client_socket.recv(1024)
-                    # tell the client, the message is received
-                    self.client_socket.send("Heart beat:ventricle:response".encode())
-
-            except Exception as e:
-                print("Heart Beat Connection Error", e, self.player.player_name)
-
-
-                # 判断玩家是否在房间里
-                # check whether the player is in the room
-                if self.player.player_status == Player.Player.PLAYING_A_GAME or \
-                        self.player.player_status == Player.Player.WAITING_IN_ROOM:
-                    # if the player is in the room, remove the player from the room
-                    # 如果玩家在房间里，将玩家从房间里移除
-                    self.player.game_room.remove_player(self.player)
+            # hand the connection over to the heart beat supervisor, this thread ends here
+            # 把连接交给心跳监视器，这个线程到此结束
+            self.game_server.heart_beat_supervisor.watch(self.player, self.client_channel)
 
-                    # remove the player from the game hall
-                    # 将玩家从游戏大厅移除
-                    self.game_server.game_hall.remove_player(self.player)
-                    
-                    # 移除socket
-                    # remove the socket
-                    self.player.player_socket.close()
-                    self.player.player_heart_beat_socket_channel.close()
-
-                    # 杀死线程
-                    # kill the thread
-                    # self.player.player_thread.join()
+            # ——————————————————————————Heart Beat—————————————————————————— #
 
-                    # 退出线程
-                    # exit the thr
+        # —————————————————————————— 区分信息 —————————————————————————— #
 
+    def run_game_hall(self) -> None:
+        """
+        Serve the game hall until the player quits, is lost, or waits in a room.
+        Runs on this thread after the login, then on a hall thread each time a game of the player finishes
+        服务游戏大厅，直到玩家退出、断线或者在房间里等待。
+        登录后在这个线程上运行，之后玩家每局游戏结束时在一个大厅线程上运行
+        :return: None
+        """
+        self.game_server.session_tracker.set_holder(self.session_record, threading.current_thread())
+        try:
+            self.game_hall()
+        except ConnectionError as e:
+            self.game_server.print_message("Connection Error: " + repr(e) + " player_name: " + self.player.player_name)
+            # the heart beat may still be alive, do not wait for it to clean up
+            # 心跳可能仍然存活，不要等它来清理
+            self.game_server.disconnect_player(self.player)
 
+        except OperationStatus.PlayerNormalQuit as e:
+            self.game_server.print_message(
+                "Player Normal Quit: " + repr(e) + " player_name: " + self.player.player_name)
 
-            # ——————————————————————————Heart Beat—————————————————————————— #
+            # 还是要结束socket，并离开游戏大厅
+            # close the socket, and leave the game hall
+            self.game_server.disconnect_player(self.player)
 
-        # —————————————————————————— 区分信息 —————————————————————————— #
+        except Exception as e:
+            self.game_server.print_message("Unknown Error: " + repr(e) + " player_name: " + self.player.player_name)
+            # a heart beat timeout is a TimeoutError
+            # 心跳超时是TimeoutError
+            self.game_server.disconnect_player(self.player)
+        finally:
+            # waiting in a room or playing, the session holds no thread
+            # 在房间里等待或游戏中，会话不占用线程
+            self.game_server.session_tracker.set_holder(self.session_record, None)
 
     def resume_thread_to_game(self) -> None:
         """
-        Resume the thread, the game is finished, back to the game hallf
+        The game is finished, continue the session in the game hall on a hall thread,
+        no thread was kept while the player waited and played
+        游戏结束，在大厅线程上继续游戏大厅里的会话，玩家等待和游戏期间没有保留线程
         :return: None
         """
-        self.thread_lock.set()
+        print(self.player.player_name, "Session Resumed")
+        self.game_server.hall_thread_pool.submit(self.run_game_hall)
 
-    def stop_thread(self) -> None:
+    def recv_hall_command(self) -> str:
         """
-        Stop the thread
-        :return: None
+        Receive the next hall command, the late messages of a forfeited game are dropped before it
+        接收下一条大厅命令，之前先丢弃已判负游戏迟到的消息
+        :return: the hall command, "hall_command:command"
+        """
+        while True:
+            message: str = self.client_channel.recv_message()
+            if self.player.late_message_number > 0 and not message.startswith("hall_command:"):
+                self.player.late_message_number -= 1
+                print(self.player.player_name, "late message dropped", message)
+                continue
+            return message
+
+    def receive_acknowledgement(self) -> str | None:
+        """
+        Receive the "Client Received" acknowledgement, only v1 clients send it
+        只有v1客户端会发送确认消息
+        :return: the acknowledgement, None for v2
         """
-        print(self.player.player_name, "Thread Paused")
-        self.thread_lock.clear()
-        self.thread_lock.wait()
-        print(self.player.player_name, "Thread Recovered")
+        if self.protocol_version == OperationStatus.PROTOCOL_VERSION_1:
+            return self.client_channel.recv_message()
+        return None
 
     def send_message(self, message: str):
         try:
             # send the message 0
-            self.client_socket.send(message.encode())
+            self.client_channel.send_message(message)
+        except Exception as e:
+            print("Message Send Error", e)
+
+    def send_frame(self, frame: bytes) -> None:
+        """
+        Send a frame encoded beforehand, e.g. the cached /list answer
+        :param frame: the frame
+        :return: None
+        """
+        try:
+            self.client_channel.send_frame(frame)
         except Exception as e:
             print("Message Send Error", e)
 
-    def login(self) -> None:
+    def login(self) -> bool:
+        """
+        Login until successful, then wait for the heart beat connection
+        :return: whether the player is logged in and the heart beat is established
+        """
         login_result: bool = False
         while login_result is not True:
             try:
@@ -292,26 +661,27 @@ class GameServerThreadEachPlayer(threading.Thread):
                 # STEP1.0.3.0 - 1.0.3.1
                 self.login_result_response(login_result)
 
-                # 阻塞线程，直到获取到心跳包的socket
-                # HEART_BEAT_CONDITION_VARIABLE.acquire(blocking=True)
                 print("Finish Login")
                 # if login successfully, then enter the game hall
                 # 如果登录成功，则进入游戏大厅
-                if login_result:
+                if login_result and self.heart_beat_in_band:
+                    # the heart beats are on this socket, nothing to wait for
+                    # 心跳在这个套接字上，不需要等待
+                    break
+                elif login_result:
+                    # the client opens the heart beat connection after it has the login result
+                    # 客户端收到登录结果后才建立心跳连接
+                    self.client_channel.flush()
                     # 进入大厅前要建立心跳链接
-                    # 等待建立心跳链接
-                    print("Waiting for Heart Beat to be Established")
-                    # wait for the heart beat to be established
-                    print(self.player.player_name)
-                    while self.game_server. \
-                            game_hall. \
-                            get_player_by_username(self.player.player_name). \
-                            player_heart_beat_socket_channel is None:
-
-
-                        # HEART_BEAT_CONDITION_VARIABLE.wait()
-                        pass
-
+                    # 阻塞线程（不占用CPU），直到心跳连接到达或超时
+                    # block the thread (no CPU) until the heart beat connection arrives or the timeout
+                    print("Waiting for Heart Beat to be Established", self.player.player_name)
+                    if not self.game_server.heart_beat_rendezvous.wait(self.heart_beat_waiter,
+                                                                       self.game_server.heart_beat_rendezvous_timeout):
+                        raise TimeoutError("The heart beat connection did not arrive")
+
+                    self.game_server.game_hall.set_heart_beat_socket(self.player,
+                                                                     self.heart_beat_waiter.heart_beat_channel.socket)
                     print("Heart Beat Established")
                     break
 
@@ -324,8 +694,17 @@ class GameServerThreadEachPlayer(threading.Thread):
                 # other exceptions
                 # 其他异常
                 print("Login: Unknown Error:", e)
+                login_result = False
                 break
 
+        if not login_result and self.player is not None:
+            # the player was added to the hall but never got a heart beat, clean up
+            # 玩家已经加入大厅但心跳没有建立，清理
+            if self.heart_beat_waiter is not None:
+                self.game_server.heart_beat_rendezvous.cancel(self.heart_beat_waiter)
+            self.game_server.disconnect_player(self.player)
+        return login_result
+
     def login_process(self):
         """
         Login, ask for the username and password, and check the username and password
@@ -340,7 +719,7 @@ class GameServerThreadEachPlayer(threading.Thread):
         # wait for the username
         # 等待用户名
         # STEP1.0.0.1
-        username: str = self.client_socket.recv(1024).decode()
+        username: str = self.client_channel.recv_message()
         # del the head, the format is username:username
         # 删除头，格式 username:username
         # Allow empty username
@@ -354,7 +733,8 @@ class GameServerThreadEachPlayer(threading.Thread):
         # wait for the password
         # STEP1.0.1.1
         # 等待密码
-        password: str = self.client_socket.recv(1024).decode()
+        password: str = self.client_channel.recv_message()
+        self.client_channel.hold_frames()
         # del the head, the format is password:password
         # 删除头，格式 password:password
         # Allow empty password
@@ -374,8 +754,8 @@ class GameServerThreadEachPlayer(threading.Thread):
         # STEP1.0.2.1
         # wait for the result, whether the user accept the message
         # 等待结果，用户是否接受消息
-        received_message: str = self.client_socket.recv(1024).decode()
-        # here, the received_message should be "Received"
+        received_message: str | None = self.receive_acknowledgement()
+        # here, the received_message should be "Received" (v1) or None (v2)
 
         print(received_message)
         print(self.user_info_file.check_account_password(username, password))
@@ -399,13 +779,24 @@ class GameServerThreadEachPlayer(threading.Thread):
                                                        password,
                                                        self.client_socket,
                                                        self,
-                                                       player_status=1)
+                                                       player_status=1,
+                                                       player_message_channel=self.client_channel,
+                                                       protocol_version=self.protocol_version)
 
             # add the player to the game hall
             # 将玩家添加到游戏大厅
             # get the shared resource, the game hall
             # 向上调用，获取共享资源，游戏大厅
             self.game_server.game_hall.add_player(self.player)
+            self.game_server.session_tracker.set_player(self.session_record, self.player)
+            # an evicted client is disconnected from now on
+            # 从现在开始被驱逐的客户端会被断开
+            self.outbound_queue.player = self.player
+
+            # wait for the heart beat connection from now on, the client opens it after the login result
+            # 从现在开始等待心跳连接，客户端在收到登录结果后才建立它
+            if not self.heart_beat_in_band:
+                self.heart_beat_waiter = self.game_server.heart_beat_rendezvous.expect(self.player)
 
             return True
         else:
@@ -430,7 +821,7 @@ class GameServerThreadEachPlayer(threading.Thread):
             # STEP1.0.3.1
             # receive the message from the client, check the message is reached
             # 接收客户端的消息，检查消息是否到达
-            self.client_socket.recv(1024).decode()
+            self.receive_acknowledgement()
 
         else:
             # login failed
@@ -443,7 +834,7 @@ class GameServerThreadEachPlayer(threading.Thread):
             # STEP1.0.3.1
             # receive the message from the client, check the message is reached
             # 接收客户端的消息，检查消息是否到达
-            self.client_socket.recv(1024).decode()
+            self.receive_acknowledgement()
 
     def game_hall(self):
         while True:
@@ -459,7 +850,10 @@ class GameServerThreadEachPlayer(threading.Thread):
             # get the command
             # 获取命令
             # STEP1.1.0.1
-            user_command: str = self.client_socket.recv(1024).decode()
+            user_command: str = self.recv_hall_command()
+            # the answer and the next prompt leave together
+            # 回答和下一个提示一起发出
+            self.client_channel.hold_frames()
             # del the head, the format is hall_command:command
             # 删除头，格式 hall_command:command
             print(user_command)
@@ -470,19 +864,54 @@ class GameServerThreadEachPlayer(threading.Thread):
             # 3001 number_of_all_rooms number_of_players_in_room_1 ... number_of_players_in_room_n
             # if the command is valid
             if user_command == "/list":
-                # get the room status
-                # 获取房间状态
-                room_status: str = self.game_server.game_hall.list_room_and_status()
+                # get the room status, already encoded, shared by every player until a room changes
+                # 获取房间状态，已经编码好，房间变化之前所有玩家共用
+                room_status_frame: bytes = self.game_server.game_hall.list_room_frame()
 
                 # send the command to the server
                 # 将命令发送给服务器
                 # STEP1.1.1.0
-                self.send_message(room_status)
+                self.send_frame(room_status_frame)
                 # ensure the client received the message, the msg is "Client Received"
                 # 确保客户端收到消息，消息是"Client Received"
                 # STEP1.1.1.1
-                self.client_socket.recv(1024).decode()
+                self.receive_acknowledgement()
+
+            elif matched_command := re.fullmatch(r"/list (?P<first_room_id>\d+) (?P<room_number>\d+)", user_command):
+                # a page of the rooms
+                # 一页房间
+                # STEP1.1.1.0
+                self.send_message(self.game_server.game_hall.list_room_page(
+                    int(matched_command.group("first_room_id")), int(matched_command.group("room_number"))))
+                # STEP1.1.1.1
+                self.receive_acknowledgement()
+
+            elif matched_command := re.fullmatch(r"/list since (?P<version>\d+)", user_command):
+                # the rooms changed since the last answer
+                # 上次回答之后变化的房间
+                # STEP1.1.1.0
+                self.send_message(self.game_server.game_hall.list_room_changes(int(matched_command.group("version"))))
+                # STEP1.1.1.1
+                self.receive_acknowledgement()
+
 
+            elif user_command == "/watch":
+                # every room now, then the changes are pushed without asking
+                # 现在发送所有房间，之后变化会被主动推送
+                version, room_status = self.game_server.game_hall.room_changes_since(-1)
+                # STEP1.1.1.0
+                self.send_message(room_status)
+                # STEP1.1.1.1
+                self.receive_acknowledgement()
+                self.game_server.room_status_broadcaster.watch(self.player, self.client_channel.send_frame, version,
+                                                               lambda: self.outbound_queue.backed_up)
+
+            elif user_command == "/unwatch":
+                self.game_server.room_status_broadcaster.unwatch(self.player)
+                # STEP1.1.1.0
+                self.send_message(OperationStatus.OperationStatus.watch_stopped)
+                # STEP1.1.1.1
+                self.receive_acknowledgement()
 
             elif matched_command := re.fullmatch(r"/enter (?P<target_room_number>\d+)", user_command):
                 # command should be in /enter <target_room_number>
@@ -502,6 +931,11 @@ class GameServerThreadEachPlayer(threading.Thread):
                     error_msg: str = OperationStatus.OperationStatus.unrecognized_message
                     # STEP1.1.1.0
                     self.send_message(error_msg)
+
+                    # the client acknowledges every message except wait and bye bye, keep in step with it
+                    # 客户端会确认除了wait和bye bye以外的所有消息，保持同步
+                    # STEP1.1.1.1
+                    self.receive_acknowledgement()
                 except OperationStatus.RoomFullError as e:
                     # if the room is full
                     # 如果房间已满
@@ -512,7 +946,7 @@ class GameServerThreadEachPlayer(threading.Thread):
                     # ensure the client received the message, the msg is "Client Received"
                     # 确保客户端收到消息，消息是"Client Received"
                     # STEP1.1.1.1
-                    self.client_socket.recv(1024).decode()
+                    self.receive_acknowledgement()
                 except Exception as e:
                     error_msg: str = repr(e)
                     # STEP1.1.1.0
@@ -521,40 +955,31 @@ class GameServerThreadEachPlayer(threading.Thread):
                     # ensure the client received the message, the msg is "Client Received"
                     # 确保客户端收到消息，消息是"Client Received"
                     # STEP1.1.1.1
-                    self.client_socket.recv(1024).decode()
+                    self.receive_acknowledgement()
                 else:
                     # if nothing wrong, send msg to the Client that successfully enter the room
-                    # break the loop, exit the game hall
-                    # 如果没有问题，发送消息给客户端，成功进入房间，退出游戏大厅循环
-                    # send the result status code to the client
-                    # 将结果状态码发送给客户端
-                    msg: str = OperationStatus.OperationStatus.wait
+                    # 如果没有问题，发送消息给客户端，成功进入房间
+                    self.wait_in_room()
+                    # the session continues when the game is finished, this thread ends
+                    # 游戏结束时会话继续，这个线程结束
+                    return
+
+            elif user_command == "/match":
+                # enter the room where a game starts soonest, no room number needed
+                # 进入最快开始游戏的房间，不需要房间号
+                try:
+                    self.game_server.game_hall.match_room(self.player)
+
+                except OperationStatus.RoomFullError:
+                    # every room is full
+                    # 所有房间都满了
                     # STEP1.1.1.0
-                    self.send_message(msg)
-                    # change the user status to waiting in room
-                    '''
-                    player's status/玩家状态
-                    0. Reserved Status (Not Used)
-                    1. Out of House
-                    2. In the game hall
-                    3. Waiting in room
-                    4. Playing a game
-                    '''
-                    self.player.player_status = 3
-                    # although here is a break, the "finally" block will still be executed
-
-                    # the client tell server start to wait
-                    # 客户端告诉服务器开始等待
-                    # STEP 1.1.1.1
-                    start_wait_msg: str = self.client_socket.recv(1024).decode()
-                    print(self.player.player_name, start_wait_msg)
-
-                    # start the game
-                    # 开始游戏，有可能判定失败, wait
-                    self.start_game()
-
-                    # after_game = self.player.player_socket.recv(1024).decode()
-                    # print(after_game)
+                    self.send_message(OperationStatus.OperationStatus.room_full)
+                    # STEP1.1.1.1
+                    self.receive_acknowledgement()
+                else:
+                    self.wait_in_room()
+                    return
 
             elif user_command == "/exit":
                 # if the user want to exit the game hall
@@ -564,6 +989,7 @@ class GameServerThreadEachPlayer(threading.Thread):
                 msg: str = OperationStatus.OperationStatus.bye_bye
                 # STEP1.1.1.0
                 self.send_message(msg)
+                self.client_channel.flush()
 
                 # out of the game hall loop
                 # 退出游戏大厅循环
@@ -578,7 +1004,40 @@ class GameServerThreadEachPlayer(threading.Thread):
                 # ensure the client received the message, the msg is "Client Received"
                 # 确保客户端收到消息，消息是"Client Received"
                 # STEP1.1.1.1
-                self.client_socket.recv(1024).decode()
+                self.receive_acknowledgement()
+
+    def wait_in_room(self) -> None:
+        """
+        The player is in a room, tell the client to wait, then leave the player to the game runner until the game
+        is finished
+        玩家已经在房间里，告诉客户端等待，然后把玩家交给游戏运行器直到游戏结束
+        :return: None
+        """
+        # send the result status code to the client
+        # 将结果状态码发送给客户端
+        msg: str = OperationStatus.OperationStatus.wait
+        # STEP1.1.1.0
+        self.send_message(msg)
+        # change the user status to waiting in room
+        '''
+        player's status/玩家状态
+        0. Reserved Status (Not Used)
+        1. Out of House
+        2. In the game hall
+        3. Waiting in room
+        4. Playing a game
+        '''
+        self.player.player_status = 3
+
+        # the client tell server start to wait
+        # 客户端告诉服务器开始等待
+        # STEP 1.1.1.1
+        start_wait_msg: str | None = self.receive_acknowledgement()
+        print(self.player.player_name, start_wait_msg)
+
+        # start the game
+        # 开始游戏，有可能判定失败, wait
+        self.start_game()
 
     def start_game(self):
         game_room: GameRoom.GameRoom = self.player.game_room
@@ -589,19 +1048,108 @@ class GameServerThreadEachPlayer(threading.Thread):
 
         print("Current GameRoom:", game_room.room_id, game_room.check_full())
 
-        # After the last player enter the room, the game will start
-        if game_room.check_full():
+        # the wait answer goes before the game starts
+        # 等待的回答在游戏开始之前发出
+        self.client_channel.flush()
+
+        # The game runner reads the socket from now on, the heart beats included, so no thread is kept for the player
+        # 从现在开始由游戏运行器读取套接字（包括心跳），所以不为玩家保留线程
+        self.game_server.game_runner.watch_waiting_player(self.player)
+
+        # After the last player is waiting in the room, the game will start
+        # Only one thread of the room is told to start it, even if all of them arrive at the same time
+        # 最后一个玩家在房间里等待后游戏开始，即使所有线程同时到达，也只有一个线程负责开始游戏
+        if game_room.player_ready(self.player):
             print("Game Created")
-            game_thread: GameRoom.GameRoom.Game = game_room.Game(self.game_server, game_room)
+            game: GameRoom.GameRoom.Game = game_room.Game(self.game_server, game_room)
             print("Game Started")
-            # Send msg that the game start to all players
+            # Send msg that the game start to all players, on a worker of the game runner
             # STEP 1.2.0.0 [INSIDE FUNCTION BELLOW]
-            game_thread.start()
-
-        print("try to pause the thread")
-        # pause the thread, wait for the game to finish
-        # 暂停线程，等待游戏结束
-        self.stop_thread()
+            self.game_server.game_runner.start_game(game)
+
+        print(self.player.player_name, "Session Suspended")
+
+
+def create_game_server(server_engine: str, listening_port: int, user_info_file_path: str,
+                       heart_beat_timeout: float = HEART_BEAT_TIMEOUT,
+                       heart_beat_check_interval: float = HEART_BEAT_CHECK_INTERVAL,
+                       heart_beat_rendezvous_timeout: float = HEART_BEAT_RENDEZVOUS_TIMEOUT,
+                       game_room_number: int = GAME_ROOM_NUMBER,
+                       max_game_room_number: int = MAX_GAME_ROOM_NUMBER,
+                       room_size: int = ROOM_SIZE,
+                       room_status_push_interval: float = ROOM_STATUS_PUSH_INTERVAL,
+                       guess_timeout: float = GUESS_TIMEOUT,
+                       game_worker_number: int = GAME_WORKER_NUMBER,
+                       hall_thread_idle_timeout: float = HALL_THREAD_IDLE_TIMEOUT,
+                       resolution_tick: float = RESOLUTION_TICK,
+                       outbound_high_watermark: int = OUTBOUND_HIGH_WATERMARK,
+                       outbound_low_watermark: int = OUTBOUND_LOW_WATERMARK,
+                       outbound_queue_limit: int = OUTBOUND_QUEUE_LIMIT,
+                       write_timeout: float = WRITE_TIMEOUT,
+                       socket_profile: str = SOCKET_PROFILE,
+                       session_sweep_interval: float = SESSION_SWEEP_INTERVAL):
+    """
+    Create the game server of the engine
+    :param server_engine: one of SERVER_ENGINES
+    :param listening_port:
+    :param user_info_file_path:
+    :param heart_beat_timeout: a player is lost if nothing arrives for this many seconds
+    :param heart_beat_check_interval: how often the in-band heart beats of the players in the rooms are checked,
+     thread engine only
+    :param heart_beat_rendezvous_timeout: how long a login waits for the heart beat connection
+    :param game_room_number: the minimum number of rooms
+    :param max_game_room_number: the maximum number of rooms
+    :param room_size: the players of a room, 2 or more
+    :param room_status_push_interval: seconds between two batches of room status changes pushed to /watch
+    :param guess_timeout: seconds a player has to guess, then the player forfeits
+    :param game_worker_number: the worker threads running the steps of all games, thread engine only
+    :param hall_thread_idle_timeout: seconds an idle hall thread waits for a session, thread engine only
+    :param resolution_tick: resolve the ready games in batches once per this many seconds, thread engine only
+    :param outbound_high_watermark: bytes queued for a client above which it is backed up
+    :param outbound_low_watermark: bytes queued at or below which a backed up client is not any more
+    :param outbound_queue_limit: bytes queued for a client above which it is evicted
+    :param write_timeout: seconds the queued bytes of a client may not move before it is evicted
+    :param socket_profile: the options of the accepted sockets, one of SocketProfile.SOCKET_PROFILES
+    :param session_sweep_interval: seconds between two sweeps reclaiming the leaked sessions and players
+    :return: GameServer or AsyncGameServer.AsyncGameServer, both have start()
+    """
+    if server_engine == THREAD_ENGINE:
+        return GameServer(listening_port, user_info_file_path,
+                          heart_beat_timeout=heart_beat_timeout,
+                          heart_beat_check_interval=heart_beat_check_interval,
+                          heart_beat_rendezvous_timeout=heart_beat_rendezvous_timeout,
+                          game_room_number=game_room_number, max_game_room_number=max_game_room_number,
+                          room_size=room_size,
+                          room_status_push_interval=room_status_push_interval,
+                          guess_timeout=guess_timeout, game_worker_number=game_worker_number,
+                          hall_thread_idle_timeout=hall_thread_idle_timeout,
+                          resolution_tick=resolution_tick,
+                          outbound_high_watermark=outbound_high_watermark,
+                          outbound_low_watermark=outbound_low_watermark,
+                          outbound_queue_limit=outbound_queue_limit,
+                          write_timeout=write_timeout,
+                          socket_profile=socket_profile,
+                          session_sweep_interval=session_sweep_interval)
+    elif server_engine == ASYNCIO_ENGINE:
+        # import here, the asyncio engine is optional
+        # 在这里导入，asyncio引擎是可选的
+        import AsyncGameServer
+        return AsyncGameServer.AsyncGameServer(listening_port, user_info_file_path,
+                                               heart_beat_timeout=heart_beat_timeout,
+                                               heart_beat_rendezvous_timeout=heart_beat_rendezvous_timeout,
+                                               game_room_number=game_room_number,
+                                               max_game_room_number=max_game_room_number,
+                                               room_size=room_size,
+                                               room_status_push_interval=room_status_push_interval,
+                                               guess_timeout=guess_timeout,
+                                               outbound_high_watermark=outbound_high_watermark,
+                                               outbound_low_watermark=outbound_low_watermark,
+                                               outbound_queue_limit=outbound_queue_limit,
+                                               write_timeout=write_timeout,
+                                               socket_profile=socket_profile,
+                                               session_sweep_interval=session_sweep_interval)
+    else:
+        raise ValueError(f"Unknown server engine {server_engine}, should be one of {SERVER_ENGINES}")
 
 
 if __name__ == '__main__':
@@ -626,8 +1174,13 @@ if __name__ == '__main__':
     game_server.start()
     '''
 
+    # choose the engine and the users, python3 GameServer.py [thread|asyncio] [user_info_file_path]
+    # 选择引擎和用户文件，默认是多线程和UserInfo.txt
+    server_engine: str = sys.argv[1] if len(sys.argv) > 1 else THREAD_ENGINE
+    user_info_file_path: str = sys.argv[2] if len(sys.argv) > 2 else "UserInfo.txt"
+
     # create the GameServer
-    game_server: GameServer = GameServer(15210, "UserInfo.txt")
+    game_server = create_game_server(server_engine, 15210, user_info_file_path)
 
     # start the server
     # 开始服务器
@@ -0,0 +1,74 @@
+import queue
+import threading
+from typing import Callable
+
+
+class HallThreadPool:
+    """
+    Runs the continuations of the sessions in the game hall, thread engine
+
+    A session holds a thread only while its player is in the game hall: when the player waits in a room
+    the session ends its part on the thread, when the game is finished its continuation is submitted here.
+    A thread that finished its part stays idle for idle_timeout seconds and takes the next continuation,
+    so a game does not cost the creation of new threads, and the idle threads end when the hall gets quiet.
+
+    运行会话在游戏大厅里的后续部分，多线程引擎使用
+    会话只在玩家处于游戏大厅时占用线程：玩家在房间里等待时会话在线程上的部分结束，游戏结束时把后续部分提交到这里。
+    完成自己部分的线程空闲idle_timeout秒，接手下一个后续部分，所以一局游戏不需要创建新线程，大厅空闲时空闲线程结束
+    """
+
+    def __init__(self, idle_timeout: float) -> None:
+        """
+        :param idle_timeout: seconds an idle thread waits for a continuation before it ends
+        """
+        self.idle_timeout: float = idle_timeout
+
+        # not a SimpleQueue: its timed get may wait past the timeout when get_nowait takes the item first,
+        # the idle thread would never end
+        # 不用SimpleQueue：get_nowait先取走元素时，它的限时get可能超过超时时间继续等待，空闲线程就永远不会结束
+        self.continuations: queue.Queue[Callable[[], None]] = queue.Queue()
+        # the threads waiting for a continuation, minus the continuations already handed to them
+        # 等待后续部分的线程数，减去已经交给它们的后续部分
+        self.idle_thread_number: int = 0
+        self.lock: threading.Lock = threading.Lock()
+
+    def submit(self, continuation: Callable[[], None]) -> None:
+        """
+        Run the continuation on an idle thread, or on a new thread if none is idle
+        :param continuation: e.g. GameServerThreadEachPlayer.run_game_hall
+        :return: None
+        """
+        with self.lock:
+            if self.idle_thread_number > 0:
+                self.idle_thread_number -= 1
+                self.continuations.put(continuation)
+                return
+        threading.Thread(target=self.serve, args=(continuation,), name="HallThread").start()
+
+    def serve(self, continuation: Callable[[], None] | None = None) -> None:
+        """
+        Run the continuation, then the continuations submitted later, until idle for idle_timeout seconds
+        Also called by a connection thread after its own session left the game hall
+        :param continuation: the first continuation, None to start idle
+        :return: None
+        """
+        while True:
+            if continuation is not None:
+                try:
+                    continuation()
+                except Exception as e:
+                    print("Hall Continuation Error", repr(e))
+
+            with self.lock:
+                self.idle_thread_number += 1
+            try:
+                continuation = self.continuations.get(timeout=self.idle_timeout)
+            except queue.Empty:
+                with self.lock:
+                    # a continuation may have been handed over just before the timeout
+                    # 超时之前可能刚好交来了一个后续部分
+                    try:
+                        continuation = self.continuations.get_nowait()
+                    except queue.Empty:
+                        self.idle_thread_number -= 1
+                        return
@@ -0,0 +1,117 @@
+from __future__ import annotations
+
+import collections
+import threading
+
+import MessageFraming
+import Player
+
+
+class HeartBeatWaiter:
+    """
+    One login session waiting for its heart beat connection
+    一个等待心跳连接的登录会话
+    """
+
+    def __init__(self, player: Player.Player) -> None:
+        self.player: Player.Player = player
+        # set when the heart beat connection arrives
+        # 心跳连接到达时被设置
+        self.arrived: threading.Event = threading.Event()
+        self.heart_beat_channel: MessageFraming.FramedSocket | None = None
+
+
+class HeartBeatRendezvous:
+    """
+    Pairs the login session of a player with its heart beat connection, keyed by username
+
+    The login session calls expect() before telling the client the login is successful,
+    so the heart beat connection can never arrive before somebody waits for it.
+    The heart beat connection calls arrive(), the oldest waiter of the username is woken up.
+    A waiter that times out is removed, the login session cleans up the player.
+
+    按用户名把玩家的登录会话和心跳连接配对
+    登录会话在告诉客户端登录成功之前调用expect()，所以心跳连接不会在有人等待之前到达
+    心跳连接调用arrive()，唤醒这个用户名最早的等待者；超时的等待者被移除，由登录会话清理玩家
+    """
+
+    def __init__(self) -> None:
+        # username -> the waiting login sessions, oldest first
+        # 用户名 -> 等待的登录会话，最早的在前
+        self.waiters: dict[str, collections.deque[HeartBeatWaiter]] = {}
+        self.lock: threading.Lock = threading.Lock()
+
+    def expect(self, player: Player.Player) -> HeartBeatWaiter:
+        """
+        Register a login session waiting for the heart beat connection of the player
+        :param player: the player who just logged in
+        :return: the waiter, pass it to wait()
+        """
+        waiter: HeartBeatWaiter = HeartBeatWaiter(player)
+        with self.lock:
+            self.waiters.setdefault(player.player_name, collections.deque()).append(waiter)
+        return waiter
+
+    def arrive(self, username: str, heart_beat_channel: MessageFraming.FramedSocket) -> HeartBeatWaiter | None:
+        """
+        A heart beat connection of the username arrives, wake up the oldest waiter
+        :param username: the username in the heart beat header
+        :param heart_beat_channel: the heart beat connection
+        :return: the woken waiter, None if nobody is waiting for this username
+        """
+        with self.lock:
+            username_waiters: collections.deque[HeartBeatWaiter] | None = self.waiters.get(username)
+            if not username_waiters:
+                return None
+            waiter: HeartBeatWaiter = username_waiters.popleft()
+            if not username_waiters:
+                del self.waiters[username]
+
+            waiter.heart_beat_channel = heart_beat_channel
+            waiter.arrived.set()
+        return waiter
+
+    def wait(self, waiter: HeartBeatWaiter, timeout: float) -> bool:
+        """
+        Block until the heart beat connection arrives, without using the CPU
+        :param waiter: returned by expect()
+        :param timeout: seconds
+        :return: whether the heart beat connection arrived, if not the waiter is removed
+        """
+        if waiter.arrived.wait(timeout):
+            return True
+
+        with self.lock:
+            # it may arrive between the timeout and the lock
+            # 可能在超时和加锁之间到达
+            if waiter.arrived.is_set():
+                return True
+            self.cancel_locked(waiter)
+        return False
+
+    def cancel(self, waiter: HeartBeatWaiter) -> None:
+        """
+        Stop waiting, e.g. the login connection is lost
+        :param waiter: returned by expect()
+        :return: None
+        """
+        with self.lock:
+            self.cancel_locked(waiter)
+
+    def cancel_locked(self, waiter: HeartBeatWaiter) -> None:
+        username_waiters: collections.deque[HeartBeatWaiter] | None = self.waiters.get(waiter.player.player_name)
+        if username_waiters is None:
+            return
+        try:
+            username_waiters.remove(waiter)
+        except ValueError:
+            return
+        if not username_waiters:
+            del self.waiters[waiter.player.player_name]
+
+    def waiting_number(self) -> int:
+        """
+        :return: the number of login sessions waiting for a heart beat connection
+        """
+        with self.lock:
+            return sum(len(username_waiters) for username_waiters in self.waiters.values())
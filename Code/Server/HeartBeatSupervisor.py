@@ -0,0 +1,239 @@
+from __future__ import annotations
+
+import heapq
+import itertools
+import selectors
+import socket
+import threading
+import time
+from typing import Callable
+
+import MessageFraming
+import Player
+
+# the answer of the server to every heart beat package on a heart beat connection
+# 服务器对心跳连接上每个心跳包的回复
+HEART_BEAT_RESPONSE_FRAME: bytes = MessageFraming.encode_frame("Heart beat:ventricle:response")
+
+
+class WatchedHeartBeat:
+    """
+    One heart beat connection watched by the supervisor
+    监视器监视的一个心跳连接
+    """
+
+    def __init__(self, player: Player.Player, heart_beat_channel: MessageFraming.FramedSocket) -> None:
+        self.player: Player.Player = player
+        self.heart_beat_channel: MessageFraming.FramedSocket = heart_beat_channel
+        # the last time anything arrived
+        # 最后一次收到数据的时间
+        self.last_seen: float = time.monotonic()
+        # responses not yet accepted by the kernel
+        # 内核还没有接收的回复
+        self.outgoing: bytearray = bytearray()
+        self.closed: bool = False
+
+
+class HeartBeatSupervisor(threading.Thread):
+    """
+    One thread watching every heart beat connection, instead of one blocked thread per connection
+
+    A selector waits on all heart beat sockets; every heart beat package refreshes the last seen time
+    and is answered. Deadlines are kept in a heap ordered by time: the entry at the top is checked when
+    it is due, pushed back with the new deadline if the player was seen in between, otherwise the player
+    is lost and on_heart_beat_lost is called from this thread.
+
+    一个线程监视所有心跳连接，而不是每个连接一个阻塞的线程
+    选择器同时等待所有心跳套接字，每个心跳包刷新最后收到的时间并回复。
+    截止时间按时间顺序保存在堆里：堆顶到期时检查，如果期间收到过心跳就按新的截止时间放回，否则玩家断线，
+    在这个线程里调用on_heart_beat_lost
+    """
+
+    def __init__(self, heart_beat_timeout: float,
+                 on_heart_beat_lost: Callable[[Player.Player], None]) -> None:
+        super().__init__(name="HeartBeatSupervisor", daemon=True)
+        self.heart_beat_timeout: float = heart_beat_timeout
+        self.on_heart_beat_lost: Callable[[Player.Player], None] = on_heart_beat_lost
+
+        self.selector: selectors.BaseSelector = selectors.DefaultSelector()
+        # (deadline, sequence, watched), the sequence breaks ties so WatchedHeartBeat is never compared
+        # （截止时间，序号，被监视的连接），序号用于打破平局，避免比较WatchedHeartBeat
+        self.deadline_heap: list[tuple[float, int, WatchedHeartBeat]] = []
+        self.sequence: itertools.count = itertools.count()
+
+        # connections handed over by other threads, registered by the supervisor thread itself
+        # 其他线程交来的连接，由监视线程自己注册
+        self.new_heart_beats: list[WatchedHeartBeat] = []
+        self.new_heart_beats_lock: threading.Lock = threading.Lock()
+
+        # writing to wakeup_sender interrupts select
+        # 向wakeup_sender写数据可以打断select
+        self.wakeup_receiver, self.wakeup_sender = socket.socketpair()
+        self.wakeup_receiver.setblocking(False)
+        self.wakeup_sender.setblocking(False)
+        self.selector.register(self.wakeup_receiver, selectors.EVENT_READ, None)
+
+    def watch(self, player: Player.Player, heart_beat_channel: MessageFraming.FramedSocket) -> None:
+        """
+        Hand over the heart beat connection of the player, thread safe
+        :param player: the player
+        :param heart_beat_channel: the framed heart beat socket, the header is already received
+        :return: None
+        """
+        with self.new_heart_beats_lock:
+            self.new_heart_beats.append(WatchedHeartBeat(player, heart_beat_channel))
+        self.wake_up()
+
+    def wake_up(self) -> None:
+        try:
+            self.wakeup_sender.send(b"\0")
+        except BlockingIOError:
+            # already woken up
+            pass
+
+    def run(self) -> None:
+        while True:
+            self.register_new_heart_beats()
+
+            # sleep until the earliest deadline, or until a socket is ready
+            # 睡到最早的截止时间，或者有套接字就绪
+            timeout: float | None = None
+            if self.deadline_heap:
+                timeout = max(0.0, self.deadline_heap[0][0] - time.monotonic())
+
+            for key, events in self.selector.select(timeout):
+                watched: WatchedHeartBeat | None = key.data
+                if watched is None:
+                    self.drain_wakeup()
+                    continue
+                try:
+                    if events & selectors.EVENT_READ:
+                        self.receive_heart_beats(watched)
+                    if events & selectors.EVENT_WRITE or watched.outgoing:
+                        self.send_responses(watched)
+                except OSError:
+                    # broken connection, lost now instead of at the deadline
+                    # 连接断开，立即判定断线，而不是等到截止时间
+                    self.lose(watched)
+
+            self.expire_deadlines()
+
+    def register_new_heart_beats(self) -> None:
+        with self.new_heart_beats_lock:
+            new_heart_beats, self.new_heart_beats = self.new_heart_beats, []
+
+        for watched in new_heart_beats:
+            heart_beat_socket: socket.socket = watched.heart_beat_channel.socket
+            try:
+                heart_beat_socket.setblocking(False)
+                self.register_heart_beat(heart_beat_socket, watched)
+            except (ValueError, OSError):
+                # closed before it was registered, e.g. the player already left
+                # 注册之前已经关闭，例如玩家已经离开
+                self.lose(watched)
+                continue
+            watched.last_seen = time.monotonic()
+            heapq.heappush(self.deadline_heap,
+                           (watched.last_seen + self.heart_beat_timeout, next(self.sequence), watched))
+
+    def register_heart_beat(self, heart_beat_socket: socket.socket, watched: WatchedHeartBeat) -> None:
+        """
+        Register the socket, a socket closed by another thread (e.g. GameServer.disconnect_player) keeps its key
+        until its deadline, if the new socket got its file descriptor the stale one is forgotten now.
+        Its player is not lost again, it was disconnected when the socket was closed,
+        and its last room may already hold a new game
+        注册套接字，被其他线程关闭的套接字（例如GameServer.disconnect_player）在截止时间之前保留它的键，
+        如果新套接字拿到了它的文件描述符，旧的现在就被忘记。
+        它的玩家不再次判定断线，关闭套接字时已经断开，它最后的房间里可能已经有新的游戏
+        """
+        try:
+            self.selector.register(heart_beat_socket, selectors.EVENT_READ, watched)
+        except KeyError:
+            stale_key: selectors.SelectorKey = self.selector.get_map()[heart_beat_socket.fileno()]
+            stale_key.data.closed = True
+            self.selector.unregister(stale_key.fileobj)
+            self.selector.register(heart_beat_socket, selectors.EVENT_READ, watched)
+
+    def drain_wakeup(self) -> None:
+        try:
+            while self.wakeup_receiver.recv(4096):
+                pass
+        except BlockingIOError:
+            pass
+
+    def receive_heart_beats(self, watched: WatchedHeartBeat) -> None:
+        """
+        Read every heart beat package that has arrived, answer each of them
+        读取所有已到达的心跳包，逐个回复
+        """
+        heart_beat_channel: MessageFraming.FramedSocket = watched.heart_beat_channel
+        try:
+            while True:
+                heart_beat_channel.receive_into_decoder()
+        except BlockingIOError:
+            pass
+        watched.last_seen = heart_beat_channel.last_receive_time
+
+        while (frame := heart_beat_channel.decoder.next_frame()) is not None:
+            frame_kind, _ = frame
+            if frame_kind == MessageFraming.FRAME_KIND_MESSAGE:
+                watched.outgoing += heart_beat_channel.wire_bytes(HEART_BEAT_RESPONSE_FRAME)
+
+    def send_responses(self, watched: WatchedHeartBeat) -> None:
+        """
+        Send the pending responses without blocking, wait for EVENT_WRITE if the kernel buffer is full
+        不阻塞地发送待发送的回复，内核缓冲区满时等待可写事件
+        """
+        heart_beat_socket: socket.socket = watched.heart_beat_channel.socket
+        try:
+            while watched.outgoing:
+                sent_size: int = heart_beat_socket.send(watched.outgoing)
+                del watched.outgoing[:sent_size]
+        except BlockingIOError:
+            pass
+
+        events: int = selectors.EVENT_READ | (selectors.EVENT_WRITE if watched.outgoing else 0)
+        if self.selector.get_key(heart_beat_socket).events != events:
+            self.selector.modify(heart_beat_socket, events, watched)
+
+    def expire_deadlines(self) -> None:
+        now: float = time.monotonic()
+        while self.deadline_heap and self.deadline_heap[0][0] <= now:
+            _, _, watched = heapq.heappop(self.deadline_heap)
+            if watched.closed:
+                continue
+
+            deadline: float = watched.last_seen + self.heart_beat_timeout
+            if deadline > now:
+                # seen in between, check again at the new deadline
+                # 期间收到过心跳，到新的截止时间再检查
+                heapq.heappush(self.deadline_heap, (deadline, next(self.sequence), watched))
+            else:
+                self.lose(watched)
+
+    def lose(self, watched: WatchedHeartBeat) -> None:
+        """
+        The heart beat of the player is lost, stop watching and call the cleanup
+        玩家的心跳丢失，停止监视并调用清理
+        """
+        if watched.closed:
+            return
+        watched.closed = True
+
+        try:
+            self.selector.unregister(watched.heart_beat_channel.socket)
+        except (KeyError, ValueError):
+            pass
+
+        print("Heart Beat Lost", watched.player.player_name)
+        try:
+            self.on_heart_beat_lost(watched.player)
+        except Exception as e:
+            print("Heart Beat Cleanup Error", repr(e), watched.player.player_name)
+        watched.heart_beat_channel.close()
+
+    def watched_number(self) -> int:
+        """
+        :return: the number of heart beat connections being watched
+        """
+        return len(self.selector.get_map()) - 1
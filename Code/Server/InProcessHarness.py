@@ -0,0 +1,95 @@
+from __future__ import annotations
+
+import itertools
+import socket
+import threading
+import time
+
+import GameServer
+import SocketProfile
+
+# how the clients reach an in-process server
+# 客户端如何连接进程内的服务器
+# one end of socket.socketpair() is handed to the server, no TCP, no listening socket, no port
+# socket.socketpair()的一端交给服务器，没有TCP、没有监听套接字、没有端口
+SOCKETPAIR_TRANSPORT: str = "socketpair"
+# a TCP connection to the listening socket on the loopback, the same as a real client
+# 通过本机回环连接到监听套接字的TCP连接，与真实客户端相同
+TCP_TRANSPORT: str = "tcp"
+TRANSPORTS: tuple[str, ...] = (SOCKETPAIR_TRANSPORT, TCP_TRANSPORT)
+
+
+class InProcessServer:
+    """
+    A game server of either engine running in this process, the clients of the same process connect to it
+    over socket.socketpair() or over TCP, e.g. ServerBenchmark.ScriptedClient(..., connection_factory=server.connect)
+
+    The server logic (sessions, game hall, rooms, games) is the same as in a server process, only the connections
+    do not go through TCP, so a change of the server can be timed without the loopback and the process boundary.
+    The clients and the server share the interpreter, the timings compare server changes, they are not what
+    a client over the network sees.
+
+    在本进程中运行的任一引擎的游戏服务器，同一进程的客户端通过socket.socketpair()或TCP连接它，
+    例如ServerBenchmark.ScriptedClient(..., connection_factory=server.connect)
+    服务器逻辑（会话、游戏大厅、房间、游戏）与服务器进程中的相同，只是连接不经过TCP，
+    所以可以在没有本机回环和进程边界的情况下测量服务器的改动。
+    客户端和服务器共用解释器，这些耗时用于比较服务器的改动，不是网络上的客户端看到的耗时
+    """
+
+    def __init__(self, server_engine: str, listening_port: int, user_info_file_path: str,
+                 transport: str = SOCKETPAIR_TRANSPORT, **server_options) -> None:
+        """
+        :param server_engine: one of GameServer.SERVER_ENGINES
+        :param listening_port: a free port, the server listens on it with either transport
+        :param user_info_file_path: path to a UserInfo.txt file
+        :param transport: one of TRANSPORTS
+        :param server_options: keyword arguments of GameServer.create_game_server
+        """
+        if transport not in TRANSPORTS:
+            raise ValueError(f"Unknown transport {transport}, should be one of {TRANSPORTS}")
+        self.transport: str = transport
+        self.listening_port: int = listening_port
+        self.game_server = GameServer.create_game_server(server_engine, listening_port, user_info_file_path,
+                                                         **server_options)
+        self.connection_numbers: itertools.count = itertools.count()
+
+    def start(self, start_timeout: float = 10) -> None:
+        """
+        Run the server on a daemon thread, return when it is accepting connections
+        在守护线程上运行服务器，直到可以连接才返回
+        :param start_timeout: seconds to wait for it
+        :return: None
+        """
+        threading.Thread(target=self.game_server.start, name="InProcessServer", daemon=True).start()
+        deadline: float = time.monotonic() + start_timeout
+        while time.monotonic() < deadline:
+            try:
+                socket.create_connection(("127.0.0.1", self.listening_port), timeout=1).close()
+            except OSError:
+                time.sleep(0.05)
+            else:
+                # the asyncio engine has its event loop too, the probe connection is an empty session
+                # asyncio引擎的事件循环也已经运行，探测连接是一个空会话
+                return
+        raise RuntimeError("The server did not start")
+
+    def connect(self) -> socket.socket:
+        """
+        Open a connection to the server, any thread
+        打开一个到服务器的连接，任何线程都可以调用
+        :return: the client end, blocking
+        """
+        if self.transport == TCP_TRANSPORT:
+            client_socket: socket.socket = socket.create_connection(("127.0.0.1", self.listening_port))
+            SocketProfile.apply_socket_profile(client_socket, self.game_server.socket_profile)
+            return client_socket
+
+        client_socket, server_socket = socket.socketpair()
+        self.game_server.attach_connection((server_socket, (SOCKETPAIR_TRANSPORT, next(self.connection_numbers))))
+        return client_socket
+
+    def session_stats(self) -> dict[str, int]:
+        """
+        :return: see GameServer.GameServer.session_stats
+        """
+        return self.game_server.session_stats()
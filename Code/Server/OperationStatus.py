@@ -1,4 +1,52 @@
 import dataclasses
+import re
+
+# Protocol versions, negotiated by the login header
+# 协议版本，通过登录头协商
+# v1: "Header:login", the server answers "Received",
+#     the client acknowledges ("Client Received") almost every response
+# v2: "Header:login:v2", the server answers "Received:v2",
+#     no acknowledgement, the server streams the responses
+# A server without v2 answers "Received", then the client falls back to v1
+# 不支持v2的服务器回复"Received"，客户端退回v1
+PROTOCOL_VERSION_1: int = 1
+PROTOCOL_VERSION_2: int = 2
+
+# The login header is "Header:login" followed by ":option" for each option the client asks for,
+# the server answers "Received" followed by ":option" for each option it accepts
+# 登录头是"Header:login"加上客户端请求的每个":选项"，服务器回复"Received"加上它接受的每个":选项"
+LOGIN_HEADER: str = "Header:login"
+LOGIN_HEADER_RECEIVED: str = "Received"
+
+# protocol v2
+LOGIN_OPTION_V2: str = "v2"
+# heart beats are frames on the message socket, instead of a second TCP connection
+# 心跳作为消息套接字上的帧发送，而不是第二条TCP连接
+LOGIN_OPTION_IN_BAND_HEART_BEAT: str = "inband"
+
+
+def encode_login_options(head: str, options: list[str]) -> str:
+    """
+    Encode the login header or its answer
+    :param head: LOGIN_HEADER or LOGIN_HEADER_RECEIVED
+    :param options: the options
+    :return: e.g. Header:login:v2:inband
+    """
+    return ":".join([head, *options])
+
+
+def decode_login_options(head: str, message: str) -> list[str] | None:
+    """
+    Decode the login header or its answer
+    :param head: LOGIN_HEADER or LOGIN_HEADER_RECEIVED
+    :param message: the received message
+    :return: the options, or None if the message is not the login header (answer)
+    """
+    if message == head:
+        return []
+    if message.startswith(head + ":"):
+        return message[len(head) + 1:].split(":")
+    return None
 
 
 @dataclasses.dataclass(init=False, frozen=True)
@@ -8,6 +56,14 @@ class OperationStatus:
 
     #  3001 number_of_all_rooms number_of_players_in_room_1 ... number_of_players_in_room_n
     list_rooms_status: str = "3001"
+    #  "/list first_room_id room_number" answers a page of the rooms
+    #  3002 number_of_all_rooms first_room_id number_of_players_in_room_first ...
+    list_rooms_page: str = "3002"
+    #  "/list since version" answers the rooms changed after the version, all rooms if the version is too old
+    #  3003 version number_of_all_rooms room_id:number_of_players ...
+    list_rooms_changes: str = "3003"
+    #  "/watch" answers every room as 3003, then 3003 batches of changes come as push frames, "/unwatch" stops them
+    watch_stopped: str = "3004 Stopped watching the rooms"
     wait: str = "3011 Wait"
     game_started: str = "3012 Game started. Please guess true or false"
     room_full: str = "3013 The room is full"
@@ -26,6 +82,44 @@ class OperationStatus:
         pass
 
 
+# the status code of a message, four digits at the start of its last line
+# 消息的状态码，位于最后一行开头的四位数字
+STATUS_CODE_PATTERN: re.Pattern = re.compile(r"^(?P<code>\d{4})(?: (?P<arguments>.*))?$")
+
+
+@dataclasses.dataclass(frozen=True)
+class StatusMessage:
+    """
+    A message of the server, parsed
+    "3001 2 1 0" is code 3001 with the arguments ("2", "1", "0"),
+    "Another Gamer quit the game\n3024 You are the winner" is code 3024,
+    a message without a status code, e.g. "STEP1.1.0.0 Server Ready", has the code None
+    服务器的消息，已解析
+    """
+    message: str
+    code: int | None
+    arguments: tuple[str, ...]
+
+    @classmethod
+    def parse(cls, message: str) -> "StatusMessage":
+        """
+        :param message: a message of the server
+        :return: the parsed message
+        """
+        matched_status: re.Match | None = STATUS_CODE_PATTERN.match(message.rsplit("\n", 1)[-1])
+        if matched_status is None:
+            return cls(message, None, ())
+        arguments: str | None = matched_status.group("arguments")
+        return cls(message, int(matched_status.group("code")), tuple(arguments.split()) if arguments else ())
+
+    def is_status(self, status: str) -> bool:
+        """
+        :param status: e.g. OperationStatus.wait
+        :return: whether this is the message
+        """
+        return self.message == status
+
+
 class UnrecognizedMessageError(Exception):
     pass
 
@@ -0,0 +1,392 @@
+from __future__ import annotations
+
+import collections
+import select
+import selectors
+import socket
+import threading
+import time
+from typing import Callable
+
+import Player
+
+# send without waiting, a full kernel buffer raises BlockingIOError instead of blocking the sending thread
+# Windows has no MSG_DONTWAIT, there a send to a blocking socket may still block
+# 不等待地发送，内核缓冲区满时抛出BlockingIOError，而不是阻塞发送线程；Windows没有MSG_DONTWAIT，阻塞套接字上的发送仍可能阻塞
+SEND_FLAGS: int = getattr(socket, "MSG_DONTWAIT", 0)
+
+# why a client was evicted
+# 客户端被驱逐的原因
+EVICTED_FOR_OVERFLOW: str = "overflow"
+EVICTED_FOR_STALL: str = "stall"
+# the connection broke while writing, not an eviction, the readers of the connection clean up
+# 写入时连接断开，不算驱逐，由连接的读取者清理
+CLOSED_FOR_ERROR: str = "error"
+
+
+class ClientEvictedError(ConnectionError):
+    pass
+
+
+class OutboundStats:
+    """
+    The monitoring counters of the outbound queues, both engines
+    出站队列的监控计数，两个引擎共用
+    """
+
+    def __init__(self) -> None:
+        self.eviction_numbers: dict[str, int] = {EVICTED_FOR_OVERFLOW: 0, EVICTED_FOR_STALL: 0}
+        # the most bytes ever queued for one connection
+        # 一个连接曾经排队的最多字节数
+        self.peak_queued_bytes: int = 0
+        self.lock: threading.Lock = threading.Lock()
+
+    def count_eviction(self, reason: str) -> None:
+        with self.lock:
+            self.eviction_numbers[reason] += 1
+
+    def note_queued_bytes(self, queued_bytes: int) -> None:
+        if queued_bytes > self.peak_queued_bytes:
+            with self.lock:
+                self.peak_queued_bytes = max(self.peak_queued_bytes, queued_bytes)
+
+    def snapshot(self, queued_sizes: list[int], high_watermark: int) -> dict[str, int]:
+        """
+        :param queued_sizes: the bytes queued for each connection with something queued
+        :param high_watermark: a connection above it is backed up
+        :return: the counters, for monitoring
+        """
+        with self.lock:
+            return {
+                "pending_connections": len(queued_sizes),
+                "backed_up_connections": sum(queued_size > high_watermark for queued_size in queued_sizes),
+                "queued_bytes": sum(queued_sizes),
+                "max_queued_bytes": max(queued_sizes, default=0),
+                "peak_queued_bytes": self.peak_queued_bytes,
+                "evicted_for_overflow": self.eviction_numbers[EVICTED_FOR_OVERFLOW],
+                "evicted_for_stall": self.eviction_numbers[EVICTED_FOR_STALL],
+            }
+
+
+class OutboundQueue:
+    """
+    The bounded outbound queue of one connection, thread engine
+
+    A frame is sent at once without blocking if nothing is queued before it, what the kernel does not take
+    is queued and written by the OutboundWriter when the socket is writable. No sending thread ever waits
+    for a slow client, so one full receive window cannot stall a game worker or the room status pushes.
+    Above the high watermark the connection is backed up, pushes skip it until it drains to the low watermark.
+
+    一个连接的有界出站队列，多线程引擎使用
+    如果前面没有排队的数据，帧立刻不阻塞地发送，内核没有接收的部分排队，在套接字可写时由OutboundWriter写出。
+    发送线程从不等待慢客户端，所以一个满的接收窗口不会卡住游戏工作线程或房间状态推送。
+    超过高水位时连接处于积压状态，推送跳过它，直到它降到低水位
+    """
+
+    def __init__(self, outbound_socket: socket.socket, outbound_writer: OutboundWriter) -> None:
+        self.socket: socket.socket = outbound_socket
+        self.outbound_writer: OutboundWriter = outbound_writer
+        # the player of the connection after the login, disconnected on eviction
+        # 登录后连接的玩家，被驱逐时断开
+        self.player: Player.Player | None = None
+
+        self.frames: collections.deque[bytes | memoryview] = collections.deque()
+        self.queued_bytes: int = 0
+        self.backed_up: bool = False
+        # the last time bytes were written, or the queue stopped being empty
+        # 最后一次写出数据，或者队列不再为空的时间
+        self.last_progress_time: float = time.monotonic()
+        # None while the connection is open
+        # 连接打开时为None
+        self.closed_reason: str | None = None
+        # one sender or the writer at a time, the frames never interleave
+        # 同一时间只有一个发送者或写入线程，帧不会交错
+        self.lock: threading.Lock = threading.Lock()
+        # asks whether a socket with a timeout is writable, such a socket waits in send even with MSG_DONTWAIT
+        # 询问有超时的套接字是否可写，这种套接字即使使用MSG_DONTWAIT也会在send里等待
+        self.writable_poll: select.poll | None = None
+
+    def send(self, frame: bytes) -> None:
+        """
+        Send or queue one frame, never blocking, used as FramedSocket.outbound
+        :param frame: returned by MessageFraming.encode_frame
+        :return: None
+        """
+        with self.lock:
+            if self.closed_reason is not None:
+                raise ClientEvictedError(f"The connection is closed, {self.closed_reason}")
+
+            was_empty: bool = not self.frames
+            if was_empty:
+                sent_size: int = self.send_without_blocking(frame)
+                if sent_size == len(frame):
+                    return
+                frame = memoryview(frame)[sent_size:]
+                self.last_progress_time = time.monotonic()
+
+            self.frames.append(frame)
+            self.queued_bytes += len(frame)
+            queued_bytes: int = self.queued_bytes
+            if queued_bytes > self.outbound_writer.high_watermark:
+                self.backed_up = True
+
+        self.outbound_writer.outbound_stats.note_queued_bytes(queued_bytes)
+        if queued_bytes > self.outbound_writer.queue_limit:
+            if self.close(EVICTED_FOR_OVERFLOW):
+                self.outbound_writer.evict_later(self)
+            raise ClientEvictedError(f"The outbound queue is over {self.outbound_writer.queue_limit} bytes")
+        if was_empty:
+            self.outbound_writer.watch(self)
+
+    def send_without_blocking(self, data: bytes | memoryview) -> int:
+        """
+        :return: the bytes the kernel took, 0 if its buffer is full
+        """
+        if self.socket.gettimeout() is not None and not self.writable_now():
+            return 0
+        try:
+            return self.socket.send(data, SEND_FLAGS)
+        except BlockingIOError:
+            return 0
+
+    def writable_now(self) -> bool:
+        if not hasattr(select, "poll"):
+            return bool(select.select([], [self.socket], [], 0)[1])
+        if self.writable_poll is None:
+            self.writable_poll = select.poll()
+            self.writable_poll.register(self.socket, select.POLLOUT)
+        return bool(self.writable_poll.poll(0))
+
+    def flush(self) -> bool:
+        """
+        Write the queued frames until the kernel buffer is full, called by the writer thread
+        :return: whether the queue is empty
+        """
+        with self.lock:
+            while self.frames:
+                frame: bytes | memoryview = self.frames[0]
+                sent_size: int = self.send_without_blocking(frame)
+                if sent_size == 0:
+                    break
+                self.last_progress_time = time.monotonic()
+                self.queued_bytes -= sent_size
+                if sent_size < len(frame):
+                    self.frames[0] = memoryview(frame)[sent_size:]
+                    break
+                self.frames.popleft()
+
+            if self.backed_up and self.queued_bytes <= self.outbound_writer.low_watermark:
+                self.backed_up = False
+            return not self.frames
+
+    def close(self, reason: str) -> bool:
+        """
+        Drop the queued frames, every later send raises ClientEvictedError
+        :param reason: EVICTED_FOR_OVERFLOW, EVICTED_FOR_STALL or CLOSED_FOR_ERROR
+        :return: whether it was open until now
+        """
+        with self.lock:
+            if self.closed_reason is not None:
+                return False
+            self.closed_reason = reason
+            self.frames.clear()
+            self.queued_bytes = 0
+            self.backed_up = False
+            return True
+
+
+class OutboundWriter(threading.Thread):
+    """
+    One thread writing the backed up outbound queues of all connections, thread engine
+
+    Only the queues holding frames the kernel did not take are registered in the selector, an idle server
+    does not wake up. A client is evicted when its queue grows over queue_limit, or when nothing of its queue
+    could be written for write_timeout seconds; on_evicted is called from this thread.
+
+    一个线程写出所有连接积压的出站队列，多线程引擎使用
+    只有持有内核没有接收的帧的队列才注册到选择器里，空闲的服务器不会被唤醒。
+    队列超过queue_limit，或者write_timeout秒内一点都写不出去时，客户端被驱逐，在这个线程里调用on_evicted
+    """
+
+    def __init__(self, high_watermark: int, low_watermark: int, queue_limit: int, write_timeout: float,
+                 on_evicted: Callable[[OutboundQueue], None]) -> None:
+        """
+        :param high_watermark: bytes queued above which a connection is backed up
+        :param low_watermark: bytes queued at or below which a backed up connection is not any more
+        :param queue_limit: bytes queued above which the client is evicted at once
+        :param write_timeout: seconds a queue may make no progress before the client is evicted
+        :param on_evicted: called on this thread with the queue of an evicted client, e.g. GameServer.evict_client
+        """
+        super().__init__(name="OutboundWriter", daemon=True)
+        if not 0 <= low_watermark <= high_watermark <= queue_limit:
+            raise ValueError(f"Expected 0 <= low watermark ({low_watermark}) <= high watermark ({high_watermark}) "
+                             f"<= queue limit ({queue_limit})")
+        self.high_watermark: int = high_watermark
+        self.low_watermark: int = low_watermark
+        self.queue_limit: int = queue_limit
+        self.write_timeout: float = write_timeout
+        # a stalled client is evicted at most a quarter of write_timeout late
+        # 停滞的客户端最多晚write_timeout的四分之一被驱逐
+        self.check_interval: float = write_timeout / 4
+        self.on_evicted: Callable[[OutboundQueue], None] = on_evicted
+        self.outbound_stats: OutboundStats = OutboundStats()
+
+        self.selector: selectors.BaseSelector = selectors.DefaultSelector()
+        # the queues registered in the selector, changed by this thread only
+        # 注册在选择器里的队列，只由这个线程修改
+        self.pending_queues: set[OutboundQueue] = set()
+        self.pending_queues_lock: threading.Lock = threading.Lock()
+        self.next_check_time: float = time.monotonic()
+
+        # work handed over by other threads, done by this thread, the selector is only touched here
+        # 其他线程交来的工作，由这个线程完成，选择器只在这里使用
+        self.writer_calls: list[Callable[[], None]] = []
+        self.writer_calls_lock: threading.Lock = threading.Lock()
+
+        # writing to wakeup_sender interrupts select
+        # 向wakeup_sender写数据可以打断select
+        self.wakeup_receiver, self.wakeup_sender = socket.socketpair()
+        self.wakeup_receiver.setblocking(False)
+        self.wakeup_sender.setblocking(False)
+        self.selector.register(self.wakeup_receiver, selectors.EVENT_READ, None)
+
+    # —————————————————————————— called by any thread —————————————————————————— #
+
+    def create_queue(self, outbound_socket: socket.socket) -> OutboundQueue:
+        return OutboundQueue(outbound_socket, self)
+
+    def watch(self, outbound_queue: OutboundQueue) -> None:
+        """
+        Write the queue when its socket is writable, it has frames the kernel did not take
+        :param outbound_queue: the queue
+        :return: None
+        """
+        self.call_in_writer(lambda: self.start_writing(outbound_queue))
+
+    def evict_later(self, outbound_queue: OutboundQueue) -> None:
+        """
+        :param outbound_queue: the queue closed for overflow by its sender
+        """
+        self.call_in_writer(lambda: self.finish_eviction(outbound_queue))
+
+    def stats(self) -> dict[str, int]:
+        """
+        The queue depth and the eviction counts, for monitoring
+        队列深度和驱逐次数，用于监控
+        :return: see OutboundStats.snapshot
+        """
+        with self.pending_queues_lock:
+            queued_sizes: list[int] = [outbound_queue.queued_bytes for outbound_queue in self.pending_queues]
+        return self.outbound_stats.snapshot(queued_sizes, self.high_watermark)
+
+    def call_in_writer(self, writer_call: Callable[[], None]) -> None:
+        with self.writer_calls_lock:
+            self.writer_calls.append(writer_call)
+        self.wake_up()
+
+    def wake_up(self) -> None:
+        try:
+            self.wakeup_sender.send(b"\0")
+        except BlockingIOError:
+            # already woken up
+            pass
+
+    # —————————————————————————— the writer thread —————————————————————————— #
+
+    def run(self) -> None:
+        while True:
+            self.run_writer_calls()
+
+            # nothing queued, nothing can stall
+            # 没有排队的数据，就不会停滞
+            timeout: float | None = None
+            if self.pending_queues:
+                timeout = max(0.0, self.next_check_time - time.monotonic())
+
+            for key, _ in self.selector.select(timeout):
+                if key.data is None:
+                    self.drain_wakeup()
+                    continue
+                self.write_queue(key.data)
+
+            now: float = time.monotonic()
+            if now >= self.next_check_time:
+                self.next_check_time = now + self.check_interval
+                self.evict_stalled_queues(now)
+
+    def run_writer_calls(self) -> None:
+        with self.writer_calls_lock:
+            writer_calls, self.writer_calls = self.writer_calls, []
+        for writer_call in writer_calls:
+            writer_call()
+
+    def drain_wakeup(self) -> None:
+        try:
+            while self.wakeup_receiver.recv(4096):
+                pass
+        except BlockingIOError:
+            pass
+
+    def start_writing(self, outbound_queue: OutboundQueue) -> None:
+        if outbound_queue.closed_reason is not None:
+            return
+        outbound_socket: socket.socket = outbound_queue.socket
+        try:
+            try:
+                key: selectors.SelectorKey = self.selector.get_key(outbound_socket)
+            except KeyError:
+                self.selector.register(outbound_socket, selectors.EVENT_WRITE, outbound_queue)
+            else:
+                if key.fileobj is outbound_socket:
+                    return
+                # the descriptor of a closed socket is reused, drop the stale registration
+                # 已关闭套接字的描述符被复用，删除过期的注册
+                self.stop_writing(key.data)
+                self.selector.register(outbound_socket, selectors.EVENT_WRITE, outbound_queue)
+        except (ValueError, OSError):
+            # closed before it was registered, its session cleans up
+            # 注册之前已经关闭，由它的会话清理
+            outbound_queue.close(CLOSED_FOR_ERROR)
+            return
+        with self.pending_queues_lock:
+            self.pending_queues.add(outbound_queue)
+
+    def stop_writing(self, outbound_queue: OutboundQueue) -> None:
+        with self.pending_queues_lock:
+            self.pending_queues.discard(outbound_queue)
+        try:
+            self.selector.unregister(outbound_queue.socket)
+        except (KeyError, ValueError):
+            pass
+
+    def write_queue(self, outbound_queue: OutboundQueue) -> None:
+        try:
+            if not outbound_queue.flush():
+                return
+        except OSError:
+            # the connection is broken, the session or the game reading it finds out by itself
+            # 连接已断开，读取它的会话或游戏自己会发现
+            outbound_queue.close(CLOSED_FOR_ERROR)
+        self.stop_writing(outbound_queue)
+
+    def evict_stalled_queues(self, now: float) -> None:
+        with self.pending_queues_lock:
+            pending_queues: list[OutboundQueue] = list(self.pending_queues)
+
+        for outbound_queue in pending_queues:
+            if outbound_queue.socket.fileno() < 0:
+                # closed by its session, e.g. the player quit
+                # 被它的会话关闭，例如玩家退出
+                outbound_queue.close(CLOSED_FOR_ERROR)
+                self.stop_writing(outbound_queue)
+            elif now - outbound_queue.last_progress_time > self.write_timeout:
+                if outbound_queue.close(EVICTED_FOR_STALL):
+                    self.finish_eviction(outbound_queue)
+
+    def finish_eviction(self, outbound_queue: OutboundQueue) -> None:
+        self.stop_writing(outbound_queue)
+        self.outbound_stats.count_eviction(outbound_queue.closed_reason)
+        try:
+            self.on_evicted(outbound_queue)
+        except Exception as e:
+            print("Eviction Error", repr(e))
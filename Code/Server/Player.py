@@ -1,7 +1,11 @@
+from __future__ import annotations
+
 import dataclasses
 import socket
 import threading
 import GameServer
+import MessageFraming
+import OperationStatus
 
 
 class Player:
@@ -26,7 +30,9 @@ class Player:
                  player_message_socket_channel: socket.socket,
                  player_thread: GameServer.GameServerThreadEachPlayer,
                  player_hear_beat_socket_channel: socket.socket = None,
-                 player_status: int = 0
+                 player_status: int = 0,
+                 player_message_channel: MessageFraming.FramedSocket = None,
+                 protocol_version: int = OperationStatus.PROTOCOL_VERSION_1
                  ):
 
         self.player_name: str = player_name
@@ -35,6 +41,15 @@ class Player:
         self.player_thread: GameServer.GameServerThreadEachPlayer = player_thread
         self.player_status: int = player_status
         self.player_heart_beat_socket_channel: socket.socket = player_hear_beat_socket_channel
+        # the framed channel on the message socket, all messages to the player go through it
+        # 消息套接字上的分帧通道，发给玩家的消息都通过它
+        self.player_channel: MessageFraming.FramedSocket = player_message_channel
+        # v2 players do not acknowledge the messages of the game
+        # v2玩家不会确认游戏消息
+        self.protocol_version: int = protocol_version
+        # messages of a forfeited game still on the way, e.g. the late guess, dropped in the game hall
+        # 已判负的游戏还在路上的消息，例如迟到的猜测，在游戏大厅里丢弃
+        self.late_message_number: int = 0
 
 
         self.game_room: GameServer.GameRoom = None
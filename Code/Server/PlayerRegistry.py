@@ -0,0 +1,143 @@
+from __future__ import annotations
+
+import threading
+
+import Player
+
+# the number of lock stripes, players are spread over the stripes by hash
+# 锁分段的数量，玩家按哈希分布到各个分段
+DEFAULT_STRIPE_NUMBER: int = 16
+
+
+class RegistryStripe:
+    """
+    One stripe of the registry, its own lock and its own part of the indexes
+    注册表的一个分段，有自己的锁和自己那部分索引
+    """
+
+    def __init__(self) -> None:
+        self.lock: threading.Lock = threading.Lock()
+        # username -> the players logged in with it, in login order, usually only one
+        # 用户名 -> 用这个用户名登录的玩家，按登录顺序，通常只有一个
+        self.players_by_username: dict[str, list[Player.Player]] = {}
+        # message socket or heart beat socket -> player
+        # 消息套接字或心跳套接字 -> 玩家
+        self.players_by_socket: dict[object, Player.Player] = {}
+        self.player_number: int = 0
+
+
+class PlayerRegistry:
+    """
+    The logged in players of the game hall, thread safe
+    Lookups by username and by socket are dict lookups, O(1) instead of a scan of the player list.
+    The indexes are split into stripes, each with its own lock, so threads working on different players
+    rarely wait for each other. Iteration works on a snapshot, never under a lock.
+
+    游戏大厅里已登录的玩家，线程安全
+    按用户名和按套接字查找都是字典查找，O(1)，而不是扫描玩家列表
+    索引分成多个分段，每个分段有自己的锁，处理不同玩家的线程很少互相等待；遍历使用快照，不持有锁
+    """
+
+    def __init__(self, stripe_number: int = DEFAULT_STRIPE_NUMBER) -> None:
+        self.stripes: list[RegistryStripe] = [RegistryStripe() for _ in range(stripe_number)]
+
+    def stripe_of(self, key: object) -> RegistryStripe:
+        return self.stripes[hash(key) % len(self.stripes)]
+
+    def add(self, player: Player.Player) -> bool:
+        """
+        Add the player, indexed by username and by its sockets
+        :param player: the player
+        :return: False if the player is already registered
+        """
+        username_stripe: RegistryStripe = self.stripe_of(player.player_name)
+        with username_stripe.lock:
+            username_players: list[Player.Player] = username_stripe.players_by_username.setdefault(
+                player.player_name, [])
+            if player in username_players:
+                return False
+            username_players.append(player)
+            username_stripe.player_number += 1
+
+        for player_socket in (player.player_socket, player.player_heart_beat_socket_channel):
+            if player_socket is not None:
+                self.index_socket(player_socket, player)
+        return True
+
+    def remove(self, player: Player.Player) -> bool:
+        """
+        Remove the player from every index
+        :param player: the player
+        :return: False if the player is not registered
+        """
+        username_stripe: RegistryStripe = self.stripe_of(player.player_name)
+        with username_stripe.lock:
+            username_players: list[Player.Player] | None = username_stripe.players_by_username.get(player.player_name)
+            if username_players is None or player not in username_players:
+                return False
+            username_players.remove(player)
+            username_stripe.player_number -= 1
+            if not username_players:
+                del username_stripe.players_by_username[player.player_name]
+
+        for player_socket in (player.player_socket, player.player_heart_beat_socket_channel):
+            if player_socket is not None:
+                self.unindex_socket(player_socket, player)
+        return True
+
+    def index_socket(self, player_socket: object, player: Player.Player) -> None:
+        """
+        Make the player findable by one more socket, e.g. the heart beat socket paired after the login
+        :param player_socket: the socket
+        :param player: the player
+        :return: None
+        """
+        socket_stripe: RegistryStripe = self.stripe_of(player_socket)
+        with socket_stripe.lock:
+            socket_stripe.players_by_socket[player_socket] = player
+
+    def unindex_socket(self, player_socket: object, player: Player.Player) -> None:
+        socket_stripe: RegistryStripe = self.stripe_of(player_socket)
+        with socket_stripe.lock:
+            if socket_stripe.players_by_socket.get(player_socket) is player:
+                del socket_stripe.players_by_socket[player_socket]
+
+    def get_by_username(self, username: str) -> Player.Player | None:
+        """
+        :param username: the username
+        :return: the first player logged in with the username, None if nobody
+        """
+        username_stripe: RegistryStripe = self.stripe_of(username)
+        with username_stripe.lock:
+            username_players: list[Player.Player] | None = username_stripe.players_by_username.get(username)
+            return username_players[0] if username_players else None
+
+    def get_by_socket(self, player_socket: object) -> Player.Player | None:
+        """
+        :param player_socket: the message socket or the heart beat socket of a player
+        :return: the player, None if the socket belongs to nobody
+        """
+        socket_stripe: RegistryStripe = self.stripe_of(player_socket)
+        with socket_stripe.lock:
+            return socket_stripe.players_by_socket.get(player_socket)
+
+    def __contains__(self, player: Player.Player) -> bool:
+        username_stripe: RegistryStripe = self.stripe_of(player.player_name)
+        with username_stripe.lock:
+            return player in username_stripe.players_by_username.get(player.player_name, ())
+
+    def __len__(self) -> int:
+        return sum(stripe.player_number for stripe in self.stripes)
+
+    def snapshot(self) -> list[Player.Player]:
+        """
+        A copy of all players for broadcasts, each stripe is locked only while it is copied
+        所有玩家的副本，用于广播，每个分段只在复制时加锁
+        :return: the players
+        """
+        players: list[Player.Player] = []
+        for stripe in self.stripes:
+            with stripe.lock:
+                for username_players in stripe.players_by_username.values():
+                    players.extend(username_players)
+        return players
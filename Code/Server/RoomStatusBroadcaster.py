@@ -0,0 +1,134 @@
+from __future__ import annotations
+
+import threading
+import time
+from typing import Callable
+
+import GameHall
+import MessageFraming
+import Player
+
+
+class RoomStatusWatcher:
+    """
+    One player watching the room status, /watch
+    一个正在关注房间状态的玩家，/watch
+    """
+
+    def __init__(self, send_frame: Callable[[bytes], None], version: int,
+                 backed_up: Callable[[], bool] | None = None) -> None:
+        # sends an encoded frame to the player, never waits for an acknowledgement
+        # 向玩家发送编码好的帧，不等待确认
+        self.send_frame: Callable[[bytes], None] = send_frame
+        # the room status version the player has seen
+        # 玩家已经看到的房间状态版本
+        self.version: int = version
+        # whether the player is behind in reading, None if it is never asked
+        # 玩家是否读取落后，None表示从不询问
+        self.backed_up: Callable[[], bool] | None = backed_up
+
+
+class RoomStatusBroadcaster:
+    """
+    Pushes the room status changes to the players watching them, instead of the players polling /list
+
+    The changes are coalesced: every push_interval seconds one batch "3003 version n room_id:players ..."
+    is pushed, holding every room changed since the version the watcher has seen.
+    The batch is built and encoded once for all watchers at the same version, usually all of them,
+    and sent as a push frame, which the client handles apart from the answers of its commands.
+    A watcher behind in reading is skipped, its next batch holds the changes it missed meanwhile.
+
+    把房间状态变化推送给关注的玩家，而不是让玩家轮询/list
+    变化会被合并：每push_interval秒推送一批"3003 version n room_id:players ..."，包含关注者看到的版本之后变化的所有房间
+    同一版本的所有关注者（通常是全部）共用一次生成和编码的批次，作为推送帧发送，客户端把它和命令的回答分开处理
+    读取落后的关注者被跳过，它的下一批包含期间错过的变化
+    """
+
+    def __init__(self, game_hall: GameHall.GameHall, push_interval: float) -> None:
+        self.game_hall: GameHall.GameHall = game_hall
+        self.push_interval: float = push_interval
+
+        self.watchers: dict[Player.Player, RoomStatusWatcher] = {}
+        self.lock: threading.Lock = threading.Lock()
+
+    def watch(self, player: Player.Player, send_frame: Callable[[bytes], None], version: int,
+              backed_up: Callable[[], bool] | None = None) -> None:
+        """
+        Start pushing the changes to the player
+        Call it after the answer of /watch is sent, so no push arrives before the answer
+        :param player: the player
+        :param send_frame: sends an encoded frame to the player
+        :param version: the version of the answer of /watch, GameHall.room_changes_since(-1)
+        :param backed_up: whether the player is behind in reading, no batch is pushed to it meanwhile
+        :return: None
+        """
+        with self.lock:
+            self.watchers[player] = RoomStatusWatcher(send_frame, version, backed_up)
+
+    def unwatch(self, player: Player.Player) -> bool:
+        """
+        Stop pushing to the player
+        :param player: the player
+        :return: whether the player was watching
+        """
+        with self.lock:
+            return self.watchers.pop(player, None) is not None
+
+    def watcher_number(self) -> int:
+        return len(self.watchers)
+
+    def push_changes(self) -> int:
+        """
+        Push one batch to every watcher behind the current version
+        :return: the number of pushed frames
+        """
+        with self.lock:
+            watchers: list[tuple[Player.Player, RoomStatusWatcher]] = list(self.watchers.items())
+        current_version: int = self.game_hall.room_status_version
+
+        # the version seen by the watchers -> (the version of the batch, the push frame)
+        # 关注者看到的版本 -> （批次的版本，推送帧）
+        batches: dict[int, tuple[int, bytes]] = {}
+        pushed_number: int = 0
+        for player, watcher in watchers:
+            if watcher.version >= current_version:
+                continue
+            if watcher.backed_up is not None and watcher.backed_up():
+                # the batches would only pile up, the next one after it caught up holds the changes
+                # 批次只会越积越多，它赶上之后的下一批包含这些变化
+                continue
+
+            if watcher.version not in batches:
+                version, room_changes = self.game_hall.room_changes_since(watcher.version)
+                batches[watcher.version] = (version,
+                                            MessageFraming.encode_frame(room_changes, MessageFraming.FRAME_KIND_PUSH))
+            version, frame = batches[watcher.version]
+
+            try:
+                watcher.send_frame(frame)
+            except Exception as e:
+                # the connection is lost, the session cleans up the player
+                # 连接已断开，由会话清理玩家
+                print("Room Status Push Error", player.player_name, repr(e))
+                self.unwatch(player)
+                continue
+            watcher.version = version
+            pushed_number += 1
+        return pushed_number
+
+
+class RoomStatusPushThread(threading.Thread):
+    """
+    Pushes the batches of a RoomStatusBroadcaster every push_interval seconds, thread engine
+    每push_interval秒推送一次RoomStatusBroadcaster的批次，多线程引擎使用
+    """
+
+    def __init__(self, room_status_broadcaster: RoomStatusBroadcaster) -> None:
+        super().__init__(name="RoomStatusPushThread", daemon=True)
+        self.room_status_broadcaster: RoomStatusBroadcaster = room_status_broadcaster
+
+    def run(self) -> None:
+        while True:
+            time.sleep(self.room_status_broadcaster.push_interval)
+            if self.room_status_broadcaster.watchers:
+                self.room_status_broadcaster.push_changes()
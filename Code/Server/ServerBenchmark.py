@@ -0,0 +1,2764 @@
+from __future__ import annotations
+
+import argparse
+import concurrent.futures
+import contextlib
+import io
+import json
+import os
+import queue
+import random
+import select
+import selectors
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import types
+from typing import Callable
+
+import BatchResolver
+import GameHall
+import GameRoom
+import GameServer
+import HeartBeatSupervisor
+import InProcessHarness
+import MessageFraming
+import OperationStatus
+import Player
+import SocketProfile
+
+# Benchmarks of the game server, every benchmark prints a JSON summary
+# 游戏服务器的性能测试，每个测试输出JSON格式的结果
+# python3 ServerBenchmark.py connections --sessions 2000
+
+SERVER_DIRECTORY: str = os.path.dirname(os.path.abspath(__file__))
+
+
+def find_free_port() -> int:
+    """
+    Ask the OS for a free TCP port
+    :return: the port
+    """
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as probe_socket:
+        probe_socket.bind(("127.0.0.1", 0))
+        return probe_socket.getsockname()[1]
+
+
+def write_user_info_file(user_number: int) -> str:
+    """
+    Create a temporary UserInfo.txt with user_number distinct accounts
+    the format is bench{i}:password{i}
+    :param user_number: the number of accounts
+    :return: the path of the file
+    """
+    user_info_file = tempfile.NamedTemporaryFile("w", suffix="_UserInfo.txt", delete=False)
+    with user_info_file:
+        for i in range(user_number):
+            user_info_file.write(f"bench{i}:password{i}\n")
+    return user_info_file.name
+
+
+def start_server_process(server_engine: str, listening_port: int, user_info_file_path: str,
+                         session_stats_path: str | None = None, **server_options) -> subprocess.Popen:
+    """
+    Start the game server in another process, return when it is accepting connections
+    在另一个进程中启动服务器，直到可以连接才返回
+    :param session_stats_path: the server writes its session_stats() into this file, see read_session_stats
+    :param server_options: keyword arguments of GameServer.create_game_server
+    """
+    start_code: str = (f"import GameServer; "
+                       f"game_server = GameServer.create_game_server({server_engine!r}, {listening_port}, "
+                       f"{user_info_file_path!r}, **{server_options!r}); ")
+    if session_stats_path is not None:
+        start_code += f"import ServerBenchmark; ServerBenchmark.start_session_stats_writer(game_server, " \
+                      f"{session_stats_path!r}); "
+    start_code += "game_server.start()"
+    server_process: subprocess.Popen = subprocess.Popen([sys.executable, "-c", start_code],
+                                                        cwd=SERVER_DIRECTORY,
+                                                        stdout=subprocess.DEVNULL,
+                                                        stderr=subprocess.DEVNULL)
+    deadline: float = time.monotonic() + 10
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", listening_port), timeout=1).close()
+        except OSError:
+            time.sleep(0.05)
+        else:
+            # the probe connection is an empty session, it ends when it is closed
+            return server_process
+
+    server_process.kill()
+    raise RuntimeError("The server did not start")
+
+
+def start_session_stats_writer(game_server, session_stats_path: str, write_interval: float = 0.2) -> None:
+    """
+    Write the session_stats() of the server into the file every write_interval seconds, in the server process
+    在服务器进程里每write_interval秒把服务器的session_stats()写入文件
+    :param game_server: GameServer or AsyncGameServer.AsyncGameServer
+    """
+    def write_forever() -> None:
+        while True:
+            time.sleep(write_interval)
+            with open(session_stats_path + ".tmp", "w") as session_stats_file:
+                json.dump(game_server.session_stats(), session_stats_file)
+            # the reader never sees half a file
+            # 读取者不会看到写了一半的文件
+            os.replace(session_stats_path + ".tmp", session_stats_path)
+
+    threading.Thread(target=write_forever, daemon=True).start()
+
+
+def read_session_stats(session_stats_path: str) -> dict[str, int]:
+    """
+    Wait for the next session_stats() written by start_session_stats_writer
+    :param session_stats_path: the file
+    :return: see GameServer.GameServer.session_stats
+    """
+    with contextlib.suppress(FileNotFoundError):
+        os.remove(session_stats_path)
+    while not os.path.exists(session_stats_path):
+        time.sleep(0.05)
+    with open(session_stats_path) as session_stats_file:
+        return json.load(session_stats_file)
+
+
+def read_process_status(pid: int) -> dict[str, int]:
+    """
+    Read the resident memory (KB), thread number, open file descriptors
+    and the CPU time used so far of a process from /proc, Linux only
+    :param pid: the process id
+    :return: {"rss_kb": ..., "threads": ..., "file_descriptors": ..., "cpu_seconds": ...}
+    """
+    process_status: dict[str, int] = {}
+    with open(f"/proc/{pid}/status") as status_file:
+        for line in status_file:
+            if line.startswith("VmRSS:"):
+                process_status["rss_kb"] = int(line.split()[1])
+            elif line.startswith("Threads:"):
+                process_status["threads"] = int(line.split()[1])
+    process_status["file_descriptors"] = len(os.listdir(f"/proc/{pid}/fd"))
+    with open(f"/proc/{pid}/stat") as stat_file:
+        # utime and stime, the fields after the command name in parentheses
+        # 用户态和内核态时间，位于括号里的命令名之后
+        stat_fields: list[str] = stat_file.read().rsplit(")", 1)[1].split()
+    process_status["cpu_seconds"] = (int(stat_fields[11]) + int(stat_fields[12])) / os.sysconf("SC_CLK_TCK")
+    return process_status
+
+
+class ScriptedClient:
+    """
+    A non-interactive client speaking the same protocol as GameClient.GameClient
+    非交互的客户端，与GameClient协议相同
+    """
+
+    def __init__(self, server_host: str, server_port: int, username: str, password: str,
+                 protocol_version: int = OperationStatus.PROTOCOL_VERSION_2,
+                 heart_beat_in_band: bool = False,
+                 heart_beat_pump: HeartBeatPump | None = None,
+                 heart_beat_delay: float = 0,
+                 socket_profile: str = SocketProfile.LATENCY_PROFILE,
+                 connection_factory: Callable[[], socket.socket] | None = None):
+        self.server_host: str = server_host
+        self.server_port: int = server_port
+        self.username: str = username
+        self.password: str = password
+        self.protocol_version: int = protocol_version
+        self.heart_beat_in_band: bool = heart_beat_in_band
+        # the pump keeping this client alive, it is added as soon as the server expects heart beats
+        # 保持这个客户端存活的心跳泵，服务器开始等待心跳时加入
+        self.heart_beat_pump: HeartBeatPump | None = heart_beat_pump
+        # seconds between the login result and the heart beat connection, e.g. a slow link
+        # 登录结果和心跳连接之间的秒数，例如慢速链路
+        self.heart_beat_delay: float = heart_beat_delay
+        self.socket_profile: str = socket_profile
+        # opens the connections instead of TCP to server_host:server_port, e.g. InProcessServer.connect
+        # 代替到server_host:server_port的TCP打开连接，例如InProcessServer.connect
+        self.connection_factory: Callable[[], socket.socket] | None = connection_factory
+
+        self.server_channel: MessageFraming.FramedSocket | None = None
+        self.heart_beat_channel: MessageFraming.FramedSocket | None = None
+
+    def connect(self) -> None:
+        self.server_channel = MessageFraming.FramedSocket(self.open_connection())
+        if not self.heart_beat_in_band:
+            self.heart_beat_channel = MessageFraming.FramedSocket(self.open_connection())
+
+    def open_connection(self) -> socket.socket:
+        if self.connection_factory is not None:
+            return self.connection_factory()
+        connection_socket: socket.socket = socket.create_connection((self.server_host, self.server_port))
+        SocketProfile.apply_socket_profile(connection_socket, self.socket_profile)
+        return connection_socket
+
+    def send(self, message: str) -> None:
+        self.server_channel.send_message(message)
+
+    def receive(self) -> str:
+        return self.server_channel.recv_message()
+
+    def send_acknowledgement(self, message: str) -> None:
+        # only v1 acknowledges
+        if self.protocol_version == OperationStatus.PROTOCOL_VERSION_1:
+            self.send(message)
+
+    def login(self, establish_heart_beat: bool = True) -> bool:
+        """
+        Log in and establish the heart beat connection
+        :param establish_heart_beat: False to stop right after the login result, the server keeps waiting
+        :return: whether the login is successful
+        """
+        # STEP Head.0.0.0 - Head.0.0.1
+        login_options: list[str] = []
+        if self.protocol_version == OperationStatus.PROTOCOL_VERSION_2:
+            login_options.append(OperationStatus.LOGIN_OPTION_V2)
+        if self.heart_beat_in_band:
+            login_options.append(OperationStatus.LOGIN_OPTION_IN_BAND_HEART_BEAT)
+        self.send(OperationStatus.encode_login_options(OperationStatus.LOGIN_HEADER, login_options))
+
+        accepted_options: list[str] = OperationStatus.decode_login_options(OperationStatus.LOGIN_HEADER_RECEIVED,
+                                                                           self.receive()) or []
+        if OperationStatus.LOGIN_OPTION_V2 not in accepted_options:
+            self.protocol_version = OperationStatus.PROTOCOL_VERSION_1
+        if self.heart_beat_in_band and OperationStatus.LOGIN_OPTION_IN_BAND_HEART_BEAT not in accepted_options:
+            raise ConnectionError("The server does not support in-band heart beats")
+        if self.heart_beat_in_band and self.heart_beat_pump is not None:
+            self.heart_beat_pump.add_client(self)
+
+        # STEP1.0.0.0 - STEP1.0.2.1
+        self.receive()
+        self.send("username:" + self.username)
+        self.receive()
+        self.send("password:" + self.password)
+        self.receive()
+        self.send_acknowledgement("STEP1.0.2.1 Client Received")
+
+        # STEP1.0.3.0 - STEP1.0.3.1
+        login_result: str = self.receive()
+        self.send_acknowledgement("STEP1.0.3.1 Client Received")
+        if login_result != OperationStatus.OperationStatus.authentication_successful:
+            return False
+        if not establish_heart_beat:
+            return True
+
+        if not self.heart_beat_in_band:
+            time.sleep(self.heart_beat_delay)
+            # the heart beat connection, the server waits for it before the game hall
+            # 心跳连接，服务器在进入大厅前等待它
+            self.heart_beat_channel.send_message(f"Header:heart beat:{self.username}:client")
+            if self.heart_beat_pump is not None:
+                self.heart_beat_pump.add_client(self)
+
+        # STEP1.1.0.0
+        self.receive()
+        return True
+
+    def hall_command(self, command: str) -> str:
+        """
+        Send one hall command, the server is ready (STEP1.1.0.0 already received)
+        :param command: e.g. /list, /enter 1
+        :return: the response of the server (STEP1.1.1.0)
+        """
+        # STEP1.1.0.1 - STEP1.1.1.0
+        self.send("hall_command:" + command)
+        response: str = self.receive()
+
+        if response == OperationStatus.OperationStatus.wait:
+            # STEP1.1.1.1, the game is played by play_game
+            self.send_acknowledgement("Client start wait")
+        elif response != OperationStatus.OperationStatus.bye_bye:
+            # STEP1.1.1.1 - STEP1.1.0.0
+            self.send_acknowledgement("STEP1.1.1.1 Client Received")
+            self.receive()
+        return response
+
+    def play_game(self, guess: str) -> str:
+        """
+        Play the game after entering a room, back to the game hall
+        :param guess: True or False
+        :return: the result of the game
+        """
+        # STEP 1.2.0.0
+        game_started: str = self.receive()
+        if game_started == OperationStatus.OperationStatus.win_the_game_since_opponent_quit:
+            result: str = game_started
+        else:
+            # STEP 1.2.0.1 - STEP 1.2.1.0
+            self.send(guess)
+            result: str = self.receive()
+
+        # STEP1.2.2.0 - STEP1.1.0.0
+        self.send_acknowledgement("STEP1.2.2.0 Client Received")
+        self.receive()
+        return result
+
+    def heart_beat(self) -> None:
+        """
+        Send one heart beat package and drop the responses
+        """
+        if self.heart_beat_in_band:
+            self.server_channel.send_heart_beat()
+            return
+
+        self.heart_beat_channel.send_message("Heart beat:atrium:send")
+        heart_beat_socket: socket.socket = self.heart_beat_channel.socket
+        heart_beat_socket.setblocking(False)
+        try:
+            while heart_beat_socket.recv(4096):
+                pass
+        except BlockingIOError:
+            pass
+        finally:
+            heart_beat_socket.setblocking(True)
+
+    def close(self) -> None:
+        for channel in (self.server_channel, self.heart_beat_channel):
+            if channel is not None:
+                channel.close()
+
+
+class HeartBeatPump(threading.Thread):
+    """
+    Keep every logged in ScriptedClient alive from one thread
+    一个线程为所有客户端发送心跳
+    """
+
+    def __init__(self, heart_beat_interval: float = 0.5):
+        super().__init__(daemon=True)
+        self.heart_beat_interval: float = heart_beat_interval
+        self.client_list: list[ScriptedClient] = []
+        self.client_list_lock: threading.Lock = threading.Lock()
+        self.stop_event: threading.Event = threading.Event()
+
+    def add_client(self, client: ScriptedClient) -> None:
+        with self.client_list_lock:
+            self.client_list.append(client)
+
+    def remove_client(self, client: ScriptedClient) -> None:
+        with self.client_list_lock:
+            if client in self.client_list:
+                self.client_list.remove(client)
+
+    def run(self) -> None:
+        while not self.stop_event.wait(self.heart_beat_interval):
+            with self.client_list_lock:
+                client_list: list[ScriptedClient] = self.client_list.copy()
+            for client in client_list:
+                try:
+                    client.heart_beat()
+                except OSError:
+                    pass
+
+    def stop(self) -> None:
+        self.stop_event.set()
+        self.join()
+
+
+class DelayProxy(threading.Thread):
+    """
+    A TCP proxy delaying every byte by a fixed one-way delay, to simulate a WAN link
+    Bytes keep their order, the bandwidth is not limited
+
+    给每个字节加上固定单向延迟的TCP代理，用于模拟广域网链路
+    """
+
+    def __init__(self, target_port: int, one_way_delay: float):
+        super().__init__(daemon=True)
+        self.target_port: int = target_port
+        self.one_way_delay: float = one_way_delay
+
+        self.listening_socket: socket.socket = socket.create_server(("127.0.0.1", 0))
+        self.listening_port: int = self.listening_socket.getsockname()[1]
+
+    def run(self) -> None:
+        while True:
+            try:
+                client_socket, _ = self.listening_socket.accept()
+            except OSError:
+                # closed
+                return
+            server_socket: socket.socket = socket.create_connection(("127.0.0.1", self.target_port))
+            # the proxy is the link, it should not add Nagle delays of its own
+            # 代理模拟的是链路本身，不应再增加Nagle延迟
+            for proxy_socket in (client_socket, server_socket):
+                proxy_socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            for source, destination in ((client_socket, server_socket), (server_socket, client_socket)):
+                delayed_chunks: queue.Queue = queue.Queue()
+                threading.Thread(target=self.read_side, args=(source, delayed_chunks), daemon=True).start()
+                threading.Thread(target=self.write_side, args=(destination, delayed_chunks), daemon=True).start()
+
+    def read_side(self, source: socket.socket, delayed_chunks: queue.Queue) -> None:
+        while True:
+            try:
+                chunk: bytes = source.recv(65536)
+            except OSError:
+                chunk = b""
+            delayed_chunks.put((time.monotonic() + self.one_way_delay, chunk))
+            if not chunk:
+                return
+
+    @staticmethod
+    def write_side(destination: socket.socket, delayed_chunks: queue.Queue) -> None:
+        while True:
+            due_time, chunk = delayed_chunks.get()
+            time.sleep(max(0.0, due_time - time.monotonic()))
+            try:
+                if not chunk:
+                    destination.shutdown(socket.SHUT_WR)
+                    return
+                destination.sendall(chunk)
+            except OSError:
+                return
+
+    def close(self) -> None:
+        self.listening_socket.close()
+
+
+def benchmark_connections(server_engine: str, session_number: int, concurrency: int,
+                          heart_beat_in_band: bool = False) -> dict:
+    """
+    Log in session_number players and keep them connected,
+    report the login rate and the server's memory and threads
+
+    登录session_number个玩家并保持连接，报告登录速度、服务器内存和线程数
+    """
+    listening_port: int = find_free_port()
+    user_info_file_path: str = write_user_info_file(session_number)
+    server_process: subprocess.Popen = start_server_process(server_engine, listening_port, user_info_file_path)
+    idle_status: dict[str, int] = read_process_status(server_process.pid)
+
+    heart_beat_pump: HeartBeatPump = HeartBeatPump()
+    heart_beat_pump.start()
+    client_list: list[ScriptedClient] = []
+
+    def login_one(i: int) -> None:
+        client: ScriptedClient = ScriptedClient("127.0.0.1", listening_port, f"bench{i}", f"password{i}",
+                                                heart_beat_in_band=heart_beat_in_band,
+                                                heart_beat_pump=heart_beat_pump)
+        client_list.append(client)
+        client.connect()
+        if not client.login():
+            raise RuntimeError(f"bench{i} login failed")
+
+    try:
+        start_time: float = time.perf_counter()
+        with concurrent.futures.ThreadPoolExecutor(max_workers=concurrency) as executor:
+            for future in [executor.submit(login_one, i) for i in range(session_number)]:
+                future.result()
+        elapsed: float = time.perf_counter() - start_time
+
+        loaded_status: dict[str, int] = read_process_status(server_process.pid)
+    finally:
+        heart_beat_pump.stop()
+        for client in client_list:
+            client.close()
+        server_process.kill()
+        server_process.wait()
+        os.remove(user_info_file_path)
+
+    return {
+        "benchmark": "connections",
+        "engine": server_engine,
+        "heart_beat_in_band": heart_beat_in_band,
+        "sessions": session_number,
+        "connections_per_second": round(session_number / elapsed, 1),
+        "idle_rss_kb": idle_status["rss_kb"],
+        "loaded_rss_kb": loaded_status["rss_kb"],
+        "rss_kb_per_session": round((loaded_status["rss_kb"] - idle_status["rss_kb"]) / session_number, 2),
+        "server_threads": loaded_status["threads"],
+        "server_file_descriptors": loaded_status["file_descriptors"],
+    }
+
+
+def benchmark_protocol_latency(server_engine: str, protocol_version: int, rtt_ms: float, list_number: int) -> dict:
+    """
+    Two players play one full session through a DelayProxy,
+    login -> /list x list_number -> /enter -> guess -> result -> /exit,
+    report the time of each step of the first player
+
+    两个玩家通过延迟代理完成一次完整会话，报告第一个玩家每一步的耗时
+    """
+    listening_port: int = find_free_port()
+    user_info_file_path: str = write_user_info_file(2)
+    server_process: subprocess.Popen = start_server_process(server_engine, listening_port, user_info_file_path)
+    delay_proxy: DelayProxy = DelayProxy(listening_port, rtt_ms / 2000)
+    delay_proxy.start()
+    heart_beat_pump: HeartBeatPump = HeartBeatPump()
+    heart_beat_pump.start()
+
+    step_times: dict[str, list[float]] = {"login": [], "list": [], "enter": [], "game": [], "exit": []}
+
+    def play_session(i: int, guess: str) -> None:
+        client: ScriptedClient = ScriptedClient("127.0.0.1", delay_proxy.listening_port,
+                                                f"bench{i}", f"password{i}", protocol_version,
+                                                heart_beat_pump=heart_beat_pump)
+        client.connect()
+        steps: list[tuple[str, float]] = []
+
+        def timed(step: str, function, *args):
+            start_time: float = time.perf_counter()
+            result = function(*args)
+            steps.append((step, time.perf_counter() - start_time))
+            return result
+
+        timed("login", client.login)
+        for _ in range(list_number):
+            timed("list", client.hall_command, "/list")
+        timed("enter", client.hall_command, "/enter 0")
+        timed("game", client.play_game, guess)
+        timed("exit", client.hall_command, "/exit")
+        client.close()
+
+        # only the first player, the second one waits for it in the room
+        if i == 0:
+            for step, elapsed in steps:
+                step_times[step].append(elapsed)
+
+    try:
+        session_start_time: float = time.perf_counter()
+        player_threads: list[threading.Thread] = [threading.Thread(target=play_session, args=(i, guess))
+                                                  for i, guess in ((0, "True"), (1, "False"))]
+        for player_thread in player_threads:
+            player_thread.start()
+        for player_thread in player_threads:
+            player_thread.join()
+        session_time: float = time.perf_counter() - session_start_time
+    finally:
+        heart_beat_pump.stop()
+        delay_proxy.close()
+        server_process.kill()
+        server_process.wait()
+        os.remove(user_info_file_path)
+
+    return {
+        "benchmark": "protocol_latency",
+        "engine": server_engine,
+        "protocol_version": protocol_version,
+        "rtt_ms": rtt_ms,
+        "session_ms": round(session_time * 1000, 1),
+        "step_ms": {step: round(statistics.mean(times) * 1000, 1) for step, times in step_times.items()},
+    }
+
+
+def benchmark_session_latency(server_engine: str, socket_profile: str, protocol_version: int, session_number: int,
+                              list_number: int) -> dict:
+    """
+    Two players play session_number full sessions one after another on the loopback,
+    login -> /list x list_number -> /enter -> guess -> result -> /exit,
+    the server and the clients use the socket profile; report the session times of the first player
+
+    两个玩家在本机回环上依次完成session_number次完整会话，服务器和客户端使用同一个套接字配置，报告第一个玩家的会话耗时
+    """
+    listening_port: int = find_free_port()
+    user_info_file_path: str = write_user_info_file(2)
+    server_process: subprocess.Popen = start_server_process(server_engine, listening_port, user_info_file_path,
+                                                            socket_profile=socket_profile)
+    heart_beat_pump: HeartBeatPump = HeartBeatPump()
+    heart_beat_pump.start()
+
+    session_times: list[float] = []
+    step_times: dict[str, list[float]] = {"login": [], "list": [], "enter": [], "game": [], "exit": []}
+
+    def play_session(i: int, guess: str) -> None:
+        client: ScriptedClient = ScriptedClient("127.0.0.1", listening_port, f"bench{i}", f"password{i}",
+                                                protocol_version, heart_beat_pump=heart_beat_pump,
+                                                socket_profile=socket_profile)
+        session_start_time: float = time.perf_counter()
+        client.connect()
+        steps: list[tuple[str, float]] = []
+
+        def timed(step: str, function, *args):
+            start_time: float = time.perf_counter()
+            result = function(*args)
+            steps.append((step, time.perf_counter() - start_time))
+            return result
+
+        timed("login", client.login)
+        for _ in range(list_number):
+            timed("list", client.hall_command, "/list")
+        timed("enter", client.hall_command, "/enter 0")
+        timed("game", client.play_game, guess)
+        timed("exit", client.hall_command, "/exit")
+        client.close()
+
+        # only the first player, the second one waits for it in the room
+        if i == 0:
+            session_times.append(time.perf_counter() - session_start_time)
+            for step, elapsed in steps:
+                step_times[step].append(elapsed)
+
+    try:
+        for _ in range(session_number):
+            player_threads: list[threading.Thread] = [threading.Thread(target=play_session, args=(i, guess))
+                                                      for i, guess in ((0, "True"), (1, "False"))]
+            for player_thread in player_threads:
+                player_thread.start()
+            for player_thread in player_threads:
+                player_thread.join()
+    finally:
+        heart_beat_pump.stop()
+        server_process.kill()
+        server_process.wait()
+        os.remove(user_info_file_path)
+
+    session_times.sort()
+    return {
+        "benchmark": "session_latency",
+        "engine": server_engine,
+        "socket_profile": socket_profile,
+        "protocol_version": protocol_version,
+        "sessions": session_number,
+        "session_mean_ms": round(statistics.mean(session_times) * 1000, 1),
+        "session_p50_ms": round(session_times[len(session_times) // 2] * 1000, 1),
+        "session_p99_ms": round(session_times[min(len(session_times) - 1,
+                                                  int(len(session_times) * 0.99))] * 1000, 1),
+        "step_mean_ms": {step: round(statistics.mean(times) * 1000, 2) for step, times in step_times.items()},
+    }
+
+
+def players_in_room(room_status: str, room_id: int) -> int | None:
+    """
+    :param room_status: a 3001 or 3003 message
+    :param room_id: the room id
+    :return: the number of players in the room, None if the message does not tell
+    """
+    fields: list[str] = room_status.split()
+    if fields[0] == OperationStatus.OperationStatus.list_rooms_status:
+        return int(fields[2 + room_id]) if 2 + room_id < len(fields) else None
+    if fields[0] == OperationStatus.OperationStatus.list_rooms_changes:
+        for room_change in fields[3:]:
+            changed_room_id, player_number = room_change.split(":")
+            if int(changed_room_id) == room_id:
+                return int(player_number)
+    return None
+
+
+def benchmark_watch(server_engine: str, watch: bool, observer_number: int, poll_interval: float,
+                    push_interval: float, duration: float) -> dict:
+    """
+    observer_number players in the game hall follow the room status, by /list every poll_interval seconds,
+    or by /watch with the changes pushed every push_interval seconds.
+    Meanwhile two players play in room 0 in a loop: one enters, 0.3 s later the other one, they play, 0.3 s pause.
+    Reported: the server CPU, the bytes the observers receive, and how long until the first observer
+    sees the first player in room 0 (missed: it never saw it before the room was empty again).
+
+    observer_number个在大厅的玩家关注房间状态：每poll_interval秒/list一次，或者/watch并每push_interval秒收到推送
+    同时两个玩家在0号房间循环游戏；报告服务器CPU、观察者收到的字节数，以及第一个观察者多久后看到第一个玩家进入0号房间
+    """
+    listening_port: int = find_free_port()
+    user_info_file_path: str = write_user_info_file(observer_number + 2)
+    server_process: subprocess.Popen = start_server_process(server_engine, listening_port, user_info_file_path,
+                                                            room_status_push_interval=push_interval)
+    heart_beat_pump: HeartBeatPump = HeartBeatPump()
+    heart_beat_pump.start()
+    stop_event: threading.Event = threading.Event()
+
+    def new_client(i: int) -> ScriptedClient:
+        client: ScriptedClient = ScriptedClient("127.0.0.1", listening_port, f"bench{i}", f"password{i}",
+                                                heart_beat_in_band=True, heart_beat_pump=heart_beat_pump)
+        client.connect()
+        if not client.login():
+            raise RuntimeError("Login failed")
+        return client
+
+    # (time, players in room 0) as seen by the first observer, and the bytes received by all observers
+    # 第一个观察者看到的（时间，0号房间的玩家数），以及所有观察者收到的字节数
+    seen_room_status: list[tuple[float, int]] = []
+    received_bytes: list[int] = [0]
+    received_bytes_lock: threading.Lock = threading.Lock()
+
+    def observe(observer_id: int, room_status: str) -> None:
+        with received_bytes_lock:
+            received_bytes[0] += MessageFraming.FRAME_HEADER.size + len(room_status.encode())
+        if observer_id == 0:
+            player_number: int | None = players_in_room(room_status, 0)
+            if player_number is not None:
+                seen_room_status.append((time.perf_counter(), player_number))
+
+    observers: list[ScriptedClient] = [new_client(i) for i in range(observer_number)]
+    drivers: list[ScriptedClient] = [new_client(observer_number), new_client(observer_number + 1)]
+
+    def read_pushes() -> None:
+        push_selector: selectors.BaseSelector = selectors.DefaultSelector()
+        for observer in observers:
+            push_selector.register(observer.server_channel.socket, selectors.EVENT_READ, observer)
+        while not stop_event.is_set():
+            for key, _ in push_selector.select(0.1):
+                key.data.server_channel.poll_heart_beats()
+
+    def poll_list() -> None:
+        while not stop_event.wait(poll_interval):
+            # every request first, then every answer, like observers polling at the same time
+            # 先发送所有请求，再接收所有回答，就像观察者同时轮询
+            for observer in observers:
+                observer.send("hall_command:/list")
+            for observer_id, observer in enumerate(observers):
+                observe(observer_id, observer.receive())
+                # STEP1.1.0.0
+                observer.receive()
+
+    enter_times: list[float] = []
+
+    def drive() -> None:
+        first_driver, second_driver = drivers
+        while not stop_event.is_set():
+            first_driver.hall_command("/enter 0")
+            enter_times.append(time.perf_counter())
+            time.sleep(0.3)
+            second_driver.hall_command("/enter 0")
+            # STEP 1.2.0.0 - STEP 1.2.1.0, both guess before either waits for the result
+            for driver in drivers:
+                driver.receive()
+            for driver in drivers:
+                driver.send("True")
+            for driver in drivers:
+                driver.receive()
+                # STEP1.1.0.0
+                driver.receive()
+            time.sleep(0.3)
+
+    try:
+        if watch:
+            for observer_id, observer in enumerate(observers):
+                observe(observer_id, observer.hall_command("/watch"))
+                observer.server_channel.push_handler = \
+                    lambda room_status, observer_id=observer_id: observe(observer_id, room_status)
+            observer_thread: threading.Thread = threading.Thread(target=read_pushes, daemon=True)
+        else:
+            observer_thread = threading.Thread(target=poll_list, daemon=True)
+        driver_thread: threading.Thread = threading.Thread(target=drive, daemon=True)
+
+        received_bytes[0] = 0
+        start_status: dict[str, int] = read_process_status(server_process.pid)
+        observer_thread.start()
+        driver_thread.start()
+        time.sleep(duration)
+        stop_event.set()
+        end_status: dict[str, int] = read_process_status(server_process.pid)
+        driver_thread.join(5)
+        observer_thread.join(5)
+    finally:
+        heart_beat_pump.stop()
+        server_process.kill()
+        server_process.wait()
+        os.remove(user_info_file_path)
+
+    # the first moment the first observer sees somebody in room 0 after each entry, before the room is empty again
+    # 每次进入之后，在房间再次变空之前，第一个观察者第一次看到0号房间有人的时刻
+    latencies: list[float] = []
+    missed_number: int = 0
+    for enter_time in enter_times:
+        seen_time: float | None = None
+        for status_time, player_number in seen_room_status:
+            if status_time < enter_time:
+                continue
+            if player_number > 0:
+                seen_time = status_time
+            break
+        if seen_time is None or seen_time - enter_time > 0.6:
+            missed_number += 1
+        else:
+            latencies.append(seen_time - enter_time)
+
+    return {
+        "benchmark": "watch",
+        "engine": server_engine,
+        "mode": "watch" if watch else "poll",
+        "observers": observer_number,
+        "interval_ms": (push_interval if watch else poll_interval) * 1000,
+        "server_cpu_percent": round((end_status["cpu_seconds"] - start_status["cpu_seconds"]) * 100 / duration, 1),
+        "observer_kb_per_second": round(received_bytes[0] / 1024 / duration, 1),
+        "room_entries": len(enter_times),
+        "seen_ms": round(statistics.mean(latencies) * 1000, 1) if latencies else None,
+        "missed": missed_number,
+    }
+
+
+def benchmark_slow_player(server_engine: str, heart_beat_in_band: bool, slow_delay: float, round_number: int) -> dict:
+    """
+    Games where the first player of the room takes slow_delay seconds to guess, two cases:
+    answer: the second player guesses at once, time from the game start until the second player has the result
+    quit: the second player disconnects right after the game start,
+    time until the slow player is told the opponent quit (the slow player never guesses if told before)
+
+    房间里的第一个玩家要slow_delay秒才猜测的游戏，两种情况：
+    answer：第二个玩家立刻猜测，从游戏开始到第二个玩家得到结果的时间
+    quit：第二个玩家在游戏开始后立刻断线，到慢的玩家被告知对手退出的时间
+    """
+    listening_port: int = find_free_port()
+    user_info_file_path: str = write_user_info_file(2 * round_number + 1)
+    server_process: subprocess.Popen = start_server_process(server_engine, listening_port, user_info_file_path)
+    heart_beat_pump: HeartBeatPump = HeartBeatPump()
+    heart_beat_pump.start()
+
+    def new_client(i: int) -> ScriptedClient:
+        client: ScriptedClient = ScriptedClient("127.0.0.1", listening_port, f"bench{i}", f"password{i}",
+                                                heart_beat_in_band=heart_beat_in_band,
+                                                heart_beat_pump=heart_beat_pump)
+        client.connect()
+        if not client.login():
+            raise RuntimeError("Login failed")
+        return client
+
+    answer_latencies: list[float] = []
+    quit_latencies: list[float] = []
+    try:
+        slow_player: ScriptedClient = new_client(0)
+        for round_id in range(round_number):
+            for quit_game in (False, True):
+                fast_player: ScriptedClient = new_client(2 * round_id + 1 + quit_game)
+                # the slow player enters first, it is the first player of the room
+                # 慢的玩家先进入，是房间里的第一个玩家
+                slow_player.hall_command("/enter 0")
+                fast_player.hall_command("/enter 0")
+                # STEP 1.2.0.0
+                fast_player.receive()
+                start_time: float = time.perf_counter()
+                slow_player.receive()
+
+                # the slow player guesses after slow_delay, unless the result or the quit arrives before
+                # 慢的玩家在slow_delay秒后猜测，除非结果或对手退出的消息先到达
+                result_event: threading.Event = threading.Event()
+                slow_guess: threading.Thread = threading.Thread(
+                    target=lambda: result_event.wait(slow_delay) or slow_player.send("True"), daemon=True)
+                slow_guess.start()
+
+                if quit_game:
+                    fast_player.close()
+                    # STEP 1.2.1.0
+                    slow_player.receive()
+                    quit_latencies.append(time.perf_counter() - start_time)
+                    result_event.set()
+                    # STEP1.1.0.0
+                    slow_player.receive()
+                else:
+                    # STEP 1.2.0.1 - STEP 1.2.1.0
+                    fast_player.send("False")
+                    fast_player.receive()
+                    answer_latencies.append(time.perf_counter() - start_time)
+                    slow_player.receive()
+                    result_event.set()
+                    # STEP1.1.0.0
+                    fast_player.receive()
+                    slow_player.receive()
+                    fast_player.close()
+                slow_guess.join()
+    finally:
+        heart_beat_pump.stop()
+        server_process.kill()
+        server_process.wait()
+        os.remove(user_info_file_path)
+
+    return {
+        "benchmark": "slow-player",
+        "engine": server_engine,
+        "heart_beat": "in-band" if heart_beat_in_band else "socket",
+        "slow_delay_ms": slow_delay * 1000,
+        "rounds": round_number,
+        "answer_ms": round(statistics.mean(answer_latencies) * 1000, 1),
+        "quit_noticed_ms": round(statistics.mean(quit_latencies) * 1000, 1),
+    }
+
+
+def benchmark_disconnect(server_engine: str, loss_mode: str, quitter_guessed: bool, round_number: int,
+                         heart_beat_timeout: float, guess_timeout: float) -> dict:
+    """
+    Games where one player loses its heart beat after the game started, time from the detection of the loss
+    until the other player is told the opponent quit.
+    close: the heart beat connection is closed, the server sees it at once, the message connection stays open
+    silent: the heart beats stop, the server sees it heart_beat_timeout seconds after the last one
+    quitter_guessed: the lost player guessed before, the game waits only for the player who is told
+
+    一个玩家在游戏开始后心跳丢失的游戏，测量从发现心跳丢失到另一个玩家被告知对手退出的时间。
+    close：关闭心跳连接，服务器立刻发现，消息连接保持打开
+    silent：心跳停止，服务器在最后一次心跳heart_beat_timeout秒后发现
+    quitter_guessed：断线的玩家之前已经猜测，游戏只在等待被告知的玩家
+    """
+    listening_port: int = find_free_port()
+    user_info_file_path: str = write_user_info_file(round_number + 1)
+    server_process: subprocess.Popen = start_server_process(server_engine, listening_port, user_info_file_path,
+                                                            heart_beat_timeout=heart_beat_timeout,
+                                                            guess_timeout=guess_timeout)
+    heart_beat_interval: float = heart_beat_timeout / 4
+    heart_beat_pump: HeartBeatPump = HeartBeatPump(heart_beat_interval)
+    heart_beat_pump.start()
+
+    latencies: list[float] = []
+    unexpected_messages: list[str] = []
+    try:
+        survivor: ScriptedClient = ScriptedClient("127.0.0.1", listening_port, "bench0", "password0",
+                                                  heart_beat_pump=heart_beat_pump)
+        survivor.connect()
+        if not survivor.login():
+            raise RuntimeError("Login failed")
+
+        for round_id in range(round_number):
+            # the quitter keeps itself alive, so its heart beats stop at a known time
+            # 断线的玩家自己发送心跳，这样心跳停止的时间是已知的
+            quitter: ScriptedClient = ScriptedClient("127.0.0.1", listening_port, f"bench{round_id + 1}",
+                                                     f"password{round_id + 1}")
+            quitter.connect()
+            if not quitter.login():
+                raise RuntimeError("Login failed")
+            last_heart_beat_time: list[float] = [time.perf_counter()]
+            stop_heart_beats: threading.Event = threading.Event()
+
+            def send_heart_beats() -> None:
+                while not stop_heart_beats.wait(heart_beat_interval):
+                    quitter.heart_beat()
+                    last_heart_beat_time[0] = time.perf_counter()
+
+            heart_beat_thread: threading.Thread = threading.Thread(target=send_heart_beats, daemon=True)
+            heart_beat_thread.start()
+
+            survivor.hall_command("/enter 0")
+            quitter.hall_command("/enter 0")
+            # STEP 1.2.0.0
+            survivor.receive()
+            quitter.receive()
+            # STEP 1.2.0.1, one of the two guesses, the game waits for the other one
+            # 两个猜测之一，游戏等待另一个
+            (quitter if quitter_guessed else survivor).send("True")
+            time.sleep(0.05)
+
+            stop_heart_beats.set()
+            heart_beat_thread.join()
+            if loss_mode == "close":
+                quitter.heart_beat_channel.close()
+                detection_time: float = time.perf_counter()
+            else:
+                detection_time: float = last_heart_beat_time[0] + heart_beat_timeout
+
+            # STEP 1.2.1.0
+            message: str = survivor.receive()
+            latencies.append(time.perf_counter() - detection_time)
+            if message != OperationStatus.OperationStatus.win_the_game_since_opponent_quit:
+                unexpected_messages.append(message)
+            # STEP1.2.2.0 - STEP1.1.0.0
+            survivor.send_acknowledgement("STEP1.2.2.0 Client Received")
+            survivor.receive()
+            quitter.close()
+        survivor.close()
+    finally:
+        heart_beat_pump.stop()
+        server_process.kill()
+        server_process.wait()
+        os.remove(user_info_file_path)
+
+    latencies.sort()
+    return {
+        "benchmark": "disconnect",
+        "engine": server_engine,
+        "loss": loss_mode,
+        "quitter_guessed": quitter_guessed,
+        "rounds": round_number,
+        "heart_beat_timeout_ms": heart_beat_timeout * 1000,
+        "notified_mean_ms": round(statistics.mean(latencies) * 1000, 1),
+        "notified_p50_ms": round(latencies[len(latencies) // 2] * 1000, 1),
+        "notified_max_ms": round(latencies[-1] * 1000, 1),
+        "unexpected": unexpected_messages,
+    }
+
+
+def benchmark_guess_timeout(server_engine: str, heart_beat_in_band: bool, protocol_version: int,
+                            guess_timeout: float, round_number: int) -> dict:
+    """
+    Games where one player, or both, never guess in time, with guess_timeout seconds to guess
+    Checked: the silent player loses and the other one wins, when the guess timeout is over,
+    the late guess (and acknowledgement) is dropped, the next hall command is answered,
+    the room is empty again and no thread is left behind
+
+    一个或两个玩家没有按时猜测的游戏，检查：超时后沉默的玩家输、另一个玩家赢，
+    迟到的猜测（和确认）被丢弃，下一条大厅命令得到回答，房间重新变空，没有遗留线程
+    """
+    listening_port: int = find_free_port()
+    user_info_file_path: str = write_user_info_file(2)
+    server_process: subprocess.Popen = start_server_process(server_engine, listening_port, user_info_file_path,
+                                                            guess_timeout=guess_timeout)
+    heart_beat_pump: HeartBeatPump = HeartBeatPump()
+    heart_beat_pump.start()
+
+    forfeit_latencies: list[float] = []
+    failed_checks: list[str] = []
+    try:
+        players: list[ScriptedClient] = []
+        for i in range(2):
+            player: ScriptedClient = ScriptedClient("127.0.0.1", listening_port, f"bench{i}", f"password{i}",
+                                                    protocol_version=protocol_version,
+                                                    heart_beat_in_band=heart_beat_in_band,
+                                                    heart_beat_pump=heart_beat_pump)
+            player.connect()
+            if not player.login():
+                raise RuntimeError("Login failed")
+            players.append(player)
+        silent_player, guessing_player = players
+        start_status: dict[str, int] = read_process_status(server_process.pid)
+
+        for round_id in range(round_number):
+            both_silent: bool = round_id % 2 == 1
+            silent_player.hall_command("/enter 0")
+            guessing_player.hall_command("/enter 0")
+            # STEP 1.2.0.0
+            for player in players:
+                player.receive()
+            start_time: float = time.perf_counter()
+
+            # STEP 1.2.0.1 - STEP 1.2.1.0
+            if not both_silent:
+                guessing_player.send("True")
+            results: list[str] = [player.receive() for player in players]
+            forfeit_latencies.append(time.perf_counter() - start_time)
+            expected_results: list[str] = [OperationStatus.OperationStatus.lose_the_game,
+                                           OperationStatus.OperationStatus.lose_the_game if both_silent
+                                           else OperationStatus.OperationStatus.win_the_game]
+            if results != expected_results:
+                failed_checks.append(f"round {round_id} results {results}")
+
+            # the silent players guess after all, the game is over, the guess is dropped
+            # 沉默的玩家最后还是猜测了，游戏已经结束，猜测被丢弃
+            for player in players:
+                if player is silent_player or both_silent:
+                    player.send("False")
+                # STEP1.2.2.0 - STEP1.1.0.0
+                player.send_acknowledgement("STEP1.2.2.0 Client Received")
+                player.receive()
+
+            for player in players:
+                room_status: str = player.hall_command("/list")
+                if players_in_room(room_status, 0) != 0:
+                    failed_checks.append(f"round {round_id} /list {room_status}")
+
+        end_status: dict[str, int] = read_process_status(server_process.pid)
+    finally:
+        heart_beat_pump.stop()
+        server_process.kill()
+        server_process.wait()
+        os.remove(user_info_file_path)
+
+    return {
+        "benchmark": "guess-timeout",
+        "engine": server_engine,
+        "heart_beat": "in-band" if heart_beat_in_band else "socket",
+        "protocol": protocol_version,
+        "guess_timeout_ms": guess_timeout * 1000,
+        "rounds": round_number,
+        "forfeit_ms": round(statistics.mean(forfeit_latencies) * 1000, 1),
+        "threads_left": end_status["threads"] - start_status["threads"],
+        "failed_checks": failed_checks,
+    }
+
+
+def benchmark_games(server_engine: str, client_number: int, duration: float, **server_options) -> dict:
+    """
+    Games completed per second: client_number clients (in-band heart beats) play in a loop,
+    /match, guess at once, back to the game hall. The server threads are sampled while they play.
+    With room_size in server_options, /match fills rooms of that many players.
+
+    每秒完成的游戏数：client_number个客户端（带内心跳）循环游戏，/match、立刻猜测、回到大厅，同时采样服务器的线程数
+    :param server_options: keyword arguments of GameServer.create_game_server, e.g. game_worker_number, room_size
+    """
+    listening_port: int = find_free_port()
+    user_info_file_path: str = write_user_info_file(client_number)
+    server_process: subprocess.Popen = start_server_process(server_engine, listening_port, user_info_file_path,
+                                                            max_game_room_number=client_number,
+                                                            **server_options)
+    room_size: int = server_options.get("room_size", GameServer.ROOM_SIZE)
+    heart_beat_pump: HeartBeatPump = HeartBeatPump()
+    heart_beat_pump.start()
+    stop_event: threading.Event = threading.Event()
+    game_numbers: list[int] = [0] * client_number
+    failures: list[str] = []
+
+    def play(client: ScriptedClient, client_id: int) -> None:
+        try:
+            while not stop_event.is_set():
+                if client.hall_command("/match") != OperationStatus.OperationStatus.wait:
+                    continue
+                client.play_game(str(client_id % 2 == 0))
+                game_numbers[client_id] += 1
+        except Exception as e:
+            # the server is stopped at the end while some clients are still playing
+            # 结束时服务器被停止，有些客户端还在游戏
+            if not stop_event.is_set():
+                failures.append(repr(e))
+
+    try:
+        clients: list[ScriptedClient] = []
+        for i in range(client_number):
+            client: ScriptedClient = ScriptedClient("127.0.0.1", listening_port, f"bench{i}", f"password{i}",
+                                                    heart_beat_in_band=True, heart_beat_pump=heart_beat_pump)
+            client.connect()
+            if not client.login():
+                raise RuntimeError("Login failed")
+            clients.append(client)
+
+        client_threads: list[threading.Thread] = [threading.Thread(target=play, args=(client, i), daemon=True)
+                                                  for i, client in enumerate(clients)]
+        start_status: dict[str, int] = read_process_status(server_process.pid)
+        for client_thread in client_threads:
+            client_thread.start()
+
+        peak_threads: int = 0
+        deadline: float = time.monotonic() + duration
+        while time.monotonic() < deadline:
+            time.sleep(0.2)
+            peak_threads = max(peak_threads, read_process_status(server_process.pid)["threads"])
+        end_status: dict[str, int] = read_process_status(server_process.pid)
+        # the games finished after the stop are not counted
+        # 停止之后完成的游戏不计入
+        game_number: int = sum(game_numbers) // room_size
+        stop_event.set()
+        # a client waiting for a match after the stop never gets one
+        # 停止之后还在等待配对的客户端不会再配对
+        for client_thread in client_threads:
+            client_thread.join(1)
+    finally:
+        heart_beat_pump.stop()
+        server_process.kill()
+        server_process.wait()
+        os.remove(user_info_file_path)
+
+    return {
+        "benchmark": "games",
+        "engine": server_engine,
+        **server_options,
+        "clients": client_number,
+        "games_per_second": round(game_number / duration, 1),
+        "server_cpu_percent": round((end_status["cpu_seconds"] - start_status["cpu_seconds"]) * 100 / duration, 1),
+        "server_cpu_us_per_game": round((end_status["cpu_seconds"] - start_status["cpu_seconds"]) * 1e6
+                                        / max(game_number, 1)),
+        "server_threads_idle": start_status["threads"],
+        "server_threads_peak": peak_threads,
+        "failures": len(failures),
+    }
+
+
+def benchmark_waiting_players(server_engine: str, waiting_number: int, heart_beat_in_band: bool,
+                              hold_time: float, **server_options) -> dict:
+    """
+    waiting_number players each enter a room of their own and wait there for an opponent who never comes.
+    The server threads and memory are read with everyone in the game hall and after hold_time seconds of waiting,
+    then an observer checks with /list that nobody was lost meanwhile, the heart beats were read all along.
+
+    waiting_number个玩家各自进入一个房间，等待一个永远不来的对手。
+    在所有人都在大厅时和等待hold_time秒之后读取服务器的线程数和内存，
+    然后由一个观察者用/list检查期间没有玩家断线，心跳一直被读取
+    :param server_options: keyword arguments of GameServer.create_game_server, e.g. hall_thread_idle_timeout
+    """
+    listening_port: int = find_free_port()
+    user_info_file_path: str = write_user_info_file(waiting_number + 1)
+    server_process: subprocess.Popen = start_server_process(server_engine, listening_port, user_info_file_path,
+                                                            game_room_number=waiting_number,
+                                                            max_game_room_number=waiting_number,
+                                                            **server_options)
+    heart_beat_pump: HeartBeatPump = HeartBeatPump()
+    heart_beat_pump.start()
+    clients: list[ScriptedClient] = []
+    try:
+        for i in range(waiting_number + 1):
+            client: ScriptedClient = ScriptedClient("127.0.0.1", listening_port, f"bench{i}", f"password{i}",
+                                                    heart_beat_in_band=heart_beat_in_band,
+                                                    heart_beat_pump=heart_beat_pump)
+            client.connect()
+            if not client.login():
+                raise RuntimeError("Login failed")
+            clients.append(client)
+        observer: ScriptedClient = clients.pop()
+        in_hall_status: dict[str, int] = read_process_status(server_process.pid)
+
+        for room_id, client in enumerate(clients):
+            if client.hall_command(f"/enter {room_id}") != OperationStatus.OperationStatus.wait:
+                raise RuntimeError("The player could not wait in the room")
+        time.sleep(hold_time)
+        waiting_status: dict[str, int] = read_process_status(server_process.pid)
+
+        room_status: list[str] = observer.hall_command("/list").split()[2:]
+        still_waiting: int = sum(int(player_number) for player_number in room_status)
+    finally:
+        heart_beat_pump.stop()
+        for client in clients:
+            client.close()
+        server_process.kill()
+        server_process.wait()
+        os.remove(user_info_file_path)
+
+    return {
+        "benchmark": "waiting",
+        "engine": server_engine,
+        "heart_beat": "in-band" if heart_beat_in_band else "socket",
+        "waiting_players": waiting_number,
+        "server_threads_in_hall": in_hall_status["threads"],
+        "server_threads_waiting": waiting_status["threads"],
+        "server_rss_kb_in_hall": in_hall_status["rss_kb"],
+        "server_rss_kb_waiting": waiting_status["rss_kb"],
+        "lost_while_waiting": waiting_number - still_waiting,
+    }
+
+
+def benchmark_slow_clients(server_engine: str, slow_number: int, burst_number: int, watcher_number: int,
+                           pair_number: int, room_number: int, push_interval: float, duration: float,
+                           **server_options) -> dict:
+    """
+    slow_number clients /watch, then send burst_number /list at once and never read the answers nor the pushes,
+    their receive windows fill up. Meanwhile watcher_number clients /watch and read every push,
+    and pair_number pairs of players play in a loop. Reported: the longest gap between two pushes to a watcher,
+    the games per second and the longest game, then how many slow clients the server closed on its own.
+
+    slow_number个客户端/watch，然后一次发送burst_number个/list，从不读取回答和推送，它们的接收窗口被填满。
+    同时watcher_number个客户端/watch并读取每次推送，pair_number对玩家循环游戏。
+    报告关注者两次推送之间最长的间隔、每秒游戏数和最长的一局，以及服务器自己关闭了多少个慢客户端
+    :param server_options: keyword arguments of GameServer.create_game_server, e.g. write_timeout
+    """
+    listening_port: int = find_free_port()
+    client_number: int = slow_number + watcher_number + 2 * pair_number
+    user_info_file_path: str = write_user_info_file(client_number)
+    server_process: subprocess.Popen = start_server_process(server_engine, listening_port, user_info_file_path,
+                                                            game_room_number=room_number,
+                                                            max_game_room_number=room_number,
+                                                            room_status_push_interval=push_interval,
+                                                            **server_options)
+    heart_beat_pump: HeartBeatPump = HeartBeatPump()
+    heart_beat_pump.start()
+    stop_event: threading.Event = threading.Event()
+    push_times: list[list[float]] = [[] for _ in range(watcher_number)]
+    game_times: list[float] = []
+    failures: list[str] = []
+
+    def new_client(i: int) -> ScriptedClient:
+        client: ScriptedClient = ScriptedClient("127.0.0.1", listening_port, f"bench{i}", f"password{i}",
+                                                heart_beat_in_band=True, heart_beat_pump=heart_beat_pump)
+        client.connect()
+        if not client.login():
+            raise RuntimeError("Login failed")
+        return client
+
+    def read_pushes(watchers: list[ScriptedClient]) -> None:
+        push_selector: selectors.BaseSelector = selectors.DefaultSelector()
+        for watcher in watchers:
+            push_selector.register(watcher.server_channel.socket, selectors.EVENT_READ, watcher)
+        while not stop_event.is_set():
+            for key, _ in push_selector.select(0.1):
+                key.data.server_channel.poll_heart_beats()
+
+    def play(players: tuple[ScriptedClient, ScriptedClient], room_id: int) -> None:
+        try:
+            while not stop_event.is_set():
+                game_start: float = time.perf_counter()
+                for player in players:
+                    if player.hall_command(f"/enter {room_id}") != OperationStatus.OperationStatus.wait:
+                        raise RuntimeError("The player could not wait in the room")
+                # STEP 1.2.0.0 - STEP 1.2.1.0, both guess before either waits for the result
+                for player in players:
+                    player.receive()
+                for player, guess in zip(players, ("True", "False")):
+                    player.send(guess)
+                for player in players:
+                    player.receive()
+                    # STEP1.1.0.0
+                    player.receive()
+                game_times.append(time.perf_counter() - game_start)
+        except Exception as e:
+            if not stop_event.is_set():
+                failures.append(repr(e))
+
+    clients: list[ScriptedClient] = []
+    try:
+        clients = [new_client(i) for i in range(client_number)]
+        slow_clients: list[ScriptedClient] = clients[:slow_number]
+        watchers: list[ScriptedClient] = clients[slow_number:slow_number + watcher_number]
+        players: list[ScriptedClient] = clients[slow_number + watcher_number:]
+
+        for watcher_id, watcher in enumerate(watchers):
+            watcher.hall_command("/watch")
+            watcher.server_channel.push_handler = \
+                lambda _, watcher_id=watcher_id: push_times[watcher_id].append(time.perf_counter())
+        list_answer_size: int = len(slow_clients[0].hall_command("/list").encode()) if slow_clients else 0
+        for slow_client in slow_clients:
+            slow_client.hall_command("/watch")
+            # a small receive window, it fills up sooner
+            # 很小的接收窗口，更快被填满
+            slow_client.server_channel.socket.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4096)
+
+        reader_thread: threading.Thread = threading.Thread(target=read_pushes, args=(watchers,), daemon=True)
+        player_threads: list[threading.Thread] = [
+            threading.Thread(target=play, args=((players[2 * i], players[2 * i + 1]), i), daemon=True)
+            for i in range(pair_number)]
+        reader_thread.start()
+        for player_thread in player_threads:
+            player_thread.start()
+        time.sleep(0.5)
+
+        start_time: float = time.perf_counter()
+        start_game_number: int = len(game_times)
+        for slow_client in slow_clients:
+            slow_client.server_channel.socket.sendall(
+                MessageFraming.encode_frame("hall_command:/list") * burst_number)
+        time.sleep(duration)
+        end_time: float = time.perf_counter()
+        game_number: int = len(game_times) - start_game_number
+        end_status: dict[str, int] = read_process_status(server_process.pid)
+        stop_event.set()
+
+        # a slow client reads at last: the connection ends if it was evicted,
+        # otherwise the answers stop coming or the pushes keep coming
+        # 慢客户端最后读取：如果被驱逐，连接结束，否则回答不再到来，或者推送一直到来
+        evicted_number: int = 0
+        for slow_client in slow_clients:
+            slow_socket: socket.socket = slow_client.server_channel.socket
+            slow_socket.settimeout(2)
+            read_deadline: float = time.monotonic() + 5
+            try:
+                while slow_socket.recv(1 << 16):
+                    if time.monotonic() > read_deadline:
+                        break
+                else:
+                    evicted_number += 1
+            except ConnectionResetError:
+                evicted_number += 1
+            except TimeoutError:
+                pass
+        reader_thread.join(1)
+        for player_thread in player_threads:
+            player_thread.join(1)
+    finally:
+        heart_beat_pump.stop()
+        for client in clients:
+            client.close()
+        server_process.kill()
+        server_process.wait()
+        os.remove(user_info_file_path)
+
+    # the gaps between the pushes to each watcher during the burst, until its end
+    # 突发期间每个关注者两次推送之间的间隔，直到结束
+    push_gaps: list[float] = []
+    for watcher_push_times in push_times:
+        measured_times: list[float] = [start_time] + [push_time for push_time in watcher_push_times
+                                                      if start_time <= push_time <= end_time] + [end_time]
+        push_gaps.extend(later - earlier for earlier, later in zip(measured_times, measured_times[1:]))
+
+    return {
+        "benchmark": "slow-clients",
+        "engine": server_engine,
+        **server_options,
+        "slow_clients": slow_number,
+        "burst_kb": round(burst_number * list_answer_size / 1024),
+        "watchers": watcher_number,
+        "pairs": pair_number,
+        "max_push_gap_ms": round(max(push_gaps, default=0) * 1000, 1),
+        "games_per_second": round(game_number / duration, 1),
+        "max_game_ms": round(max(game_times[start_game_number:], default=0) * 1000, 1),
+        "server_rss_kb": end_status["rss_kb"],
+        "slow_clients_evicted": evicted_number,
+        "failures": len(failures),
+    }
+
+
+def benchmark_login_storm(server_engine: str, player_number: int, concurrency: int, heart_beat_delay: float,
+                          abandoned_number: int, heart_beat_rendezvous_timeout: float) -> dict:
+    """
+    Log in player_number players as fast as possible, each opens its heart beat connection
+    heart_beat_delay seconds after the login result. Report the CPU the server burns meanwhile.
+    abandoned_number more players never open the heart beat connection,
+    the server should give up and close them after heart_beat_rendezvous_timeout.
+
+    尽快登录player_number个玩家，每个玩家在登录结果后heart_beat_delay秒才建立心跳连接，报告服务器在此期间消耗的CPU
+    另外abandoned_number个玩家从不建立心跳连接，服务器应在heart_beat_rendezvous_timeout后放弃并关闭它们
+    """
+    listening_port: int = find_free_port()
+    user_info_file_path: str = write_user_info_file(player_number + abandoned_number)
+    server_process: subprocess.Popen = start_server_process(
+        server_engine, listening_port, user_info_file_path,
+        heart_beat_rendezvous_timeout=heart_beat_rendezvous_timeout)
+
+    heart_beat_pump: HeartBeatPump = HeartBeatPump()
+    heart_beat_pump.start()
+    client_list: list[ScriptedClient] = []
+    abandoned_list: list[ScriptedClient] = []
+
+    def login_one(i: int) -> None:
+        client: ScriptedClient = ScriptedClient("127.0.0.1", listening_port, f"bench{i}", f"password{i}",
+                                                heart_beat_pump=heart_beat_pump,
+                                                heart_beat_delay=heart_beat_delay)
+        client_list.append(client)
+        client.connect()
+        if i < abandoned_number:
+            abandoned_list.append(client)
+            client.login(establish_heart_beat=False)
+        elif not client.login():
+            raise RuntimeError(f"bench{i} login failed")
+
+    try:
+        idle_status: dict[str, int] = read_process_status(server_process.pid)
+        start_time: float = time.perf_counter()
+        with concurrent.futures.ThreadPoolExecutor(max_workers=concurrency) as executor:
+            for future in [executor.submit(login_one, i) for i in range(player_number + abandoned_number)]:
+                future.result()
+        elapsed: float = time.perf_counter() - start_time
+        loaded_status: dict[str, int] = read_process_status(server_process.pid)
+
+        # the abandoned logins are closed by the server
+        # 被放弃的登录由服务器关闭
+        reclaimed_number: int = 0
+        for client in abandoned_list:
+            client.server_channel.socket.settimeout(heart_beat_rendezvous_timeout + 2)
+            try:
+                client.receive()
+            except ConnectionError:
+                reclaimed_number += 1
+            except OSError:
+                pass
+        reclaimed_status: dict[str, int] = read_process_status(server_process.pid)
+    finally:
+        heart_beat_pump.stop()
+        for client in client_list:
+            client.close()
+        server_process.kill()
+        server_process.wait()
+        os.remove(user_info_file_path)
+
+    cpu_seconds: float = loaded_status["cpu_seconds"] - idle_status["cpu_seconds"]
+    return {
+        "benchmark": "login_storm",
+        "engine": server_engine,
+        "players": player_number,
+        "heart_beat_delay_ms": heart_beat_delay * 1000,
+        "logins_per_second": round((player_number + abandoned_number) / elapsed, 1),
+        "server_cpu_seconds": round(cpu_seconds, 2),
+        "server_cpu_percent": round(cpu_seconds / elapsed * 100, 1),
+        "server_cpu_ms_per_login": round(cpu_seconds * 1000 / (player_number + abandoned_number), 2),
+        "abandoned": abandoned_number,
+        "abandoned_reclaimed": reclaimed_number,
+        "server_threads_after_reclaim": reclaimed_status["threads"],
+    }
+
+
+# how a soak session ends, see benchmark_soak
+# 压力测试会话的结束方式，见benchmark_soak
+SOAK_ENDINGS: tuple[str, ...] = ("exit", "drop_in_hall", "drop_in_room", "drop_in_game")
+
+
+def benchmark_soak(server_engine: str, session_number: int, concurrency: int, silent_every: int,
+                   sweep_interval: float, heart_beat_timeout: float) -> dict:
+    """
+    Churn session_number sessions through the server and check it gives back every thread, connection and player.
+    Each of concurrency workers owns two accounts and four rooms, half of them use in-band heart beats.
+    The sessions end in turn by /exit, by dropping the connections in the game hall, in a room, or in a game
+    (the opponent is told it won, then exits), and one in silent_every stops its heart beats in the game hall
+    and must be disconnected by the server. At the end the server counts of the session tracker must be back to 0
+    and its threads and file descriptors back to where they started.
+
+    让session_number个会话轮流经过服务器，检查它归还每个线程、连接和玩家。
+    concurrency个工作线程各自拥有两个账号和四个房间，一半使用带内心跳。会话轮流以/exit、在大厅断开、在房间里断开、
+    在游戏中断开（对手被告知获胜后退出）结束，每silent_every个会话有一个在大厅停止心跳，必须由服务器断开。
+    最后会话跟踪器的计数必须回到0，服务器的线程数和文件描述符数回到开始时的值
+    """
+    listening_port: int = find_free_port()
+    user_info_file_path: str = write_user_info_file(2 * concurrency)
+    session_stats_path: str = user_info_file_path + ".session_stats.json"
+    room_per_worker: int = 4
+    server_process: subprocess.Popen = start_server_process(server_engine, listening_port, user_info_file_path,
+                                                            session_stats_path=session_stats_path,
+                                                            game_room_number=room_per_worker * concurrency,
+                                                            heart_beat_timeout=heart_beat_timeout,
+                                                            hall_thread_idle_timeout=1,
+                                                            session_sweep_interval=sweep_interval)
+    heart_beat_pump: HeartBeatPump = HeartBeatPump(heart_beat_timeout / 4)
+    heart_beat_pump.start()
+    counter_lock: threading.Lock = threading.Lock()
+    ending_numbers: dict[str, int] = {ending: 0 for ending in SOAK_ENDINGS + ("silent",)}
+    silent_not_disconnected: list[int] = [0]
+    failures: list[str] = []
+    next_session: list[int] = [0]
+
+    def claim_sessions(number: int) -> bool:
+        with counter_lock:
+            if next_session[0] >= session_number:
+                return False
+            next_session[0] += number
+            return True
+
+    def count(ending: str) -> None:
+        with counter_lock:
+            ending_numbers[ending] += 1
+
+    def churn(worker_id: int) -> None:
+        accounts: list[tuple[str, str]] = [(f"bench{2 * worker_id + i}", f"password{2 * worker_id + i}")
+                                           for i in range(2)]
+        heart_beat_in_band: bool = worker_id % 2 == 1
+
+        def new_client(account: int) -> ScriptedClient:
+            client: ScriptedClient = ScriptedClient("127.0.0.1", listening_port, *accounts[account],
+                                                    heart_beat_in_band=heart_beat_in_band,
+                                                    heart_beat_pump=heart_beat_pump)
+            client.connect()
+            if not client.login():
+                raise RuntimeError(f"{accounts[account][0]} login failed")
+            return client
+
+        def drop(client: ScriptedClient) -> None:
+            heart_beat_pump.remove_client(client)
+            client.close()
+
+        iteration: int = 0
+        while True:
+            # a room is used again four sessions later, the server has long seen the last one drop
+            # 一个房间四个会话之后才再次使用，服务器早已发现上一个会话断开
+            room_id: int = worker_id * room_per_worker + iteration % room_per_worker
+            ending: str = "silent" if silent_every and iteration % silent_every == silent_every - 1 \
+                else SOAK_ENDINGS[iteration % len(SOAK_ENDINGS)]
+            iteration += 1
+            if not claim_sessions(2 if ending == "drop_in_game" else 1):
+                return
+            try:
+                client: ScriptedClient = new_client(0)
+                if ending == "exit":
+                    client.hall_command("/list")
+                    client.hall_command("/exit")
+                    drop(client)
+                elif ending == "drop_in_hall":
+                    drop(client)
+                elif ending == "drop_in_room":
+                    if client.hall_command(f"/enter {room_id}") != OperationStatus.OperationStatus.wait:
+                        raise RuntimeError(f"room {room_id} is not free")
+                    drop(client)
+                elif ending == "drop_in_game":
+                    opponent: ScriptedClient = new_client(1)
+                    for player in (client, opponent):
+                        if player.hall_command(f"/enter {room_id}") != OperationStatus.OperationStatus.wait:
+                            raise RuntimeError(f"room {room_id} is not free")
+                    client.receive()
+                    opponent.receive()
+                    client.send("True")
+                    drop(opponent)
+                    result: str = client.receive()
+                    if result != OperationStatus.OperationStatus.win_the_game_since_opponent_quit:
+                        raise RuntimeError(f"unexpected result {result}")
+                    client.receive()
+                    client.hall_command("/exit")
+                    drop(client)
+                else:
+                    # the heart beats stop, the connections stay open, the server must close them
+                    # 心跳停止，连接保持打开，服务器必须关闭它们
+                    heart_beat_pump.remove_client(client)
+                    client.server_channel.socket.settimeout(heart_beat_timeout * 5)
+                    try:
+                        client.receive()
+                    except ConnectionError:
+                        pass
+                    except OSError:
+                        with counter_lock:
+                            silent_not_disconnected[0] += 1
+                    client.close()
+                count(ending)
+            except Exception as e:
+                failures.append(f"{ending}: {e!r}")
+                if len(failures) > 100:
+                    return
+
+    try:
+        start_stats: dict[str, int] = read_session_stats(session_stats_path)
+        start_status: dict[str, int] = read_process_status(server_process.pid)
+        peak_sessions: int = 0
+        peak_rss_kb: int = start_status["rss_kb"]
+        start_time: float = time.perf_counter()
+        worker_threads: list[threading.Thread] = [threading.Thread(target=churn, args=(worker_id,), daemon=True)
+                                                  for worker_id in range(concurrency)]
+        for worker_thread in worker_threads:
+            worker_thread.start()
+        while any(worker_thread.is_alive() for worker_thread in worker_threads):
+            peak_sessions = max(peak_sessions, read_session_stats(session_stats_path)["sessions"])
+            peak_rss_kb = max(peak_rss_kb, read_process_status(server_process.pid)["rss_kb"])
+            time.sleep(0.5)
+        elapsed: float = time.perf_counter() - start_time
+
+        # the last drops are noticed and the hall threads idle out, a leak would be reclaimed by two sweeps,
+        # wait until the server is back where it started, or a leak stays
+        # 最后的断开被发现，大厅线程空闲结束，泄漏会在两次清扫之内被回收，等待服务器回到开始时的状态，否则就是泄漏
+        settle_deadline: float = time.monotonic() + 3 * sweep_interval + 2 * heart_beat_timeout + 5
+        while True:
+            end_stats: dict[str, int] = read_session_stats(session_stats_path)
+            end_status: dict[str, int] = read_process_status(server_process.pid)
+            settled: bool = end_stats["sessions"] == end_stats["players"] == 0 and \
+                end_status["threads"] <= start_status["threads"] and \
+                end_status["file_descriptors"] <= start_status["file_descriptors"]
+            if settled or time.monotonic() > settle_deadline:
+                break
+            time.sleep(0.5)
+        settle_time: float = time.perf_counter() - start_time - elapsed
+    finally:
+        heart_beat_pump.stop()
+        server_process.kill()
+        server_process.wait()
+        os.remove(user_info_file_path)
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(session_stats_path)
+
+    return {
+        "benchmark": "soak",
+        "engine": server_engine,
+        "sessions": end_stats["opened_sessions"] - start_stats["opened_sessions"],
+        "client_sessions": next_session[0],
+        "concurrency": concurrency,
+        "endings": ending_numbers,
+        "sessions_per_second": round(next_session[0] / elapsed, 1),
+        "settle_seconds": round(settle_time, 1),
+        "failures": len(failures),
+        "first_failures": failures[:3],
+        "silent_not_disconnected": silent_not_disconnected[0],
+        "peak_live_sessions": peak_sessions,
+        "live_sessions_left": end_stats["sessions"],
+        "players_left": end_stats["players"],
+        "connections_left": end_stats["session_connections"],
+        "orphaned_sessions_reclaimed": end_stats["orphaned_sessions"],
+        "orphaned_players_reclaimed": end_stats["orphaned_players"],
+        "server_threads_start": start_status["threads"],
+        "server_threads_end": end_status["threads"],
+        "server_fds_start": start_status["file_descriptors"],
+        "server_fds_end": end_status["file_descriptors"],
+        "server_rss_kb_start": start_status["rss_kb"],
+        "server_rss_kb_peak": peak_rss_kb,
+        "server_rss_kb_end": end_status["rss_kb"],
+    }
+
+
+# the stages timed by benchmark_in_process, in the order of a session
+# benchmark_in_process测量的阶段，按会话中的顺序
+IN_PROCESS_STAGES: tuple[str, ...] = ("connect", "login", "list", "enter", "game", "exit")
+
+
+def benchmark_in_process(server_engine: str, transport: str, session_number: int, concurrency: int,
+                         heart_beat_in_band: bool, protocol_version: int, seed: int) -> dict:
+    """
+    Run session_number full sessions against a server in this process (InProcessHarness.py) and time every stage:
+    connect, login (the heart beat included), /list, /enter, game (from the start to back in the game hall), /exit.
+    Each of concurrency workers drives the two players of one room of its own, game after game, the guesses come
+    from the seed, so every run plays the same games. Every answer is checked, a game ends in a tie or with
+    exactly one winner, and no session or player of the server is left at the end.
+
+    对本进程中的服务器（InProcessHarness.py）运行session_number个完整会话并测量每个阶段：
+    连接、登录（包括心跳）、/list、/enter、游戏（从开始到回到大厅）、/exit。
+    concurrency个工作线程各自驱动自己房间的两个玩家一局接一局地游戏，猜测来自随机种子，所以每次运行的游戏都相同。
+    每个回答都被检查，游戏以平局或恰好一个赢家结束，最后服务器不剩任何会话或玩家
+    """
+    user_info_file_path: str = write_user_info_file(2 * concurrency)
+    in_process_server: InProcessHarness.InProcessServer = InProcessHarness.InProcessServer(
+        server_engine, find_free_port(), user_info_file_path, transport, game_room_number=concurrency)
+    heart_beat_pump: HeartBeatPump = HeartBeatPump()
+    guess_random: random.Random = random.Random(seed)
+    # the guesses of the two players of every game, in the order the games are claimed
+    # 每局游戏两个玩家的猜测，按游戏被领取的顺序
+    game_guesses: list[tuple[str, str]] = [(str(guess_random.random() < 0.5), str(guess_random.random() < 0.5))
+                                           for _ in range((session_number + 1) // 2)]
+    result_lock: threading.Lock = threading.Lock()
+    stage_times: dict[str, list[float]] = {stage: [] for stage in IN_PROCESS_STAGES}
+    session_times: list[float] = []
+    result_numbers: dict[str, int] = {"tie": 0, "win": 0}
+    failures: list[str] = []
+    next_game: list[int] = [0]
+
+    def claim_game() -> int | None:
+        with result_lock:
+            if next_game[0] >= len(game_guesses) or failures:
+                return None
+            next_game[0] += 1
+            return next_game[0] - 1
+
+    def check(answer: str, expected: str, what: str) -> None:
+        if not answer.startswith(expected):
+            raise RuntimeError(f"{what}: {answer!r}")
+
+    def play_game(worker_id: int, guesses: tuple[str, str]) -> None:
+        players: list[ScriptedClient] = [
+            ScriptedClient("127.0.0.1", in_process_server.listening_port, f"bench{2 * worker_id + i}",
+                           f"password{2 * worker_id + i}", protocol_version, heart_beat_in_band, heart_beat_pump,
+                           connection_factory=in_process_server.connect)
+            for i in range(2)]
+        times: dict[str, float] = {}
+
+        def timed(stage: str, function, *args):
+            start_time: float = time.perf_counter()
+            result = function(*args)
+            times[stage] = times.get(stage, 0) + time.perf_counter() - start_time
+            return result
+
+        # the two players go through every stage one after the other, the stage time is for both
+        # 两个玩家依次经过每个阶段，阶段耗时是两者的
+        session_start_time: float = time.perf_counter()
+        for player in players:
+            timed("connect", player.connect)
+        for player in players:
+            if not timed("login", player.login):
+                raise RuntimeError(f"{player.username} login failed")
+        for player in players:
+            check(timed("list", player.hall_command, "/list"), OperationStatus.OperationStatus.list_rooms_status,
+                  "/list")
+        for player in players:
+            check(timed("enter", player.hall_command, f"/enter {worker_id}"), OperationStatus.OperationStatus.wait,
+                  "/enter")
+
+        # STEP 1.2.0.0 - STEP1.1.0.0, the same as ScriptedClient.play_game for both players
+        game_start_time: float = time.perf_counter()
+        for player in players:
+            check(player.receive(), OperationStatus.OperationStatus.game_started, "game start")
+        for player, guess in zip(players, guesses):
+            player.send(guess)
+        results: list[str] = [player.receive() for player in players]
+        for player in players:
+            player.send_acknowledgement("STEP1.2.2.0 Client Received")
+        for player in players:
+            player.receive()
+        times["game"] = time.perf_counter() - game_start_time
+        if guesses[0] == guesses[1]:
+            if results != [OperationStatus.OperationStatus.result_is_tie] * 2:
+                raise RuntimeError(f"same guesses, results {results}")
+            result: str = "tie"
+        else:
+            if sorted(results) != sorted([OperationStatus.OperationStatus.win_the_game,
+                                          OperationStatus.OperationStatus.lose_the_game]):
+                raise RuntimeError(f"different guesses, results {results}")
+            result: str = "win"
+
+        for player in players:
+            check(timed("exit", player.hall_command, "/exit"), OperationStatus.OperationStatus.bye_bye, "/exit")
+            heart_beat_pump.remove_client(player)
+            player.close()
+        session_time: float = time.perf_counter() - session_start_time
+
+        with result_lock:
+            for stage, stage_time in times.items():
+                stage_times[stage].append(stage_time / 2)
+            session_times.extend((session_time, session_time))
+            result_numbers[result] += 1
+
+    def work(worker_id: int) -> None:
+        while (game_id := claim_game()) is not None:
+            try:
+                play_game(worker_id, game_guesses[game_id])
+            except Exception as e:
+                # the players of the worker may still be logged in, stop every worker
+                # 工作线程的玩家可能仍然登录着，停止所有工作线程
+                with result_lock:
+                    failures.append(f"game {game_id}: {e!r}")
+                return
+
+    def stage_summary(times: list[float]) -> dict[str, float]:
+        times = sorted(times)
+        return {"mean_ms": round(statistics.mean(times) * 1000, 3),
+                "p50_ms": round(times[len(times) // 2] * 1000, 3),
+                "p99_ms": round(times[min(len(times) - 1, int(len(times) * 0.99))] * 1000, 3)}
+
+    # the server prints every message, keep the JSON output clean
+    # 服务器会打印每条消息，保持JSON输出干净
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        try:
+            in_process_server.start()
+            heart_beat_pump.start()
+            start_time: float = time.perf_counter()
+            worker_threads: list[threading.Thread] = [threading.Thread(target=work, args=(worker_id,), daemon=True)
+                                                      for worker_id in range(concurrency)]
+            for worker_thread in worker_threads:
+                worker_thread.start()
+            for worker_thread in worker_threads:
+                worker_thread.join()
+            elapsed: float = time.perf_counter() - start_time
+
+            # the server may see the last exits a moment after the clients
+            # 服务器可能在客户端之后片刻才看到最后的退出
+            settle_deadline: float = time.monotonic() + 5
+            while True:
+                end_stats: dict[str, int] = in_process_server.session_stats()
+                if end_stats["sessions"] == end_stats["players"] == 0 or time.monotonic() > settle_deadline:
+                    break
+                time.sleep(0.05)
+        finally:
+            heart_beat_pump.stop()
+            os.remove(user_info_file_path)
+
+    return {
+        "benchmark": "in_process",
+        "engine": server_engine,
+        "transport": transport,
+        "protocol_version": protocol_version,
+        "heart_beat": "in-band" if heart_beat_in_band else "socket",
+        "seed": seed,
+        "sessions": len(session_times),
+        "concurrency": concurrency,
+        "sessions_per_second": round(len(session_times) / elapsed, 1),
+        "session": stage_summary(session_times) if session_times else None,
+        "stages": {stage: stage_summary(times) for stage, times in stage_times.items() if times},
+        "results": result_numbers,
+        "failures": len(failures),
+        "first_failures": failures[:3],
+        "sessions_left": end_stats["sessions"],
+        "players_left": end_stats["players"],
+    }
+
+
+class StressSession:
+    """
+    Stands for the hall thread of a player in the room stress test, only the pause flag
+    房间压力测试中代表玩家大厅线程的对象，只有暂停标志
+    """
+
+    def __init__(self) -> None:
+        self.thread_lock: threading.Event = threading.Event()
+
+    def resume_thread_to_game(self) -> None:
+        self.thread_lock.set()
+
+
+def stress_room_entry(thread_number: int, duration: float, room_size: int) -> dict:
+    """
+    thread_number threads enter the same room over and over for duration seconds, in process, no sockets.
+    Each thread: enter room 0 (retry while it is full) -> player_ready -> the thread told to start the game
+    checks the room, clears it and resumes the players -> wait until resumed.
+    Any overfilled room, game started twice or with someone not waiting, and any player nobody resumes is counted.
+
+    thread_number个线程在duration秒内反复进入同一个房间，进程内，没有套接字
+    统计房间超员、同一局游戏开始两次、有人未等待就开始游戏，以及没有被恢复的玩家
+    """
+    game_hall: GameHall.GameHall = GameHall.GameHall(None)
+    game_room = game_hall.game_room_list[0]
+    game_room.MAX_PLAYER_NUMBER = room_size
+
+    counter_lock: threading.Lock = threading.Lock()
+    counters: dict[str, int] = {"entries": 0, "games": 0, "overfilled": 0, "bad_starts": 0, "room_full_retries": 0}
+    start_barrier: threading.Barrier = threading.Barrier(thread_number + 1)
+    stop_event: threading.Event = threading.Event()
+
+    def count(counter: str) -> None:
+        with counter_lock:
+            counters[counter] += 1
+
+    def hammer(i: int) -> None:
+        player: Player.Player = Player.Player(f"bench{i}", f"password{i}", object(), StressSession(),
+                                              player_status=Player.Player.IN_THE_GAME_HALL)
+        game_hall.add_player(player)
+        start_barrier.wait()
+
+        while not stop_event.is_set():
+            try:
+                game_hall.enter_room(player, 0)
+            except OperationStatus.RoomFullError:
+                count("room_full_retries")
+                time.sleep(0)
+                continue
+            count("entries")
+            if len(game_room.player_list) > room_size:
+                count("overfilled")
+
+            player.player_thread.thread_lock.clear()
+            if game_room.player_ready(player):
+                # the only thread starting this game, the room must be exactly full and everybody waiting
+                # 唯一开始这局游戏的线程，房间必须正好满员且所有人都在等待
+                count("games")
+                if len(game_room.player_list) != room_size or len(game_room.ready_player_list) != room_size:
+                    count("bad_starts")
+                for room_player in game_room.clear_room():
+                    room_player.player_thread.resume_thread_to_game()
+
+            player.player_thread.thread_lock.wait()
+
+    hammer_threads: list[threading.Thread] = [threading.Thread(target=hammer, args=(i,), daemon=True)
+                                              for i in range(thread_number)]
+    for hammer_thread in hammer_threads:
+        hammer_thread.start()
+    start_barrier.wait()
+    time.sleep(duration)
+    stop_event.set()
+
+    # give the running games time to finish, the players left waiting in the half-full room are resumed here
+    # 等待正在进行的游戏结束，留在未满房间里等待的玩家在这里恢复
+    time.sleep(1)
+    left_in_room: list[Player.Player] = game_room.clear_room()
+    for room_player in left_in_room:
+        room_player.player_thread.resume_thread_to_game()
+    for hammer_thread in hammer_threads:
+        hammer_thread.join(5)
+
+    return {
+        "benchmark": "room_stress",
+        "threads": thread_number,
+        "room_size": room_size,
+        "entries": counters["entries"],
+        "games_started": counters["games"],
+        "games_per_second": round(counters["games"] / duration, 1),
+        "room_full_retries": counters["room_full_retries"],
+        "overfilled": counters["overfilled"],
+        "bad_starts": counters["bad_starts"],
+        # entries that are neither in a started game nor left waiting in the half-full room
+        # 既不在已开始的游戏里，也不是留在未满房间里等待的进入
+        "lost_entries": counters["entries"] - counters["games"] * room_size - len(left_in_room),
+        "left_waiting": len(left_in_room),
+        "stuck_players": sum(hammer_thread.is_alive() for hammer_thread in hammer_threads),
+    }
+
+def benchmark_match(join_mode: str, thread_number: int, room_number: int, duration: float) -> dict:
+    """
+    Matches formed per second by thread_number threads over room_number rooms, in process, no sockets.
+    join_mode "match": GameHall.match_room, the fullest room with a free seat.
+    join_mode "list": what a client does without /match, read the /list answer and enter the first room
+    showing a free seat, retry on 3013 Room Full.
+    Each thread: join -> player_ready -> the thread starting the game clears the room -> wait until resumed.
+
+    thread_number个线程在room_number个房间里每秒组成的对局数，进程内，没有套接字
+    "match"：GameHall.match_room；"list"：没有/match时客户端的做法，读/list的结果，进入第一个显示有空位的房间，
+    收到3013房间已满时重试
+    """
+    game_hall: GameHall.GameHall = GameHall.GameHall(None, room_number)
+    room_size: int = GameRoom.GameRoom.DEFAULT_MAX_PLAYER_NUMBER
+
+    counter_lock: threading.Lock = threading.Lock()
+    counters: dict[str, float] = {"games": 0, "room_full_retries": 0, "wait_seconds": 0.0, "joins": 0}
+    start_barrier: threading.Barrier = threading.Barrier(thread_number + 1)
+    stop_event: threading.Event = threading.Event()
+
+    def add(counter: str, value: float = 1) -> None:
+        with counter_lock:
+            counters[counter] += value
+
+    def join_by_list(player: Player.Player) -> None:
+        while True:
+            room_status: list[str] = game_hall.list_room_and_status().split()[2:]
+            free_room_ids: list[int] = [room_id for room_id, player_number in enumerate(room_status)
+                                        if int(player_number) < room_size]
+            if not free_room_ids:
+                add("room_full_retries")
+                time.sleep(0)
+                continue
+            try:
+                game_hall.enter_room(player, free_room_ids[0])
+                return
+            except OperationStatus.RoomFullError:
+                add("room_full_retries")
+
+    def join_by_match(player: Player.Player) -> None:
+        while True:
+            try:
+                game_hall.match_room(player)
+                return
+            except OperationStatus.RoomFullError:
+                add("room_full_retries")
+                time.sleep(0)
+
+    join: Callable[[Player.Player], None] = join_by_match if join_mode == "match" else join_by_list
+
+    def play(i: int) -> None:
+        player: Player.Player = Player.Player(f"bench{i}", f"password{i}", object(), StressSession(),
+                                              player_status=Player.Player.IN_THE_GAME_HALL)
+        game_hall.add_player(player)
+        start_barrier.wait()
+
+        while not stop_event.is_set():
+            join(player)
+            joined_time: float = time.perf_counter()
+            player.player_thread.thread_lock.clear()
+            game_room: GameRoom.GameRoom = player.game_room
+            if game_room.player_ready(player):
+                add("games")
+                for room_player in game_room.clear_room():
+                    room_player.player_thread.resume_thread_to_game()
+            player.player_thread.thread_lock.wait()
+            add("wait_seconds", time.perf_counter() - joined_time)
+            add("joins")
+
+    play_threads: list[threading.Thread] = [threading.Thread(target=play, args=(i,), daemon=True)
+                                            for i in range(thread_number)]
+    for play_thread in play_threads:
+        play_thread.start()
+    start_barrier.wait()
+    time.sleep(duration)
+    stop_event.set()
+
+    # resume the players left waiting in half-full rooms
+    # 恢复留在未满房间里等待的玩家
+    time.sleep(1)
+    left_waiting: int = 0
+    for game_room in game_hall.game_room_list:
+        for room_player in game_room.clear_room():
+            left_waiting += 1
+            room_player.player_thread.resume_thread_to_game()
+    for play_thread in play_threads:
+        play_thread.join(5)
+
+    return {
+        "benchmark": "match",
+        "join_mode": join_mode,
+        "threads": thread_number,
+        "rooms": room_number,
+        "matches_per_second": round(counters["games"] / duration, 1),
+        "room_full_retries": int(counters["room_full_retries"]),
+        "mean_wait_ms": round(counters["wait_seconds"] * 1000 / max(1, counters["joins"]), 3),
+        "left_waiting": left_waiting,
+        "stuck_players": sum(play_thread.is_alive() for play_thread in play_threads),
+    }
+
+
+def benchmark_room_pool(player_number: int, game_room_number: int, list_number: int) -> dict:
+    """
+    The elastic room pool of the game hall, in process, no sockets.
+    player_number players enter rooms one by one with /match, the hall creates rooms on demand;
+    /list is timed at the peak; then everybody leaves, the rooms are retired into the free-list;
+    then everybody enters again, the retired room objects are reused.
+
+    游戏大厅的弹性房间池，进程内，没有套接字
+    player_number个玩家逐个用/match进入房间，大厅按需创建房间；在高峰时测量/list；
+    然后所有人离开，房间被回收到空闲列表；然后所有人再次进入，复用已回收的房间对象
+    """
+    game_hall: GameHall.GameHall = GameHall.GameHall(None, game_room_number, player_number)
+    players: list[Player.Player] = [Player.Player(f"bench{i}", f"password{i}", object(), StressSession(),
+                                                  player_status=Player.Player.IN_THE_GAME_HALL)
+                                    for i in range(player_number)]
+    for player in players:
+        game_hall.add_player(player)
+
+    def fill() -> float:
+        start_time: float = time.perf_counter()
+        for player in players:
+            game_hall.match_room(player)
+        return time.perf_counter() - start_time
+
+    def empty() -> float:
+        start_time: float = time.perf_counter()
+        for player in players:
+            player.game_room.remove_player(player)
+        return time.perf_counter() - start_time
+
+    fill_seconds: float = fill()
+    peak_rooms: int = len(game_hall.game_rooms)
+
+    start_time: float = time.perf_counter()
+    for _ in range(list_number):
+        list_answer: str = game_hall.list_room_and_status()
+    list_us: float = (time.perf_counter() - start_time) * 1e6 / list_number
+
+    # what /list did before the pool, visit every room
+    # 房间池之前/list的做法，访问每个房间
+    rooms: list[GameRoom.GameRoom] = game_hall.game_room_list
+    start_time = time.perf_counter()
+    for _ in range(list_number):
+        " ".join([OperationStatus.OperationStatus.list_rooms_status, str(len(rooms)),
+                  *[str(len(game_room.player_list)) for game_room in rooms]])
+    visit_all_rooms_us: float = (time.perf_counter() - start_time) * 1e6 / list_number
+
+    empty_seconds: float = empty()
+    rooms_after_empty: int = len(game_hall.game_rooms)
+    listed_rooms_after_empty: int = game_hall.game_room_number
+    spare_rooms_after_empty: int = len(game_hall.spare_rooms)
+
+    spare_rooms_before_refill: int = len(game_hall.spare_rooms)
+    refill_seconds: float = fill()
+
+    return {
+        "benchmark": "room_pool",
+        "players": player_number,
+        "min_rooms": game_room_number,
+        "peak_rooms": peak_rooms,
+        "join_us": round(fill_seconds * 1e6 / player_number, 2),
+        "list_us": round(list_us, 1),
+        "list_bytes": len(list_answer),
+        "visit_all_rooms_list_us": round(visit_all_rooms_us, 1),
+        "leave_us": round(empty_seconds * 1e6 / player_number, 2),
+        "rooms_after_empty": rooms_after_empty,
+        "listed_rooms_after_empty": listed_rooms_after_empty,
+        "spare_rooms_after_empty": spare_rooms_after_empty,
+        "rooms_reused_on_refill": spare_rooms_before_refill - len(game_hall.spare_rooms),
+        "rejoin_us": round(refill_seconds * 1e6 / player_number, 2),
+    }
+
+
+def benchmark_resolution(room_size: int, game_number: int, check_number: int) -> dict:
+    """
+    The cost of resolving the results of game_number games of room_size players, in process, no sockets.
+    Timed: GameRoom.Game.resolve_results and one lookup of the frames encoded beforehand per player,
+    which is what a game does, compared with encoding the result of every player on its own.
+    The first check_number games are checked against the rules applied to each player separately.
+    1 game in 10 is a tie and 1 in 20 has a player who did not guess.
+
+    解析game_number局room_size人游戏结果的开销，进程内，没有套接字
+    计时：GameRoom.Game.resolve_results、每个玩家查找一次预先编码好的帧（游戏的做法），
+    对比为每个玩家单独编码结果。前check_number局与逐个玩家套用规则的结果核对
+    """
+    random_generator: random.Random = random.Random(room_size)
+    games: list[tuple[list[str | None], bool]] = []
+    for _ in range(game_number):
+        choice: float = random_generator.random()
+        if choice < 0.1:
+            player_guesses: list[str | None] = [str(random_generator.random() < 0.5)] * room_size
+        else:
+            player_guesses = [str(random_generator.random() < 0.5) for _ in range(room_size)]
+            if choice < 0.15:
+                player_guesses[random_generator.randrange(room_size)] = None
+        games.append((player_guesses, random_generator.random() < 0.5))
+
+    result_frames: dict[str, bytes] = GameRoom.GameRoom.Game.RESULT_FRAMES
+    start_time: float = time.perf_counter()
+    for player_guesses, random_bool in games:
+        results: dict[str | None, str] = GameRoom.GameRoom.Game.resolve_results(player_guesses, random_bool)
+        player_frames: list[bytes] = [result_frames[results[guess]] for guess in player_guesses]
+    resolve_seconds: float = time.perf_counter() - start_time
+
+    start_time = time.perf_counter()
+    for player_guesses, random_bool in games:
+        results = GameRoom.GameRoom.Game.resolve_results(player_guesses, random_bool)
+        player_frames = [MessageFraming.encode_frame(results[guess]) for guess in player_guesses]
+    per_player_encoding_seconds: float = time.perf_counter() - start_time
+
+    def expected_result(player_guesses: list[str | None], player_id: int, random_bool: bool) -> str:
+        if None in player_guesses:
+            return OperationStatus.OperationStatus.lose_the_game if player_guesses[player_id] is None \
+                else OperationStatus.OperationStatus.win_the_game
+        if all(guess == player_guesses[0] for guess in player_guesses):
+            return OperationStatus.OperationStatus.result_is_tie
+        return OperationStatus.OperationStatus.win_the_game if player_guesses[player_id] == str(random_bool) \
+            else OperationStatus.OperationStatus.lose_the_game
+
+    mismatches: int = 0
+    for player_guesses, random_bool in games[:check_number]:
+        results = GameRoom.GameRoom.Game.resolve_results(player_guesses, random_bool)
+        mismatches += sum(results[guess] != expected_result(player_guesses, player_id, random_bool)
+                          for player_id, guess in enumerate(player_guesses))
+
+    return {
+        "benchmark": "resolution",
+        "room_size": room_size,
+        "games": game_number,
+        "resolve_us_per_game": round(resolve_seconds * 1e6 / game_number, 2),
+        "resolve_ns_per_player": round(resolve_seconds * 1e9 / (game_number * room_size), 1),
+        "per_player_encoding_us_per_game": round(per_player_encoding_seconds * 1e6 / game_number, 2),
+        "checked_games": min(check_number, game_number),
+        "mismatches": mismatches,
+    }
+
+
+def benchmark_batch_resolution(batch_size: int, room_size: int, game_number: int, use_numpy: bool) -> dict:
+    """
+    Games resolved per second when batch_size ready games are resolved together on a tick, in process, no sockets,
+    compared with every game drawing its own random bool and resolving itself.
+    Every batch result is checked: it must be what GameRoom.Game.resolve_results gives for one of the two random bools.
+
+    每个周期一起判定batch_size局就绪游戏时每秒判定的游戏数，进程内，没有套接字，对比每局游戏自己抽随机数并判定
+    每个批次的结果都会核对：必须等于GameRoom.Game.resolve_results在两种随机布尔值之一下的结果
+    """
+    random_generator: random.Random = random.Random(room_size)
+    games_guesses: list[list[str | None]] = [[str(random_generator.random() < 0.5) for _ in range(room_size)]
+                                             for _ in range(game_number)]
+    batches: list[list[list[str | None]]] = [games_guesses[i:i + batch_size]
+                                             for i in range(0, game_number, batch_size)]
+
+    start_time: float = time.perf_counter()
+    for player_guesses in games_guesses:
+        GameRoom.GameRoom.Game.resolve_results(player_guesses, GameRoom.GameRoom.Game.generate_random_bool())
+    one_by_one_seconds: float = time.perf_counter() - start_time
+
+    start_time = time.perf_counter()
+    batches_results: list[list[dict[str | None, str]]] = [BatchResolver.resolve_batch(batch, use_numpy)
+                                                          for batch in batches]
+    batch_seconds: float = time.perf_counter() - start_time
+
+    mismatches: int = 0
+    for batch, games_results in zip(batches, batches_results):
+        for player_guesses, results in zip(batch, games_results):
+            player_results: list[str] = [results[guess] for guess in player_guesses]
+            if all(player_results != [expected[guess] for guess in player_guesses]
+                   for expected in (GameRoom.GameRoom.Game.resolve_results(player_guesses, random_bool)
+                                    for random_bool in (False, True))):
+                mismatches += 1
+
+    return {
+        "benchmark": "batch_resolution",
+        "backend": "numpy" if use_numpy else "python",
+        "batch_size": batch_size,
+        "room_size": room_size,
+        "games": game_number,
+        "one_by_one_games_per_second": round(game_number / one_by_one_seconds),
+        "batch_games_per_second": round(game_number / batch_seconds),
+        "mismatches": mismatches,
+    }
+
+
+def benchmark_list_cache(room_number: int, poll_number: int, changes_per_poll: int) -> dict:
+    """
+    The cost of /list with room_number rooms, in process, no sockets.
+    Each poll follows changes_per_poll room changes (a player enters or leaves a room).
+    Compared: building the answer by visiting every room (before the cache), the cached frame,
+    and "/list since version" of a client keeping its own table.
+
+    room_number个房间时/list的开销，进程内，没有套接字；每次轮询之前有changes_per_poll次房间变化
+    比较：访问每个房间生成回答（缓存之前）、缓存的帧、以及自己维护房间表的客户端使用的"/list since version"
+    """
+    game_hall: GameHall.GameHall = GameHall.GameHall(None, room_number, room_number)
+    rooms: list[GameRoom.GameRoom] = game_hall.game_room_list
+    players: list[Player.Player] = [Player.Player(f"bench{i}", f"password{i}", object(), StressSession(),
+                                                  player_status=Player.Player.IN_THE_GAME_HALL)
+                                    for i in range(changes_per_poll)]
+    for player in players:
+        game_hall.add_player(player)
+
+    def change_rooms(poll: int) -> None:
+        for i, player in enumerate(players):
+            if player.game_room is not None and player in player.game_room.player_list:
+                player.game_room.remove_player(player)
+            else:
+                game_hall.enter_room(player, (poll * changes_per_poll + i) % room_number)
+
+    def visit_all_rooms() -> bytes:
+        return MessageFraming.encode_frame(" ".join(
+            [OperationStatus.OperationStatus.list_rooms_status, str(len(rooms)),
+             *[str(len(game_room.player_list)) for game_room in rooms]]))
+
+    timings: dict[str, float] = {"visit_all_rooms": 0.0, "cached_frame": 0.0, "since_version": 0.0}
+    answer_bytes: dict[str, int] = {"visit_all_rooms": 0, "cached_frame": 0, "since_version": 0}
+    version: int = 0
+    for poll in range(poll_number):
+        if changes_per_poll:
+            change_rooms(poll)
+
+        start_time: float = time.perf_counter()
+        full_frame: bytes = visit_all_rooms()
+        timings["visit_all_rooms"] += time.perf_counter() - start_time
+        answer_bytes["visit_all_rooms"] += len(full_frame)
+
+        start_time = time.perf_counter()
+        cached_frame: bytes = game_hall.list_room_frame()
+        timings["cached_frame"] += time.perf_counter() - start_time
+        answer_bytes["cached_frame"] += len(cached_frame)
+        if cached_frame != full_frame:
+            raise RuntimeError("The cached /list answer is out of date")
+
+        start_time = time.perf_counter()
+        changes: str = game_hall.list_room_changes(version)
+        timings["since_version"] += time.perf_counter() - start_time
+        answer_bytes["since_version"] += len(MessageFraming.encode_frame(changes))
+        version = int(changes.split()[1])
+
+    return {
+        "benchmark": "list_cache",
+        "rooms": room_number,
+        "polls": poll_number,
+        "changes_per_poll": changes_per_poll,
+        "poll_us": {name: round(seconds * 1e6 / poll_number, 2) for name, seconds in timings.items()},
+        "bytes_per_poll": {name: round(size / poll_number) for name, size in answer_bytes.items()},
+    }
+
+
+def run_heart_beat_clients(listening_port: int, client_number: int, heart_beat_interval: float) -> None:
+    """
+    The client side of the heart beat benchmark, runs in its own process so the file descriptors are split
+    Open client_number heart beat connections and send a heart beat on each of them every heart_beat_interval,
+    spread evenly over the interval. Commands come from stdin:
+        stop <k>: the first k connections go silent, print the time
+        exit: close everything
+    心跳测试的客户端，在独立进程中运行，每个连接每隔heart_beat_interval发送一次心跳，均匀分布在间隔内
+    """
+    client_sockets: list[socket.socket] = []
+    for i in range(client_number):
+        client_socket: socket.socket = socket.create_connection(("127.0.0.1", listening_port))
+        client_socket.sendall(MessageFraming.encode_frame(f"Header:heart beat:bench{i}:client"))
+        client_sockets.append(client_socket)
+    print("ready", flush=True)
+
+    response_selector: selectors.BaseSelector = selectors.DefaultSelector()
+    for client_socket in client_sockets:
+        response_selector.register(client_socket, selectors.EVENT_READ)
+
+    heart_beat_frame: bytes = MessageFraming.encode_frame("Heart beat:atrium:send")
+    slice_number: int = 10
+    slice_size: int = -(-client_number // slice_number)
+    silent_number: int = 0
+    next_tick: float = time.monotonic()
+    tick: int = 0
+
+    while True:
+        start: int = (tick % slice_number) * slice_size
+        for client_socket in client_sockets[max(start, silent_number):start + slice_size]:
+            client_socket.send(heart_beat_frame)
+        tick += 1
+
+        # drop the responses, only the server side is measured
+        # 丢弃回复，只测量服务器端
+        for key, _ in response_selector.select(0):
+            key.fileobj.recv(65536)
+
+        if select.select([sys.stdin], [], [], 0)[0]:
+            command: list[str] = sys.stdin.readline().split()
+            if not command or command[0] == "exit":
+                break
+            if command[0] == "stop":
+                silent_number = int(command[1])
+                print(time.monotonic(), flush=True)
+
+        next_tick += heart_beat_interval / slice_number
+        time.sleep(max(0.0, next_tick - time.monotonic()))
+
+    for client_socket in client_sockets:
+        client_socket.close()
+
+
+def benchmark_heart_beat(player_number: int, heart_beat_timeout: float, heart_beat_interval: float,
+                         duration: float, silent_number: int) -> dict:
+    """
+    player_number idle players keep sending heart beats to one HeartBeatSupervisor,
+    report the CPU time of the supervisor, the false expiries while everybody is alive,
+    and how long it takes to notice silent_number players that stop sending
+
+    player_number个空闲玩家向一个心跳监视器发送心跳，报告监视器的CPU时间、误判断线的数量，
+    以及发现silent_number个停止发送心跳的玩家所需的时间
+    """
+    lost_times: dict[str, float] = {}
+
+    def heart_beat_lost(player) -> None:
+        lost_times[player.player_name] = time.monotonic()
+
+    heart_beat_supervisor: HeartBeatSupervisor.HeartBeatSupervisor = \
+        HeartBeatSupervisor.HeartBeatSupervisor(heart_beat_timeout, heart_beat_lost)
+    heart_beat_supervisor.start()
+
+    listening_socket: socket.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    listening_socket.bind(("127.0.0.1", 0))
+    listening_socket.listen(1024)
+    start_code: str = (f"import ServerBenchmark; ServerBenchmark.run_heart_beat_clients("
+                       f"{listening_socket.getsockname()[1]}, {player_number}, {heart_beat_interval})")
+    client_process: subprocess.Popen = subprocess.Popen([sys.executable, "-c", start_code],
+                                                        cwd=SERVER_DIRECTORY,
+                                                        stdin=subprocess.PIPE,
+                                                        stdout=subprocess.PIPE,
+                                                        text=True)
+    # the supervisor reports every lost player, keep the JSON output clean
+    # 监视器会打印每个断线的玩家，保持JSON输出干净
+    with contextlib.redirect_stdout(io.StringIO()):
+        try:
+            for _ in range(player_number):
+                heart_beat_socket, _ = listening_socket.accept()
+                heart_beat_channel: MessageFraming.FramedSocket = MessageFraming.FramedSocket(heart_beat_socket)
+                username: str = heart_beat_channel.recv_message().split(":")[2]
+                heart_beat_supervisor.watch(types.SimpleNamespace(player_name=username), heart_beat_channel)
+            client_process.stdout.readline()
+
+            # one timeout to settle, then measure the steady state
+            # 先等待一个超时时间稳定下来，再测量稳定状态
+            time.sleep(heart_beat_timeout)
+            cpu_start: float = time.process_time()
+            wall_start: float = time.perf_counter()
+            time.sleep(duration)
+            cpu_time: float = time.process_time() - cpu_start
+            wall_time: float = time.perf_counter() - wall_start
+            # everybody is still sending heart beats, every lost player so far is a false expiry
+            # 所有人都还在发送心跳，到目前为止的断线都是误判
+            false_expiries: int = len(lost_times)
+            watched_number: int = heart_beat_supervisor.watched_number()
+            loaded_status: dict[str, int] = read_process_status(os.getpid())
+
+            client_process.stdin.write(f"stop {silent_number}\n")
+            client_process.stdin.flush()
+            silent_time: float = float(client_process.stdout.readline())
+            time.sleep(heart_beat_timeout + 2 * heart_beat_interval)
+        finally:
+            client_process.stdin.write("exit\n")
+            client_process.stdin.flush()
+            client_process.wait()
+            listening_socket.close()
+
+    detection_times: list[float] = sorted(lost_times[f"bench{i}"] - silent_time
+                                          for i in range(silent_number) if f"bench{i}" in lost_times)
+    return {
+        "benchmark": "heart_beat",
+        "players": player_number,
+        "heart_beat_timeout": heart_beat_timeout,
+        "heart_beat_interval": heart_beat_interval,
+        "watched": watched_number,
+        "supervisor_cpu_percent": round(cpu_time / wall_time * 100, 1),
+        "heart_beats_per_second": round(player_number / heart_beat_interval),
+        "false_expiries": false_expiries,
+        "silent_players": silent_number,
+        "detected": len(detection_times),
+        "detection_ms_p50": round(detection_times[len(detection_times) // 2] * 1000, 1) if detection_times else None,
+        "detection_ms_max": round(detection_times[-1] * 1000, 1) if detection_times else None,
+        "threads": loaded_status["threads"],
+        "rss_kb": loaded_status["rss_kb"],
+    }
+
+
+def benchmark_player_registry(player_number: int, thread_number: int, linear_sample: int) -> dict:
+    """
+    The player registry of the game hall with player_number players, in process, no sockets:
+    add, lookup by username, lookup by socket, heart beat pairing, snapshot, remove,
+    then the same from thread_number threads at once. The old linear scan is timed on linear_sample lookups.
+
+    游戏大厅玩家注册表的微基准测试，player_number个玩家，进程内，没有真正的套接字
+    """
+    game_hall: GameHall.GameHall = GameHall.GameHall(None)
+    players: list[Player.Player] = [Player.Player(f"bench{i}", f"password{i}", object(), None, player_status=1)
+                                    for i in range(player_number)]
+    heart_beat_sockets: list[object] = [object() for _ in range(player_number)]
+
+    def per_operation_us(function, arguments) -> float:
+        start_time: float = time.perf_counter()
+        for argument in arguments:
+            function(*argument)
+        return round((time.perf_counter() - start_time) / len(arguments) * 1e6, 3)
+
+    operation_us: dict[str, float] = {
+        "add": per_operation_us(game_hall.add_player, [(player,) for player in players]),
+        "get_by_username": per_operation_us(game_hall.get_player_by_username,
+                                            [(player.player_name,) for player in players]),
+        "get_by_socket": per_operation_us(game_hall.get_player_by_socket,
+                                          [(player.player_socket,) for player in players]),
+        "pair_heart_beat": per_operation_us(game_hall.correspond_heart_beating_socket_to_player_socket,
+                                            [(player.player_name, heart_beat_socket)
+                                             for player, heart_beat_socket in zip(players, heart_beat_sockets)]),
+    }
+    snapshot_start_time: float = time.perf_counter()
+    snapshot_size: int = len(game_hall.player_list)
+    snapshot_ms: float = round((time.perf_counter() - snapshot_start_time) * 1000, 2)
+
+    # the old implementation, one scan of the list per lookup
+    # 旧的实现，每次查找扫描一遍列表
+    def linear_get_by_username(user_name: str) -> Player.Player | None:
+        for player in players:
+            if player.player_name == user_name:
+                return player
+        return None
+
+    sample_players: list[Player.Player] = players[::max(1, player_number // linear_sample)][:linear_sample]
+    operation_us["linear_get_by_username"] = per_operation_us(linear_get_by_username,
+                                                              [(player.player_name,) for player in sample_players])
+    operation_us["remove"] = per_operation_us(game_hall.remove_player, [(player,) for player in players])
+
+    # every thread adds, looks up and removes its own slice of the players
+    # 每个线程添加、查找、删除自己那部分玩家
+    def churn(thread_players: list[Player.Player]) -> None:
+        for player in thread_players:
+            game_hall.add_player(player)
+        for player in thread_players:
+            if game_hall.get_player_by_username(player.player_name) is not player or \
+                    game_hall.get_player_by_socket(player.player_socket) is not player:
+                raise RuntimeError(f"{player.player_name} is not found")
+        for player in thread_players:
+            game_hall.remove_player(player)
+
+    churn_threads: list[threading.Thread] = [threading.Thread(target=churn, args=(players[i::thread_number],))
+                                             for i in range(thread_number)]
+    churn_start_time: float = time.perf_counter()
+    for churn_thread in churn_threads:
+        churn_thread.start()
+    for churn_thread in churn_threads:
+        churn_thread.join()
+    churn_time: float = time.perf_counter() - churn_start_time
+
+    return {
+        "benchmark": "player_registry",
+        "players": player_number,
+        "operation_us": operation_us,
+        "snapshot_players": snapshot_size,
+        "snapshot_ms": snapshot_ms,
+        "threads": thread_number,
+        "concurrent_operations_per_second": round(4 * player_number / churn_time),
+        "players_left_after_churn": len(game_hall.player_registry),
+    }
+
+
+if __name__ == '__main__':
+    argument_parser: argparse.ArgumentParser = argparse.ArgumentParser(description="Game server benchmarks")
+    benchmark_parsers = argument_parser.add_subparsers(dest="benchmark", required=True)
+
+    connections_parser = benchmark_parsers.add_parser("connections",
+                                                      help="logins per second and RSS, thread vs asyncio engine")
+    connections_parser.add_argument("--engines", nargs="+", default=list(GameServer.SERVER_ENGINES),
+                                    choices=GameServer.SERVER_ENGINES)
+    connections_parser.add_argument("--sessions", type=int, default=1000)
+    connections_parser.add_argument("--concurrency", type=int, default=32)
+    connections_parser.add_argument("--in-band-heart-beat", action="store_true",
+                                    help="heart beats on the message socket instead of a second connection")
+
+    protocol_parser = benchmark_parsers.add_parser("protocol",
+                                                   help="latency of one session, protocol v1 vs v2 over a slow link")
+    protocol_parser.add_argument("--engine", default=GameServer.THREAD_ENGINE, choices=GameServer.SERVER_ENGINES)
+    protocol_parser.add_argument("--rtt-ms", type=float, default=50)
+    protocol_parser.add_argument("--lists", type=int, default=10)
+
+    session_latency_parser = benchmark_parsers.add_parser("session-latency",
+                                                          help="latency of full sessions, per socket profile")
+    session_latency_parser.add_argument("--engines", nargs="+", default=list(GameServer.SERVER_ENGINES),
+                                        choices=GameServer.SERVER_ENGINES)
+    session_latency_parser.add_argument("--profiles", nargs="+", default=list(SocketProfile.SOCKET_PROFILES),
+                                        choices=list(SocketProfile.SOCKET_PROFILES))
+    session_latency_parser.add_argument("--protocol-versions", type=int, nargs="+",
+                                        default=[OperationStatus.PROTOCOL_VERSION_1,
+                                                 OperationStatus.PROTOCOL_VERSION_2],
+                                        choices=[OperationStatus.PROTOCOL_VERSION_1,
+                                                 OperationStatus.PROTOCOL_VERSION_2])
+    session_latency_parser.add_argument("--sessions", type=int, default=50)
+    session_latency_parser.add_argument("--lists", type=int, default=10)
+
+    login_storm_parser = benchmark_parsers.add_parser("login-storm",
+                                                      help="server CPU while logins wait for their heart beats")
+    login_storm_parser.add_argument("--engine", default=GameServer.THREAD_ENGINE, choices=GameServer.SERVER_ENGINES)
+    login_storm_parser.add_argument("--players", type=int, default=500)
+    login_storm_parser.add_argument("--concurrency", type=int, default=64)
+    login_storm_parser.add_argument("--heart-beat-delay-ms", type=float, default=100)
+    login_storm_parser.add_argument("--abandoned", type=int, default=20,
+                                    help="players that never open the heart beat connection")
+    login_storm_parser.add_argument("--rendezvous-timeout", type=float, default=2)
+
+    room_stress_parser = benchmark_parsers.add_parser("room-stress",
+                                                      help="hundreds of threads entering the same room")
+    room_stress_parser.add_argument("--threads", type=int, default=400)
+    room_stress_parser.add_argument("--duration", type=float, default=10)
+    room_stress_parser.add_argument("--room-size", type=int, default=2)
+
+    registry_parser = benchmark_parsers.add_parser("registry",
+                                                   help="player registry of the game hall, in process")
+    registry_parser.add_argument("--players", type=int, default=100000)
+    registry_parser.add_argument("--threads", type=int, default=8)
+    registry_parser.add_argument("--linear-sample", type=int, default=200,
+                                 help="lookups timed with the old linear scan")
+
+    match_parser = benchmark_parsers.add_parser("match",
+                                                help="matches per second, /match vs list then enter, in process")
+    match_parser.add_argument("--modes", nargs="+", default=["list", "match"], choices=["list", "match"])
+    match_parser.add_argument("--threads", type=int, default=200)
+    match_parser.add_argument("--rooms", type=int, default=1000)
+    match_parser.add_argument("--duration", type=float, default=5)
+
+    room_pool_parser = benchmark_parsers.add_parser("room-pool",
+                                                    help="rooms created on demand and recycled, in process")
+    room_pool_parser.add_argument("--players", type=int, default=20000)
+    room_pool_parser.add_argument("--min-rooms", type=int, default=GameServer.GAME_ROOM_NUMBER)
+    room_pool_parser.add_argument("--lists", type=int, default=200)
+
+    resolution_parser = benchmark_parsers.add_parser("resolution",
+                                                     help="resolving the results of rooms of any size, in process")
+    resolution_parser.add_argument("--room-sizes", type=int, nargs="+", default=[2, 16, 256])
+    resolution_parser.add_argument("--games", type=int, default=20000)
+    resolution_parser.add_argument("--check", type=int, default=1000,
+                                   help="games checked against the rules applied to each player")
+
+    batch_resolution_parser = benchmark_parsers.add_parser("batch-resolution",
+                                                           help="ready games resolved together per tick, in process")
+    batch_resolution_parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 10, 100, 1000, 10000])
+    batch_resolution_parser.add_argument("--room-size", type=int, default=GameServer.ROOM_SIZE)
+    batch_resolution_parser.add_argument("--games", type=int, default=100000)
+    batch_resolution_parser.add_argument("--backends", nargs="+", choices=["python", "numpy"],
+                                         default=["python", "numpy"] if BatchResolver.NUMPY_AVAILABLE else ["python"])
+
+    list_cache_parser = benchmark_parsers.add_parser("list-cache",
+                                                     help="cached /list answer and /list since version, in process")
+    list_cache_parser.add_argument("--rooms", type=int, default=5000)
+    list_cache_parser.add_argument("--polls", type=int, default=1000)
+    list_cache_parser.add_argument("--changes-per-poll", type=int, nargs="+", default=[0, 1, 16])
+
+    watch_parser = benchmark_parsers.add_parser("watch",
+                                                help="observers following the rooms, /list polling vs /watch pushes")
+    watch_parser.add_argument("--engine", default=GameServer.THREAD_ENGINE, choices=GameServer.SERVER_ENGINES)
+    watch_parser.add_argument("--observers", type=int, default=200)
+    watch_parser.add_argument("--poll-interval", type=float, default=0.2)
+    watch_parser.add_argument("--push-interval", type=float, default=GameServer.ROOM_STATUS_PUSH_INTERVAL)
+    watch_parser.add_argument("--duration", type=float, default=10)
+
+    slow_player_parser = benchmark_parsers.add_parser("slow-player",
+                                                      help="games with a slow first player, answer and quit latency")
+    slow_player_parser.add_argument("--engines", nargs="+", default=GameServer.SERVER_ENGINES,
+                                    choices=GameServer.SERVER_ENGINES)
+    slow_player_parser.add_argument("--slow-delay", type=float, default=2)
+    slow_player_parser.add_argument("--rounds", type=int, default=3)
+
+    disconnect_parser = benchmark_parsers.add_parser("disconnect",
+                                                     help="from a lost heart beat to the opponent quit message")
+    disconnect_parser.add_argument("--engines", nargs="+", default=list(GameServer.SERVER_ENGINES),
+                                   choices=GameServer.SERVER_ENGINES)
+    disconnect_parser.add_argument("--modes", nargs="+", default=["close", "silent"], choices=["close", "silent"])
+    disconnect_parser.add_argument("--rounds", type=int, default=10)
+    disconnect_parser.add_argument("--heart-beat-timeout", type=float, default=1)
+    disconnect_parser.add_argument("--guess-timeout", type=float, default=10)
+
+    guess_timeout_parser = benchmark_parsers.add_parser("guess-timeout",
+                                                        help="games with silent players, forfeit after the timeout")
+    guess_timeout_parser.add_argument("--engines", nargs="+", default=GameServer.SERVER_ENGINES,
+                                      choices=GameServer.SERVER_ENGINES)
+    guess_timeout_parser.add_argument("--guess-timeout", type=float, default=0.5)
+    guess_timeout_parser.add_argument("--rounds", type=int, default=4)
+
+    games_parser = benchmark_parsers.add_parser("games", help="games completed per second")
+    games_parser.add_argument("--engine", default=GameServer.THREAD_ENGINE, choices=GameServer.SERVER_ENGINES)
+    games_parser.add_argument("--clients", type=int, default=200)
+    games_parser.add_argument("--workers", type=int, nargs="+", default=[GameServer.GAME_WORKER_NUMBER],
+                              help="game_worker_number of the thread engine")
+    games_parser.add_argument("--room-size", type=int, default=GameServer.ROOM_SIZE)
+    games_parser.add_argument("--resolution-ticks", type=float, nargs="+", default=[GameServer.RESOLUTION_TICK],
+                              help="resolution_tick of the thread engine, 0 resolves each game at once")
+    games_parser.add_argument("--duration", type=float, default=10)
+
+    waiting_parser = benchmark_parsers.add_parser("waiting",
+                                                  help="server threads while many players wait in their rooms")
+    waiting_parser.add_argument("--engine", default=GameServer.THREAD_ENGINE, choices=GameServer.SERVER_ENGINES)
+    waiting_parser.add_argument("--players", type=int, default=1000)
+    waiting_parser.add_argument("--in-band-heart-beat", action="store_true",
+                                help="heart beats on the message socket instead of a second connection")
+    waiting_parser.add_argument("--hold", type=float, default=3,
+                                help="seconds of waiting, longer than the heart beat timeout and the hall thread "
+                                     "idle timeout")
+    waiting_parser.add_argument("--hall-thread-idle-timeout", type=float, default=1)
+
+    slow_clients_parser = benchmark_parsers.add_parser("slow-clients",
+                                                       help="pushes and games while some clients stop reading")
+    slow_clients_parser.add_argument("--engines", nargs="+", default=list(GameServer.SERVER_ENGINES),
+                                     choices=GameServer.SERVER_ENGINES)
+    slow_clients_parser.add_argument("--slow", type=int, default=4,
+                                     help="clients that never read, as many as the game workers")
+    slow_clients_parser.add_argument("--burst", type=int, default=2000,
+                                     help="/list sent at once by each slow client")
+    slow_clients_parser.add_argument("--watchers", type=int, default=20)
+    slow_clients_parser.add_argument("--pairs", type=int, default=10)
+    slow_clients_parser.add_argument("--rooms", type=int, default=2000, help="rooms, the size of a /list answer")
+    slow_clients_parser.add_argument("--push-interval", type=float, default=0.05)
+    slow_clients_parser.add_argument("--duration", type=float, default=5)
+    slow_clients_parser.add_argument("--write-timeout", type=float, default=None,
+                                     help="seconds a slow client may not read before it is evicted")
+    slow_clients_parser.add_argument("--queue-limit-kb", type=int, default=None,
+                                     help="bytes queued for a client before it is evicted")
+
+    soak_parser = benchmark_parsers.add_parser("soak",
+                                               help="churn many sessions, check no thread, socket or player leaks")
+    soak_parser.add_argument("--engines", nargs="+", default=list(GameServer.SERVER_ENGINES),
+                             choices=GameServer.SERVER_ENGINES)
+    soak_parser.add_argument("--sessions", type=int, default=100000)
+    soak_parser.add_argument("--concurrency", type=int, default=16)
+    soak_parser.add_argument("--silent-every", type=int, default=25,
+                             help="one session in this many stops its heart beats in the game hall, 0 for none")
+    soak_parser.add_argument("--sweep-interval", type=float, default=1)
+    soak_parser.add_argument("--heart-beat-timeout", type=float, default=GameServer.HEART_BEAT_TIMEOUT)
+
+    in_process_parser = benchmark_parsers.add_parser("in-process",
+                                                     help="full sessions against a server in this process, "
+                                                          "time every stage")
+    in_process_parser.add_argument("--engines", nargs="+", default=list(GameServer.SERVER_ENGINES),
+                                   choices=GameServer.SERVER_ENGINES)
+    in_process_parser.add_argument("--transports", nargs="+", default=list(InProcessHarness.TRANSPORTS),
+                                   choices=InProcessHarness.TRANSPORTS)
+    in_process_parser.add_argument("--sessions", type=int, default=2000)
+    in_process_parser.add_argument("--concurrency", type=int, default=8, help="pairs of players playing at once")
+    in_process_parser.add_argument("--in-band-heart-beat", action="store_true",
+                                   help="heart beats on the message socket instead of a second connection")
+    in_process_parser.add_argument("--protocol-version", type=int, default=OperationStatus.PROTOCOL_VERSION_2,
+                                   choices=[OperationStatus.PROTOCOL_VERSION_1, OperationStatus.PROTOCOL_VERSION_2])
+    in_process_parser.add_argument("--seed", type=int, default=3234)
+
+    heart_beat_parser = benchmark_parsers.add_parser("heartbeat",
+                                                     help="one heart beat supervisor watching many idle players")
+    heart_beat_parser.add_argument("--players", type=int, default=10000)
+    heart_beat_parser.add_argument("--timeout", type=float, default=GameServer.HEART_BEAT_TIMEOUT)
+    heart_beat_parser.add_argument("--interval", type=float, default=0.5)
+    heart_beat_parser.add_argument("--duration", type=float, default=10)
+    heart_beat_parser.add_argument("--silent", type=int, default=100,
+                                   help="players that stop sending heart beats at the end")
+
+    arguments: argparse.Namespace = argument_parser.parse_args()
+
+    if arguments.benchmark == "connections":
+        for engine in arguments.engines:
+            print(json.dumps(benchmark_connections(engine, arguments.sessions, arguments.concurrency,
+                                                   arguments.in_band_heart_beat)))
+    elif arguments.benchmark == "protocol":
+        for version in (OperationStatus.PROTOCOL_VERSION_1, OperationStatus.PROTOCOL_VERSION_2):
+            print(json.dumps(benchmark_protocol_latency(arguments.engine, version, arguments.rtt_ms, arguments.lists)))
+    elif arguments.benchmark == "session-latency":
+        for server_engine in arguments.engines:
+            for protocol_version in arguments.protocol_versions:
+                for profile in arguments.profiles:
+                    print(json.dumps(benchmark_session_latency(server_engine, profile, protocol_version,
+                                                               arguments.sessions, arguments.lists)))
+    elif arguments.benchmark == "login-storm":
+        print(json.dumps(benchmark_login_storm(arguments.engine, arguments.players, arguments.concurrency,
+                                               arguments.heart_beat_delay_ms / 1000, arguments.abandoned,
+                                               arguments.rendezvous_timeout)))
+    elif arguments.benchmark == "room-stress":
+        print(json.dumps(stress_room_entry(arguments.threads, arguments.duration, arguments.room_size)))
+    elif arguments.benchmark == "registry":
+        print(json.dumps(benchmark_player_registry(arguments.players, arguments.threads, arguments.linear_sample)))
+    elif arguments.benchmark == "match":
+        for mode in arguments.modes:
+            print(json.dumps(benchmark_match(mode, arguments.threads, arguments.rooms, arguments.duration)))
+    elif arguments.benchmark == "room-pool":
+        print(json.dumps(benchmark_room_pool(arguments.players, arguments.min_rooms, arguments.lists)))
+    elif arguments.benchmark == "resolution":
+        for room_size in arguments.room_sizes:
+            print(json.dumps(benchmark_resolution(room_size, arguments.games, arguments.check)))
+    elif arguments.benchmark == "batch-resolution":
+        for backend in arguments.backends:
+            for batch_size in arguments.batch_sizes:
+                print(json.dumps(benchmark_batch_resolution(batch_size, arguments.room_size, arguments.games,
+                                                            backend == "numpy")))
+    elif arguments.benchmark == "list-cache":
+        for changes in arguments.changes_per_poll:
+            print(json.dumps(benchmark_list_cache(arguments.rooms, arguments.polls, changes)))
+    elif arguments.benchmark == "watch":
+        for watch_mode in (False, True):
+            print(json.dumps(benchmark_watch(arguments.engine, watch_mode, arguments.observers,
+                                             arguments.poll_interval, arguments.push_interval, arguments.duration)))
+    elif arguments.benchmark == "slow-player":
+        for server_engine in arguments.engines:
+            for heart_beat_in_band in (False, True):
+                print(json.dumps(benchmark_slow_player(server_engine, heart_beat_in_band,
+                                                       arguments.slow_delay, arguments.rounds)))
+    elif arguments.benchmark == "disconnect":
+        for server_engine in arguments.engines:
+            for loss_mode in arguments.modes:
+                for quitter_guessed in (False, True):
+                    print(json.dumps(benchmark_disconnect(server_engine, loss_mode, quitter_guessed, arguments.rounds,
+                                                          arguments.heart_beat_timeout, arguments.guess_timeout)))
+    elif arguments.benchmark == "guess-timeout":
+        for server_engine in arguments.engines:
+            for heart_beat_in_band in (False, True):
+                for protocol_version in (OperationStatus.PROTOCOL_VERSION_1, OperationStatus.PROTOCOL_VERSION_2):
+                    print(json.dumps(benchmark_guess_timeout(server_engine, heart_beat_in_band, protocol_version,
+                                                             arguments.guess_timeout, arguments.rounds)))
+    elif arguments.benchmark == "games":
+        if arguments.engine == GameServer.THREAD_ENGINE:
+            for game_worker_number in arguments.workers:
+                for resolution_tick in arguments.resolution_ticks:
+                    print(json.dumps(benchmark_games(arguments.engine, arguments.clients, arguments.duration,
+                                                     game_worker_number=game_worker_number,
+                                                     room_size=arguments.room_size,
+                                                     resolution_tick=resolution_tick)))
+        else:
+            print(json.dumps(benchmark_games(arguments.engine, arguments.clients, arguments.duration,
+                                             room_size=arguments.room_size)))
+    elif arguments.benchmark == "waiting":
+        if arguments.engine == GameServer.THREAD_ENGINE:
+            print(json.dumps(benchmark_waiting_players(arguments.engine, arguments.players,
+                                                       arguments.in_band_heart_beat, arguments.hold,
+                                                       hall_thread_idle_timeout=arguments.hall_thread_idle_timeout)))
+        else:
+            print(json.dumps(benchmark_waiting_players(arguments.engine, arguments.players,
+                                                       arguments.in_band_heart_beat, arguments.hold)))
+    elif arguments.benchmark == "slow-clients":
+        # only the given limits are passed, the defaults of the server are measured otherwise
+        # 只传入给出的限制，否则测量服务器的默认值
+        outbound_options: dict[str, float] = {}
+        if arguments.write_timeout is not None:
+            outbound_options["write_timeout"] = arguments.write_timeout
+        if arguments.queue_limit_kb is not None:
+            outbound_options["outbound_queue_limit"] = arguments.queue_limit_kb * 1024
+        for server_engine in arguments.engines:
+            print(json.dumps(benchmark_slow_clients(server_engine, arguments.slow, arguments.burst, arguments.watchers,
+                                                    arguments.pairs, arguments.rooms, arguments.push_interval,
+                                                    arguments.duration, **outbound_options)))
+    elif arguments.benchmark == "soak":
+        for server_engine in arguments.engines:
+            print(json.dumps(benchmark_soak(server_engine, arguments.sessions, arguments.concurrency,
+                                            arguments.silent_every, arguments.sweep_interval,
+                                            arguments.heart_beat_timeout)))
+    elif arguments.benchmark == "in-process":
+        for server_engine in arguments.engines:
+            for transport in arguments.transports:
+                print(json.dumps(benchmark_in_process(server_engine, transport, arguments.sessions,
+                                                      arguments.concurrency, arguments.in_band_heart_beat,
+                                                      arguments.protocol_version, arguments.seed)))
+    elif arguments.benchmark == "heartbeat":
+        print(json.dumps(benchmark_heart_beat(arguments.players, arguments.timeout, arguments.interval,
+                                              arguments.duration, arguments.silent)))
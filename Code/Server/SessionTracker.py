@@ -0,0 +1,248 @@
+from __future__ import annotations
+
+import asyncio
+import itertools
+import socket
+import threading
+import time
+from typing import Callable
+
+import GameHall
+import Player
+
+# what a sweep reclaims
+# 清扫回收的资源
+ORPHANED_SESSION: str = "orphaned_sessions"
+ORPHANED_PLAYER: str = "orphaned_players"
+
+
+class SessionRecord:
+    """
+    What one session holds: the thread (or task) running it, its connections and its player
+    A connection is a socket of the thread engine or a transport of the asyncio engine
+    一个会话持有的资源：运行它的线程（或任务）、它的连接和它的玩家
+    连接是多线程引擎的套接字或asyncio引擎的传输
+    """
+
+    def __init__(self, session_id: int, session: object,
+                 connection: socket.socket | asyncio.BaseTransport) -> None:
+        self.session_id: int = session_id
+        # GameServer.GameServerThreadEachPlayer or AsyncGameServer.AsyncGameSession
+        # GameServer.GameServerThreadEachPlayer或AsyncGameServer.AsyncGameSession
+        self.session: object = session
+        # the connection of the session, then the heart beat connection handed over to it
+        # 会话的连接，之后还有交给它的心跳连接
+        self.connections: list[socket.socket | asyncio.BaseTransport] = [connection]
+        self.player: Player.Player | None = None
+        # the thread or task running the session, None while a session of the thread engine holds no thread
+        # 运行会话的线程或任务，多线程引擎的会话不占用线程时为None
+        self.holder: object | None = None
+        self.opened_time: float = time.monotonic()
+        # found orphaned by the last sweep, reclaimed if it still is at the next one
+        # 上一次清扫发现它是孤儿，如果下一次仍然是就回收
+        self.orphan_suspected: bool = False
+
+    @staticmethod
+    def connection_closed(connection: socket.socket | asyncio.BaseTransport) -> bool:
+        if isinstance(connection, socket.socket):
+            return connection.fileno() == -1
+        return connection.is_closing()
+
+    def connections_closed(self) -> bool:
+        return all(self.connection_closed(connection) for connection in self.connections)
+
+    def holder_finished(self) -> bool:
+        """
+        :return: whether the thread or task holding the session ended without releasing it
+        """
+        if isinstance(self.holder, threading.Thread):
+            return not self.holder.is_alive()
+        if isinstance(self.holder, asyncio.Task):
+            return self.holder.done()
+        return False
+
+
+class SessionTracker:
+    """
+    Accounts for the thread, the connections and the player of every session, both engines
+
+    Every accepted connection opens a record, the session closes it when it ends, and the server closes it
+    when the player is disconnected. Every sweep_interval seconds the sweep looks for what nobody will release:
+    a record whose player left the game hall, whose connections are all closed or whose thread ended,
+    a player in the game hall that no open record holds. Found twice in a row, so a session ending right now is not counted,
+    it is reclaimed and counted as a leak.
+
+    统计每个会话的线程、连接和玩家，两种引擎都使用
+    每个接受的连接打开一条记录，会话结束时关闭它，玩家断开时服务器也会关闭它。每sweep_interval秒清扫一次，
+    寻找没有人会释放的资源：玩家已离开游戏大厅、连接全部关闭或线程已结束的记录，没有任何打开的记录持有的大厅玩家。
+    连续两次被发现才回收并计为泄漏，这样正在结束的会话不会被计入
+    """
+
+    def __init__(self, game_hall: GameHall.GameHall, sweep_interval: float,
+                 reclaim_session: Callable[[SessionRecord], None],
+                 release_player: Callable[[Player.Player], None]) -> None:
+        """
+        :param game_hall: the players logged in are in its registry
+        :param sweep_interval: seconds between two sweeps
+        :param reclaim_session: wakes up whatever waits on the session and releases it, e.g. the blocked thread
+        :param release_player: removes a player from the room and the game hall, e.g. GameServer.disconnect_player
+        """
+        self.game_hall: GameHall.GameHall = game_hall
+        self.sweep_interval: float = sweep_interval
+        self.reclaim_session: Callable[[SessionRecord], None] = reclaim_session
+        self.release_player: Callable[[Player.Player], None] = release_player
+
+        self.records: dict[int, SessionRecord] = {}
+        self.lock: threading.Lock = threading.Lock()
+        self.session_ids: itertools.count = itertools.count()
+        self.opened_number: int = 0
+        self.closed_number: int = 0
+        self.reclaimed_numbers: dict[str, int] = {ORPHANED_SESSION: 0, ORPHANED_PLAYER: 0}
+        # the players without a record at the last sweep
+        # 上一次清扫时没有记录的玩家
+        self.suspected_players: set[Player.Player] = set()
+
+    def open(self, session: object, connection: socket.socket | asyncio.BaseTransport) -> SessionRecord:
+        """
+        A connection is accepted
+        :param session: the session of the connection
+        :param connection: its socket, or its transport
+        :return: the record, closed by close()
+        """
+        with self.lock:
+            record: SessionRecord = SessionRecord(next(self.session_ids), session, connection)
+            self.records[record.session_id] = record
+            self.opened_number += 1
+        return record
+
+    @staticmethod
+    def set_holder(record: SessionRecord, holder: object | None) -> None:
+        """
+        :param record: the record
+        :param holder: the thread or task running the session from now on, None when the session holds none
+        :return: None
+        """
+        record.holder = holder
+
+    @staticmethod
+    def set_player(record: SessionRecord, player: Player.Player) -> None:
+        """
+        The session logged in, call it after the player is added to the game hall
+        :param record: the record
+        :param player: the player
+        :return: None
+        """
+        record.player = player
+
+    def hand_over(self, record: SessionRecord, owner_record: SessionRecord) -> None:
+        """
+        The connection now belongs to another session, e.g. a heart beat connection paired with its login
+        :param record: the record of the connection, forgotten
+        :param owner_record: the record of the session it belongs to
+        :return: None
+        """
+        with self.lock:
+            if self.records.pop(record.session_id, None) is None:
+                return
+            self.closed_number += 1
+            owner_record.connections.extend(record.connections)
+
+    def close(self, record: SessionRecord) -> bool:
+        """
+        The session ended, close its connections and forget it, any thread, more than once is fine
+        :param record: the record
+        :return: False if it was closed already
+        """
+        with self.lock:
+            if self.records.pop(record.session_id, None) is None:
+                return False
+            self.closed_number += 1
+        record.holder = None
+        for connection in record.connections:
+            connection.close()
+        return True
+
+    def sweep(self) -> dict[str, int]:
+        """
+        Reclaim what no session will release, see the class
+        :return: the numbers reclaimed by this sweep
+        """
+        reclaimed_numbers: dict[str, int] = {ORPHANED_SESSION: 0, ORPHANED_PLAYER: 0}
+        with self.lock:
+            records: list[SessionRecord] = list(self.records.values())
+
+        for record in records:
+            orphaned: bool = record.connections_closed() or record.holder_finished() or \
+                (record.player is not None and record.player not in self.game_hall.player_registry)
+            if not orphaned:
+                record.orphan_suspected = False
+            elif not record.orphan_suspected:
+                record.orphan_suspected = True
+            else:
+                print("Orphaned Session Reclaimed", record.session_id,
+                      record.player.player_name if record.player is not None else None)
+                try:
+                    self.reclaim_session(record)
+                except Exception as e:
+                    print("Session Reclaim Error", repr(e))
+                # reclaiming the player may have closed it already
+                # 回收玩家时可能已经关闭了它
+                self.close(record)
+                reclaimed_numbers[ORPHANED_SESSION] += 1
+
+        with self.lock:
+            owned_players: set[Player.Player] = {record.player for record in self.records.values()
+                                                 if record.player is not None}
+        unowned_players: set[Player.Player] = set(self.game_hall.player_list) - owned_players
+        for player in unowned_players & self.suspected_players:
+            print("Orphaned Player Released", player.player_name)
+            try:
+                self.release_player(player)
+            except Exception as e:
+                print("Player Release Error", repr(e))
+            reclaimed_numbers[ORPHANED_PLAYER] += 1
+        self.suspected_players = unowned_players - self.suspected_players
+
+        with self.lock:
+            for reclaimed, number in reclaimed_numbers.items():
+                self.reclaimed_numbers[reclaimed] += number
+        return reclaimed_numbers
+
+    def stats(self) -> dict[str, int]:
+        """
+        The resources held by the sessions now and the leaks reclaimed so far, for monitoring
+        会话现在持有的资源和目前回收的泄漏，用于监控
+        :return: {"sessions": ..., "session_holders": ..., "session_connections": ..., "players": ..., ...}
+        """
+        with self.lock:
+            records: list[SessionRecord] = list(self.records.values())
+            session_stats: dict[str, int] = {
+                "sessions": len(records),
+                "session_holders": sum(record.holder is not None for record in records),
+                "session_connections": sum(not record.connection_closed(connection) for record in records
+                                           for connection in record.connections),
+                "players": len(self.game_hall.player_registry),
+                "opened_sessions": self.opened_number,
+                "closed_sessions": self.closed_number,
+            }
+            session_stats.update(self.reclaimed_numbers)
+        return session_stats
+
+
+class SessionSweepThread(threading.Thread):
+    """
+    Sweeps a SessionTracker every sweep_interval seconds, thread engine
+    每sweep_interval秒清扫一次SessionTracker，多线程引擎使用
+    """
+
+    def __init__(self, session_tracker: SessionTracker) -> None:
+        super().__init__(name="SessionSweepThread", daemon=True)
+        self.session_tracker: SessionTracker = session_tracker
+
+    def run(self) -> None:
+        while True:
+            time.sleep(self.session_tracker.sweep_interval)
+            try:
+                self.session_tracker.sweep()
+            except Exception as e:
+                print("Session Sweep Error", repr(e))
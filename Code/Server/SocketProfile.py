@@ -0,0 +1,32 @@
+import socket
+
+# Socket option profiles, shared by the server and the client (the same file is in both folders)
+# 套接字选项配置，服务器和客户端共用（两个文件夹里是同一个文件）
+
+# the default of the operating system, Nagle's algorithm on (asyncio turns it off, it is turned on again):
+# a small frame waits until the previous one is acknowledged, the peer may delay that ACK by tens of milliseconds
+# 操作系统的默认选项，开启Nagle算法（asyncio会关闭它，这里重新开启）：小的帧要等前一帧被确认才发送，对方可能把这个ACK延迟几十毫秒
+DEFAULT_PROFILE: str = "default"
+# every frame leaves at once, the frames of one reply are coalesced into one send by FramedSocket.hold_frames
+# 每一帧立刻发送，同一个回复的帧由FramedSocket.hold_frames合并成一次发送
+LATENCY_PROFILE: str = "latency"
+
+# profile -> (level, option, value) set on every socket of the profile
+# 配置 -> 在配置的每个套接字上设置的（级别，选项，值）
+SOCKET_PROFILES: dict[str, tuple[tuple[int, int, int], ...]] = {
+    DEFAULT_PROFILE: ((socket.IPPROTO_TCP, socket.TCP_NODELAY, 0),),
+    LATENCY_PROFILE: ((socket.IPPROTO_TCP, socket.TCP_NODELAY, 1),),
+}
+
+
+def apply_socket_profile(profile_socket: socket.socket, socket_profile: str) -> None:
+    """
+    Set the options of the profile on a TCP socket, before or after it is connected
+    :param profile_socket: the socket
+    :param socket_profile: one of SOCKET_PROFILES
+    :return: None
+    """
+    if socket_profile not in SOCKET_PROFILES:
+        raise ValueError(f"Unknown socket profile {socket_profile}, should be one of {tuple(SOCKET_PROFILES)}")
+    for level, option, value in SOCKET_PROFILES[socket_profile]:
+        profile_socket.setsockopt(level, option, value)